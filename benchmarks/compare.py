@@ -0,0 +1,70 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+"""
+Compare two benchmark result files, e.g. of a base commit and of a change:
+
+    python -m benchmarks.compare benchmark_results/base.json benchmark_results/change.json
+"""
+
+import argparse
+
+import ujson as json
+
+
+def get_result_key(result):
+    return result['scenario'], result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(base, change, threshold):
+    """
+    :return: a line for each result that appears in both *base* and *change*, with the ratio between their median
+    timings; ratios that exceed 1 + *threshold* are marked as regressions
+    """
+    base_results = {get_result_key(result): result for result in base['results']}
+    lines = []
+    for result in change['results']:
+        key = get_result_key(result)
+        if key not in base_results:
+            continue
+        base_seconds = base_results[key]['median_seconds']
+        ratio = result['median_seconds'] / base_seconds if base_seconds > 0 else float('inf')
+        marker = 'REGRESSION' if ratio > 1 + threshold else ''
+        params = ' '.join(f'{k}={v}' for k, v in result['params'].items())
+        lines.append(f"{key[0]:<16} {key[1]:<36} {params:<40} {base_seconds:>10.4f}s "
+                     f"{result['median_seconds']:>10.4f}s {ratio:>7.2f}x {marker}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two Label Sleuth benchmark result files')
+    parser.add_argument('base')
+    parser.add_argument('change')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown above which a result is marked as a regression')
+    args = parser.parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.change) as f:
+        change = json.load(f)
+    for name in ['git_commit', 'scale', 'platform']:
+        print(f"{name}: {base['metadata'].get(name)} -> {change['metadata'].get(name)}")
+    for line in compare(base, change, args.threshold):
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
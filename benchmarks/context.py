@@ -0,0 +1,87 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import logging
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from benchmarks.corpus_generator import SyntheticCorpus
+from benchmarks.results import BenchmarkResults
+from label_sleuth.data_access.core.data_structs import WorkspaceModelType
+from label_sleuth.data_access.file_based.file_based_data_access import FileBasedDataAccess
+
+WORKSPACE_ID = 'benchmark_workspace'
+CATEGORY_ID = 0
+
+
+@dataclass
+class BenchmarkContext:
+    """
+    The state shared by the benchmark scenarios: a synthetic corpus that was loaded into a FileBasedDataAccess, and
+    the topic of each of its rows (in dataset row order), from which labels are derived.
+    """
+    corpus: SyntheticCorpus
+    data_access: FileBasedDataAccess
+    dataset_name: str
+    work_dir: str
+    topics: np.ndarray
+    inference_chunk_size: int
+    train_size: int
+    process_workers: int = 0
+
+    @property
+    def num_rows(self):
+        return len(self.topics)
+
+    def iterate_row_chunks(self, chunk_size=None):
+        chunk_size = chunk_size if chunk_size is not None else self.inference_chunk_size
+        for chunk_start in range(0, self.num_rows, chunk_size):
+            yield np.arange(chunk_start, min(chunk_start + chunk_size, self.num_rows))
+
+    def get_train_rows(self):
+        """
+        :return: a deterministic sample of *train_size* rows, in which the rows of each topic are overrepresented
+        """
+        rng = np.random.default_rng(self.corpus.spec.seed)
+        topic_rows = np.flatnonzero(self.topics >= 0)
+        other_rows = np.flatnonzero(self.topics < 0)
+        num_topic_rows = min(len(topic_rows), self.train_size // 2)
+        return np.sort(np.concatenate([
+            rng.choice(topic_rows, size=num_topic_rows, replace=False),
+            rng.choice(other_rows, size=min(len(other_rows), self.train_size - num_topic_rows), replace=False)]))
+
+
+def load_corpus(corpus: SyntheticCorpus, data_access: FileBasedDataAccess, dataset_name, results: BenchmarkResults):
+    """
+    Add the documents of *corpus* to *dataset_name* block by block, timing each addition, and create the benchmark
+    workspace.
+    :return: the topic of each row of the dataset
+    """
+    data_access.delete_dataset(dataset_name)
+    timings = []
+    topics = []
+    for block in corpus.iterate_blocks():
+        documents = corpus.to_documents(dataset_name, block)
+        start = time.perf_counter()
+        data_access.add_documents(dataset_name, documents)
+        timings.append(time.perf_counter() - start)
+        topics.append(block['topic'].values)
+        logging.info(f'loaded {sum(len(block_topics) for block_topics in topics)} out of {corpus.spec.num_rows} rows')
+    results.add('data_access', 'add_documents', [sum(timings)], items=corpus.spec.num_rows, blocks=len(timings))
+    data_access.initialize_user_labels(WORKSPACE_ID, dataset_name, WorkspaceModelType.Binary)
+    return np.concatenate(topics)
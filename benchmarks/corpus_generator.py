@@ -0,0 +1,167 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+from dataclasses import dataclass
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from label_sleuth.data_access.core.data_structs import Document, TextElement, URI_SEP
+
+# the corpus is generated in blocks of whole documents with roughly this number of rows, each from its own random
+# generator, so that large corpora can be generated (and loaded) without holding all of their rows in memory
+ROWS_PER_BLOCK = 100000
+NO_TOPIC = -1
+TOPIC_WORDS_PER_TOPIC = 5
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'ba', 'do', 'fu', 'gi', 'ha', 'je', 'pu', 'ro',
+             'se', 'ta', 'wi', 'an', 'el', 'is', 'om', 'ur']
+
+
+@dataclass
+class CorpusSpec:
+    """
+    The parameters of a synthetic corpus. The same spec always generates the same corpus.
+
+    :param num_rows: the total number of text elements
+    :param num_documents: the number of documents, between which the text elements are split evenly
+    :param duplicate_rate: the fraction of text elements whose text duplicates the text of a previous element
+    :param mean_words: the mean number of words in a text element; lengths follow a lognormal distribution
+    :param words_sigma: the sigma of the lognormal distribution of the text element lengths
+    :param max_words: the maximal number of words in a text element
+    :param vocabulary_size: the number of distinct words, which are sampled according to Zipf's law
+    :param zipf_exponent: the exponent of the Zipf distribution of the words
+    :param num_topics: the number of topics. Elements of a topic contain one of its topic words, so that labels derived
+    from the topics can be learned by the models
+    :param topic_rate: the fraction of text elements that belong to one of the topics
+    :param seed: the random seed
+    """
+    num_rows: int = 10000
+    num_documents: int = 100
+    duplicate_rate: float = 0.1
+    mean_words: float = 20
+    words_sigma: float = 0.5
+    max_words: int = 200
+    vocabulary_size: int = 20000
+    zipf_exponent: float = 1.1
+    num_topics: int = 3
+    topic_rate: float = 0.2
+    seed: int = 0
+
+
+class SyntheticCorpus:
+    """
+    A deterministic generator of a synthetic corpus of documents, as described by a CorpusSpec.
+    """
+
+    def __init__(self, spec: CorpusSpec):
+        if spec.num_documents < 1 or spec.num_documents > spec.num_rows:
+            raise Exception(f'the number of documents must be between 1 and the number of rows ({spec.num_rows}), '
+                            f'got {spec.num_documents}')
+        self.spec = spec
+        rng = np.random.default_rng([spec.seed, 0])
+        self.vocabulary = self._generate_vocabulary(rng, spec.vocabulary_size)
+        num_topic_words = spec.num_topics * TOPIC_WORDS_PER_TOPIC
+        if num_topic_words >= spec.vocabulary_size:
+            raise Exception(f'the vocabulary size must be larger than {num_topic_words}')
+        # the least frequent words of the vocabulary are reserved as topic words
+        self.topic_words = self.vocabulary[spec.vocabulary_size - num_topic_words:] \
+            .reshape(spec.num_topics, TOPIC_WORDS_PER_TOPIC)
+        ranks = np.arange(1, spec.vocabulary_size - num_topic_words + 1, dtype=np.float64)
+        self.word_probabilities = ranks ** -spec.zipf_exponent
+        self.word_probabilities /= self.word_probabilities.sum()
+
+    @staticmethod
+    def _generate_vocabulary(rng, vocabulary_size) -> np.ndarray:
+        words = set()
+        vocabulary = []
+        while len(vocabulary) < vocabulary_size:
+            word = ''.join(rng.choice(SYLLABLES, size=rng.integers(2, 5)))
+            if word not in words:
+                words.add(word)
+                vocabulary.append(word)
+        return np.array(vocabulary, dtype=object)
+
+    def get_document_name(self, document_index):
+        return f'doc_{document_index}'
+
+    def get_document_row_range(self, document_index):
+        """
+        :return: the start and end (exclusive) positions of the rows of a document in the corpus
+        """
+        return (document_index * self.spec.num_rows // self.spec.num_documents,
+                (document_index + 1) * self.spec.num_rows // self.spec.num_documents)
+
+    def iterate_blocks(self) -> Iterator[pd.DataFrame]:
+        """
+        Generate the corpus in blocks of whole documents.
+        :return: an iterator of DataFrames with the columns 'document_index', 'text' and 'topic' (the topic of each
+        text element, or NO_TOPIC)
+        """
+        rows_per_document = max(self.spec.num_rows // self.spec.num_documents, 1)
+        documents_per_block = max(ROWS_PER_BLOCK // rows_per_document, 1)
+        for block_index, first_document in enumerate(range(0, self.spec.num_documents, documents_per_block)):
+            last_document = min(first_document + documents_per_block, self.spec.num_documents)
+            yield self._generate_block(block_index, first_document, last_document)
+
+    def _generate_block(self, block_index, first_document, last_document) -> pd.DataFrame:
+        spec = self.spec
+        rng = np.random.default_rng([spec.seed, block_index + 1])
+        block_start = self.get_document_row_range(first_document)[0]
+        num_rows = self.get_document_row_range(last_document - 1)[1] - block_start
+        document_indices = np.arange(first_document, last_document).repeat(
+            [np.subtract(*self.get_document_row_range(doc)[::-1]) for doc in range(first_document, last_document)])
+
+        lengths = np.clip(rng.lognormal(np.log(spec.mean_words), spec.words_sigma, size=num_rows).round(),
+                          1, spec.max_words).astype(np.int64)
+        words = self.vocabulary[rng.choice(len(self.word_probabilities), size=lengths.sum(), p=self.word_probabilities)]
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+
+        topics = np.where(rng.random(num_rows) < spec.topic_rate, rng.integers(0, spec.num_topics, size=num_rows),
+                          NO_TOPIC)
+        topic_rows = np.flatnonzero(topics != NO_TOPIC)
+        topic_word_positions = starts[topic_rows] + (rng.random(len(topic_rows)) * lengths[topic_rows]).astype(np.int64)
+        words[topic_word_positions] = self.topic_words[
+            topics[topic_rows], rng.integers(0, TOPIC_WORDS_PER_TOPIC, size=len(topic_rows))]
+
+        texts = np.array([' '.join(words[start:end]).capitalize() + '.' for start, end in zip(starts, ends)],
+                         dtype=object)
+        # duplicates copy the text (and topic) of a uniformly chosen previous row in the block
+        duplicate_rows = np.flatnonzero(rng.random(num_rows) < spec.duplicate_rate)
+        duplicate_rows = duplicate_rows[duplicate_rows > 0]
+        sources = (rng.random(len(duplicate_rows)) * duplicate_rows).astype(np.int64)
+        for row, source in zip(duplicate_rows.tolist(), sources.tolist()):
+            texts[row] = texts[source]
+            topics[row] = topics[source]
+
+        return pd.DataFrame({'document_index': document_indices, 'text': texts, 'topic': topics.astype(np.int8)})
+
+    def to_documents(self, dataset_name, block: pd.DataFrame) -> List[Document]:
+        """
+        Convert a block of the corpus to Documents, in the same way as the CsvFileProcessor.
+        """
+        documents = []
+        for document_index, document_df in block.groupby('document_index', sort=True):
+            document_uri = dataset_name + URI_SEP + self.get_document_name(document_index)
+            text_elements = []
+            span_start = 0
+            for element_id, text in enumerate(document_df['text'].tolist()):
+                text_elements.append(TextElement(uri=document_uri + URI_SEP + str(element_id), text=text,
+                                                 span=[(span_start, span_start + len(text))], metadata={}))
+                span_start += len(text) + 1
+            documents.append(Document(uri=document_uri, text_elements=text_elements, metadata={}))
+        return documents
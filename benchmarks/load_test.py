@@ -0,0 +1,313 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+"""
+A load generator that simulates concurrent annotators working against the Label Sleuth HTTP API, and reports the
+throughput and latency percentiles of each endpoint as the number of concurrent annotators ramps up, e.g.:
+
+    python -m benchmarks.load_test --scale 10k --concurrency 1 2 4 8 16 --duration 30
+
+By default, the app is started in-process (using create_app() and waitress, as in start_server()) on a temporary
+output directory; use --url to test a running instance instead. In both cases, a synthetic dataset is uploaded
+through the API and each simulated annotator works in a workspace of its own.
+"""
+
+import argparse
+import dataclasses
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+import numpy as np
+import requests
+
+import label_sleuth
+from benchmarks.corpus_generator import CorpusSpec, SyntheticCorpus
+from benchmarks.results import BenchmarkResults
+from benchmarks.run import SCALES
+from label_sleuth.config import load_config
+from label_sleuth.models.core.model_policies import ModelPolicies
+
+SCENARIO = 'load_test'
+CATEGORY_NAME = 'topic_0'
+DOCUMENT_PAGE_SIZE = 50
+SEARCH_PAGE_SIZE = 50
+ACTIVE_LEARNING_PAGE_SIZE = 50
+LABELS_FROM_SEARCH = 3
+LABELS_FROM_DOCUMENT = 2
+SEARCH_PROBABILITY = 0.5
+REQUEST_TIMEOUT_SECONDS = 300
+
+
+class LoadTestClient:
+    """
+    A thin wrapper of the Label Sleuth HTTP API, which records the latency and status of every request
+    """
+
+    def __init__(self, base_url, token=None):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        if token is not None:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+        self.records = []
+
+    def request(self, endpoint, method, path, **kwargs):
+        """
+        :param endpoint: the name under which the latency of the request is recorded
+        :return: the json of the response, or None if the request failed
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=REQUEST_TIMEOUT_SECONDS, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            logging.exception(f'{method} {path} failed')
+            response = None
+            status = None
+        self.records.append((endpoint, time.perf_counter() - start, status))
+        if response is None or status >= 400:
+            return None
+        return response.json()
+
+
+def quote(value):
+    return urllib.parse.quote(str(value), safe='')
+
+
+class AnnotatorSession:
+    """
+    A simulated annotator, who repeatedly reads a page of a document in the main panel, searches for a topic word,
+    labels some of the search results and document elements (polling the status after each label, as the UI does)
+    and fetches the active learning recommendations, labeling the top recommendation.
+    """
+
+    def __init__(self, client: LoadTestClient, workspace_id, category_id, document_uris, corpus: SyntheticCorpus,
+                 seed, think_time_seconds=0):
+        self.client = client
+        self.workspace_id = quote(workspace_id)
+        self.category_id = category_id
+        self.document_uris = document_uris
+        self.positive_words = set(corpus.topic_words[0].tolist())
+        self.search_words = corpus.topic_words[0].tolist() + corpus.vocabulary[:100].tolist()
+        self.rng = np.random.default_rng(seed)
+        self.think_time_seconds = think_time_seconds
+
+    def run(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            self.run_cycle(stop_event)
+
+    def run_cycle(self, stop_event: threading.Event):
+        document_uri = self.document_uris[self.rng.integers(len(self.document_uris))]
+        elements = self._get('document', f'/workspace/{self.workspace_id}/document/{quote(document_uri)}',
+                             {'category_id': self.category_id, 'size': DOCUMENT_PAGE_SIZE, 'start_idx': 0})
+        to_label = self._sample(elements, LABELS_FROM_DOCUMENT)
+
+        if self.rng.random() < SEARCH_PROBABILITY:
+            search_word = self.search_words[self.rng.integers(len(self.search_words))]
+            results = self._get('query', f'/workspace/{self.workspace_id}/query',
+                                {'category_id': self.category_id, 'qry_string': search_word,
+                                 'size': SEARCH_PAGE_SIZE})
+            to_label += self._sample(results, LABELS_FROM_SEARCH)
+
+        for element in to_label:
+            if stop_event.is_set():
+                return
+            self._label(element)
+
+        recommendations = self._get('active_learning', f'/workspace/{self.workspace_id}/active_learning',
+                                    {'category_id': self.category_id, 'size': ACTIVE_LEARNING_PAGE_SIZE})
+        if recommendations is not None and len(recommendations['elements']) > 0:
+            self._label(recommendations['elements'][0])
+
+    def _sample(self, response, count):
+        if response is None or len(response['elements']) == 0:
+            return []
+        indices = self.rng.choice(len(response['elements']), size=min(count, len(response['elements'])),
+                                  replace=False)
+        return [response['elements'][i] for i in indices]
+
+    def _label(self, element):
+        is_positive = len(self.positive_words.intersection(element['text'].lower().rstrip('.').split(' '))) > 0
+        self._think()
+        self.client.request('set_label', 'PUT', f'/workspace/{self.workspace_id}/element/{quote(element["id"])}',
+                            json={'category_id': str(self.category_id), 'binary_label': is_positive,
+                                  'source': 'load_test'})
+        self._get('status', f'/workspace/{self.workspace_id}/status', {'category_id': self.category_id})
+
+    def _get(self, endpoint, path, params):
+        self._think()
+        return self.client.request(endpoint, 'GET', path, params=params)
+
+    def _think(self):
+        if self.think_time_seconds > 0:
+            time.sleep(self.rng.exponential(self.think_time_seconds))
+
+
+def upload_corpus(client: LoadTestClient, corpus: SyntheticCorpus, dataset_name):
+    for block in corpus.iterate_blocks():
+        csv = block.assign(document_id=[corpus.get_document_name(i) for i in block['document_index']])[
+            ['document_id', 'text']].to_csv(index=False)
+        if client.request('upload', 'POST', f'/datasets/{quote(dataset_name)}/add_documents',
+                          files={'file': ('corpus.csv', csv.encode('utf-8'))}) is None:
+            raise Exception(f'failed to upload the corpus to dataset {dataset_name}')
+
+
+def create_workspace(client: LoadTestClient, workspace_id, dataset_name):
+    if client.request('create_workspace', 'POST', '/workspace',
+                      json={'workspace_id': workspace_id, 'dataset_id': dataset_name}) is None:
+        raise Exception(f'failed to create workspace {workspace_id}')
+    category = client.request('create_category', 'POST', f'/workspace/{quote(workspace_id)}/category',
+                              json={'category_name': CATEGORY_NAME, 'category_description': 'load test'})
+    documents = client.request('documents', 'GET', f'/workspace/{quote(workspace_id)}/documents')
+    return int(category['category_id']), [document['document_id'] for document in documents['documents']]
+
+
+def summarize(records, duration_seconds):
+    """
+    :return: a mapping from each endpoint to its latencies, throughput and number of errors
+    """
+    endpoint_to_records = defaultdict(list)
+    for endpoint, latency, status in records:
+        endpoint_to_records[endpoint].append((latency, status))
+    summary = {}
+    for endpoint, endpoint_records in sorted(endpoint_to_records.items()):
+        summary[endpoint] = {'latencies': [latency for latency, _ in endpoint_records],
+                             'requests_per_second': len(endpoint_records) / duration_seconds,
+                             'errors': sum(1 for _, status in endpoint_records if status is None or status >= 400)}
+    return summary
+
+
+def run_load_test(base_url, corpus: SyntheticCorpus, results: BenchmarkResults, concurrency_levels, duration_seconds,
+                  think_time_seconds=0, token=None):
+    setup_client = LoadTestClient(base_url, token)
+    dataset_name = f'load_test_{corpus.spec.num_rows}_{corpus.spec.seed}'
+    existing_datasets = [dataset['dataset_id'] for dataset in setup_client.request('datasets', 'GET',
+                                                                                   '/datasets')['datasets']]
+    if dataset_name not in existing_datasets:
+        logging.info(f'uploading {corpus.spec.num_rows} rows to dataset {dataset_name}')
+        upload_corpus(setup_client, corpus, dataset_name)
+
+    workspaces = []
+    try:
+        for level in concurrency_levels:
+            while len(workspaces) < level:
+                workspace_id = f'load_test_annotator_{len(workspaces)}_{int(time.time())}'
+                workspaces.append((workspace_id, *create_workspace(setup_client, workspace_id, dataset_name)))
+            # the annotators of previous levels continue working in their workspaces
+            clients = [LoadTestClient(base_url, token) for _ in range(level)]
+            sessions = [AnnotatorSession(client, workspace_id, category_id, document_uris, corpus,
+                                         seed=[corpus.spec.seed, level, i], think_time_seconds=think_time_seconds)
+                        for i, (client, (workspace_id, category_id, document_uris)) in enumerate(zip(clients,
+                                                                                                     workspaces))]
+            stop_event = threading.Event()
+            threads = [threading.Thread(target=session.run, args=(stop_event,), daemon=True) for session in sessions]
+            logging.info(f'running {level} concurrent annotators for {duration_seconds} seconds')
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            time.sleep(duration_seconds)
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            records = [record for client in clients for record in client.records]
+            summary = summarize(records, elapsed)
+            summary['all'] = summarize([('all', latency, status) for _, latency, status in records], elapsed)['all']
+            for endpoint, endpoint_summary in summary.items():
+                results.add(SCENARIO, endpoint, endpoint_summary['latencies'], keep_timings=False,
+                            extra={'requests_per_second': endpoint_summary['requests_per_second'],
+                                   'errors': endpoint_summary['errors']},
+                            concurrency=level)
+                result = results.results[-1]
+                logging.info(f"concurrency {level:>3} {endpoint:<16} {result['requests_per_second']:>8.1f} req/s  "
+                             f"p50 {result['median_seconds'] * 1000:>8.1f}ms  "
+                             f"p95 {result['p95_seconds'] * 1000:>8.1f}ms  "
+                             f"p99 {result['p99_seconds'] * 1000:>8.1f}ms  errors {result['errors']}")
+    finally:
+        for workspace_id, _, _ in workspaces:
+            setup_client.request('delete_workspace', 'DELETE', f'/workspace/{quote(workspace_id)}')
+
+
+def start_app_server(output_dir, num_serving_threads, process_workers=0):
+    """
+    Start the app in-process on a free local port, using the default configuration with a CPU-only model policy.
+    :return: the waitress server and its base url
+    """
+    from waitress.server import create_server
+    from label_sleuth.app import create_app
+
+    config = load_config(os.path.join(os.path.dirname(label_sleuth.__file__), 'config.json'))
+    # avoid downloading a spacy model, as in the app tests
+    config.language.spacy_model_name = None
+    config = dataclasses.replace(
+        config, process_workers=process_workers,
+        binary_flow=dataclasses.replace(config.binary_flow, model_policy=ModelPolicies.STATIC_SVM_BOW),
+        multiclass_flow=dataclasses.replace(config.multiclass_flow,
+                                            model_policy=ModelPolicies.STATIC_MULTICLASS_SVM_BOW))
+    app = create_app(config=config, output_dir=output_dir)
+    server = create_server(app, host='127.0.0.1', port=0, threads=num_serving_threads)
+    threading.Thread(target=server.run, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.effective_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Label Sleuth HTTP load test')
+    parser.add_argument('--scale', choices=list(SCALES.keys()), default='10k')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='base url of a running Label Sleuth instance. By default, the app is started '
+                                      'in-process')
+    parser.add_argument('--token', help='authentication token, for instances that require login')
+    parser.add_argument('--num-serving-threads', type=int, default=10,
+                        help='number of waitress threads of the in-process app, as in start_label_sleuth')
+    parser.add_argument('--process-workers', type=int, default=0,
+                        help='number of worker processes of the in-process app')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='numbers of concurrent annotators, in the order in which they are run')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run each concurrency level')
+    parser.add_argument('--think-time', type=float, default=0,
+                        help='mean seconds that an annotator waits before each request. Default is 0, i.e. a closed '
+                             'loop that measures the maximal throughput')
+    parser.add_argument('--output', default=os.path.join('benchmark_results', 'load_test.json'))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    spec: CorpusSpec = dataclasses.replace(SCALES[args.scale], seed=args.seed)
+    corpus = SyntheticCorpus(spec)
+    results = BenchmarkResults(args.scale, spec)
+    results.metadata.update({'url': args.url, 'num_serving_threads': None if args.url else args.num_serving_threads,
+                             'think_time_seconds': args.think_time})
+
+    if args.url is not None:
+        run_load_test(args.url, corpus, results, args.concurrency, args.duration, args.think_time, args.token)
+    else:
+        with tempfile.TemporaryDirectory() as output_dir:
+            server, base_url = start_app_server(output_dir, args.num_serving_threads, args.process_workers)
+            try:
+                run_load_test(base_url, corpus, results, args.concurrency, args.duration, args.think_time)
+            finally:
+                server.task_dispatcher.shutdown()
+                server.close()
+    results.save(args.output)
+    logging.info(f'load test results were written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import datetime
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+
+import numpy as np
+import ujson as json
+
+from benchmarks.corpus_generator import CorpusSpec
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def get_git_commit():
+    """
+    :return: the current git commit of the repository and whether the working tree has uncommitted changes, or
+    (None, None) if they cannot be determined
+    """
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=repo_dir, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_dir,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, len(status.strip()) > 0
+
+
+def get_peak_rss_bytes():
+    if resource is None:
+        return None
+    # ru_maxrss is reported in bytes on macOS, and in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+class BenchmarkResults:
+    """
+    Collects the timings of the benchmark scenarios, along with the information needed to compare them across commits
+    and machines, and writes them to a JSON file.
+    """
+
+    def __init__(self, scale: str, spec: CorpusSpec):
+        commit, dirty = get_git_commit()
+        self.metadata = {'scale': scale, 'corpus_spec': asdict(spec), 'git_commit': commit,
+                         'git_dirty': dirty, 'python_version': platform.python_version(),
+                         'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+                         'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        self.results = []
+
+    def time(self, scenario, name, func, repeats=1, items=None, **params):
+        """
+        Run *func* *repeats* times, and record its timings under *scenario* and *name*.
+        :param scenario: the scenario, e.g. 'data_access'
+        :param name: the name of the timed operation
+        :param func: a function with no arguments
+        :param repeats: the number of times to run *func*. Operations that are not idempotent should use 1
+        :param items: the number of items processed by each run of *func*, used to report a throughput
+        :param params: additional parameters of the operation, which are recorded with the timings
+        :return: the return value of the last run of *func*
+        """
+        timings = []
+        result = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        self.add(scenario, name, timings, items, **params)
+        return result
+
+    def add(self, scenario, name, timings, items=None, keep_timings=True, extra=None, **params):
+        """
+        Record the timings of an operation.
+        :param keep_timings: if False, only the summary of the timings is recorded, e.g. for operations with many
+        thousands of timings
+        :param extra: additional measurements to record with the timings, e.g. a throughput
+        """
+        median = statistics.median(timings)
+        result = {'scenario': scenario, 'name': name, 'params': params, 'repeats': len(timings),
+                  'min_seconds': min(timings), 'median_seconds': median,
+                  'p95_seconds': float(np.percentile(timings, 95)), 'p99_seconds': float(np.percentile(timings, 99)),
+                  'items': items, 'items_per_second': items / median if items and median > 0 else None,
+                  'peak_rss_bytes': get_peak_rss_bytes(), **(extra or {})}
+        if keep_timings:
+            result['timings'] = timings
+        self.results.append(result)
+
+    def to_dict(self):
+        return {'metadata': {**self.metadata, 'peak_rss_bytes': get_peak_rss_bytes()}, 'results': self.results}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
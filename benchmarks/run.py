@@ -0,0 +1,100 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+"""
+Run the performance benchmarks on a synthetic corpus, and write the results to a JSON file, e.g.:
+
+    python -m benchmarks.run --scale 10k --output benchmark_results/10k.json
+
+The 'iteration' scenario measures the latency of a full iteration flow of the OrchestratorApi, from run_iteration()
+until the iteration is ready with active learning recommendations, along with the time of each of its stages.
+
+Results of different commits can then be compared with benchmarks.compare.
+"""
+
+import argparse
+import dataclasses
+import logging
+import os
+import tempfile
+
+from benchmarks.context import BenchmarkContext, load_corpus
+from benchmarks.corpus_generator import CorpusSpec, SyntheticCorpus
+from benchmarks.results import BenchmarkResults
+from benchmarks.scenarios import active_learning, data_access, infer_funnel, iteration, models
+from label_sleuth.data_access.file_based.file_based_data_access import FileBasedDataAccess
+
+SCALES = {
+    '10k': CorpusSpec(num_rows=10 ** 4, num_documents=100),
+    '1m': CorpusSpec(num_rows=10 ** 6, num_documents=10 ** 4),
+    '10m': CorpusSpec(num_rows=10 ** 7, num_documents=10 ** 5),
+}
+
+SCENARIOS = {
+    'data_access': data_access.run,
+    'infer_funnel': infer_funnel.run,
+    'models': models.run,
+    'active_learning': active_learning.run,
+    'iteration': iteration.run,
+}
+
+
+def run_benchmarks(spec: CorpusSpec, scale: str, scenario_names, work_dir, inference_chunk_size=10000,
+                   train_size=2000, process_workers=0) -> BenchmarkResults:
+    results = BenchmarkResults(scale, spec)
+    corpus = SyntheticCorpus(spec)
+    data_access = FileBasedDataAccess(os.path.join(work_dir, 'output'))
+    dataset_name = f'benchmark_{scale}'
+    topics = load_corpus(corpus, data_access, dataset_name, results)
+    context = BenchmarkContext(corpus=corpus, data_access=data_access, dataset_name=dataset_name, work_dir=work_dir,
+                               topics=topics, inference_chunk_size=inference_chunk_size, train_size=train_size,
+                               process_workers=process_workers)
+    for scenario_name in scenario_names:
+        logging.info(f'running benchmark scenario {scenario_name} on {spec.num_rows} rows')
+        SCENARIOS[scenario_name](context, results)
+    data_access.delete_dataset(dataset_name)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Label Sleuth performance benchmarks')
+    parser.add_argument('--scale', choices=list(SCALES.keys()), default='10k')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS.keys()), default=list(SCENARIOS.keys()))
+    parser.add_argument('--output', help='path of the JSON results file',
+                        default=os.path.join('benchmark_results', 'results.json'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--duplicate-rate', type=float, help='override the duplicate rate of the corpus')
+    parser.add_argument('--work-dir', help='directory for the dataset and models. Default is a temporary directory')
+    parser.add_argument('--inference-chunk-size', type=int, default=10000)
+    parser.add_argument('--train-size', type=int, default=2000)
+    parser.add_argument('--process-workers', type=int, default=0,
+                        help='number of worker processes used by the models, as in the process_workers configuration')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    spec = dataclasses.replace(SCALES[args.scale], seed=args.seed)
+    if args.duplicate_rate is not None:
+        spec = dataclasses.replace(spec, duplicate_rate=args.duplicate_rate)
+
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as work_dir:
+        results = run_benchmarks(spec, args.scale, args.scenarios, work_dir, args.inference_chunk_size,
+                                 args.train_size, args.process_workers)
+    results.save(args.output)
+    logging.info(f'benchmark results were written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import numpy as np
+
+from benchmarks.context import BenchmarkContext, CATEGORY_ID, WORKSPACE_ID
+from benchmarks.results import BenchmarkResults
+from label_sleuth.active_learning.core.active_learning_factory import ActiveLearningFactory
+from label_sleuth.active_learning.core.catalog import ActiveLearningCatalog
+from label_sleuth.models.core.prediction import MulticlassPrediction, Prediction
+
+SCENARIO = 'active_learning'
+STRATEGIES = ['RANDOM', 'HARD_MINING', 'RETROSPECTIVE', 'COMBINED_RETROSPECTIVE_HM', 'MULTICLASS_ENTROPY']
+MULTICLASS_STRATEGIES = {'MULTICLASS_ENTROPY'}
+SAMPLE_SIZE = 10
+REPEATS = 3
+
+
+def run(context: BenchmarkContext, results: BenchmarkResults):
+    # the candidates are the unlabeled elements of the dataset, as in the iteration flow of the orchestrator
+    candidates = results.time(SCENARIO, 'get_unlabeled_candidates', lambda: context.data_access
+                              .get_unlabeled_text_elements(WORKSPACE_ID, context.dataset_name, CATEGORY_ID,
+                                                           remove_duplicates=True)['results'])
+
+    rng = np.random.default_rng(context.corpus.spec.seed)
+    scores = rng.random(len(candidates)).tolist()
+    binary_predictions = [Prediction(label=score > 0.5, score=score) for score in scores]
+    class_ids = list(range(context.corpus.spec.num_topics))
+    multiclass_predictions = [MulticlassPrediction(label=int(np.argmax(class_scores)),
+                                                   scores=dict(zip(class_ids, class_scores)))
+                              for class_scores in rng.dirichlet(np.ones(len(class_ids)), size=len(candidates)).tolist()]
+
+    active_learning_factory = ActiveLearningFactory()
+    for strategy_name in STRATEGIES:
+        active_learner = active_learning_factory.get_active_learner(getattr(ActiveLearningCatalog, strategy_name))
+        predictions = multiclass_predictions if strategy_name in MULTICLASS_STRATEGIES else binary_predictions
+        results.time(SCENARIO, 'get_recommended_items_for_labeling',
+                     lambda: active_learner.get_recommended_items_for_labeling(
+                         WORKSPACE_ID, context.dataset_name, CATEGORY_ID, candidates, predictions,
+                         sample_size=SAMPLE_SIZE),
+                     repeats=REPEATS, items=len(candidates), strategy=strategy_name)
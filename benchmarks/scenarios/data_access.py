@@ -0,0 +1,100 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import time
+
+import numpy as np
+
+from benchmarks.context import BenchmarkContext, CATEGORY_ID, WORKSPACE_ID
+from benchmarks.results import BenchmarkResults
+from label_sleuth.data_access.core.data_structs import Label, LABEL_NEGATIVE, LABEL_POSITIVE
+from label_sleuth.data_access.file_based.file_based_data_access import FileBasedDataAccess
+
+SCENARIO = 'data_access'
+PAGE_SIZE = 100
+NUM_PAGES = 20
+LABEL_BATCH_SIZE = 100
+NUM_LABEL_BATCHES = 20
+REPEATS = 5
+
+
+def evict_dataset_from_memory(dataset_name):
+    """
+    Drop the in-memory state of *dataset_name*, which is shared by all FileBasedDataAccess instances, so that it is
+    loaded again from the disk.
+    """
+    FileBasedDataAccess.ds_in_memory.pop(dataset_name, None)
+    FileBasedDataAccess.duplicate_index_in_memory.pop(dataset_name, None)
+    FileBasedDataAccess.documents_in_memory.pop(dataset_name, None)
+    FileBasedDataAccess.uri_index_in_memory.pop(dataset_name, None)
+    FileBasedDataAccess.result_cursors.discard_dataset(dataset_name)
+    for dataset_to_label_index in FileBasedDataAccess.label_index_in_memory.values():
+        dataset_to_label_index.pop(dataset_name, None)
+
+
+def run(context: BenchmarkContext, results: BenchmarkResults):
+    data_access = context.data_access
+    dataset_name = context.dataset_name
+
+    # load
+    evict_dataset_from_memory(dataset_name)
+    results.time(SCENARIO, 'load_dataset_from_disk', lambda: data_access.preload_dataset(dataset_name),
+                 items=context.num_rows)
+    results.time(SCENARIO, 'first_get_text_elements', lambda: data_access.get_text_elements(
+        WORKSPACE_ID, dataset_name, sample_size=PAGE_SIZE), items=PAGE_SIZE)
+
+    # query
+    topic_word = context.corpus.topic_words[0][0]
+    for name, query, is_regex in [('query_topic_word', topic_word, False),
+                                  ('query_regex', f'{topic_word}|{context.corpus.topic_words[1][0]}', True),
+                                  ('query_no_hits', 'nonexistentword', False)]:
+        results.time(SCENARIO, name, lambda: data_access.get_text_elements(
+            WORKSPACE_ID, dataset_name, sample_size=PAGE_SIZE, query=query, is_regex=is_regex), repeats=REPEATS)
+
+    # label
+    rng = np.random.default_rng(context.corpus.spec.seed)
+    label_rows = rng.choice(context.num_rows, size=min(context.num_rows, LABEL_BATCH_SIZE * NUM_LABEL_BATCHES),
+                            replace=False)
+    timings = []
+    for rows in np.array_split(label_rows, NUM_LABEL_BATCHES):
+        elements = data_access.get_text_elements_by_row_positions(WORKSPACE_ID, dataset_name, rows)
+        uris_to_labels = {element.uri: {CATEGORY_ID: Label(LABEL_POSITIVE if topic == 0 else LABEL_NEGATIVE)}
+                          for element, topic in zip(elements, context.topics[rows].tolist())}
+        start = time.perf_counter()
+        data_access.set_labels(WORKSPACE_ID, uris_to_labels, apply_to_duplicate_texts=True)
+        timings.append(time.perf_counter() - start)
+    results.add(SCENARIO, 'set_labels', timings, items=LABEL_BATCH_SIZE, apply_to_duplicate_texts=True)
+    results.time(SCENARIO, 'get_label_counts', lambda: data_access.get_label_counts(
+        WORKSPACE_ID, dataset_name, CATEGORY_ID, remove_duplicates=True), repeats=REPEATS)
+    results.time(SCENARIO, 'get_labeled_text_elements', lambda: data_access.get_labeled_text_elements(
+        WORKSPACE_ID, dataset_name, CATEGORY_ID), repeats=REPEATS)
+
+    # paginate
+    def follow_cursor():
+        page = data_access.get_unlabeled_text_elements(WORKSPACE_ID, dataset_name, CATEGORY_ID,
+                                                       sample_size=PAGE_SIZE, remove_duplicates=True)
+        for _ in range(NUM_PAGES - 1):
+            if page['next_cursor'] is None:
+                break
+            page = data_access.get_unlabeled_text_elements(WORKSPACE_ID, dataset_name, CATEGORY_ID,
+                                                           sample_size=PAGE_SIZE, remove_duplicates=True,
+                                                           cursor=page['next_cursor'])
+
+    results.time(SCENARIO, 'paginate_unlabeled_with_cursor', follow_cursor, repeats=REPEATS,
+                 items=PAGE_SIZE * NUM_PAGES)
+    results.time(SCENARIO, 'get_unlabeled_deep_page', lambda: data_access.get_unlabeled_text_elements(
+        WORKSPACE_ID, dataset_name, CATEGORY_ID, sample_size=PAGE_SIZE, sample_start_idx=context.num_rows // 2,
+        remove_duplicates=True), repeats=REPEATS, items=PAGE_SIZE)
@@ -0,0 +1,71 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import os
+import time
+
+import xxhash
+
+from benchmarks.context import BenchmarkContext
+from benchmarks.results import BenchmarkResults
+from label_sleuth import definitions
+from label_sleuth.models.core.model_api import ModelAPI
+from label_sleuth.models.core.prediction import Prediction
+from label_sleuth.models.util.caches_infer_funnel import get_from_memory_or_disk_or_infer, InFlightPredictions
+from label_sleuth.models.util.prediction_cache import PredictionCache
+
+SCENARIO = 'infer_funnel'
+MODEL_ID = 'benchmark_model'
+
+
+def infer(items):
+    """
+    A cheap deterministic stand-in for a model, so that the timings reflect the overhead of the caches
+    """
+    predictions = []
+    for item in items:
+        score = xxhash.xxh32_intdigest(item['text'].encode('utf-8')) / 2 ** 32
+        predictions.append(Prediction(label=score > 0.5, score=score))
+    return predictions
+
+
+def run(context: BenchmarkContext, results: BenchmarkResults):
+    prediction_store_dir = os.path.join(context.work_dir, 'infer_funnel_prediction_store')
+    in_flight_predictions = InFlightPredictions()
+
+    def infer_all_chunks(memory_cache):
+        timings = []
+        for rows in context.iterate_row_chunks():
+            items = [{'text': text} for text in context.data_access.get_texts_by_row_positions(context.dataset_name,
+                                                                                              rows)]
+            start = time.perf_counter()
+            get_from_memory_or_disk_or_infer(items, memory_cache, in_flight_predictions,
+                                             [ModelAPI._infer_item_to_cache_key(item) for item in items], MODEL_ID,
+                                             infer, Prediction, prediction_store_dir)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    memory_cache = PredictionCache(definitions.INFER_CACHE_MAX_BYTES)
+    # nothing is cached: all the items are inferred and written to the memory cache and the prediction store
+    results.add(SCENARIO, 'infer_and_store', [sum(infer_all_chunks(memory_cache))], items=context.num_rows,
+                chunk_size=context.inference_chunk_size)
+    # all the items are read from the memory cache, unless it is smaller than the corpus
+    results.add(SCENARIO, 'memory_cache', [sum(infer_all_chunks(memory_cache))], items=context.num_rows,
+                chunk_size=context.inference_chunk_size)
+    # an empty memory cache, e.g. after a restart: all the items are read from the prediction store
+    empty_memory_cache = PredictionCache(definitions.INFER_CACHE_MAX_BYTES)
+    results.add(SCENARIO, 'prediction_store', [sum(infer_all_chunks(empty_memory_cache))],
+                items=context.num_rows, chunk_size=context.inference_chunk_size)
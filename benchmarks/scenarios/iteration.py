@@ -0,0 +1,129 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import dataclasses
+import logging
+import os
+import time
+
+import label_sleuth
+from benchmarks.context import BenchmarkContext
+from benchmarks.results import BenchmarkResults
+from label_sleuth.active_learning.core.active_learning_factory import ActiveLearningFactory
+from label_sleuth.config import load_config
+from label_sleuth.data_access.core.data_structs import Label, LABEL_NEGATIVE, LABEL_POSITIVE
+from label_sleuth.metrics import ITERATION_STAGE_SECONDS
+from label_sleuth.models.core.catalog import ModelsCatalog
+from label_sleuth.models.core.models_factory import ModelFactory
+from label_sleuth.models.core.tools import SentenceEmbeddingService
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
+from label_sleuth.orchestrator.core.state_api.orchestrator_state_api import IterationStatus, OrchestratorStateApi
+from label_sleuth.orchestrator.orchestrator_api import OrchestratorApi
+from label_sleuth.training_set_selector.training_set_selector_factory import TrainingSetSelectionFactory
+
+SCENARIO = 'iteration'
+# binary CPU models, which do not require downloading embeddings
+MODEL_TYPES = ['NB_OVER_BOW', 'SVM_OVER_BOW']
+NUM_ITERATIONS = 3
+# the stages of the iteration flow, as timed by the orchestrator in ITERATION_STAGE_SECONDS: collect_train_set,
+# training the model, inference over the full dataset, _calculate_iteration_statistics,
+# _calculate_active_learning_recommendations and _delete_old_models
+STAGES = ['train_set_selection', 'train', 'inference', 'statistics', 'active_learning', 'delete_old_models']
+POLL_INTERVAL_SECONDS = 0.01
+TIMEOUT_SECONDS = 3600
+
+
+def create_orchestrator_api(context: BenchmarkContext) -> OrchestratorApi:
+    """
+    Build an OrchestratorApi over the data access of *context*, using the default configuration of Label Sleuth
+    """
+    config = load_config(os.path.join(os.path.dirname(label_sleuth.__file__), 'config.json'))
+    config = dataclasses.replace(config, process_workers=context.process_workers,
+                                 inference_chunk_size=context.inference_chunk_size,
+                                 max_dataset_length=max(config.max_dataset_length, context.num_rows))
+    output_dir = os.path.join(context.work_dir, 'iteration')
+    background_jobs_manager = BackgroundJobsManager(config.cpu_workers, config.process_workers)
+    model_factory = ModelFactory(output_dir, background_jobs_manager,
+                                 SentenceEmbeddingService(output_dir, background_jobs_manager=None))
+    return OrchestratorApi(OrchestratorStateApi(os.path.join(output_dir, 'workspaces')), context.data_access,
+                           ActiveLearningFactory(), model_factory,
+                           TrainingSetSelectionFactory(context.data_access, background_jobs_manager),
+                           background_jobs_manager, None, config)
+
+
+def get_stage_seconds():
+    return {stage: ITERATION_STAGE_SECONDS.get_sum(stage=stage) for stage in STAGES}
+
+
+def wait_for(condition, description):
+    start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - start > TIMEOUT_SECONDS:
+            raise Exception(f'timed out waiting for {description}')
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def run(context: BenchmarkContext, results: BenchmarkResults):
+    orchestrator_api = create_orchestrator_api(context)
+    train_rows = context.get_train_rows()
+    train_elements = context.data_access.get_text_elements_by_row_positions(None, context.dataset_name, train_rows)
+
+    for model_type_name in MODEL_TYPES:
+        model_type = getattr(ModelsCatalog, model_type_name)
+        workspace_id = f'benchmark_iteration_{model_type_name}'
+        orchestrator_api.create_workspace(workspace_id, context.dataset_name)
+        category_id = orchestrator_api.create_new_category(workspace_id, 'benchmark_category', 'description')
+        uri_to_label = {element.uri: {category_id: Label(LABEL_POSITIVE if topic == 0 else LABEL_NEGATIVE)}
+                        for element, topic in zip(train_elements, context.topics[train_rows].tolist())}
+        results.time(SCENARIO, 'set_labels', lambda: orchestrator_api.set_labels(workspace_id, uri_to_label),
+                     items=len(uri_to_label), model_type=model_type_name)
+
+        for iteration_index in range(NUM_ITERATIONS):
+            stage_seconds_before = get_stage_seconds()
+            deletions_before = ITERATION_STAGE_SECONDS.get_count(stage='delete_old_models')
+            start = time.perf_counter()
+            orchestrator_api.run_iteration(workspace_id, context.dataset_name, category_id, model_type)
+
+            def get_status():
+                return orchestrator_api.get_all_iterations_for_category(workspace_id, category_id)[
+                    iteration_index].status
+
+            wait_for(lambda: get_status() in (IterationStatus.READY, IterationStatus.ERROR),
+                     f'iteration {iteration_index}')
+            time_to_ready = time.perf_counter() - start
+            if get_status() == IterationStatus.ERROR:
+                raise Exception(f'iteration {iteration_index} of {model_type_name} failed')
+            # old models are deleted after the iteration is marked as ready
+            wait_for(lambda: ITERATION_STAGE_SECONDS.get_count(stage='delete_old_models') > deletions_before,
+                     f'the deletion of old models of iteration {iteration_index}')
+            time_to_done = time.perf_counter() - start
+
+            params = {'model_type': model_type_name, 'iteration_index': iteration_index}
+            results.add(SCENARIO, 'time_to_ready', [time_to_ready], items=context.num_rows, **params)
+            results.add(SCENARIO, 'time_to_done', [time_to_done], items=context.num_rows, **params)
+            stage_seconds = {stage: seconds - stage_seconds_before[stage]
+                             for stage, seconds in get_stage_seconds().items()}
+            for stage, seconds in stage_seconds.items():
+                results.add(SCENARIO, f'stage_{stage}', [seconds], **params)
+            # the time between the stages: waiting for the background job queues, and the callbacks of the flow
+            results.add(SCENARIO, 'between_stages', [max(time_to_done - sum(stage_seconds.values()), 0)], **params)
+            logging.info(f'{model_type_name} iteration {iteration_index} was ready after {time_to_ready:.3f} seconds')
+
+        orchestrator_api.delete_workspace(workspace_id)
+
+    background_jobs_manager = orchestrator_api.background_jobs_manager
+    if background_jobs_manager.process_executor is not None:
+        background_jobs_manager.process_executor.shutdown()
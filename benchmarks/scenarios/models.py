@@ -0,0 +1,68 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import logging
+import os
+import time
+
+from benchmarks.context import BenchmarkContext
+from benchmarks.results import BenchmarkResults
+from label_sleuth.models.core.catalog import ModelsCatalog
+from label_sleuth.models.core.languages import Languages
+from label_sleuth.models.core.models_factory import ModelFactory
+from label_sleuth.models.core.tools import SentenceEmbeddingService
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
+
+SCENARIO = 'models'
+# the models of the catalog that run on CPU, and do not require downloading embeddings or a remote service
+CPU_MODEL_TYPES = ['RAND', 'NB_OVER_BOW', 'SVM_OVER_BOW', 'MULTICLASS_SVM_BOW']
+
+
+def run(context: BenchmarkContext, results: BenchmarkResults):
+    background_jobs_manager = BackgroundJobsManager(process_workers=context.process_workers)
+    models_dir = os.path.join(context.work_dir, 'models')
+    model_factory = ModelFactory(models_dir, background_jobs_manager,
+                                 SentenceEmbeddingService(models_dir, background_jobs_manager=None))
+
+    train_rows = context.get_train_rows()
+    train_texts = context.data_access.get_texts_by_row_positions(context.dataset_name, train_rows)
+    train_topics = context.topics[train_rows].tolist()
+    for model_type_name in CPU_MODEL_TYPES:
+        model_api = model_factory.get_model_api(getattr(ModelsCatalog, model_type_name))
+        if model_api.is_multiclass:
+            train_data = [{'text': text, 'label': topic} for text, topic in zip(train_texts, train_topics)
+                          if topic >= 0]
+        else:
+            train_data = [{'text': text, 'label': topic == 0} for text, topic in zip(train_texts, train_topics)]
+
+        model_id = results.time(SCENARIO, 'train', lambda: model_api.train(train_data, Languages.ENGLISH)[1].result(),
+                                items=len(train_data), model_type=model_type_name)
+
+        timings = []
+        for rows in context.iterate_row_chunks():
+            items = [{'text': text} for text in context.data_access.get_texts_by_row_positions(context.dataset_name,
+                                                                                              rows)]
+            start = time.perf_counter()
+            model_api.infer_by_id(model_id, items, use_cache=False)
+            timings.append(time.perf_counter() - start)
+        results.add(SCENARIO, 'infer', [sum(timings)], items=context.num_rows, model_type=model_type_name,
+                    chunk_size=context.inference_chunk_size)
+        logging.info(f'{model_type_name}: trained on {len(train_data)} elements and inferred {context.num_rows} '
+                     f'elements')
+        model_api.delete_model(model_id)
+
+    if background_jobs_manager.process_executor is not None:
+        background_jobs_manager.process_executor.shutdown()
@@ -0,0 +1,61 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import tempfile
+import unittest
+
+from benchmarks.context import load_corpus
+from benchmarks.corpus_generator import CorpusSpec, NO_TOPIC, SyntheticCorpus
+from benchmarks.results import BenchmarkResults
+from label_sleuth.data_access.file_based.file_based_data_access import FileBasedDataAccess
+
+
+class TestCorpusGenerator(unittest.TestCase):
+    def test_corpus_is_deterministic(self):
+        spec = CorpusSpec(num_rows=1000, num_documents=7, duplicate_rate=0.2)
+        blocks = list(SyntheticCorpus(spec).iterate_blocks())
+        other_blocks = list(SyntheticCorpus(spec).iterate_blocks())
+        self.assertEqual(1000, sum(len(block) for block in blocks))
+        for block, other_block in zip(blocks, other_blocks):
+            self.assertTrue(block.equals(other_block))
+
+        texts = [text for block in blocks for text in block['text']]
+        self.assertGreaterEqual(len(texts) - len(set(texts)), 150)
+        self.assertNotEqual(texts, [text for block in SyntheticCorpus(CorpusSpec(num_rows=1000, num_documents=7,
+                                                                                 seed=1)).iterate_blocks()
+                                    for text in block['text']])
+
+    def test_topic_words_appear_in_topic_texts(self):
+        corpus = SyntheticCorpus(CorpusSpec(num_rows=500, num_documents=5))
+        block = next(corpus.iterate_blocks())
+        for text, topic in zip(block['text'], block['topic']):
+            words = set(text.lower().rstrip('.').split(' '))
+            for topic_id, topic_words in enumerate(corpus.topic_words):
+                self.assertEqual(topic == topic_id, len(words.intersection(topic_words)) > 0)
+        self.assertGreater((block['topic'] != NO_TOPIC).sum(), 0)
+
+    def test_load_corpus_keeps_the_row_order(self):
+        spec = CorpusSpec(num_rows=300, num_documents=4)
+        corpus = SyntheticCorpus(spec)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_access = FileBasedDataAccess(temp_dir)
+            results = BenchmarkResults('test', spec)
+            topics = load_corpus(corpus, data_access, 'benchmark_test', results)
+            texts = data_access.get_texts_by_row_positions('benchmark_test', range(spec.num_rows))
+            data_access.delete_dataset('benchmark_test')
+        self.assertEqual([text for block in corpus.iterate_blocks() for text in block['text']], texts)
+        self.assertEqual(spec.num_rows, len(topics))
+        self.assertEqual(['add_documents'], [result['name'] for result in results.results])
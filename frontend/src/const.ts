@@ -180,6 +180,7 @@ export enum IterationStatusEnum {
   TRAINING = "TRAINING",
   ERROR = "ERROR",
   INSUFFICIENT_TRAIN_DATA = "INSUFFICIENT_TRAIN_DATA",
+  CANCELLED = "CANCELLED",
   READY = "READY",
   RUNNING_INFERENCE = "RUNNING_INFERENCE",
   RUNNING_ACTIVE_LEARNING = "RUNNING_ACTIVE_LEARNING",
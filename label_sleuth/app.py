@@ -19,6 +19,7 @@ import os
 import random
 import shutil
 import tempfile
+import time
 import zipfile
 import pkg_resources
 from concurrent.futures.thread import ThreadPoolExecutor
@@ -26,14 +27,17 @@ from io import BytesIO, StringIO
 
 import dacite
 import pandas as pd
-from flask import Flask, jsonify, request, send_file, make_response, send_from_directory, current_app, Blueprint
+from flask import Flask, jsonify, request, send_file, make_response, send_from_directory, current_app, Blueprint, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS, cross_origin
 
+from label_sleuth import metrics
+
 from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
 from label_sleuth.training_set_selector.training_set_selector_factory import TrainingSetSelectionFactory
 from label_sleuth.app_utils import elements_back_to_front, extract_iteration_information_list, \
     extract_enriched_ngrams_and_weights_list, get_customizable_UI_text, get_element, get_natural_sort_key, \
-    validate_category_id, validate_workspace_id
+    get_next_page_cursor, get_page_start_idx, validate_category_id, validate_workspace_id
 from label_sleuth.authentication import authenticate_response, login_if_required, verify_password
 from label_sleuth.active_learning.core.active_learning_factory import ActiveLearningFactory
 from label_sleuth.config import Configuration
@@ -44,6 +48,7 @@ from label_sleuth.data_access.data_access_api import AlreadyExistsException, Bad
     DatasetRowCountLimitExceededException, DocumentNameTooLongException, DocumentNameEmptyException, \
     NoTextColumnException
 from label_sleuth.data_access.file_based.file_based_data_access import FileBasedDataAccess
+from label_sleuth.data_access.file_based.result_cursors import InvalidCursorException, hash_request_args
 from label_sleuth.models.core.models_factory import ModelFactory
 from label_sleuth.models.core.tools import SentenceEmbeddingService
 from label_sleuth.orchestrator.core.state_api.orchestrator_state_api import IterationStatus, OrchestratorStateApi
@@ -63,6 +68,22 @@ class LabelSleuthApp(Flask):
     tokens: list
 
 
+class TimedJSONProvider(DefaultJSONProvider):
+    """
+    Measures the serialization of json responses as a span of the request
+    """
+    def dumps(self, obj, **kwargs):
+        with metrics.span('serialization'):
+            return super().dumps(obj, **kwargs)
+
+
+REQUEST_SECONDS = metrics.registry.histogram('label_sleuth_http_request_seconds', 'Time spent serving requests',
+                                             ('endpoint', 'method', 'status'))
+REQUEST_STAGE_SECONDS = metrics.registry.histogram('label_sleuth_http_request_stage_seconds',
+                                                   'Time spent in each stage of serving requests',
+                                                   ('endpoint', 'stage'))
+
+
 # in order for the IDE to recognize custom objects within the Label Sleuth flask application -- and specifically
 # the methods of OrchestratorApi -- we define a class LabelSleuthApp with these objects and assign this type to
 # the flask "current_app" proxy object
@@ -83,6 +104,9 @@ def create_app(
 
     os.makedirs(output_dir, exist_ok=True)
     app = Flask(__name__, static_folder='./build')
+    app.json = TimedJSONProvider(app)
+    app.before_request(start_request_trace)
+    app.after_request(record_request_metrics)
     CORS(app)
     app.config['CORS_HEADERS'] = 'Content-Type'
     app.config["CONFIGURATION"] = config
@@ -93,7 +117,8 @@ def create_app(
 
     app.users = {x['username']: dacite.from_dict(data_class=User, data=x) for x in app.config["CONFIGURATION"].users}
     app.tokens = [user.token for user in app.users.values()]
-    background_jobs_manager = BackgroundJobsManager(app.config['CONFIGURATION'].cpu_workers)
+    background_jobs_manager = BackgroundJobsManager(app.config['CONFIGURATION'].cpu_workers,
+                                                    app.config['CONFIGURATION'].process_workers)
     sentence_embedding_service = \
         SentenceEmbeddingService(embedding_model_dir=output_dir,
                                  preload_spacy_model_name=config.language.spacy_model_name,
@@ -103,13 +128,16 @@ def create_app(
     data_access = FileBasedDataAccess(output_dir, config.max_document_name_length)
 
     training_set_selection_factory = TrainingSetSelectionFactory(data_access, background_jobs_manager)
+    model_factory = ModelFactory(os.path.join(output_dir, "models"), background_jobs_manager,
+                                 sentence_embedding_service)
+    register_metrics_collectors(background_jobs_manager, model_factory, sentence_embedding_service)
 
-    app.orchestrator_api = OrchestratorApi(OrchestratorStateApi(os.path.join(output_dir, "workspaces")),
+    orchestrator_state_api = OrchestratorStateApi(os.path.join(output_dir, "workspaces"),
+                                                  config.workspace_flush_interval_ms)
+    app.orchestrator_api = OrchestratorApi(orchestrator_state_api,
                                            data_access,
                                            ActiveLearningFactory(),
-                                           ModelFactory(os.path.join(output_dir, "models"),
-                                                        background_jobs_manager,
-                                                        sentence_embedding_service),
+                                           model_factory,
                                            training_set_selection_factory,
                                            background_jobs_manager,
                                            sentence_embedding_service,
@@ -120,6 +148,61 @@ def create_app(
     return app
 
 
+def register_metrics_collectors(background_jobs_manager: BackgroundJobsManager, model_factory: ModelFactory,
+                                sentence_embedding_service: SentenceEmbeddingService):
+    """
+    Register the collectors of metrics that are read from the application objects when the metrics are rendered:
+    the number of pending background jobs, and the statistics of the prediction and loaded model caches
+    """
+    pending_jobs = metrics.registry.gauge('label_sleuth_background_jobs_pending',
+                                          'Number of pending background jobs', ('priority',))
+    cache_gauges = {stat: metrics.registry.gauge(f'label_sleuth_cache_{stat}', f'Cache {stat.replace("_", " ")}',
+                                                 ('cache',))
+                    for stat in ['items', 'bytes', 'hits', 'misses', 'evictions', 'hit_ratio']}
+
+    def collect():
+        for priority, depth in background_jobs_manager.get_queue_depths().items():
+            pending_jobs.set(depth, priority=priority)
+        cache_stats = {}
+        for model_type, model_api in list(model_factory.loaded_model_apis.items()):
+            cache_stats[f'{model_type.name}_predictions'] = model_api.cache.get_stats()
+            cache_stats[f'{model_type.name}_loaded_models'] = model_api.loaded_models.get_stats()
+        if sentence_embedding_service is not None:
+            cache_stats['sbert_embeddings'] = sentence_embedding_service.sbert_cache.get_stats()
+        for cache_name, stats in cache_stats.items():
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_ratio'] = stats['hits'] / lookups if lookups > 0 else 0.0
+            for stat, gauge in cache_gauges.items():
+                # the loaded model caches are bounded by the number of models, and do not report their bytes
+                if stat in stats:
+                    gauge.set(stats[stat], cache=cache_name)
+
+    metrics.registry.register_collector('label_sleuth_app', collect)
+
+
+def start_request_trace():
+    g.request_start_time = time.perf_counter()
+    metrics.start_request_trace()
+
+
+def record_request_metrics(response):
+    """
+    Record the duration of the request and of its stages, which are also returned in the Server-Timing header
+    """
+    request_durations = metrics.end_request_trace()
+    if request_durations is None or 'request_start_time' not in g:
+        return response
+    total_duration = time.perf_counter() - g.request_start_time
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_SECONDS.observe(total_duration, endpoint=endpoint, method=request.method, status=response.status_code)
+    request_durations['other'] = max(0.0, total_duration - sum(request_durations.values()))
+    for stage, duration in request_durations.items():
+        REQUEST_STAGE_SECONDS.observe(duration, endpoint=endpoint, stage=stage)
+    response.headers['Server-Timing'] = ', '.join(f'{stage};dur={duration * 1000:.1f}'
+                                                  for stage, duration in request_durations.items())
+    return response
+
+
 def start_server(app, host, port, num_serving_threads):
     disable_html_printouts = False
     if disable_html_printouts:
@@ -145,6 +228,17 @@ def serve(path):
     return send_from_directory(curr_app.static_folder, 'index.html')
 
 
+@main_blueprint.app_errorhandler(InvalidCursorException)
+def invalid_cursor(e: InvalidCursorException):
+    """
+    A cursor that is malformed or was returned for a request with other arguments is a client error
+    """
+    return make_error({
+        "type": "invalid_cursor",
+        "title": e.message
+    }, 400)
+
+
 @main_blueprint.route('/users/authenticate', methods=['POST'])
 def login():
     post_data = request.get_json(force=True)
@@ -176,6 +270,16 @@ def health_check():
     return jsonify({'ok': True})
 
 
+@main_blueprint.route("/metrics", methods=['GET'])
+def get_metrics():
+    """
+    Returns the application metrics in the Prometheus text format
+    """
+    response = make_response(metrics.registry.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+
 @main_blueprint.route("/datasets", methods=['GET'])
 @login_if_required
 def get_all_dataset_ids():
@@ -580,21 +684,25 @@ def get_document_elements(workspace_id, document_uri):
     :request_arg category_id:
     :request_arg size: number of elements to return
     :request_arg start_idx: get elements starting from this index (for pagination)
+    :request_arg cursor: the next_cursor returned by a previous request with the same arguments, for fetching the
+    following page of its results. If provided, start_idx is ignored
     """
 
     size = int(request.args.get('size', curr_app.config["CONFIGURATION"].main_panel_elements_per_page))
-    start_idx = int(request.args.get('start_idx', 0))
-    dataset_name = curr_app.orchestrator_api.get_dataset_name(workspace_id)
-    document = curr_app.orchestrator_api.get_documents(workspace_id, dataset_name, [document_uri])[0]
-    elements = document.text_elements
     category_id = request.args.get('category_id')
     if category_id is not None:
         category_id = int(category_id)
+    request_hash = hash_request_args('document_elements', workspace_id, document_uri, category_id)
+    start_idx = get_page_start_idx(request_hash)
+    dataset_name = curr_app.orchestrator_api.get_dataset_name(workspace_id)
+    document = curr_app.orchestrator_api.get_documents(workspace_id, dataset_name, [document_uri])[0]
+    elements = document.text_elements
     hit_count = len(elements)
     elements = elements[start_idx: start_idx + size]
     elements_transformed = elements_back_to_front(workspace_id, elements, category_id, need_snippet=False)
 
-    res = {'elements': elements_transformed, 'hit_count': hit_count}
+    res = {'elements': elements_transformed, 'hit_count': hit_count,
+           'next_cursor': get_next_page_cursor(start_idx + size, hit_count, request_hash)}
     return jsonify(res)
 
 
@@ -612,11 +720,15 @@ def get_document_positive_predictions(workspace_id, document_uri):
     :request_arg category_id:
     :request_arg size: number of elements to return
     :request_arg start_idx: get elements starting from this index (for pagination)
+    :request_arg cursor: the next_cursor returned by a previous request with the same arguments, for fetching the
+    following page of its results. If provided, start_idx is ignored
     """
     category_id = int(request.args['category_id'])
     size = int(request.args.get('size', curr_app.config["CONFIGURATION"].sidebar_panel_elements_per_page))
-    start_idx = int(request.args.get('start_idx', 0))
+    request_hash = hash_request_args('document_positive_predictions', workspace_id, document_uri, category_id)
+    start_idx = get_page_start_idx(request_hash)
 
+    next_cursor = None
     if len(curr_app.orchestrator_api.get_all_iterations_by_status(workspace_id, category_id,
                                                                   IterationStatus.READY)) == 0:
         elements_transformed = []
@@ -630,9 +742,10 @@ def get_document_positive_predictions(workspace_id, document_uri):
         positive_predicted_elements = [element for element, prediction in zip(elements, predictions)
                                        if prediction == LABEL_POSITIVE]
 
+        next_cursor = get_next_page_cursor(start_idx + size, len(positive_predicted_elements), request_hash)
         positive_predicted_elements = positive_predicted_elements[start_idx: start_idx + size]
         elements_transformed = elements_back_to_front(workspace_id, positive_predicted_elements, category_id)
-    res = {'elements': elements_transformed}
+    res = {'elements': elements_transformed, 'next_cursor': next_cursor}
     return jsonify(res)
 
 
@@ -687,9 +800,10 @@ def elements_by_prediction(workspace_id):
     :request_arg category_id:
     :request_arg size: number of elements to return
     :request_arg start_idx: get elements starting from this index (for pagination)
+    :request_arg cursor: the next_cursor returned by a previous request with the same arguments, for fetching the
+    following page of its results. If provided, start_idx is ignored
     """
     size = int(request.args.get('size', curr_app.config["CONFIGURATION"].sidebar_panel_elements_per_page))
-    start_idx = int(request.args.get('start_idx', 0))
 
     value = request.args["value"]
 
@@ -698,11 +812,15 @@ def elements_by_prediction(workspace_id):
         if value.lower() not in ["true", "false"]:
             raise Exception(f"unknown binary label value {value}")
         value = (value.lower() == "true")
+        request_hash = hash_request_args('elements_by_prediction', workspace_id, category_id, value)
+        start_idx = get_page_start_idx(request_hash)
         logging.info(f"workspace '{workspace_id}' category id {category_id} fetching {size} elements with "
                      f"prediction {value} (start index: {start_idx})")
     else:
         category_id = None
         value = int(value)
+        request_hash = hash_request_args('elements_by_prediction', workspace_id, category_id, value)
+        start_idx = get_page_start_idx(request_hash)
         logging.info(
             f"workspace '{workspace_id}' (multiclass) fetching {size} predictions with value {value} "
             f"(start index: {start_idx})")
@@ -710,11 +828,15 @@ def elements_by_prediction(workspace_id):
     all_ready_iterations = curr_app.orchestrator_api.get_all_iterations_by_status(workspace_id, category_id,
                                                                                   IterationStatus.READY)
     if len(all_ready_iterations) == 0:
-        return jsonify({'elements': [], 'count': None, 'fraction': None})
+        return jsonify({'elements': [], 'count': None, 'fraction': None, 'next_cursor': None})
     else:
+        # one more element is fetched to tell whether there is a following page
         positive_predicted_elements = curr_app.orchestrator_api.get_elements_by_prediction(
-            workspace_id, category_id, value, sample_size=size, start_idx=start_idx, shuffle=False,
+            workspace_id, category_id, value, sample_size=size + 1, start_idx=start_idx, shuffle=False,
             remove_duplicates=False)  # For better performance in large datasets, we do not remove duplicates
+        next_cursor = get_next_page_cursor(start_idx + size, start_idx + len(positive_predicted_elements),
+                                           request_hash)
+        positive_predicted_elements = positive_predicted_elements[:size]
         iteration, _ = all_ready_iterations[-1]
 
         elements_transformed = elements_back_to_front(workspace_id, positive_predicted_elements, category_id)
@@ -731,7 +853,7 @@ def elements_by_prediction(workspace_id):
         if not curr_app.orchestrator_api.is_binary_workspace(workspace_id):
             prediction_stats = {c: prediction_stats.get(c, {'count': 0, 'fraction': 0.0})  # add new categories
                                 for c in curr_app.orchestrator_api.get_all_categories(workspace_id)}
-        res = {'elements': elements_transformed, **prediction_stats[value]}
+        res = {'elements': elements_transformed, **prediction_stats[value], 'next_cursor': next_cursor}
         return jsonify(res)
 
 
@@ -764,6 +886,8 @@ def query(workspace_id):
     :request_arg qry_string: query string
     :request_arg size: number of elements to return
     :request_arg start_idx: get elements starting from this index (for pagination)
+    :request_arg cursor: the next_cursor returned by a previous query, for fetching the following page of its results.
+    If provided, start_idx is ignored
     """
     category_id = request.args.get('category_id')
     if category_id is not None:
@@ -771,18 +895,20 @@ def query(workspace_id):
     query_string = request.args.get('qry_string')
     sample_size = int(request.args.get('size', curr_app.config["CONFIGURATION"].sidebar_panel_elements_per_page))
     sample_start_idx = int(request.args.get('start_idx', 0))
+    cursor = request.args.get('cursor')
 
     dataset_name = curr_app.orchestrator_api.get_dataset_name(workspace_id)
     resp = curr_app.orchestrator_api.query(workspace_id, dataset_name, category_id=None,
                                            query=query_string, is_regex=False,
                                            unlabeled_only=False, sample_size=sample_size,
-                                           sample_start_idx=sample_start_idx, remove_duplicates=True)
+                                           sample_start_idx=sample_start_idx, remove_duplicates=True, cursor=cursor)
     sorted_elements = sorted(resp["results"], key=lambda te: get_natural_sort_key(te.uri))
     elements_transformed = elements_back_to_front(workspace_id, sorted_elements, category_id, query_string=query_string,
                                                   is_regex=False)
     res = {'elements': elements_transformed,
            'hit_count': resp["hit_count"],
-           'hit_count_unique': resp["hit_count_unique"]}
+           'hit_count_unique': resp["hit_count_unique"],
+           'next_cursor': resp["next_cursor"]}
     return jsonify(res)
 
 
@@ -863,9 +989,12 @@ def get_labeled_elements_by_value(workspace_id):
     :request_arg value: True/False for binary workspaces, or the class id for multiclass workspace
     :request_arg size: number of elements to return
     :request_arg start_idx: get elements starting from this index (for pagination)
+    :request_arg cursor: the next_cursor returned by a previous request with the same arguments, for fetching the
+    following page of its results. If provided, start_idx is ignored
     """
     size = int(request.args.get('size', curr_app.config["CONFIGURATION"].sidebar_panel_elements_per_page))
     start_idx = int(request.args.get('start_idx', 0))
+    cursor = request.args.get('cursor')
     if "value" not in request.args:
         raise Exception(f"value was not provided for /elements_by_value in workspace {workspace_id}")
     value = request.args["value"]
@@ -884,12 +1013,11 @@ def get_labeled_elements_by_value(workspace_id):
             f"workspace '{workspace_id}' (multiclass) fetching {size} labeled elements with label {value} "
             f"(start index: {start_idx})")
 
-    text_elements, hit_count = curr_app.orchestrator_api.get_labeled_elements_by_value(workspace_id, category_id, value,
-                                                                                  size, start_idx,
-                                                                                  remove_duplicates=False)
-    elements = elements_back_to_front(workspace_id, text_elements, category_id, need_snippet=True)
+    resp = curr_app.orchestrator_api.get_labeled_elements_by_value(workspace_id, category_id, value, size, start_idx,
+                                                                   remove_duplicates=False, cursor=cursor)
+    elements = elements_back_to_front(workspace_id, resp["results"], category_id, need_snippet=True)
 
-    res = {'elements': elements, "hit_count": hit_count}
+    res = {'elements': elements, "hit_count": resp["hit_count"], 'next_cursor': resp["next_cursor"]}
     return jsonify(res)
 
 
@@ -976,7 +1104,7 @@ def get_labelling_status(workspace_id):
     Returns information about the number of user labels for the category, as well as a number between 0-100 that
     reflects when a new model will be trained.
     Once a certain amount of user labels for a given category has been reached, the get_labelling_status() call --
-    via a call to orchestrator_api.train_if_recommended() -- will trigger an iteration flow in the background. This
+    via a call to orchestrator_api.train_if_recommended_later() -- will trigger an iteration flow in the background. This
     flow includes training a model, inferring the full corpus using this model, choosing candidate elements for
     labeling using active learning, and calculating various statistics.
 
@@ -994,8 +1122,7 @@ def get_labelling_status(workspace_id):
                          remove_duplicates=curr_app.config["CONFIGURATION"].apply_labels_to_duplicate_texts)
     progress = curr_app.orchestrator_api.get_progress(workspace_id, dataset_name, category_id)
 
-    # TODO move executor to the orchestrator
-    executor.submit(curr_app.orchestrator_api.train_if_recommended, workspace_id, category_id)
+    curr_app.orchestrator_api.train_if_recommended_later(workspace_id, category_id)
 
     return jsonify({
         "labeling_counts": labeling_counts,
@@ -1036,12 +1163,15 @@ def get_elements_to_label(workspace_id):
     :request_arg category_id:
     :request_arg size: the number of elements to return
     :request_arg start_idx: get elements starting from this index (for pagination)
+    :request_arg cursor: the next_cursor returned by a previous request with the same arguments, for fetching the
+    following page of its results. If provided, start_idx is ignored
     """
     category_id = request.args.get('category_id')
     if category_id is not None:
         category_id = int(category_id)
     size = int(request.args.get('size', curr_app.config["CONFIGURATION"].sidebar_panel_elements_per_page))
-    start_idx = int(request.args.get('start_idx', 0))
+    request_hash = hash_request_args('active_learning', workspace_id, category_id)
+    start_idx = get_page_start_idx(request_hash)
 
     if len(curr_app.orchestrator_api.get_all_iterations_by_status(workspace_id, category_id,
                                                                   IterationStatus.READY)) == 0:
@@ -1050,7 +1180,8 @@ def get_elements_to_label(workspace_id):
     elements, hit_count = curr_app.orchestrator_api.get_elements_to_label(workspace_id, category_id, size, start_idx)
     elements_transformed = elements_back_to_front(workspace_id, elements, category_id)
 
-    res = {'elements': elements_transformed, 'hit_count': hit_count}
+    res = {'elements': elements_transformed, 'hit_count': hit_count,
+           'next_cursor': get_next_page_cursor(start_idx + size, hit_count, request_hash)}
     return jsonify(res)
 
 
@@ -1285,21 +1416,25 @@ def get_suspicious_elements(workspace_id):
     :request_arg category_id:
     :request_arg size: number of elements to return
     :request_arg start_idx: get elements starting from this index (for pagination)
+    :request_arg cursor: the next_cursor returned by a previous request with the same arguments, for fetching the
+    following page of its results. If provided, start_idx is ignored
     """
     size = int(request.args.get('size', curr_app.config["CONFIGURATION"].sidebar_panel_elements_per_page))
-    start_idx = int(request.args.get('start_idx', 0))
     category_id = int(request.args['category_id'])
-    
+    request_hash = hash_request_args('suspicious_elements', workspace_id, category_id)
+    start_idx = get_page_start_idx(request_hash)
+
     try:
         suspicious_elements = curr_app.orchestrator_api.get_suspicious_elements_report(workspace_id, category_id)
         hit_count = len(suspicious_elements)
         suspicious_elements = suspicious_elements[start_idx: start_idx + size]
         elements_transformed = elements_back_to_front(workspace_id, suspicious_elements, category_id)
-        res = {'elements': elements_transformed, 'hit_count': hit_count}
+        res = {'elements': elements_transformed, 'hit_count': hit_count,
+               'next_cursor': get_next_page_cursor(start_idx + size, hit_count, request_hash)}
         return jsonify(res)
     except Exception:
         logging.exception("Failed to generate suspicious elements report")
-        res = {'elements': [], 'hit_count': 0}
+        res = {'elements': [], 'hit_count': 0, 'next_cursor': None}
         return jsonify(res)
 
 
@@ -1322,10 +1457,13 @@ def get_contradicting_elements(workspace_id):
     :request_arg category_id:
     :request_arg size: number of elements to return
     :request_arg start_idx: get elements starting from this index (for pagination)
+    :request_arg cursor: the next_cursor returned by a previous request with the same arguments, for fetching the
+    following page of its results. If provided, start_idx is ignored
     """
     category_id = int(request.args['category_id'])
     size = int(request.args.get('size', curr_app.config["CONFIGURATION"].sidebar_panel_elements_per_page))
-    start_idx = int(request.args.get('start_idx', 0))
+    request_hash = hash_request_args('contradiction_elements', workspace_id, category_id)
+    start_idx = get_page_start_idx(request_hash)
     try:
         contradiction_elements_dict = curr_app.orchestrator_api.get_contradiction_report(workspace_id, category_id)
         element_pairs_transformed = [elements_back_to_front(workspace_id, element_pair, category_id)
@@ -1334,7 +1472,8 @@ def get_contradicting_elements(workspace_id):
         element_pairs_transformed = element_pairs_transformed[start_idx: start_idx + size]
         diffs = [[list(element_a_unique_token_set), list(element_b_unique_token_set)]
                  for element_a_unique_token_set, element_b_unique_token_set in contradiction_elements_dict['diffs']]
-        res = {'pairs': element_pairs_transformed, 'diffs': diffs, 'hit_count': hit_count}
+        res = {'pairs': element_pairs_transformed, 'diffs': diffs, 'hit_count': hit_count,
+               'next_cursor': get_next_page_cursor(start_idx + size, hit_count, request_hash)}
         return jsonify(res)
     except Exception:
         logging.exception(f"workspace {workspace_id} category_id '{category_id}' failed to create contradiction report")
@@ -16,7 +16,7 @@ import functools
 import json
 import logging
 import re
-from typing import List, Mapping, Sequence, Union
+from typing import List, Mapping, Optional, Sequence, Union
 import os
 from flask import current_app, request, jsonify
 
@@ -24,6 +24,7 @@ from label_sleuth.analysis_utils.analyze_tokens import ngrams_by_info_gain
 from label_sleuth.data_access.core.data_structs import TextElement, LabeledTextElement, MulticlassLabeledTextElement, \
     WorkspaceModelType
 from label_sleuth.data_access.data_access_api import get_document_uri
+from label_sleuth.data_access.file_based.result_cursors import decode_cursor, encode_cursor
 from label_sleuth.models.core.languages import Languages
 from label_sleuth.orchestrator.core.state_api.orchestrator_state_api import Iteration, IterationStatus
 from label_sleuth.orchestrator.orchestrator_api import TRAIN_COUNTS_STR_KEY
@@ -124,6 +125,26 @@ def elements_back_to_front(workspace_id: str,
     return [element_info for element_info in element_uri_to_info.values()]
 
 
+def get_page_start_idx(request_hash: str) -> int:
+    """
+    Return the index of the first element of the requested page: the position kept in the 'cursor' request arg if it
+    was provided, and otherwise the 'start_idx' request arg.
+    :param request_hash: the hash of the request arguments that determine its results (see hash_request_args()). A
+    cursor returned for a request with other arguments is rejected.
+    """
+    cursor = request.args.get('cursor')
+    if cursor is None:
+        return int(request.args.get('start_idx', 0))
+    return decode_cursor(cursor, request_hash)[1]
+
+
+def get_next_page_cursor(page_end: int, hit_count: int, request_hash: str) -> Optional[str]:
+    """
+    :return: a cursor for fetching the page that starts at *page_end*, or None if there are no more results
+    """
+    return encode_cursor('', page_end, request_hash) if page_end < hit_count else None
+
+
 def get_element(workspace_id, category_id, element_id):
     """
     Get element by id
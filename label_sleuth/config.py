@@ -73,6 +73,10 @@ class Configuration:
     snippet_max_token_length: int = 100
     max_dataset_length: int = 3000000
     cpu_workers: int = 10
+    process_workers: int = 0
+    inference_chunk_size: int = 10000
+    training_trigger_window_seconds: float = 2.0
+    workspace_flush_interval_ms: int = 500
 
 
 converters = {
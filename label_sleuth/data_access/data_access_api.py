@@ -18,7 +18,10 @@ import sys
 from dataclasses import dataclass
 from enum import Enum
 
-from typing import Iterable, Sequence, Mapping, List, Union, Set
+from typing import Iterable, Sequence, Mapping, List, Optional, Union, Set
+
+import numpy as np
+
 from label_sleuth.data_access.core.data_structs import Document, TextElement, Label, URI_SEP, LabelType, \
     MulticlassLabel, WorkspaceModelType, LabeledTextElement, MulticlassLabeledTextElement
 
@@ -184,7 +187,8 @@ class DataAccessApi(object, metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def get_text_elements(self, workspace_id: str, dataset_name: str, sample_size: int = sys.maxsize,
                           sample_start_idx: int = 0, query: str = None, is_regex: bool = False,
-                          remove_duplicates=False, document_uri=None, random_state: int = 0) -> Mapping:
+                          remove_duplicates=False, document_uri=None, random_state: int = 0,
+                          cursor: str = None) -> Mapping:
         """
         Sample *sample_size* TextElements from dataset_name, optionally limiting to those matching a query,
         and add their labels information for workspace_id, if available.
@@ -199,16 +203,19 @@ class DataAccessApi(object, metaclass=abc.ABCMeta):
         :param document_uri: get elements from a particular document
         :param remove_duplicates: if True, do not include elements that are duplicates of each other.
         :param random_state: provide an int seed to define a random state. Default is zero.
-        :return: a dictionary with two keys: 'results' whose value is a list of TextElements, and 'hit_count' whose
-        value is the total number of TextElements in the dataset matched by the query.
-        {'results': [TextElement], 'hit_count': int}
+        :param cursor: the 'next_cursor' returned by a previous call with the same arguments. If provided, the page
+        of results that follows the previous call is returned, and sample_start_idx is ignored.
+        :return: a dictionary with the keys 'results' whose value is a list of TextElements, 'hit_count' whose value
+        is the total number of TextElements in the dataset matched by the query, and 'next_cursor' whose value is a
+        cursor for fetching the next page of results (or None if there are no more results).
+        {'results': [TextElement], 'hit_count': int, 'next_cursor': str}
         """
 
     @abc.abstractmethod
     def get_unlabeled_text_elements(self, workspace_id: str, dataset_name: str, category_id: int,
                                     sample_size: int = sys.maxsize, sample_start_idx: int = 0,
                                     query: str = None, is_regex: bool = False,
-                                    remove_duplicates=False, random_state: int = 0) -> Mapping:
+                                    remove_duplicates=False, random_state: int = 0, cursor: str = None) -> Mapping:
         """
         Sample *sample_size* TextElements from dataset_name, unlabeled for category_id in workspace_id, optionally
         limiting to those matching a query.
@@ -223,9 +230,12 @@ class DataAccessApi(object, metaclass=abc.ABCMeta):
         :param is_regex: if True, the query string is interpreted as a regular expression (False by default)
         :param remove_duplicates: if True, do not include elements that are duplicates of each other.
         :param random_state: provide an int seed to define a random state. Default is zero.
-        :return: a dictionary with two keys: 'results' whose value is a list of TextElements, and 'hit_count' whose
-        value is the total number of TextElements in the dataset matched by the query.
-        {'results': [TextElement], 'hit_count': int}
+        :param cursor: the 'next_cursor' returned by a previous call with the same arguments. If provided, the page
+        of results that follows the previous call is returned, and sample_start_idx is ignored.
+        :return: a dictionary with the keys 'results' whose value is a list of TextElements, 'hit_count' whose value
+        is the total number of TextElements in the dataset matched by the query, and 'next_cursor' whose value is a
+        cursor for fetching the next page of results (or None if there are no more results).
+        {'results': [TextElement], 'hit_count': int, 'next_cursor': str}
         """
 
     @abc.abstractmethod
@@ -258,7 +268,7 @@ class DataAccessApi(object, metaclass=abc.ABCMeta):
                                   value: Union[bool, int],
                                   sample_size: int = sys.maxsize,
                                   sample_start_idx: int = 0,
-                                  remove_duplicates=False, random_state: int = 0):
+                                  remove_duplicates=False, random_state: int = 0, cursor: str = None):
         """
         TODO
         """
@@ -323,6 +333,56 @@ class DataAccessApi(object, metaclass=abc.ABCMeta):
         :param remove_duplicates: if True, do not include elements that are duplicates of each other.
         """
 
+    @abc.abstractmethod
+    def get_text_element_row_positions(self, dataset_name, shuffle=False, random_state: int = 0,
+                                       remove_duplicates=False) -> np.ndarray:
+        """
+        Return the row positions of the text elements in *dataset_name*, in the order in which they are yielded by
+        get_text_element_iterator() with the same arguments.
+        :param dataset_name:
+        :param shuffle: if True, the row positions are returned in random order.
+        :param random_state: provide an int seed to define a random state. Default is zero.
+        :param remove_duplicates: if True, do not include elements that are duplicates of each other.
+        """
+
+    @abc.abstractmethod
+    def get_text_elements_by_row_positions(self, workspace_id: str, dataset_name: str, rows: Sequence[int]) \
+            -> Union[List[LabeledTextElement], List[MulticlassLabeledTextElement]]:
+        """
+        Return a List of TextElement objects from the given dataset_name at the given row positions (in the same
+        order), and add the label information for the workspace to these TextElements, if available.
+        :param workspace_id:
+        :param dataset_name:
+        :param rows: positions of the text elements in the dataset, e.g. as returned by
+        get_text_element_row_positions()
+        """
+
+    @abc.abstractmethod
+    def get_texts_by_row_positions(self, dataset_name: str, rows: Sequence[int]) -> List[str]:
+        """
+        Return the texts of the text elements at the given row positions in *dataset_name*, without building
+        TextElement objects.
+        :param dataset_name:
+        :param rows: positions of the text elements in the dataset
+        """
+
+    @abc.abstractmethod
+    def get_row_positions_by_uris(self, dataset_name: str, uris: Sequence[str]) -> List[int]:
+        """
+        Return the row positions of the text elements with the given uris in *dataset_name* (in the same order), or -1
+        for uris that are not in the dataset.
+        :param dataset_name:
+        :param uris:
+        """
+
+    @abc.abstractmethod
+    def get_dataset_store_dir(self, dataset_name: str) -> Optional[str]:
+        """
+        Return the directory of the DatasetStore that holds the text elements of *dataset_name*, from which other
+        processes can read the texts by their row positions, or None if the dataset is not held in a DatasetStore.
+        :param dataset_name:
+        """
+
     @abc.abstractmethod
     def get_all_dataset_names(self) -> List[str]:
         """
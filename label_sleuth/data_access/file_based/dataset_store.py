@@ -0,0 +1,558 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import bisect
+import logging
+import os
+import shutil
+import threading
+from collections import defaultdict
+from functools import cached_property
+from typing import Callable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import ujson as json
+
+from label_sleuth.data_access.file_based.token_index import TokenIndex
+from label_sleuth.data_access.file_based.trigram_index import TrigramIndex
+
+STORE_FORMAT_VERSION = 2
+MANIFEST_FILENAME = 'manifest.json'
+SEGMENT_INFO_FILENAME = 'segment.json'
+
+
+def _save_string_column(column_dir, name, values: Sequence[str]):
+    """
+    Save a column of strings as an offsets array and a single utf-8 heap file. The string in row i is stored in
+    heap[offsets[i]:offsets[i+1]].
+    """
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.array([len(value) for value in encoded], dtype=np.int64))
+    np.save(os.path.join(column_dir, f'{name}.offsets.npy'), offsets)
+    with open(os.path.join(column_dir, f'{name}.heap'), 'wb') as f:
+        f.write(b''.join(encoded))
+
+
+def _load_heap(column_dir, name) -> memoryview:
+    heap_path = os.path.join(column_dir, f'{name}.heap')
+    if os.path.getsize(heap_path) == 0:
+        # an empty file cannot be memory-mapped
+        return memoryview(b'')
+    return memoryview(np.memmap(heap_path, dtype=np.uint8, mode='r'))
+
+
+def _decode_strings(offsets: np.ndarray, heap: memoryview) -> List[str]:
+    if len(heap) == 0:
+        return [''] * (len(offsets) - 1)
+    heap = heap.tobytes()
+    decoded = heap.decode('utf-8')
+    offsets = offsets.tolist()
+    if len(decoded) == len(heap):
+        # pure ascii heap: byte offsets are also character offsets, so we slice the decoded string directly
+        return [decoded[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    return [heap[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _load_string_column(column_dir, name) -> List[str]:
+    return StringColumn.load(column_dir, name).tolist()
+
+
+class StringColumn:
+    """
+    A read-only column of strings, stored as an offsets array and a utf-8 heap for each segment of the store (see
+    _save_string_column). Both are memory-mapped, so strings are only decoded for the rows that are accessed.
+    """
+
+    def __init__(self, parts: Sequence[Tuple[np.ndarray, memoryview]]):
+        """
+        :param parts: the offsets array and heap of each segment, in order
+        """
+        self.parts = list(parts)
+        self.first_rows = np.cumsum([0] + [len(offsets) - 1 for offsets, _ in self.parts]).astype(np.int64)
+        self._first_rows_list = self.first_rows.tolist()
+
+    @classmethod
+    def load(cls, column_dir, name) -> 'StringColumn':
+        return cls([(np.load(os.path.join(column_dir, f'{name}.offsets.npy'), mmap_mode='r'),
+                     _load_heap(column_dir, name))])
+
+    @classmethod
+    def concatenate(cls, columns: Sequence['StringColumn']) -> 'StringColumn':
+        return cls([part for column in columns for part in column.parts])
+
+    def __len__(self):
+        return self._first_rows_list[-1]
+
+    def __getitem__(self, row: int) -> str:
+        if not 0 <= row < len(self):
+            raise IndexError(f'row {row} is out of range for a column of {len(self)} rows')
+        part_idx = bisect.bisect_right(self._first_rows_list, row) - 1
+        offsets, heap = self.parts[part_idx]
+        local_row = row - self._first_rows_list[part_idx]
+        return str(heap[offsets[local_row]:offsets[local_row + 1]], 'utf-8')
+
+    def take(self, rows: Sequence[int]) -> List[str]:
+        """
+        Return the strings in the given rows, in the same order
+        :param rows:
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        values = [None] * len(rows)
+        part_indices = np.searchsorted(self.first_rows, rows, side='right') - 1
+        for part_idx in np.unique(part_indices).tolist():
+            positions = np.flatnonzero(part_indices == part_idx)
+            offsets, heap = self.parts[part_idx]
+            local_rows = rows[positions] - self.first_rows[part_idx]
+            for position, start, end in zip(positions.tolist(), offsets[local_rows].tolist(),
+                                            offsets[local_rows + 1].tolist()):
+                values[position] = str(heap[start:end], 'utf-8')
+        return values
+
+    def tolist(self) -> List[str]:
+        """
+        Decode the whole column
+        """
+        return [value for offsets, heap in self.parts for value in _decode_strings(offsets, heap)]
+
+
+def _to_python_value(value):
+    # metadata values coming from pandas may be numpy scalars
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _infer_metadata_type(values) -> str:
+    if all(type(v) == bool for v in values):
+        return 'bool'
+    if all(type(v) == int for v in values):
+        return 'int'
+    if all(type(v) in (int, float) for v in values):
+        return 'float'
+    if all(type(v) == str for v in values):
+        return 'str'
+    return 'json'
+
+
+def _save_metadata_columns(column_dir, metadata_dicts: Sequence[Mapping]) -> List[Mapping]:
+    """
+    Each metadata key is saved as a separate typed column, with a mask marking the rows in which the key is present.
+    :return: a list describing the name and type of each metadata column
+    """
+    keys = list(dict.fromkeys(key for metadata in metadata_dicts for key in metadata))
+    column_infos = []
+    for idx, key in enumerate(keys):
+        mask = np.array([key in metadata for metadata in metadata_dicts], dtype=bool)
+        values = [_to_python_value(metadata.get(key)) for metadata in metadata_dicts]
+        column_type = _infer_metadata_type([v for v, present in zip(values, mask) if present])
+        column_name = f'metadata_{idx}'
+        np.save(os.path.join(column_dir, f'{column_name}.mask.npy'), mask)
+        if column_type == 'str':
+            _save_string_column(column_dir, column_name, [v if present else '' for v, present in zip(values, mask)])
+        elif column_type == 'json':
+            _save_string_column(column_dir, column_name,
+                                [json.dumps(v) if present else '' for v, present in zip(values, mask)])
+        else:
+            dtype = {'bool': bool, 'int': np.int64, 'float': np.float64}[column_type]
+            np.save(os.path.join(column_dir, f'{column_name}.npy'),
+                    np.array([v if present else 0 for v, present in zip(values, mask)], dtype=dtype))
+        column_infos.append({'name': key, 'column': column_name, 'type': column_type})
+    return column_infos
+
+
+class _MetadataColumn:
+    """
+    A memory-mapped metadata column of a segment, as written by _save_metadata_columns()
+    """
+
+    def __init__(self, column_dir, column_info: Mapping):
+        self.name = column_info['name']
+        self.type = column_info['type']
+        column_name = column_info['column']
+        self.mask = np.load(os.path.join(column_dir, f'{column_name}.mask.npy'), mmap_mode='r')
+        if self.type in ('str', 'json'):
+            self.values = StringColumn.load(column_dir, column_name)
+        else:
+            self.values = np.load(os.path.join(column_dir, f'{column_name}.npy'), mmap_mode='r')
+
+    def take(self, rows: np.ndarray) -> list:
+        if self.type == 'str':
+            return self.values.take(rows)
+        if self.type == 'json':
+            return [json.loads(value) for value in self.values.take(rows)]
+        return self.values[rows].tolist()
+
+
+class SegmentColumns:
+    """
+    The memory-mapped columns of a single segment
+    """
+
+    def __init__(self, segment_dir):
+        with open(os.path.join(segment_dir, SEGMENT_INFO_FILENAME)) as f:
+            segment_info = json.loads(f.read())
+        self.num_rows = segment_info['num_rows']
+        self.uri = StringColumn.load(segment_dir, 'uri')
+        self.text = StringColumn.load(segment_dir, 'text')
+        self.spans = np.load(os.path.join(segment_dir, 'span.npy'), mmap_mode='r')
+        self.text_unique_id = np.load(os.path.join(segment_dir, 'text_unique_id.npy'), mmap_mode='r')
+        self.metadata_columns = [_MetadataColumn(segment_dir, column_info)
+                                 for column_info in segment_info['metadata_columns']]
+
+    def get_metadata(self, rows: np.ndarray) -> List[dict]:
+        """
+        Build the metadata dict of each of the given rows of the segment
+        :param rows:
+        """
+        metadata_dicts = [{} for _ in range(len(rows))]
+        for column in self.metadata_columns:
+            positions = np.flatnonzero(column.mask[rows])
+            for position, value in zip(positions.tolist(), column.take(rows[positions])):
+                metadata_dicts[position][column.name] = value
+        return metadata_dicts
+
+
+class StoredDataset:
+    """
+    The text elements of a DatasetStore, read through the memory-mapped columns of its segments. Loading a dataset
+    only maps its column files: the strings, spans and metadata of an element are converted to Python objects only
+    when the element is accessed, e.g. when building the TextElements of a page of results. Thus, the time and memory
+    required for loading a dataset do not depend on the number of its elements.
+    """
+
+    def __init__(self, segments: Sequence[SegmentColumns]):
+        self.segments = list(segments)
+        self.first_rows = np.cumsum([0] + [segment.num_rows for segment in self.segments]).astype(np.int64)
+        self.uri = StringColumn.concatenate([segment.uri for segment in self.segments])
+        self.text = StringColumn.concatenate([segment.text for segment in self.segments])
+
+    def __len__(self):
+        return int(self.first_rows[-1])
+
+    @cached_property
+    def text_unique_id(self) -> np.ndarray:
+        columns = [segment.text_unique_id for segment in self.segments]
+        if len(columns) == 0:
+            return np.empty(0, dtype=np.int64)
+        return columns[0] if len(columns) == 1 else np.concatenate(columns)
+
+    def get_text_element_fields(self, rows: Sequence[int]) -> List[dict]:
+        """
+        Return a dict with the TextElement fields (uri, text, span and metadata) of each of the given rows, in the same
+        order
+        :param rows:
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        element_fields = [None] * len(rows)
+        segment_indices = np.searchsorted(self.first_rows, rows, side='right') - 1
+        for segment_idx in np.unique(segment_indices).tolist():
+            segment = self.segments[segment_idx]
+            positions = np.flatnonzero(segment_indices == segment_idx)
+            local_rows = rows[positions] - self.first_rows[segment_idx]
+            for position, uri, text, (start, end), metadata in zip(positions.tolist(), segment.uri.take(local_rows),
+                                                                    segment.text.take(local_rows),
+                                                                    segment.spans[local_rows].tolist(),
+                                                                    segment.get_metadata(local_rows)):
+                element_fields[position] = {'uri': uri, 'text': text, 'span': [(start, end)], 'metadata': metadata}
+        return element_fields
+
+
+def _write_segment(segment_dir, df: pd.DataFrame, documents_df: pd.DataFrame,
+                   index_columns: Mapping[str, np.ndarray]):
+    """
+    Write the given DataFrame of text elements (uri, text, span, metadata and text_unique_id columns) as a segment,
+    along with the DataFrame of the documents these elements belong to (uri, num_elements and metadata columns), and
+    additional numeric columns used for indexing the elements. A TokenIndex and a TrigramIndex of the texts are written
+    as well. The segment is first written to a temporary directory, so that a failure during the write does not leave
+    a partially written segment.
+    """
+    temp_dir = segment_dir + '.tmp'
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+
+    _save_string_column(temp_dir, 'uri', df['uri'].tolist())
+    _save_string_column(temp_dir, 'text', df['text'].tolist())
+    spans = np.array([span[0] for span in df['span']], dtype=np.int64).reshape(-1, 2)
+    np.save(os.path.join(temp_dir, 'span.npy'), spans)
+    np.save(os.path.join(temp_dir, 'text_unique_id.npy'), df['text_unique_id'].to_numpy(dtype=np.int64))
+    metadata_columns = _save_metadata_columns(temp_dir, df['metadata'].tolist())
+    _save_string_column(temp_dir, 'document_uri', documents_df['uri'].tolist())
+    np.save(os.path.join(temp_dir, 'document_num_elements.npy'),
+            documents_df['num_elements'].to_numpy(dtype=np.int64))
+    _save_string_column(temp_dir, 'document_metadata', [json.dumps(metadata) for metadata in documents_df['metadata']])
+    for name, values in index_columns.items():
+        np.save(os.path.join(temp_dir, f'{name}.npy'), values)
+    _save_token_index(temp_dir, TokenIndex.build(df['text'].tolist()))
+    _save_trigram_index(temp_dir, TrigramIndex.build(df['text'].tolist()))
+    with open(os.path.join(temp_dir, SEGMENT_INFO_FILENAME), 'w') as f:
+        f.write(json.dumps({'num_rows': len(df), 'metadata_columns': metadata_columns,
+                            'index_columns': list(index_columns.keys())}))
+    os.replace(temp_dir, segment_dir)
+
+
+def _read_segment(segment_dir) -> pd.DataFrame:
+    """
+    Build a DataFrame with all the text elements of a segment, for merging segments during compaction
+    """
+    segment = SegmentColumns(segment_dir)
+    return pd.DataFrame({
+        'uri': segment.uri.tolist(),
+        'text': segment.text.tolist(),
+        'span': [[(start, end)] for start, end in segment.spans.tolist()],
+        'metadata': segment.get_metadata(np.arange(segment.num_rows)),
+        'text_unique_id': np.array(segment.text_unique_id)
+    })
+
+
+def _read_segment_index_columns(segment_dir) -> Mapping[str, np.ndarray]:
+    with open(os.path.join(segment_dir, SEGMENT_INFO_FILENAME)) as f:
+        segment_info = json.loads(f.read())
+    return {name: np.load(os.path.join(segment_dir, f'{name}.npy'), mmap_mode='r')
+            for name in segment_info.get('index_columns', [])}
+
+
+def _save_token_index(segment_dir, token_index: TokenIndex):
+    _save_string_column(segment_dir, 'token_vocabulary', token_index.vocabulary.tolist())
+    np.save(os.path.join(segment_dir, 'token_offsets.npy'), token_index.offsets)
+    np.save(os.path.join(segment_dir, 'token_postings.npy'), token_index.postings)
+
+
+def _load_token_index(segment_dir) -> TokenIndex:
+    return TokenIndex(_load_string_column(segment_dir, 'token_vocabulary'),
+                      np.load(os.path.join(segment_dir, 'token_offsets.npy'), mmap_mode='r'),
+                      np.load(os.path.join(segment_dir, 'token_postings.npy'), mmap_mode='r'))
+
+
+def _save_trigram_index(segment_dir, trigram_index: TrigramIndex):
+    np.save(os.path.join(segment_dir, 'trigram_codes.npy'), trigram_index.codes)
+    np.save(os.path.join(segment_dir, 'trigram_offsets.npy'), trigram_index.offsets)
+    np.save(os.path.join(segment_dir, 'trigram_postings.npy'), trigram_index.postings)
+
+
+def _load_trigram_index(segment_dir) -> TrigramIndex:
+    return TrigramIndex(np.load(os.path.join(segment_dir, 'trigram_codes.npy'), mmap_mode='r'),
+                        np.load(os.path.join(segment_dir, 'trigram_offsets.npy'), mmap_mode='r'),
+                        np.load(os.path.join(segment_dir, 'trigram_postings.npy'), mmap_mode='r'))
+
+
+def _read_segment_documents(segment_dir) -> pd.DataFrame:
+    return pd.DataFrame({
+        'uri': _load_string_column(segment_dir, 'document_uri'),
+        'num_elements': np.array(np.load(os.path.join(segment_dir, 'document_num_elements.npy'), mmap_mode='r')),
+        'metadata': [json.loads(metadata) for metadata in _load_string_column(segment_dir, 'document_metadata')]
+    })
+
+
+class DatasetStore:
+    """
+    A columnar on-disk representation of the text elements of a dataset.
+
+    Each column is stored as a NumPy file that can be memory-mapped: string columns (uri, text) are kept as an offsets
+    array and a utf-8 heap, spans as an (N, 2) int array, and each metadata key as a separate typed column. The
+    columns are read through a StoredDataset (see read_dataset()), which builds Python objects only for the accessed
+    rows, so loading a dataset does not parse all of its elements.
+
+    Each segment also holds a table of the documents added in it. As the elements of each document are stored in
+    consecutive rows, the table maps each document to a range of rows in the dataset.
+
+    The store is append-only: each batch of added elements is written as a new segment, and the manifest file lists
+    the segments that make up the dataset, in order. Thus, the cost of adding elements depends only on the number of
+    added elements. Once the number of segments exceeds MAX_SEGMENTS, they can be merged into a single segment using
+    compact().
+    """
+    MAX_SEGMENTS = 10
+    store_locks = defaultdict(threading.RLock)
+    compaction_locks = defaultdict(threading.Lock)
+    text_indices_in_memory = {}
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.lock = self.store_locks[os.path.abspath(store_dir)]
+
+    def exists(self) -> bool:
+        return os.path.isfile(os.path.join(self.store_dir, MANIFEST_FILENAME))
+
+    def get_num_rows(self) -> int:
+        return sum(segment['num_rows'] for segment in self._read_manifest()['segments'])
+
+    def get_num_segments(self) -> int:
+        return len(self._read_manifest()['segments'])
+
+    def needs_compaction(self) -> bool:
+        return self.get_num_segments() > self.MAX_SEGMENTS
+
+    def write(self, df: pd.DataFrame, documents_df: pd.DataFrame, index_columns: Mapping[str, np.ndarray]):
+        """
+        Write the given DataFrame of text elements (uri, text, span, metadata and text_unique_id columns) to the store
+        as a single segment, replacing its existing contents.
+        :param df:
+        :param documents_df: a DataFrame with the uri, number of elements and metadata of each document in *df*, in the
+        order in which their elements appear in *df*
+        :param index_columns: maps a column name to a numeric array with a value for each element in *df*. These
+        columns can later be retrieved using get_column()
+        """
+        with self.lock:
+            manifest = self._read_manifest() if self.exists() else {'next_segment_id': 0, 'segments': []}
+            segment = self._allocate_segment(manifest, len(df))
+            _write_segment(os.path.join(self.store_dir, segment['name']), df, documents_df, index_columns)
+            replaced_segments = manifest['segments']
+            manifest['segments'] = [segment]
+            self._write_manifest(manifest)
+            self._delete_segments(replaced_segments)
+
+    def append(self, df: pd.DataFrame, documents_df: pd.DataFrame, index_columns: Mapping[str, np.ndarray]):
+        """
+        Add the given DataFrame of text elements to the end of the store, as a new segment
+        :param df:
+        :param documents_df: a DataFrame with the uri, number of elements and metadata of each document in *df*
+        :param index_columns: maps a column name to a numeric array with a value for each element in *df*
+        """
+        if not self.exists():
+            self.write(df, documents_df, index_columns)
+            return
+        with self.lock:
+            manifest = self._read_manifest()
+            segment = self._allocate_segment(manifest, len(df))
+            _write_segment(os.path.join(self.store_dir, segment['name']), df, documents_df, index_columns)
+            manifest['segments'].append(segment)
+            self._write_manifest(manifest)
+
+    def compact(self):
+        """
+        Merge all the current segments of the store into a single segment. Segments appended while the merged segment
+        is being written are kept as is.
+        """
+        with self.compaction_locks[os.path.abspath(self.store_dir)]:
+            with self.lock:
+                manifest = self._read_manifest()
+                segments_to_merge = manifest['segments']
+                if len(segments_to_merge) <= 1:
+                    return
+                segment_dirs = [os.path.join(self.store_dir, segment['name']) for segment in segments_to_merge]
+                merged_df = pd.concat([_read_segment(segment_dir) for segment_dir in segment_dirs], ignore_index=True)
+                merged_documents_df = pd.concat([_read_segment_documents(segment_dir) for segment_dir in segment_dirs],
+                                                ignore_index=True)
+                segments_index_columns = [_read_segment_index_columns(segment_dir) for segment_dir in segment_dirs]
+                merged_index_columns = {name: np.concatenate([index_columns[name]
+                                                              for index_columns in segments_index_columns])
+                                        for name in segments_index_columns[0]}
+                merged_segment = self._allocate_segment(manifest, len(merged_df))
+                self._write_manifest(manifest)
+
+            _write_segment(os.path.join(self.store_dir, merged_segment['name']), merged_df, merged_documents_df,
+                           merged_index_columns)
+
+            with self.lock:
+                manifest = self._read_manifest()
+                merged_names = [segment['name'] for segment in segments_to_merge]
+                if [segment['name'] for segment in manifest['segments'][:len(merged_names)]] != merged_names:
+                    raise Exception(f"segments of dataset store {self.store_dir} changed during compaction")
+                manifest['segments'] = [merged_segment] + manifest['segments'][len(merged_names):]
+                self._write_manifest(manifest)
+                self._delete_segments(segments_to_merge)
+        logging.info(f"compacted {len(segments_to_merge)} segments of dataset store {self.store_dir}")
+
+    def get_column(self, name) -> np.ndarray:
+        """
+        Return a numeric column (e.g. "span", "text_unique_id" or one of the index columns). If the store has a single
+        segment, the returned array is a memory-mapped view of the column file.
+        :param name:
+        """
+        with self.lock:
+            columns = [np.load(os.path.join(self.store_dir, segment['name'], f'{name}.npy'), mmap_mode='r')
+                       for segment in self._read_manifest()['segments']]
+        return columns[0] if len(columns) == 1 else np.concatenate(columns)
+
+    def get_token_indices(self) -> List[Tuple[int, TokenIndex]]:
+        """
+        Return the TokenIndex of each segment along with the position of the first row of the segment. The posting
+        lists of the indices are memory-mapped, and the loaded indices are kept in memory until their segment is
+        removed.
+        """
+        return self._get_text_indices(_load_token_index)
+
+    def get_trigram_indices(self) -> List[Tuple[int, TrigramIndex]]:
+        """
+        Return the TrigramIndex of each segment along with the position of the first row of the segment
+        """
+        return self._get_text_indices(_load_trigram_index)
+
+    def _get_text_indices(self, load_func: Callable) -> list:
+        text_indices = []
+        first_row = 0
+        with self.lock:
+            for segment in self._read_manifest()['segments']:
+                key = (os.path.abspath(os.path.join(self.store_dir, segment['name'])), load_func.__name__)
+                if key not in self.text_indices_in_memory:
+                    self.text_indices_in_memory[key] = load_func(key[0])
+                text_indices.append((first_row, self.text_indices_in_memory[key]))
+                first_row += segment['num_rows']
+        return text_indices
+
+    def _discard_text_indices(self, segment_dir):
+        for load_func in (_load_token_index, _load_trigram_index):
+            self.text_indices_in_memory.pop((os.path.abspath(segment_dir), load_func.__name__), None)
+
+    def read_dataset(self) -> StoredDataset:
+        """
+        Map the columns of all the segments of the store. Elements appended to the store later on are not included in
+        the returned StoredDataset.
+        """
+        with self.lock:
+            return StoredDataset([SegmentColumns(os.path.join(self.store_dir, segment['name']))
+                                  for segment in self._read_manifest()['segments']])
+
+    def read_documents(self) -> pd.DataFrame:
+        """
+        Build a DataFrame with a row for each document in the store, holding the document uri, metadata, and the
+        range of rows [start, end) of its elements in the StoredDataset returned by read_dataset()
+        """
+        with self.lock:
+            documents_df = pd.concat([_read_segment_documents(os.path.join(self.store_dir, segment['name']))
+                                      for segment in self._read_manifest()['segments']], ignore_index=True)
+        documents_df['end'] = np.cumsum(documents_df['num_elements'].to_numpy(dtype=np.int64))
+        documents_df['start'] = documents_df['end'] - documents_df['num_elements']
+        return documents_df[['uri', 'start', 'end', 'metadata']]
+
+    def _allocate_segment(self, manifest, num_rows) -> dict:
+        segment = {'name': f'segment_{manifest["next_segment_id"]:06d}', 'num_rows': num_rows}
+        manifest['next_segment_id'] += 1
+        # a store that was deleted and created again reuses segment names, so indices loaded for the previous store
+        # are discarded
+        self._discard_text_indices(os.path.join(self.store_dir, segment['name']))
+        return segment
+
+    def _delete_segments(self, segments):
+        for segment in segments:
+            segment_dir = os.path.join(self.store_dir, segment['name'])
+            self._discard_text_indices(segment_dir)
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.store_dir, exist_ok=True)
+        manifest['format_version'] = STORE_FORMAT_VERSION
+        temp_path = os.path.join(self.store_dir, MANIFEST_FILENAME + '.tmp')
+        with open(temp_path, 'w') as f:
+            f.write(json.dumps(manifest))
+        os.replace(temp_path, os.path.join(self.store_dir, MANIFEST_FILENAME))
+
+    def _read_manifest(self) -> dict:
+        with open(os.path.join(self.store_dir, MANIFEST_FILENAME)) as f:
+            manifest = json.loads(f.read())
+        if manifest.get('format_version') != STORE_FORMAT_VERSION:
+            raise Exception(f"dataset store in {self.store_dir} has format version {manifest.get('format_version')}, "
+                            f"expected {STORE_FORMAT_VERSION}")
+        return manifest
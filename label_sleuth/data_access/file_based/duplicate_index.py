@@ -0,0 +1,122 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from label_sleuth.data_access.file_based.sorted_runs import SortedRuns
+
+
+class DuplicateIndex:
+    """
+    An index of the text elements that have the same text, i.e. duplicates of each other.
+
+    Each unique text in the dataset is assigned a group id (stored in the "text_unique_id" column of the dataset), in
+    the order in which the texts first appear. The index maps the 64-bit hash of each text to its group ids, and each
+    group id to its member rows, so finding the duplicates of an element or the group of a newly added text does not
+    require scanning the text column. As different texts may share a hash, the group of a text is verified by
+    comparing it to the text of the first row in the group.
+
+    The per-row arrays are grown by doubling their capacity, and the rows of each group are kept as SortedRuns, so
+    adding elements does not copy the whole index.
+    """
+
+    def __init__(self):
+        self.num_rows = 0
+        self._group_ids = np.empty(0, dtype=np.int64)
+        self._first_occurrence_mask = np.empty(0, dtype=bool)
+        self.group_rows = SortedRuns(np.int64)
+        self.group_first_rows: List[int] = []
+        self.hash_to_groups: Dict[int, List[int]] = {}
+
+    @property
+    def group_ids(self) -> np.ndarray:
+        return self._group_ids[:self.num_rows]
+
+    @property
+    def first_occurrence_mask(self) -> np.ndarray:
+        return self._first_occurrence_mask[:self.num_rows]
+
+    @classmethod
+    def from_columns(cls, text_hashes: np.ndarray, group_ids: np.ndarray):
+        """
+        Build the index from the text hash and group id of each row in the dataset
+        :param text_hashes:
+        :param group_ids:
+        """
+        index = cls()
+        group_ids = np.asarray(group_ids, dtype=np.int64)
+        _, first_rows = np.unique(group_ids, return_index=True)
+        index.group_first_rows = first_rows.tolist()
+        for group_id, text_hash in enumerate(np.asarray(text_hashes)[first_rows].tolist()):
+            index.hash_to_groups.setdefault(text_hash, []).append(group_id)
+        index._extend(group_ids, num_existing_groups=0)
+        return index
+
+    def add(self, texts: Sequence[str], text_hashes: np.ndarray, text_column: np.ndarray) -> np.ndarray:
+        """
+        Add text elements that were appended to the end of the dataset, assigning each text the group id of an existing
+        identical text, or a new group id if the text does not appear in the dataset.
+        :param texts: the texts of the new elements
+        :param text_hashes: the hashes of *texts*
+        :param text_column: the text of each existing row in the dataset
+        :return: the group ids of the new elements
+        """
+        num_existing_groups = len(self.group_first_rows)
+        group_ids = np.empty(len(texts), dtype=np.int64)
+        for idx, (text, text_hash) in enumerate(zip(texts, text_hashes.tolist())):
+            candidate_groups = self.hash_to_groups.setdefault(text_hash, [])
+            for group_id in candidate_groups:
+                first_row = self.group_first_rows[group_id]
+                first_text = text_column[first_row] if first_row < self.num_rows else texts[first_row - self.num_rows]
+                if first_text == text:
+                    break
+            else:
+                group_id = len(self.group_first_rows)
+                self.group_first_rows.append(self.num_rows + idx)
+                candidate_groups.append(group_id)
+            group_ids[idx] = group_id
+        self._extend(group_ids, num_existing_groups)
+        return group_ids
+
+    def get_rows_with_the_same_text(self, row: int) -> np.ndarray:
+        """
+        :return: the rows whose text is identical to the text of *row*, including *row* itself, in ascending order
+        """
+        return self.group_rows.get_rows(self._group_ids[row])
+
+    def _extend(self, new_group_ids: np.ndarray, num_existing_groups: int):
+        new_rows = np.arange(self.num_rows, self.num_rows + len(new_group_ids), dtype=np.int64)
+        is_first_occurrence = np.zeros(len(new_group_ids), dtype=bool)
+        new_group_first_rows = np.asarray(self.group_first_rows[num_existing_groups:], dtype=np.int64)
+        is_first_occurrence[new_group_first_rows - self.num_rows] = True
+        self._group_ids = _append(self._group_ids, self.num_rows, new_group_ids)
+        self._first_occurrence_mask = _append(self._first_occurrence_mask, self.num_rows, is_first_occurrence)
+        self.group_rows.add(new_group_ids, new_rows)
+        self.num_rows += len(new_group_ids)
+
+
+def _append(array: np.ndarray, num_rows: int, values: np.ndarray) -> np.ndarray:
+    """
+    Write *values* after the first *num_rows* of *array*, doubling its capacity if needed
+    :return: the given array, or a larger copy of it
+    """
+    if num_rows + len(values) > len(array):
+        grown = np.empty(max(2 * len(array), num_rows + len(values)), dtype=array.dtype)
+        grown[:num_rows] = array[:num_rows]
+        array = grown
+    array[num_rows:num_rows + len(values)] = values
+    return array
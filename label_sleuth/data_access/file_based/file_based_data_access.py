@@ -14,7 +14,6 @@
 #
 
 import ast
-import dataclasses
 import logging
 import os
 import random
@@ -24,19 +23,29 @@ import threading
 import re
 
 import ujson as json
+import numpy as np
 import pandas as pd
 
 from pathlib import Path
-from collections import Counter, defaultdict
-from typing import Sequence, Iterable, Mapping, List, Union, Set
+from collections import Counter, OrderedDict, defaultdict
+from typing import Sequence, Iterable, Mapping, List, Optional, Union, Set
 
 import label_sleuth.data_access.file_based.utils as utils
 from label_sleuth.data_access.core.data_structs import Document, Label, TextElement, LabelType, MulticlassLabel, \
     WorkspaceModelType, MulticlassLabeledTextElement, LabeledTextElement
 from label_sleuth.data_access.data_access_api import DataAccessApi, AlreadyExistsException, DocumentStatistics, \
-    LabeledStatus, BadDocumentNamesException, DocumentNameTooLongException, get_document_id, DocumentNameEmptyException
+    LabeledStatus, BadDocumentNamesException, DocumentNameTooLongException, get_document_id, \
+    DocumentNameEmptyException, get_document_uri
+from label_sleuth.data_access.file_based.dataset_store import DatasetStore, StoredDataset
+from label_sleuth.data_access.file_based.duplicate_index import DuplicateIndex
+from label_sleuth.data_access.file_based.label_index import LabelIndex
+from label_sleuth.data_access.file_based.label_journal import LabelJournal
+from label_sleuth.data_access.file_based.result_cursors import CachedResult, ResultCursorCache, decode_cursor, \
+    encode_cursor, hash_request_args
+from label_sleuth.data_access.file_based.uri_index import NOT_FOUND, UriIndex, hash_strings
 from label_sleuth.data_access.file_based.utils import get_dataset_name_from_uri
-from label_sleuth.utils import jsonpickle_encode, jsonpickle_decode
+from label_sleuth.metrics import timed_span
+from label_sleuth.utils import jsonpickle_decode
 
 
 def _validate_document_names(documents: Sequence[Document], max_document_name_length):
@@ -78,66 +87,80 @@ class FileBasedDataAccess(DataAccessApi):
     inside "ds_in_memory" only changes if new documents are added to the dataset.
 
     ===ds_in_memory===
-    maps dataset_name to a pandas DataFrame containing all the dataset text elements
+    maps dataset_name to a StoredDataset, which reads the dataset text elements from the memory-mapped columns of the
+    DatasetStore
+
+    ===documents_in_memory===
+    maps dataset_name to a dict of document uri -> (start row, end row, document metadata), where rows [start, end) of
+    the dataset hold the text elements of the document
 
     ===labels_in_memory===
     maps workspace_id -> dataset name -> URIs -> categories -> Label object
+    On disk, the labels are stored as a snapshot file and a journal of the changes made since the snapshot was saved.
+
+    ===label_index_in_memory===
+    maps workspace_id -> dataset name -> (LabelIndex, the labels dict from which it was built). The LabelIndex holds the
+    same label information as "labels_in_memory" in arrays that are aligned with the rows of the dataset, for
+    filtering elements by their labels
 
     """
-    doc_dir_name = 'doc_dump'
-    sentences_filename = 'dataset_sentences.csv'
+    doc_dir_name = 'doc_dump'  # legacy format, migrated to the DatasetStore on first load
+    store_dir_name = 'dataset_store'
+    sentences_filename = 'dataset_sentences.csv'  # legacy format, migrated to the DatasetStore on first load
     labels_filename = 'workspace_labels.json'
+    labels_journal_filename = 'workspace_labels_journal.jsonl'
+    min_label_journal_records_to_compact = 1000
+    max_cached_results = 32
+    max_cached_permutations = 8
 
     workspace_to_labels_lock_objects = defaultdict(threading.Lock)
-    ds_in_memory = defaultdict(pd.DataFrame)
+    ds_in_memory = {}
     labels_in_memory = defaultdict(lambda: defaultdict(lambda: defaultdict()))
+    label_index_in_memory = defaultdict(dict)
+    duplicate_index_in_memory = {}
+    documents_in_memory = {}
+    uri_index_in_memory = {}
+    # the (workspace_id, dataset_name) pairs with a pending labels journal compaction, guarded by the workspace lock
+    labels_journal_compactions_pending = set()
+    permutations_in_memory = OrderedDict()
+    permutations_lock = threading.Lock()
+    result_cursors = ResultCursorCache(max_cached_results)
     dataset_in_memory_lock = threading.RLock()
 
     def __init__(self, output_dir, max_document_name_length=60):
         self.output_dir = output_dir
         self.max_document_name_length = max_document_name_length
 
+    @timed_span('data_access')
     def add_documents(self, dataset_name: str, documents: Sequence[Document]):
         """
         Add new documents to a given dataset; If dataset does not exist, create it.
 
-        In this implementation, the same data is stored in two formats:
-            A. a json file per Document, containing data for the TextElement objects within that Document
-            B. a single csv file, containing data for the TextElement objects from all Documents for this dataset
+        In this implementation, the TextElement objects of all Documents are stored in a columnar DatasetStore, along
+        with a table that maps each Document to the range of rows holding its TextElement objects.
 
         :param dataset_name: the name of the dataset to which the documents should be added.
         :param documents: an Iterable over Document type.
         """
 
         _validate_document_names(documents, self.max_document_name_length)
-        doc_dump_dir = self._get_documents_dump_dir(dataset_name)
-        sentences = []
-        if not os.path.exists(doc_dump_dir):
-            os.makedirs(doc_dump_dir)
-        else:
-            doc_ids = {document.uri for document in documents}
-            intersection = doc_ids.intersection(set(self.get_all_document_uris(dataset_name)))
-            if len(intersection) > 0:
-                raise AlreadyExistsException(
-                    f"{len(intersection)} documents are already in dataset '{dataset_name}'. "
-                    f"uris: ({list(intersection)[:5]}{'...' if len(intersection) > 5 else ''})", list(intersection))
-
-        for doc in documents:
-            # save doc to file
-            filename = utils.uri_to_filename(doc.uri)
-            file_path = os.path.join(doc_dump_dir, filename)
-            doc_encoded = jsonpickle_encode(doc)
-            with open(file_path + '.json', 'w') as f:
-                f.write(doc_encoded)
-            # add doc sentences to working memory
-            sentences.extend(doc.text_elements)
-        self._add_sentences_to_dataset_in_memory(dataset_name=dataset_name, text_elements=sentences)
+        with self.dataset_in_memory_lock:
+            if self._dataset_exists(dataset_name):
+                doc_ids = {document.uri for document in documents}
+                intersection = doc_ids.intersection(self._get_documents_in_memory(dataset_name).keys())
+                if len(intersection) > 0:
+                    raise AlreadyExistsException(
+                        f"{len(intersection)} documents are already in dataset '{dataset_name}'. "
+                        f"uris: ({list(intersection)[:5]}{'...' if len(intersection) > 5 else ''})",
+                        list(intersection))
+            self._add_documents_to_dataset_in_memory(dataset_name=dataset_name, documents=documents)
 
         num_of_text_elements = sum([len(doc.text_elements) for doc in documents])
         logging.info(f'{dataset_name}:\t\tloaded {len(documents)} documents '
-                     f'({num_of_text_elements} text elements) under {doc_dump_dir}')
+                     f'({num_of_text_elements} text elements) under {self._get_dataset_store(dataset_name).store_dir}')
         return DocumentStatistics(len(documents), num_of_text_elements)
 
+    @timed_span('data_access')
     def set_labels(self, workspace_id: str, uris_to_labels: Union[Mapping[str, Mapping[int, Label]],
                                                                   Mapping[str, MulticlassLabel]],
                    apply_to_duplicate_texts=False):
@@ -157,20 +180,26 @@ class FileBasedDataAccess(DataAccessApi):
         dataset_name = utils.get_dataset_name_from_uri(next(iter(uris_to_labels.keys())))
         with self._get_lock_object_for_workspace(workspace_id):
             ds_labels = self._get_labels(workspace_id, dataset_name)
-            all_uris = self.get_all_text_elements_uris(dataset_name)
+            uris = list(uris_to_labels.keys())
+            missing_uris = {uri for uri, row in zip(uris, self._get_rows_by_uris(dataset_name, uris))
+                            if row == NOT_FOUND}
+            updated_uris = []
             for uri, labels in uris_to_labels.items():
-                if uri not in all_uris:
+                if uri in missing_uris:
                     raise Exception(f'Trying to set labels for uri "{uri}" which does not exist')
 
                 if apply_to_duplicate_texts:  # set the given label for all elements with the same text
                     same_text_uris = self._get_uris_with_the_same_text(dataset_name, uri)
                     for same_text_uri in same_text_uris:
                         self._set_single_uri_labels(same_text_uri, ds_labels, labels)
+                    updated_uris.extend(same_text_uris)
                 else:
                     # Note: we do not override existing labels if they are from another category
                     self._set_single_uri_labels(uri, ds_labels, labels)
-            # Save updated labels dict to disk
-            self._save_labels_data(dataset_name, workspace_id)
+                    updated_uris.append(uri)
+            self._update_label_index(workspace_id, dataset_name, updated_uris)
+            # Save the label changes to disk
+            self._append_to_labels_journal(workspace_id, dataset_name, updated_uris)
 
     @staticmethod
     def _set_single_uri_labels(uri, existing_labels, labels_info: Union[Mapping[int, Label], MulticlassLabel]):
@@ -190,6 +219,7 @@ class FileBasedDataAccess(DataAccessApi):
             if len(existing_labels[uri]) == 0:
                 existing_labels.pop(uri)
 
+    @timed_span('data_access')
     def unset_labels(self, workspace_id: str, category_id: Union[int, None], uris: Sequence[str],
                      apply_to_duplicate_texts=False):
         """
@@ -204,21 +234,27 @@ class FileBasedDataAccess(DataAccessApi):
         dataset_name = utils.get_dataset_name_from_uri(uris[0])
         with self._get_lock_object_for_workspace(workspace_id):
             ds_labels = self._get_labels(workspace_id, dataset_name)
-            all_uris = self.get_all_text_elements_uris(dataset_name)
+            missing_uris = {uri for uri, row in zip(uris, self._get_rows_by_uris(dataset_name, uris))
+                            if row == NOT_FOUND}
+            updated_uris = []
             for uri in uris:
-                if uri not in all_uris:
+                if uri in missing_uris:
                     raise Exception(f'Trying to unset labels for uri "{uri}" which does not exist')
 
                 if apply_to_duplicate_texts:  # unset the given label for all elements with the same text
                     same_text_uris = self._get_uris_with_the_same_text(dataset_name, uri)
                     for same_text_uri in same_text_uris:
                         self._unset_single_uri_label(same_text_uri, ds_labels, category_id)
+                    updated_uris.extend(same_text_uris)
                 else:
                     self._unset_single_uri_label(uri, ds_labels, category_id)
+                    updated_uris.append(uri)
+            self._update_label_index(workspace_id, dataset_name, updated_uris)
 
-            # Save updated labels dict to disk
-            self._save_labels_data(dataset_name, workspace_id)
+            # Save the label changes to disk
+            self._append_to_labels_journal(workspace_id, dataset_name, updated_uris)
 
+    @timed_span('data_access')
     def get_documents(self, workspace_id: Union[None, str], dataset_name: str, uris: Iterable[str],
                       label_types: Union[None, Set[LabelType]] = frozenset({LabelType.Standard})) \
             -> List[Document]:
@@ -236,20 +272,14 @@ class FileBasedDataAccess(DataAccessApi):
         information for the TextElements of these Documents, if available.
         """
 
-        def load_doc(uri):
-            filename = utils.uri_to_filename(uri)
-            file_path = os.path.join(doc_dump_dir, filename)
-            with open(file_path + '.json') as json_file:
-                doc_encoded = json_file.read()
-            doc = jsonpickle_decode(doc_encoded)
-            if len(doc.text_elements) > 0:
-                if hasattr(doc.text_elements[0], "category_to_label"): # for backward compatability remove the empty "category_to_label" field from TextElement objects
-                    for te in doc.text_elements:
-                        delattr(te, "category_to_label")
-            return doc
-
-        doc_dump_dir = self._get_documents_dump_dir(dataset_name)
-        docs = [load_doc(uri) for uri in uris]
+        dataset = self._get_ds_in_memory(dataset_name)
+        documents_in_memory = self._get_documents_in_memory(dataset_name)
+        docs = []
+        for uri in uris:
+            start, end, metadata = documents_in_memory[uri]
+            text_elements = utils.build_text_elements_from_dataset_and_labels(dataset, np.arange(start, end),
+                                                                              labels_dict=None)
+            docs.append(Document(uri=uri, text_elements=text_elements, metadata=metadata))
         if workspace_id is not None:
             with self._get_lock_object_for_workspace(workspace_id):
                 for d in docs:
@@ -257,6 +287,7 @@ class FileBasedDataAccess(DataAccessApi):
                                                             text_elements=d.text_elements, label_types=label_types)
         return docs
 
+    @timed_span('data_access')
     def get_all_document_uris(self, dataset_name: str) -> List[str]:
         """
         Return a List of all Document uris in the given dataset_name.
@@ -264,14 +295,10 @@ class FileBasedDataAccess(DataAccessApi):
         :param dataset_name: the name of the dataset from which the Document uris should be retrieved.
         :return: a List of all Document uris in the given dataset_name.
         """
-        uris = []
-        doc_dump_dir = self._get_documents_dump_dir(dataset_name)
-        for filename in os.listdir(doc_dump_dir):
-            filename, file_extension = os.path.splitext(filename)
-            uris.append(utils.filename_to_uri(filename))
-        uris = sorted(uris, key=utils.get_sort_key_by_document_name)
+        uris = sorted(self._get_documents_in_memory(dataset_name).keys(), key=utils.get_sort_key_by_document_name)
         return uris
 
+    @timed_span('data_access')
     def get_all_text_elements_uris(self, dataset_name: str) -> List[str]:
         """
         Return a List of all TextElement uris in the given dataset_name.
@@ -279,28 +306,30 @@ class FileBasedDataAccess(DataAccessApi):
         :param dataset_name: the name of the dataset from which the TextElement uris should be retrieved.
         :return: a List of all TextElement uris in the given dataset_name.
         """
-        return list(self._get_ds_in_memory(dataset_name)['uri'].values)
+        return self._get_ds_in_memory(dataset_name).uri.tolist()
 
+    @timed_span('data_access')
     def get_text_element_count(self, dataset_name: str) -> int:
         """
         Return the total number of TextElements in the given dataset_name.
         :param dataset_name:
         """
-        return len(self.get_all_text_elements_uris(dataset_name))
+        return len(self._get_ds_in_memory(dataset_name))
 
+    @timed_span('data_access')
     def get_all_text_elements(self, dataset_name: str) -> List[TextElement]:
         """
         Return a List of all TextElement in the given dataset_name.
 
         :param dataset_name: the name of the dataset from which the TextElement should be retrieved.
         """
-        return utils.build_text_elements_from_dataframe_and_labels(
-            self._get_ds_in_memory(dataset_name),
-            labels_dict=None)
+        dataset = self._get_ds_in_memory(dataset_name)
+        return utils.build_text_elements_from_dataset_and_labels(dataset, np.arange(len(dataset)), labels_dict=None)
 
+    @timed_span('data_access')
     def get_text_elements(self, workspace_id: str, dataset_name: str, sample_size: int = sys.maxsize,
                           sample_start_idx: int = 0, query: str = None, is_regex: bool = False, document_uri=None,
-                          remove_duplicates=False, random_state: int = 0) -> Mapping:
+                          remove_duplicates=False, random_state: int = 0, cursor: str = None) -> Mapping:
         """
         Sample *sample_size* TextElements from dataset_name, optionally limiting to those matching a query,
         and add their labels information for workspace_id, if available.
@@ -315,24 +344,34 @@ class FileBasedDataAccess(DataAccessApi):
         :param document_uri: get elements from a particular document
         :param remove_duplicates: if True, do not include elements that are duplicates of each other.
         :param random_state: provide an int seed to define a random state. Default is zero.
-        :return: a dictionary with two keys: 'results' whose value is a list of TextElements, and 'hit_count' whose
-        value is the total number of TextElements in the dataset matched by the query.
-        {'results': [TextElement], 'hit_count': int}
+        :param cursor: the 'next_cursor' returned by a previous call with the same arguments. If provided, the page
+        of results that follows the previous call is returned, and sample_start_idx is ignored.
+        :return: a dictionary with the keys 'results' whose value is a list of TextElements, 'hit_count' whose value
+        is the total number of TextElements in the dataset matched by the query, and 'next_cursor' whose value is a
+        cursor for fetching the next page of results (or None if there are no more results).
+        {'results': [TextElement], 'hit_count': int, 'next_cursor': str}
         """
+        document_rows = None
+        if document_uri is not None:
+            document_rows = self._get_documents_in_memory(dataset_name).get(document_uri, (0, 0))[:2]
+        query_rows = self._get_query_candidate_rows(dataset_name, query, is_regex)
         with self._get_lock_object_for_workspace(workspace_id):
             results_dict = \
                 self._get_text_elements(
                     workspace_id=workspace_id, dataset_name=dataset_name,
-                    filter_func=lambda df, _: utils.filter_by_query_and_document_uri(df, query, is_regex, document_uri),
+                    filter_func=lambda dataset, _: utils.filter_by_query_and_document_uri(dataset, query, is_regex,
+                                                                                     document_rows, query_rows),
                     sample_size=sample_size, sample_start_idx=sample_start_idx,
-                    remove_duplicates=remove_duplicates, random_state=random_state)
+                    remove_duplicates=remove_duplicates, random_state=random_state, cursor=cursor,
+                    request_args=('text_elements', query, is_regex, document_uri))
 
         return results_dict
 
+    @timed_span('data_access')
     def get_unlabeled_text_elements(self, workspace_id: str, dataset_name: str, category_id: int,
                                     sample_size: int = sys.maxsize, sample_start_idx: int = 0,
                                     query: str = None, is_regex: bool = False,
-                                    remove_duplicates=False, random_state: int = 0) -> Mapping:
+                                    remove_duplicates=False, random_state: int = 0, cursor: str = None) -> Mapping:
         """
         Sample *sample_size* TextElements from dataset_name, unlabeled for category_id in workspace_id, optionally
         limiting to those matching a query.
@@ -347,20 +386,29 @@ class FileBasedDataAccess(DataAccessApi):
         :param is_regex: if True, the query string is interpreted as a regular expression (False by default)
         :param remove_duplicates: if True, do not include elements that are duplicates of each other.
         :param random_state: provide an int seed to define a random state. Default is zero.
-        :return: a dictionary with two keys: 'results' whose value is a list of TextElements, and 'hit_count' whose
-        value is the total number of TextElements in the dataset matched by the query.
-        {'results': [TextElement], 'hit_count': int}
+        :param cursor: the 'next_cursor' returned by a previous call with the same arguments. If provided, the page
+        of results that follows the previous call is returned, and sample_start_idx is ignored.
+        :return: a dictionary with the keys 'results' whose value is a list of TextElements, 'hit_count' whose value
+        is the total number of TextElements in the dataset matched by the query, and 'next_cursor' whose value is a
+        cursor for fetching the next page of results (or None if there are no more results).
+        {'results': [TextElement], 'hit_count': int, 'next_cursor': str}
         """
-        filter_func = lambda df, labels: \
-            utils.filter_by_query_and_label_status(df, labels, category_id, LabeledStatus.UNLABELED, query, is_regex)
+        query_rows = self._get_query_candidate_rows(dataset_name, query, is_regex)
+        filter_func = lambda dataset, label_index: \
+            utils.filter_by_query_and_label_status(dataset, label_index, category_id, LabeledStatus.UNLABELED, query,
+                                                   is_regex, query_rows=query_rows)
 
         with self._get_lock_object_for_workspace(workspace_id):
             results_dict = self._get_text_elements(workspace_id=workspace_id, dataset_name=dataset_name,
                                                    filter_func=filter_func, sample_size=sample_size,
                                                    sample_start_idx=sample_start_idx,
-                                                   remove_duplicates=remove_duplicates, random_state=random_state)
+                                                   remove_duplicates=remove_duplicates, random_state=random_state,
+                                                   cursor=cursor,
+                                                   request_args=('unlabeled_text_elements', category_id, query,
+                                                                 is_regex))
         return results_dict
 
+    @timed_span('data_access')
     def get_labeled_text_elements(self, workspace_id: str, dataset_name: str, category_id: Union[int, None],
                                   sample_size: int = sys.maxsize, query: str = None, is_regex: bool = False,
                                   remove_duplicates=False, random_state: int = 0,
@@ -384,30 +432,35 @@ class FileBasedDataAccess(DataAccessApi):
         {'results': [TextElement], 'hit_count': int}
         """
 
-        filter_func = lambda df, labels: \
-            utils.filter_by_query_and_label_status(df, labels, category_id, LabeledStatus.LABELED, query, is_regex,
-                                                   label_types=label_types)
+        query_rows = self._get_query_candidate_rows(dataset_name, query, is_regex)
+        filter_func = lambda dataset, label_index: \
+            utils.filter_by_query_and_label_status(dataset, label_index, category_id, LabeledStatus.LABELED, query,
+                                                   is_regex, label_types=label_types, query_rows=query_rows)
         with self._get_lock_object_for_workspace(workspace_id):
             results_dict = self._get_text_elements(workspace_id=workspace_id, dataset_name=dataset_name,
                                                    filter_func=filter_func, sample_size=sample_size,
                                                    remove_duplicates=remove_duplicates, random_state=random_state)
         return results_dict
 
+    @timed_span('data_access')
     def get_labeled_elements_by_value(self, workspace_id: str, dataset_name: str, category_id: Union[int, None],
                                       value: Union[bool, int],
                                       sample_size: int = sys.maxsize,
                                       sample_start_idx: int = 0,
-                                      remove_duplicates=False, random_state: int = 0):
-        filter_func = lambda df, labels: \
-            utils.filter_by_label_value(df, labels, category_id, value)
+                                      remove_duplicates=False, random_state: int = 0, cursor: str = None):
+        filter_func = lambda dataset, label_index: \
+            utils.filter_by_label_value(dataset, label_index, category_id, value)
 
         with self._get_lock_object_for_workspace(workspace_id):
             results_dict = self._get_text_elements(workspace_id=workspace_id, dataset_name=dataset_name,
                                                    filter_func=filter_func, sample_size=sample_size,
                                                    sample_start_idx=sample_start_idx,
-                                                   remove_duplicates=remove_duplicates, random_state=random_state)
+                                                   remove_duplicates=remove_duplicates, random_state=random_state,
+                                                   cursor=cursor,
+                                                   request_args=('labeled_elements_by_value', category_id, value))
         return results_dict
 
+    @timed_span('data_access')
     def get_label_counts(self, workspace_id: str, dataset_name: str, category_id: Union[int, None],
                          remove_duplicates=False,
                          label_types: Set[LabelType] = frozenset(LabelType._member_map_.values()),
@@ -425,9 +478,10 @@ class FileBasedDataAccess(DataAccessApi):
         """
         labels_by_uri = self._get_labels(workspace_id=workspace_id, dataset_name=dataset_name).copy()
         if remove_duplicates:
-            corpus_df = self._get_ds_in_memory(dataset_name=dataset_name)
-            labeled_df = corpus_df[corpus_df['uri'].isin(labels_by_uri)]
-            uris_to_keep = set(labeled_df.drop_duplicates(subset=['text'])['uri'])
+            dataset = self._get_ds_in_memory(dataset_name=dataset_name)
+            labeled_rows = np.sort([row for row in self._get_rows_by_uris(dataset_name, list(labels_by_uri))
+                                    if row != NOT_FOUND]).astype(np.int64)
+            uris_to_keep = set(dataset.uri.take(self._get_first_rows_of_each_text(dataset, labeled_rows)))
             labels_by_uri = {uri: category_to_label for uri, category_to_label in labels_by_uri.items()
                              if uri in uris_to_keep}
 
@@ -443,6 +497,7 @@ class FileBasedDataAccess(DataAccessApi):
         else:
             return Counter(lbl_obj.label for lbl_obj in category_label_list)
 
+    @timed_span('data_access')
     def delete_all_labels(self, workspace_id, dataset_name):
         """
         Delete the labels info of the given workspace_id for the given dataset (other labels info files are kept).
@@ -450,13 +505,16 @@ class FileBasedDataAccess(DataAccessApi):
         :param dataset_name:
         """
         if workspace_id in self.labels_in_memory: del self.labels_in_memory[workspace_id]
+        if workspace_id in self.label_index_in_memory: del self.label_index_in_memory[workspace_id]
         labels_file = self._get_workspace_labels_dump_filename(workspace_id, dataset_name)
         if os.path.isfile(labels_file):
             os.remove(labels_file)
+        self._get_labels_journal(workspace_id, dataset_name).clear()
         workspace_dumps_dir = self._get_workspace_labels_dir(workspace_id)
         if os.path.exists(workspace_dumps_dir) and len(os.listdir(workspace_dumps_dir)) == 0:
             os.rmdir(workspace_dumps_dir)
 
+    @timed_span('data_access')
     def delete_labels_for_category(self, workspace_id, dataset_name, category_id):
         """
         Delete the labels info associated with the given category.
@@ -474,6 +532,7 @@ class FileBasedDataAccess(DataAccessApi):
         if len(labeled_elements) > 0:
             self.unset_labels(workspace_id, category_id, [e.uri for e in labeled_elements])
 
+    @timed_span('data_access')
     def get_text_elements_by_uris(self, workspace_id: str, dataset_name: str, uris: Iterable[str],
                                   label_types: Set[LabelType] = frozenset({LabelType.Standard})) \
             -> Union[List[LabeledTextElement], List[MulticlassLabeledTextElement]]:
@@ -488,7 +547,8 @@ class FileBasedDataAccess(DataAccessApi):
         with self._get_lock_object_for_workspace(workspace_id):
             results_dict = self._get_text_elements(
                 workspace_id=workspace_id, dataset_name=dataset_name,
-                filter_func=lambda df, _: utils.filter_by_uris(df, uris),
+                filter_func=lambda dataset, _: np.array([row for row in self._get_rows_by_uris(dataset_name, uris)
+                                                         if row != NOT_FOUND], dtype=np.int64),
                 sample_size=sys.maxsize)
 
         elements = []
@@ -510,19 +570,83 @@ class FileBasedDataAccess(DataAccessApi):
         :param random_state: provide an int seed to define a random state. Default is zero.
         :param remove_duplicates: if True, do not include elements that are duplicates of each other.
         """
-        corpus_df = self._get_ds_in_memory(dataset_name)
-        if remove_duplicates:
-            corpus_df = corpus_df.drop_duplicates(subset=['text'])
-        all_uris = list(corpus_df['uri'].values)
-        if shuffle:
-            random.Random(random_state).shuffle(all_uris)
+        rows = self.get_text_element_row_positions(dataset_name, shuffle, random_state, remove_duplicates)
 
         # extracting one element at a time from a large dataframe can be expensive, so we fetch them in batches
         # but yield them one by one
         batch_size = 1000
-        for i in range(0, len(all_uris), batch_size):
-            batch_uris = all_uris[i:i + batch_size]
-            yield from self.get_text_elements_by_uris(workspace_id, dataset_name, batch_uris)
+        for i in range(0, len(rows), batch_size):
+            yield from self.get_text_elements_by_row_positions(workspace_id, dataset_name, rows[i:i + batch_size])
+
+    @timed_span('data_access')
+    def get_text_element_row_positions(self, dataset_name, shuffle=False, random_state: int = 0,
+                                       remove_duplicates=False) -> np.ndarray:
+        """
+        Return the row positions of the text elements in *dataset_name*, in the order in which they are yielded by
+        get_text_element_iterator() with the same arguments.
+        :param dataset_name:
+        :param shuffle: if True, the row positions are returned in random order.
+        :param random_state: provide an int seed to define a random state. Default is zero.
+        :param remove_duplicates: if True, do not include elements that are duplicates of each other.
+        """
+        with self.dataset_in_memory_lock:
+            num_rows = len(self._get_ds_in_memory(dataset_name))
+            if remove_duplicates:
+                rows = np.flatnonzero(self._get_duplicate_index(dataset_name).first_occurrence_mask[:num_rows])
+            else:
+                rows = np.arange(num_rows)
+        if shuffle:
+            # shuffling a list of the same length with the same seed results in the same order as shuffling the uris
+            row_list = rows.tolist()
+            random.Random(random_state).shuffle(row_list)
+            rows = np.array(row_list, dtype=np.int64)
+        return rows
+
+    @timed_span('data_access')
+    def get_text_elements_by_row_positions(self, workspace_id: str, dataset_name: str, rows: Sequence[int]) \
+            -> Union[List[LabeledTextElement], List[MulticlassLabeledTextElement]]:
+        """
+        Return a List of TextElement objects from the given dataset_name at the given row positions (in the same
+        order), and add the label information for the workspace to these TextElements, if available.
+        :param workspace_id:
+        :param dataset_name:
+        :param rows: positions of the text elements in the dataset, e.g. as returned by
+        get_text_element_row_positions()
+        """
+        with self._get_lock_object_for_workspace(workspace_id):
+            results_dict = self._get_text_elements(workspace_id=workspace_id, dataset_name=dataset_name,
+                                                   filter_func=lambda dataset, _: np.asarray(rows, dtype=np.int64),
+                                                   sample_size=None)
+        return results_dict['results']
+
+    @timed_span('data_access')
+    def get_texts_by_row_positions(self, dataset_name: str, rows: Sequence[int]) -> List[str]:
+        """
+        Return the texts of the text elements at the given row positions in *dataset_name*, without building
+        TextElement objects.
+        :param dataset_name:
+        :param rows: positions of the text elements in the dataset
+        """
+        return self._get_ds_in_memory(dataset_name).text.take(rows)
+
+    @timed_span('data_access')
+    def get_row_positions_by_uris(self, dataset_name: str, uris: Sequence[str]) -> List[int]:
+        """
+        Return the row positions of the text elements with the given uris in *dataset_name* (in the same order), or -1
+        for uris that are not in the dataset.
+        :param dataset_name:
+        :param uris:
+        """
+        return self._get_rows_by_uris(dataset_name, uris)
+
+    def get_dataset_store_dir(self, dataset_name: str) -> Optional[str]:
+        """
+        Return the directory of the DatasetStore that holds the text elements of *dataset_name*, from which other
+        processes can read the texts by their row positions.
+        :param dataset_name:
+        """
+        self._get_ds_in_memory(dataset_name)  # a dataset kept in the legacy csv format is migrated to the store
+        return self._get_dataset_store(dataset_name).store_dir
 
     def get_all_dataset_names(self) -> List[str]:
         """
@@ -531,6 +655,7 @@ class FileBasedDataAccess(DataAccessApi):
         path = self._get_datasets_base_dir()
         return [name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))]
 
+    @timed_span('data_access')
     def delete_dataset(self, dataset_name: str):
         """
         Delete dataset by name
@@ -542,12 +667,19 @@ class FileBasedDataAccess(DataAccessApi):
             shutil.rmtree(dataset_dir)
         if dataset_name in self.ds_in_memory:
             del self.ds_in_memory[dataset_name]
-
+        self.duplicate_index_in_memory.pop(dataset_name, None)
+        self.documents_in_memory.pop(dataset_name, None)
+        self.uri_index_in_memory.pop(dataset_name, None)
+        self.result_cursors.discard_dataset(dataset_name)
+        for dataset_to_label_index in self.label_index_in_memory.values():
+            dataset_to_label_index.pop(dataset_name, None)
+
+    @timed_span('data_access')
     def get_dataset_elements_count(self, dataset_name: str):
         if self._dataset_exists(dataset_name):
             self.ds_in_memory[dataset_name] = self._get_ds_in_memory(dataset_name)
         if dataset_name in self.ds_in_memory:
-            return self.ds_in_memory[dataset_name].shape[0]
+            return len(self.ds_in_memory[dataset_name])
         else:
             return 0
 
@@ -558,21 +690,30 @@ class FileBasedDataAccess(DataAccessApi):
     def _get_ds_in_memory(self, dataset_name):
         with self.dataset_in_memory_lock:
             if dataset_name not in self.ds_in_memory:
-                if self._dataset_exists(dataset_name):
-                    logging.info(f"reading dataset '{dataset_name}' csv file")
-                    dataset_file_path = self._get_dataset_dump_filename(dataset_name)
-
-                    df = pd.read_csv(dataset_file_path, converters=
-                            {"span": lambda span: [tuple(int(x) for x in span[2:-2].split(','))],
-                             "metadata": lambda metadata: ast.literal_eval(metadata) if metadata != '{}' else {}})
-
-                    logging.info(f"csv file for dataset '{dataset_name}' read and processed successfully")
+                store = self._get_dataset_store(dataset_name)
+                if store.exists():
+                    logging.info(f"reading dataset '{dataset_name}' from {store.store_dir}")
+                    dataset = store.read_dataset()
+                    logging.info(f"dataset '{dataset_name}' read successfully")
+                elif os.path.exists(self._get_dataset_dump_filename(dataset_name)):
+                    dataset = self._migrate_dataset_csv_to_store(dataset_name)
                 else:
                     raise Exception(f'Dataset "{dataset_name}" does not exist.')
-                self.ds_in_memory[dataset_name] = df
+                self.ds_in_memory[dataset_name] = dataset
             res = self.ds_in_memory[dataset_name]
         return res
 
+    def _get_documents_in_memory(self, dataset_name):
+        with self.dataset_in_memory_lock:
+            if dataset_name not in self.documents_in_memory:
+                self._get_ds_in_memory(dataset_name)  # migrates datasets stored in the legacy format, if needed
+                documents_df = self._get_dataset_store(dataset_name).read_documents()
+                self.documents_in_memory[dataset_name] = \
+                    {uri: (start, end, metadata) for uri, start, end, metadata
+                     in zip(documents_df['uri'], documents_df['start'].tolist(), documents_df['end'].tolist(),
+                            documents_df['metadata'])}
+            return self.documents_in_memory[dataset_name]
+
     def _get_labels(self, workspace_id, dataset_name):
         if workspace_id not in self.labels_in_memory or dataset_name not in self.labels_in_memory[workspace_id]:
             file_path = self._get_workspace_labels_dump_filename(workspace_id, dataset_name)
@@ -582,31 +723,181 @@ class FileBasedDataAccess(DataAccessApi):
             with open(file_path) as f:
                 labels_encoded = f.read()
             simplified_dict = json.loads(labels_encoded)
+            # Replay the changes made since the snapshot was saved
+            for uri, simplified_labels in self._get_labels_journal(workspace_id, dataset_name).read():
+                if simplified_labels is None:
+                    simplified_dict.pop(uri, None)
+                else:
+                    simplified_dict[uri] = simplified_labels
 
-            if self.is_multiclass(workspace_id):
-                for uri, label_dict in simplified_dict.items():
-                    self.labels_in_memory[workspace_id][dataset_name][uri] = MulticlassLabel(**label_dict)
-            else:
-                for uri, category_to_label in simplified_dict.items():
-                    for category_id, label_dict in category_to_label.items():
-                        self.labels_in_memory[workspace_id][dataset_name][uri] = \
-                            self.labels_in_memory[workspace_id][dataset_name].get(uri, {})
-                        self.labels_in_memory[workspace_id][dataset_name][uri][int(category_id)] = Label(**label_dict)
+            is_multiclass = self.is_multiclass(workspace_id)
+            for uri, simplified_labels in simplified_dict.items():
+                self.labels_in_memory[workspace_id][dataset_name][uri] = \
+                    self._decode_uri_labels(simplified_labels, is_multiclass)
 
         return self.labels_in_memory[workspace_id][dataset_name]
 
-    def _add_sentences_to_dataset_in_memory(self, dataset_name, text_elements: Iterable[TextElement]):
-        if self._dataset_exists(dataset_name):
-            self.ds_in_memory[dataset_name] = self._get_ds_in_memory(dataset_name)
-        dicts = [dataclasses.asdict(s) for s in text_elements]
+    def _get_label_index(self, workspace_id, dataset_name) -> LabelIndex:
+        """
+        Return the LabelIndex for the given workspace and dataset, building it from the labels dict if needed. The
+        index is rebuilt if the labels dict was reloaded, and extended if elements were added to the dataset.
+        """
+        num_rows = len(self._get_ds_in_memory(dataset_name))
+        labels_dict = self._get_labels(workspace_id, dataset_name)
+        label_index, source_labels_dict = self.label_index_in_memory[workspace_id].get(dataset_name, (None, None))
+        if label_index is None or source_labels_dict is not labels_dict or label_index.num_rows > num_rows:
+            uris = list(labels_dict.keys())
+            uri_to_row = dict(zip(uris, self._get_rows_by_uris(dataset_name, uris)))
+            label_index = LabelIndex.from_labels(labels_dict, uri_to_row, num_rows, self.is_multiclass(workspace_id))
+            self.label_index_in_memory[workspace_id][dataset_name] = (label_index, labels_dict)
+        elif label_index.num_rows < num_rows:
+            label_index.extend(num_rows)
+        return label_index
+
+    def _update_label_index(self, workspace_id, dataset_name, uris: Sequence[str]):
+        """
+        Update the LabelIndex rows of the given uris, following a change in their labels
+        """
+        labels_dict = self._get_labels(workspace_id, dataset_name)
+        label_index = self._get_label_index(workspace_id, dataset_name)
+        for uri, row in zip(uris, self._get_rows_by_uris(dataset_name, uris)):
+            if row != NOT_FOUND:
+                label_index.update_row(row, labels_dict.get(uri))
 
-        new_sentences_df = pd.DataFrame(dicts)
-        if dataset_name in self.ds_in_memory:
-            self.ds_in_memory[dataset_name] = self.ds_in_memory[dataset_name].append(new_sentences_df, sort=False)
-        else:
-            self.ds_in_memory[dataset_name] = new_sentences_df
-        self.ds_in_memory[dataset_name] = self._add_text_unique_ids(self.ds_in_memory[dataset_name])
-        self.ds_in_memory[dataset_name].to_csv(self._get_dataset_dump_filename(dataset_name), index=False)
+    def _get_rows_by_uris(self, dataset_name, uris: Iterable[str]) -> List[int]:
+        """
+        Return the row positions of the given uris in the dataset, or NOT_FOUND for uris that are not in the dataset
+        """
+        with self.dataset_in_memory_lock:
+            dataset = self._get_ds_in_memory(dataset_name)
+            uri_index = self._get_uri_index(dataset_name)
+        return uri_index.get_rows(list(uris), dataset.uri).tolist()
+
+    def _get_query_candidate_rows(self, dataset_name, query, is_regex) -> Optional[np.ndarray]:
+        """
+        Return the sorted rows of the dataset that may match the given query, using the token index (or the trigram
+        index, for regular expressions) kept in the dataset store, or None if the index cannot be used for this query
+        (and all rows should be matched against it)
+        """
+        if not query:
+            return None
+        with self.dataset_in_memory_lock:
+            num_rows = len(self._get_ds_in_memory(dataset_name))
+            store = self._get_dataset_store(dataset_name)
+            text_indices = store.get_trigram_indices() if is_regex else store.get_token_indices()
+        rows = []
+        for first_row, text_index in text_indices:
+            segment_rows = text_index.get_candidate_rows(query)
+            if segment_rows is None:
+                return None
+            rows.append(segment_rows.astype(np.int64) + first_row)
+        rows = np.concatenate(rows) if len(rows) > 0 else np.empty(0, dtype=np.int64)
+        return rows[rows < num_rows]
+
+    def _get_uri_index(self, dataset_name) -> UriIndex:
+        """
+        Return the UriIndex of the given dataset, building it from the uri hashes kept in the dataset store if needed
+        """
+        with self.dataset_in_memory_lock:
+            dataset = self._get_ds_in_memory(dataset_name)
+            uri_index = self.uri_index_in_memory.get(dataset_name)
+            if uri_index is None or uri_index.num_rows != len(dataset):
+                uri_index = UriIndex(np.asarray(self._get_dataset_store(dataset_name).get_column('uri_hash')))
+                self.uri_index_in_memory[dataset_name] = uri_index
+            return uri_index
+
+    def _add_documents_to_dataset_in_memory(self, dataset_name, documents: Sequence[Document]):
+        """
+        Add the elements of the given documents to the dataset. The new elements are written to the dataset store as a
+        new segment, so the cost of this operation depends on the number of new elements rather than on the size of the
+        dataset.
+        """
+        with self.dataset_in_memory_lock:
+            existing_dataset = self._get_ds_in_memory(dataset_name) if self._dataset_exists(dataset_name) else None
+            text_elements = [element for document in documents for element in document.text_elements]
+            new_sentences_df = pd.DataFrame({field_name: [getattr(element, field_name) for element in text_elements]
+                                             for field_name in TextElement.get_field_names()})
+            new_text_hashes = hash_strings(new_sentences_df['text'].tolist())
+            duplicate_index = self._get_duplicate_index(dataset_name) if existing_dataset is not None \
+                else DuplicateIndex()
+            new_sentences_df['text_unique_id'] = duplicate_index.add(
+                new_sentences_df['text'].tolist(), new_text_hashes,
+                existing_dataset.text if existing_dataset is not None else np.empty(0, dtype=object))
+            documents_df = pd.DataFrame({'uri': [document.uri for document in documents],
+                                         'num_elements': [len(document.text_elements) for document in documents],
+                                         'metadata': [document.metadata for document in documents]})
+            new_uri_hashes = hash_strings(new_sentences_df['uri'].tolist())
+            uri_index = self._get_uri_index(dataset_name) if existing_dataset is not None \
+                else UriIndex(new_uri_hashes[:0])
+            store = self._get_dataset_store(dataset_name)
+            store.append(new_sentences_df, documents_df, {'uri_hash': new_uri_hashes, 'text_hash': new_text_hashes})
+            self.duplicate_index_in_memory[dataset_name] = duplicate_index
+            uri_index.extend(new_uri_hashes)
+            self.uri_index_in_memory[dataset_name] = uri_index
+
+            documents_in_memory = self._get_documents_in_memory(dataset_name) if existing_dataset is not None else {}
+            start = 0 if existing_dataset is None else len(existing_dataset)
+            for document in documents:
+                end = start + len(document.text_elements)
+                documents_in_memory[document.uri] = (start, end, document.metadata)
+                start = end
+            self.documents_in_memory[dataset_name] = documents_in_memory
+            # mapping the columns of the store does not read the existing elements, so the dataset is mapped again
+            # rather than extended in memory
+            self.ds_in_memory[dataset_name] = store.read_dataset()
+        if store.needs_compaction():
+            threading.Thread(target=self._compact_dataset_store, args=(dataset_name,), daemon=True).start()
+
+    def _compact_dataset_store(self, dataset_name):
+        try:
+            self._get_dataset_store(dataset_name).compact()
+        except Exception:
+            logging.exception(f"failed to compact the dataset store of dataset '{dataset_name}'")
+
+    def _migrate_dataset_csv_to_store(self, dataset_name) -> StoredDataset:
+        """
+        Datasets created by older versions are stored in a single csv file. The csv is parsed once, written to the
+        columnar DatasetStore and then removed.
+        :param dataset_name:
+        """
+        dataset_file_path = self._get_dataset_dump_filename(dataset_name)
+        logging.info(f"migrating dataset '{dataset_name}' from csv file {dataset_file_path} to the dataset store")
+        df = pd.read_csv(dataset_file_path, keep_default_na=False, converters=
+                         {"span": lambda span: [tuple(int(x) for x in span[2:-2].split(','))],
+                          "metadata": lambda metadata: ast.literal_eval(metadata) if metadata != '{}' else {}})
+        if 'text_unique_id' not in df.columns:
+            df = self._add_text_unique_ids(df)
+        store = self._get_dataset_store(dataset_name)
+        store.write(df, self._get_legacy_documents_df(dataset_name, df),
+                    {'uri_hash': hash_strings(df['uri'].tolist()), 'text_hash': hash_strings(df['text'].tolist())})
+        os.remove(dataset_file_path)
+        doc_dump_dir = self._get_documents_dump_dir(dataset_name)
+        if os.path.isdir(doc_dump_dir):
+            shutil.rmtree(doc_dump_dir)
+        logging.info(f"dataset '{dataset_name}' migrated successfully")
+        return store.read_dataset()
+
+    def _get_legacy_documents_df(self, dataset_name, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Build the documents table of a dataset stored in the legacy format. The elements of each document are in
+        consecutive rows of *df*; document metadata is read from the json file of each document in the doc_dump
+        directory, if it exists.
+        """
+        document_uris = df['uri'].map(get_document_uri)
+        is_new_document = document_uris.ne(document_uris.shift()).to_numpy()
+        uris = document_uris[is_new_document].tolist()
+        num_elements = np.diff(np.append(np.flatnonzero(is_new_document), len(df)))
+
+        doc_dump_dir = self._get_documents_dump_dir(dataset_name)
+        metadata = []
+        for uri in uris:
+            file_path = os.path.join(doc_dump_dir, utils.uri_to_filename(uri)) + '.json'
+            if os.path.isfile(file_path):
+                with open(file_path) as json_file:
+                    metadata.append(jsonpickle_decode(json_file.read()).metadata)
+            else:
+                metadata.append({})
+        return pd.DataFrame({'uri': uris, 'num_elements': num_elements, 'metadata': metadata})
 
     def _add_labels_info_for_text_elements(self, workspace_id, dataset_name, text_elements: List[TextElement],
                                            label_types) -> Union[List[LabeledTextElement],
@@ -623,58 +914,164 @@ class FileBasedDataAccess(DataAccessApi):
         return text_elements
 
     def _get_text_elements(self, workspace_id: str, dataset_name: str, filter_func, sample_size: int,
-                           sample_start_idx=0, remove_duplicates=False, random_state: int = 0) -> Mapping:
+                           sample_start_idx=0, remove_duplicates=False, random_state: int = 0,
+                           cursor: str = None, request_args: Sequence = ()) -> Mapping:
         """
         :param workspace_id: if None no labels info would be used or output
         :param dataset_name:
-        :param filter_func:
+        :param filter_func: a function that receives the StoredDataset and the workspace LabelIndex, and returns the
+        rows of the matching elements
         :param sample_size: number of elements to return. if None, return all elements without sampling
         :param sample_start_idx: get elements starting from this index (for pagination)
         :param remove_duplicates:
         :param random_state: provide an int seed to define a random state. Default is zero.
+        :param cursor: a cursor returned by a previous call, pointing to the next page of its results. The ordered
+        results of paginated calls are cached, so fetching a page using a cursor does not filter the dataset again.
+        If the cached results were evicted, they are computed again using *filter_func*.
+        :param request_args: the arguments that determine the results of *filter_func*. A cursor is bound to these
+        arguments (as well as to the workspace, dataset, remove_duplicates and random_state), and cannot be used with
+        other arguments.
         """
-        corpus_df = self._get_ds_in_memory(dataset_name)
+        dataset = self._get_ds_in_memory(dataset_name)
         if workspace_id:
             labels_dict = self._get_labels(workspace_id, dataset_name)
         else:
             labels_dict = {}
-        if self.is_multiclass(workspace_id):
-            labels_series = corpus_df['uri'].apply(lambda u: labels_dict[u] if u in labels_dict else None)
-        else:
-            labels_series = corpus_df['uri'].apply(lambda u: labels_dict[u] if u in labels_dict else {})
 
-        corpus_df = filter_func(corpus_df, labels_series)
+        request_hash = hash_request_args(workspace_id, dataset_name, remove_duplicates, random_state, *request_args)
+        cached_result = None
+        if cursor is not None:
+            result_id, sample_start_idx = decode_cursor(cursor, request_hash)
+            cached_result = self.result_cursors.get(dataset_name, result_id, request_hash)
+
+        if cached_result is None:
+            label_index = self._get_label_index(workspace_id, dataset_name) if workspace_id \
+                else LabelIndex(len(dataset), is_multiclass=False)
+            rows = np.asarray(filter_func(dataset, label_index), dtype=np.int64)
+            hit_count, hit_count_unique = len(rows), None
+            if remove_duplicates:
+                rows = self._get_first_rows_of_each_text(dataset, rows)
+                hit_count_unique = len(rows)
+            if sample_size is not None:
+                # this is the order in which DataFrame.sample() returns the rows for this random_state
+                rows = rows[self._get_permutation(random_state, len(rows))]
+            cached_result = CachedResult(dataset_name, rows, hit_count, hit_count_unique, request_hash)
+            result_id = None
+        else:
+            rows = cached_result.rows
 
-        results_dict = {'hit_count': len(corpus_df)}
+        results_dict = {'hit_count': cached_result.hit_count}
         if remove_duplicates:
-            unique_texts = set()
-            corpus_df = corpus_df.loc[
-                corpus_df['text'].apply(lambda x: x not in unique_texts and not unique_texts.add(x))]
-            results_dict['hit_count_unique'] = len(corpus_df)
+            results_dict['hit_count_unique'] = cached_result.hit_count_unique
 
+        next_cursor = None
         if sample_size is not None:
-            corpus_df = corpus_df.sample(n=min(sample_size + sample_start_idx, len(corpus_df)),
-                                         random_state=random_state
-                                         )[sample_start_idx:sample_start_idx + sample_size]
-
-        results_dict['results'] = utils.build_text_elements_from_dataframe_and_labels(
-            corpus_df,
+            page_end = min(sample_start_idx + sample_size, len(rows))
+            if page_end < len(rows):
+                if result_id is None:
+                    result_id = self.result_cursors.add(cached_result)
+                next_cursor = encode_cursor(result_id, page_end, request_hash)
+            rows = rows[sample_start_idx:page_end]
+        results_dict['next_cursor'] = next_cursor
+
+        results_dict['results'] = utils.build_text_elements_from_dataset_and_labels(
+            dataset, rows,
             labels_dict,
             is_multiclass=self.is_multiclass(workspace_id))
         return results_dict
 
+    @staticmethod
+    def _get_first_rows_of_each_text(dataset: StoredDataset, rows: np.ndarray) -> np.ndarray:
+        """
+        Keep the first of the given rows for each text. As *rows* may exclude the first occurrence of a text in the
+        dataset, this uses the unique text ids rather than the first occurrence mask of the DuplicateIndex.
+        """
+        _, first_positions = np.unique(dataset.text_unique_id[rows], return_index=True)
+        return rows[np.sort(first_positions)]
+
+    def _get_permutation(self, random_state: int, num_rows: int) -> np.ndarray:
+        """
+        Return a random permutation of *num_rows* positions for the given random_state. Recently used permutations are
+        kept in memory, as paging through the same results requires the same permutation.
+        """
+        with self.permutations_lock:
+            permutation = self.permutations_in_memory.get((random_state, num_rows))
+            if permutation is not None:
+                self.permutations_in_memory.move_to_end((random_state, num_rows))
+                return permutation
+        permutation = np.random.RandomState(random_state).permutation(num_rows)
+        with self.permutations_lock:
+            self.permutations_in_memory[(random_state, num_rows)] = permutation
+            while len(self.permutations_in_memory) > self.max_cached_permutations:
+                self.permutations_in_memory.popitem(last=False)
+        return permutation
+
     def _save_labels_data(self, dataset_name, workspace_id):
+        """
+        Save a snapshot of all the labels of the workspace, and clear the labels journal whose changes are now included
+        in the snapshot. The snapshot is written to a temporary file which then replaces the previous snapshot, so a
+        failure during the write does not leave a partially written snapshot.
+        """
         file_path = self._get_workspace_labels_dump_filename(workspace_id, dataset_name)
         os.makedirs(Path(file_path).parent, exist_ok=True)
         labels = self.labels_in_memory[workspace_id][dataset_name]
-        if self.is_multiclass(workspace_id):
-            simplified_labels = {uri: label.to_dict() for uri, label in labels.items()}
-        else:
-            simplified_labels = {uri: {str(category_id): label.to_dict() for category_id, label in uri_labels.items()}
-                                 for uri, uri_labels in labels.items()}
+        is_multiclass = self.is_multiclass(workspace_id)
+        simplified_labels = {uri: self._encode_uri_labels(uri_labels, is_multiclass)
+                             for uri, uri_labels in labels.items()}
         labels_in_memory_encoded = json.dumps(simplified_labels)
-        with open(file_path, 'w') as f:
+        with open(file_path + '.tmp', 'w') as f:
             f.write(labels_in_memory_encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(file_path + '.tmp', file_path)
+        self._get_labels_journal(workspace_id, dataset_name).clear()
+
+    def _append_to_labels_journal(self, workspace_id, dataset_name, uris: Sequence[str]):
+        """
+        Record the current labels of the given uris in the labels journal. Once the journal holds more records than
+        the number of labeled uris (and at least *min_label_journal_records_to_compact*), it is compacted into the labels
+        snapshot in the background, so the amortized cost of saving a label change does not depend on the total number
+        of labels. This method is called while holding the workspace lock.
+        """
+        labels = self.labels_in_memory[workspace_id][dataset_name]
+        is_multiclass = self.is_multiclass(workspace_id)
+        journal = self._get_labels_journal(workspace_id, dataset_name)
+        journal.append((uri, self._encode_uri_labels(labels[uri], is_multiclass) if uri in labels else None)
+                       for uri in uris)
+        if self._should_compact_labels_journal(workspace_id, dataset_name) \
+                and (workspace_id, dataset_name) not in self.labels_journal_compactions_pending:
+            # a single compaction is started until it runs, regardless of the label changes made in the meantime
+            self.labels_journal_compactions_pending.add((workspace_id, dataset_name))
+            threading.Thread(target=self._compact_labels_journal, args=(workspace_id, dataset_name),
+                             daemon=True).start()
+
+    def _should_compact_labels_journal(self, workspace_id, dataset_name) -> bool:
+        num_labels = len(self.labels_in_memory[workspace_id][dataset_name])
+        return self._get_labels_journal(workspace_id, dataset_name).get_num_records() > \
+            max(self.min_label_journal_records_to_compact, num_labels)
+
+    def _compact_labels_journal(self, workspace_id, dataset_name):
+        with self._get_lock_object_for_workspace(workspace_id):
+            self.labels_journal_compactions_pending.discard((workspace_id, dataset_name))
+            try:
+                # the journal is checked again, as it may have been compacted since the compaction was requested
+                if workspace_id in self.labels_in_memory and dataset_name in self.labels_in_memory[workspace_id] \
+                        and self._should_compact_labels_journal(workspace_id, dataset_name):
+                    self._save_labels_data(dataset_name, workspace_id)
+            except Exception:
+                logging.exception(f"failed to compact the labels journal of workspace '{workspace_id}'")
+
+    @staticmethod
+    def _encode_uri_labels(uri_labels: Union[Mapping[int, Label], MulticlassLabel], is_multiclass) -> Mapping:
+        if is_multiclass:
+            return uri_labels.to_dict()
+        return {str(category_id): label.to_dict() for category_id, label in uri_labels.items()}
+
+    @staticmethod
+    def _decode_uri_labels(simplified_labels: Mapping, is_multiclass) -> Union[Mapping[int, Label], MulticlassLabel]:
+        if is_multiclass:
+            return MulticlassLabel(**simplified_labels)
+        return {int(category_id): Label(**label_dict) for category_id, label_dict in simplified_labels.items()}
 
     def is_multiclass(self, workspace_id):
         return os.path.isfile(os.path.join(self._get_workspace_labels_dir(workspace_id),
@@ -684,21 +1081,37 @@ class FileBasedDataAccess(DataAccessApi):
     def _add_text_unique_ids(df):
         """
         To facilitate extraction of duplicate elements, i.e. text elements that have the same text, we assign an id to
-        each unique text in the dataframe. Whenever new documents are added to the corpus, these ids are recalculated.
+        each unique text in the dataframe, in the order in which the texts first appear. Ids for elements added later
+        on are assigned by the DuplicateIndex of the dataset.
         """
-        unique_to_id = {}
-        df['text_unique_id'] = df['text'].apply(
-            lambda x: len(unique_to_id) - 1 if x not in unique_to_id and not unique_to_id.update({x: len(unique_to_id)})
-            else unique_to_id[x])
+        df['text_unique_id'] = pd.factorize(df['text'])[0]
         return df
 
-    def _get_uris_with_the_same_text(self, dataset_name, uri):
-        ds_in_memory = self._get_ds_in_memory(dataset_name)
-        text_unique_id = ds_in_memory[ds_in_memory['uri'] == uri]['text_unique_id'].values[0]
-        return ds_in_memory[ds_in_memory['text_unique_id'] == text_unique_id]['uri']
+    def _get_duplicate_index(self, dataset_name) -> DuplicateIndex:
+        """
+        Return the DuplicateIndex of the given dataset, building it from the text hashes and unique text ids kept in
+        the dataset store if needed
+        """
+        with self.dataset_in_memory_lock:
+            dataset = self._get_ds_in_memory(dataset_name)
+            duplicate_index = self.duplicate_index_in_memory.get(dataset_name)
+            if duplicate_index is None or duplicate_index.num_rows != len(dataset):
+                store = self._get_dataset_store(dataset_name)
+                duplicate_index = DuplicateIndex.from_columns(np.asarray(store.get_column('text_hash')),
+                                                              np.asarray(store.get_column('text_unique_id')))
+                self.duplicate_index_in_memory[dataset_name] = duplicate_index
+            return duplicate_index
+
+    def _get_uris_with_the_same_text(self, dataset_name, uri) -> List[str]:
+        with self.dataset_in_memory_lock:
+            dataset = self._get_ds_in_memory(dataset_name)
+            duplicate_index = self._get_duplicate_index(dataset_name)
+        row = self._get_rows_by_uris(dataset_name, [uri])[0]
+        return dataset.uri.take(duplicate_index.get_rows_with_the_same_text(row))
 
     def _dataset_exists(self, dataset_name):
-        return os.path.exists(self._get_dataset_dump_filename(dataset_name))
+        return self._get_dataset_store(dataset_name).exists() \
+            or os.path.exists(self._get_dataset_dump_filename(dataset_name))
 
     def _get_dataset_base_dir(self, dataset_name):
         return os.path.join(self._get_datasets_base_dir(), dataset_name)
@@ -709,15 +1122,23 @@ class FileBasedDataAccess(DataAccessApi):
         return data_access_dumps_path
 
     def _get_documents_dump_dir(self, dataset_name):
+        # legacy format, only read when migrating a dataset to the DatasetStore
         return os.path.join(self._get_dataset_base_dir(dataset_name), self.doc_dir_name)
 
     def _get_dataset_dump_filename(self, dataset_name):
         return os.path.join(self._get_dataset_base_dir(dataset_name), self.sentences_filename)
 
+    def _get_dataset_store(self, dataset_name) -> DatasetStore:
+        return DatasetStore(os.path.join(self._get_dataset_base_dir(dataset_name), self.store_dir_name))
+
     def _get_workspace_labels_dump_filename(self, workspace_id, dataset_name):
         workspace_dir = self._get_workspace_labels_dir(workspace_id)
         return os.path.join(workspace_dir, str(dataset_name) + '_' + self.labels_filename)
 
+    def _get_labels_journal(self, workspace_id, dataset_name) -> LabelJournal:
+        workspace_dir = self._get_workspace_labels_dir(workspace_id)
+        return LabelJournal(os.path.join(workspace_dir, str(dataset_name) + '_' + self.labels_journal_filename))
+
     def _get_workspace_labels_dir(self, workspace_id):
         return os.path.join(self.output_dir, 'user_labels', str(workspace_id))
 
@@ -735,6 +1156,7 @@ class FileBasedDataAccess(DataAccessApi):
         file_path = self._get_workspace_labels_dump_filename(workspace_id, dataset_name)
         os.makedirs(Path(file_path).parent, exist_ok=True)
         empty_dict_encoded = json.dumps({})
+        self._get_labels_journal(workspace_id, dataset_name).clear()
         open(os.path.join(self._get_workspace_labels_dir(workspace_id), workspace_model_type.name), 'w').close()
         with open(file_path, 'w') as f:
             f.write(empty_dict_encoded)
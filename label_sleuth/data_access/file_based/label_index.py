@@ -0,0 +1,125 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import logging
+
+from typing import Dict, Mapping, Optional, Set, Union
+
+import numpy as np
+
+from label_sleuth.data_access.core.data_structs import Label, LabelType, MulticlassLabel
+from label_sleuth.data_access.file_based.uri_index import NOT_FOUND
+
+NO_LABEL = -1
+
+
+class LabelIndex:
+    """
+    The labels of a workspace for a given dataset, stored as NumPy arrays that are aligned with the row positions of
+    the dataset DataFrame. This allows filtering the dataset by label status or label value using boolean masks,
+    rather than looking up the labels of each row separately.
+
+    For each category, *category_to_labels* holds the label value of every row (0/1 for binary workspaces, the class
+    id for multiclass workspaces), or NO_LABEL if the row is not labeled; *category_to_label_types* holds the
+    LabelType value of each label. Multiclass workspaces use a single pair of arrays, stored under the category None.
+    """
+
+    def __init__(self, num_rows: int, is_multiclass: bool):
+        self.num_rows = num_rows
+        self.is_multiclass = is_multiclass
+        self.category_to_labels: Dict[Optional[int], np.ndarray] = {}
+        self.category_to_label_types: Dict[Optional[int], np.ndarray] = {}
+
+    @classmethod
+    def from_labels(cls, labels_dict: Mapping, uri_to_row: Mapping[str, int], num_rows: int, is_multiclass: bool):
+        """
+        Build the index from a dict of uri -> labels (as stored in FileBasedDataAccess.labels_in_memory)
+        :param labels_dict:
+        :param uri_to_row: maps each uri in labels_dict to its row position in the dataset, or to NOT_FOUND if it is
+        not in the dataset
+        :param num_rows: number of rows in the dataset
+        :param is_multiclass:
+        """
+        index = cls(num_rows, is_multiclass)
+        missing_uris = []
+        for uri, labels_info in labels_dict.items():
+            row = uri_to_row.get(uri, NOT_FOUND)
+            if row == NOT_FOUND:
+                missing_uris.append(uri)
+                continue
+            index.update_row(row, labels_info)
+        if len(missing_uris) > 0:
+            logging.warning(f"ignoring the labels of {len(missing_uris)} uris that are not in the dataset, e.g. "
+                            f"'{missing_uris[0]}'")
+        return index
+
+    def extend(self, num_rows: int):
+        """
+        Add unlabeled rows to the end of the index, following the addition of new elements to the dataset
+        :param num_rows: the new number of rows in the dataset
+        """
+        num_added = num_rows - self.num_rows
+        for category_id in self.category_to_labels:
+            self.category_to_labels[category_id] = np.concatenate(
+                [self.category_to_labels[category_id], np.full(num_added, NO_LABEL, dtype=np.int64)])
+            self.category_to_label_types[category_id] = np.concatenate(
+                [self.category_to_label_types[category_id], np.full(num_added, NO_LABEL, dtype=np.int8)])
+        self.num_rows = num_rows
+
+    def update_row(self, row: int, labels_info: Union[None, Mapping[int, Label], MulticlassLabel]):
+        """
+        Replace the label information of a single row
+        :param row: row position in the dataset
+        :param labels_info: a dict of category_id -> Label for binary workspaces, a MulticlassLabel for multiclass
+        workspaces, or None if the row has no labels
+        """
+        for category_id in self.category_to_labels:
+            self.category_to_labels[category_id][row] = NO_LABEL
+            self.category_to_label_types[category_id][row] = NO_LABEL
+        if labels_info is None:
+            return
+        category_to_label = {None: labels_info} if self.is_multiclass else labels_info
+        for category_id, label in category_to_label.items():
+            labels, label_types = self._get_arrays(category_id, create=True)
+            labels[row] = int(label.label)
+            label_types[row] = label.label_type.value
+
+    def get_labeled_mask(self, category_id: Optional[int], label_types: Optional[Set[LabelType]] = None) \
+            -> np.ndarray:
+        """
+        :return: a boolean mask of the rows labeled for *category_id*, optionally limited to the given label types
+        """
+        labels, types = self._get_arrays(category_id)
+        mask = labels != NO_LABEL
+        if label_types is not None:
+            mask &= np.isin(types, [label_type.value for label_type in label_types])
+        return mask
+
+    def get_label_value_mask(self, category_id: Optional[int], value: Union[bool, int]) -> np.ndarray:
+        """
+        :return: a boolean mask of the rows whose label for *category_id* equals *value*
+        """
+        labels, _ = self._get_arrays(category_id)
+        return labels == int(value)
+
+    def _get_arrays(self, category_id, create=False):
+        if category_id not in self.category_to_labels:
+            labels = np.full(self.num_rows, NO_LABEL, dtype=np.int64)
+            label_types = np.full(self.num_rows, NO_LABEL, dtype=np.int8)
+            if not create:
+                return labels, label_types
+            self.category_to_labels[category_id] = labels
+            self.category_to_label_types[category_id] = label_types
+        return self.category_to_labels[category_id], self.category_to_label_types[category_id]
@@ -0,0 +1,93 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+import ujson as json
+
+
+class LabelJournal:
+    """
+    An append-only log of label changes, kept alongside the labels snapshot file of a workspace. Each record holds a
+    uri and the full label information of this uri following the change (or None if the uri no longer has labels), so
+    replaying the records on top of the snapshot restores the current labels, and replaying a record more than once
+    has no effect.
+
+    Records are written as json lines, and each append is flushed and synced to disk before returning.
+    """
+    record_counts = {}
+    locks = defaultdict(threading.RLock)
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = self.locks[os.path.abspath(path)]
+
+    def append(self, records: Iterable[Tuple[str, Optional[Mapping]]]):
+        """
+        :param records: tuples of (uri, label information of the uri, or None if the uri has no labels)
+        """
+        lines = [json.dumps([uri, labels_info]) + '\n' for uri, labels_info in records]
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self.record_counts[self.path] = self.get_num_records() + len(lines)
+
+    def read(self) -> List[Tuple[str, Optional[Mapping]]]:
+        """
+        Return the records in the journal, in the order in which they were appended
+        """
+        with self.lock:
+            if not os.path.isfile(self.path):
+                self.record_counts[self.path] = 0
+                return []
+            with open(self.path) as f:
+                lines = f.read().splitlines()
+            records = []
+            for line_idx, line in enumerate(lines):
+                try:
+                    uri, labels_info = json.loads(line)
+                except ValueError:
+                    if line_idx != len(lines) - 1:
+                        raise
+                    # the last record may be partially written if the process stopped while appending it. It is
+                    # removed, so that records appended later on are not written on the same line.
+                    logging.warning(f"removing a partially written record at the end of label journal {self.path}")
+                    with open(self.path + '.tmp', 'w') as f:
+                        f.write(''.join(line + '\n' for line in lines[:line_idx]))
+                    os.replace(self.path + '.tmp', self.path)
+                    break
+                records.append((uri, labels_info))
+            self.record_counts[self.path] = len(records)
+            return records
+
+    def get_num_records(self) -> int:
+        if self.path not in self.record_counts:
+            self.read()
+        return self.record_counts[self.path]
+
+    def clear(self):
+        """
+        Remove all records from the journal, once they are included in the labels snapshot
+        """
+        with self.lock:
+            if os.path.isfile(self.path):
+                os.remove(self.path)
+            self.record_counts[self.path] = 0
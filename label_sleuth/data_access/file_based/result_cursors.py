@@ -0,0 +1,113 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import base64
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import xxhash
+
+
+class InvalidCursorException(Exception):
+    def __init__(self, message):
+        self.message = message
+
+
+@dataclass
+class CachedResult:
+    dataset_name: str
+    rows: np.ndarray
+    hit_count: int
+    hit_count_unique: Optional[int]
+    request_hash: str = ''
+
+
+def hash_request_args(*args) -> str:
+    """
+    Return a hash of the arguments of a paginated request, which is kept in the cursors of its results so that a cursor
+    cannot be used with different arguments. Sets are hashed as sorted lists, as their iteration order may differ
+    between processes.
+    """
+    normalized_args = [sorted(str(value) for value in arg) if isinstance(arg, (set, frozenset)) else arg
+                       for arg in args]
+    return xxhash.xxh64_hexdigest(repr(normalized_args).encode('utf-8'))
+
+
+def encode_cursor(result_id: str, offset: int, request_hash: str) -> str:
+    return base64.urlsafe_b64encode(f'{result_id}:{offset}:{request_hash}'.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str, request_hash: str) -> Tuple[str, int]:
+    """
+    :param cursor:
+    :param request_hash: the hash of the arguments of the request in which the cursor is used
+    :return: the id of the cached result and the position of the next page in this result
+    :raises InvalidCursorException: if the cursor is malformed or was returned for a request with other arguments
+    """
+    try:
+        result_id, offset, cursor_request_hash = \
+            base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':')
+        offset = int(offset)
+    except ValueError:
+        raise InvalidCursorException(f'Invalid cursor "{cursor}"')
+    if cursor_request_hash != request_hash:
+        raise InvalidCursorException(f'Cursor "{cursor}" was returned for a request with different arguments')
+    return result_id, offset
+
+
+class ResultCursorCache:
+    """
+    Keeps the ordered row positions of recent paginated results, so following pages of a result can be fetched using a
+    cursor, without filtering and ordering the dataset again. The least recently used results are evicted once more
+    than *max_results* are kept.
+    """
+
+    def __init__(self, max_results: int):
+        self.max_results = max_results
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, result: CachedResult) -> str:
+        """
+        :return: the id of the cached result
+        """
+        result_id = uuid.uuid4().hex
+        with self.lock:
+            self.results[result_id] = result
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+        return result_id
+
+    def get(self, dataset_name, result_id, request_hash) -> Optional[CachedResult]:
+        """
+        :return: the cached result, or None if it was evicted or does not belong to *dataset_name* and the request
+        arguments hashed to *request_hash*
+        """
+        with self.lock:
+            result = self.results.get(result_id)
+            if result is None or result.dataset_name != dataset_name or result.request_hash != request_hash:
+                return None
+            self.results.move_to_end(result_id)
+            return result
+
+    def discard_dataset(self, dataset_name):
+        with self.lock:
+            for result_id in [result_id for result_id, result in self.results.items()
+                              if result.dataset_name == dataset_name]:
+                del self.results[result_id]
@@ -0,0 +1,62 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+class SortedRuns:
+    """
+    A multiset of (key, row) pairs, sorted by key, that supports adding pairs without copying the existing ones.
+
+    The pairs are kept as a few sorted runs. Each batch of added pairs becomes a new run, and the last two runs are
+    merged for as long as the last run is at least as large as the run before it. Thus, each pair is merged O(log N)
+    times and there are O(log N) runs to search, whereas inserting into a single sorted array copies all N pairs on
+    every batch.
+    """
+
+    def __init__(self, key_dtype):
+        self.key_dtype = key_dtype
+        self.runs: List[Tuple[np.ndarray, np.ndarray]] = []
+
+    def __len__(self):
+        return sum(len(keys) for keys, _ in self.runs)
+
+    def add(self, keys: np.ndarray, rows: np.ndarray):
+        """
+        Add pairs whose rows are larger than the rows of all the existing pairs
+        :param keys:
+        :param rows:
+        """
+        if len(keys) == 0:
+            return
+        order = np.argsort(keys, kind='stable')
+        self.runs.append((np.asarray(keys, dtype=self.key_dtype)[order], np.asarray(rows, dtype=np.int64)[order]))
+        while len(self.runs) > 1 and len(self.runs[-1][0]) >= len(self.runs[-2][0]):
+            (previous_keys, previous_rows), (last_keys, last_rows) = self.runs[-2:]
+            keys = np.concatenate([previous_keys, last_keys])
+            # a stable sort keeps the pairs of the previous run, whose rows are smaller, first among equal keys
+            order = np.argsort(keys, kind='stable')
+            self.runs[-2:] = [(keys[order], np.concatenate([previous_rows, last_rows])[order])]
+
+    def get_rows(self, key) -> np.ndarray:
+        """
+        :return: the rows of the pairs with the given key, in ascending order
+        """
+        rows = [sorted_rows[np.searchsorted(sorted_keys, key, side='left'):
+                            np.searchsorted(sorted_keys, key, side='right')]
+                for sorted_keys, sorted_rows in self.runs]
+        return np.sort(np.concatenate(rows)) if len(rows) > 0 else np.empty(0, dtype=np.int64)
@@ -0,0 +1,125 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import ujson as json
+
+from label_sleuth.data_access.file_based.dataset_store import DatasetStore, MANIFEST_FILENAME
+from label_sleuth.data_access.file_based.uri_index import hash_strings
+
+
+def generate_elements_df(first_idx, num_elements):
+    return pd.DataFrame({'uri': [f'dataset-doc-{i}' for i in range(first_idx, first_idx + num_elements)],
+                         'text': [f'text {i % 3} ✓' for i in range(first_idx, first_idx + num_elements)],
+                         'span': [[(i, i + 5)] for i in range(first_idx, first_idx + num_elements)],
+                         'metadata': [{'page': i} if i % 2 == 0 else {'subject': 'abc'}
+                                      for i in range(first_idx, first_idx + num_elements)],
+                         'text_unique_id': [i % 3 for i in range(first_idx, first_idx + num_elements)]})
+
+
+def generate_index_columns(df):
+    return {'uri_hash': hash_strings(df['uri'].tolist())}
+
+
+def read_elements_df(store):
+    dataset = store.read_dataset()
+    df = pd.DataFrame(dataset.get_text_element_fields(np.arange(len(dataset))))
+    df['text_unique_id'] = np.asarray(dataset.text_unique_id)
+    return df
+
+
+def generate_documents_df(first_idx, num_elements):
+    return pd.DataFrame({'uri': [f'dataset-doc_{first_idx}'], 'num_elements': [num_elements],
+                         'metadata': [{'source': first_idx}]})
+
+
+class TestDatasetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = DatasetStore(os.path.join(self.temp_dir.name, 'dataset_store'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write_and_read(self):
+        df = generate_elements_df(0, 10)
+        self.store.write(df, generate_documents_df(0, 10), generate_index_columns(df))
+        self.assertTrue(self.store.exists())
+        self.assertEqual(10, self.store.get_num_rows())
+        pd.testing.assert_frame_equal(df, read_elements_df(self.store))
+        self.assertListEqual(df['text_unique_id'].tolist(), self.store.get_column('text_unique_id').tolist())
+
+    def test_append_adds_segments(self):
+        dfs = [generate_elements_df(i * 5, 5) for i in range(4)]
+        for i, df in enumerate(dfs):
+            self.store.append(df, generate_documents_df(i * 5, 5), generate_index_columns(df))
+        self.assertEqual(4, self.store.get_num_segments())
+        pd.testing.assert_frame_equal(pd.concat(dfs, ignore_index=True), read_elements_df(self.store))
+        documents_df = self.store.read_documents()
+        self.assertListEqual([0, 5, 10, 15], documents_df['start'].tolist())
+        self.assertListEqual([5, 10, 15, 20], documents_df['end'].tolist())
+        self.assertListEqual([{'source': i * 5} for i in range(4)], documents_df['metadata'].tolist())
+
+    def test_compact(self):
+        dfs = [generate_elements_df(i * 5, 5) for i in range(DatasetStore.MAX_SEGMENTS + 1)]
+        for i, df in enumerate(dfs):
+            self.store.append(df, generate_documents_df(i * 5, 5), generate_index_columns(df))
+        self.assertTrue(self.store.needs_compaction())
+        self.store.compact()
+        self.assertEqual(1, self.store.get_num_segments())
+        self.assertFalse(self.store.needs_compaction())
+        pd.testing.assert_frame_equal(pd.concat(dfs, ignore_index=True), read_elements_df(self.store))
+        self.assertListEqual(hash_strings(pd.concat(dfs)['uri'].tolist()).tolist(),
+                             self.store.get_column('uri_hash').tolist())
+        self.assertListEqual([f'dataset-doc_{i * 5}' for i in range(len(dfs))],
+                             self.store.read_documents()['uri'].tolist())
+        # only the merged segment is left on disk
+        self.assertEqual(1, len([name for name in os.listdir(self.store.store_dir) if name.startswith('segment_')]))
+
+
+    def test_read_dataset_builds_only_the_requested_rows(self):
+        dfs = [generate_elements_df(i * 5, 5) for i in range(3)]
+        for i, df in enumerate(dfs):
+            self.store.append(df, generate_documents_df(i * 5, 5), generate_index_columns(df))
+        dataset = self.store.read_dataset()
+        self.assertEqual(15, len(dataset))
+        rows = [12, 3, 7]
+        expected_df = pd.concat(dfs, ignore_index=True).iloc[rows]
+        self.assertListEqual(expected_df['text'].tolist(), dataset.text.take(rows))
+        self.assertListEqual(expected_df['uri'].tolist()[1:2], [dataset.uri[3]])
+        self.assertListEqual(expected_df[['uri', 'text', 'span', 'metadata']].to_dict('records'),
+                             dataset.get_text_element_fields(rows))
+
+    def test_store_with_another_format_version_is_rejected(self):
+        df = generate_elements_df(0, 5)
+        self.store.write(df, generate_documents_df(0, 5), generate_index_columns(df))
+        manifest_path = os.path.join(self.store.store_dir, MANIFEST_FILENAME)
+        with open(manifest_path) as f:
+            manifest = json.loads(f.read())
+        manifest['format_version'] = 1
+        with open(manifest_path, 'w') as f:
+            f.write(json.dumps(manifest))
+        with self.assertRaises(Exception):
+            self.store.read_dataset()
+
+
+if __name__ == "__main__":
+    unittest.main()
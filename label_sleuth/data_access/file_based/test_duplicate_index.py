@@ -0,0 +1,53 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import unittest
+
+import numpy as np
+
+from label_sleuth.data_access.file_based.duplicate_index import DuplicateIndex
+from label_sleuth.data_access.file_based.uri_index import hash_strings
+
+
+class TestDuplicateIndex(unittest.TestCase):
+
+    def test_add_and_rebuild(self):
+        texts = ['a', 'b', 'a', 'c']
+        new_texts = ['c', 'd', 'd', 'a']
+        duplicate_index = DuplicateIndex()
+        self.assertListEqual([0, 1, 0, 2], duplicate_index.add(texts, hash_strings(texts),
+                                                               np.empty(0, dtype=object)).tolist())
+        self.assertListEqual([2, 3, 3, 0], duplicate_index.add(new_texts, hash_strings(new_texts),
+                                                               np.array(texts, dtype=object)).tolist())
+        self.assertListEqual([True, True, False, True, False, True, False, False],
+                             duplicate_index.first_occurrence_mask.tolist())
+        self.assertListEqual([0, 2, 7], duplicate_index.get_rows_with_the_same_text(2).tolist())
+
+        rebuilt_index = DuplicateIndex.from_columns(hash_strings(texts + new_texts), duplicate_index.group_ids)
+        self.assertListEqual(duplicate_index.first_occurrence_mask.tolist(),
+                             rebuilt_index.first_occurrence_mask.tolist())
+        self.assertListEqual([3, 4], rebuilt_index.get_rows_with_the_same_text(4).tolist())
+        self.assertListEqual([4], rebuilt_index.add(['e'], hash_strings(['e']),
+                                                    np.array(texts + new_texts, dtype=object)).tolist())
+
+    def test_hash_collisions_are_resolved_by_text(self):
+        duplicate_index = DuplicateIndex()
+        colliding_hashes = np.zeros(3, dtype=np.uint64)
+        self.assertListEqual([0, 1, 0], duplicate_index.add(['a', 'b', 'a'], colliding_hashes,
+                                                            np.empty(0, dtype=object)).tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import unittest
+
+from label_sleuth.data_access.core.data_structs import Label, LABEL_NEGATIVE, LABEL_POSITIVE
+from label_sleuth.data_access.file_based.label_index import LabelIndex, NO_LABEL
+from label_sleuth.data_access.file_based.uri_index import NOT_FOUND
+
+
+class TestLabelIndex(unittest.TestCase):
+
+    def test_labels_of_uris_that_are_not_in_the_dataset_are_ignored(self):
+        labels_dict = {'uri-0': {0: Label(label=LABEL_POSITIVE)}, 'stale-uri': {0: Label(label=LABEL_NEGATIVE)},
+                       'uri-1': {0: Label(label=LABEL_NEGATIVE)}}
+        uri_to_row = {'uri-0': 0, 'stale-uri': NOT_FOUND, 'uri-1': 1}
+        index = LabelIndex.from_labels(labels_dict, uri_to_row, num_rows=3, is_multiclass=False)
+        self.assertListEqual([1, 0, NO_LABEL], index.category_to_labels[0].tolist())
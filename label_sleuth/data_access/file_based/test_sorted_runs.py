@@ -0,0 +1,40 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import unittest
+
+import numpy as np
+
+from label_sleuth.data_access.file_based.sorted_runs import SortedRuns
+
+
+class TestSortedRuns(unittest.TestCase):
+
+    def test_runs_are_merged_as_batches_are_added(self):
+        sorted_runs = SortedRuns(np.int64)
+        keys = np.random.RandomState(0).randint(0, 20, size=100)
+        for start in range(0, 100, 10):
+            sorted_runs.add(keys[start:start + 10], np.arange(start, start + 10))
+            # the sizes of the runs decrease, so there are at most log2(N) + 1 runs
+            run_sizes = [len(run_keys) for run_keys, _ in sorted_runs.runs]
+            self.assertListEqual(sorted(run_sizes, reverse=True), run_sizes)
+            self.assertTrue(all(np.all(np.diff(run_keys) >= 0) for run_keys, _ in sorted_runs.runs))
+        self.assertEqual(100, len(sorted_runs))
+        for key in range(21):
+            self.assertListEqual(np.flatnonzero(keys == key).tolist(), sorted_runs.get_rows(key).tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
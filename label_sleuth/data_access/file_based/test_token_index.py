@@ -0,0 +1,46 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from label_sleuth.data_access.file_based.token_index import TokenIndex
+
+
+class TestTokenIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.texts = ['Hello world', 'the world is round', 'HELLO, Othello!', '', 'straße', 'say hello_world']
+        self.token_index = TokenIndex.build(self.texts)
+
+    def test_candidate_rows_include_all_matches(self):
+        texts = pd.Series(self.texts)
+        for query in ['hello', 'ELLO', 'lo wor', 'world is', 'o, oth', 'o_w', 'STRASSE', 'xyz']:
+            expected_rows = np.flatnonzero(texts.str.contains(query, case=False, regex=False)).tolist()
+            candidate_rows = self.token_index.get_candidate_rows(query).tolist()
+            self.assertTrue(set(expected_rows).issubset(candidate_rows), query)
+
+    def test_complete_tokens_are_matched_exactly(self):
+        self.assertListEqual([1], self.token_index.get_candidate_rows(' world is ').tolist())
+        self.assertListEqual([0, 2, 5], self.token_index.get_candidate_rows('hello').tolist())
+
+    def test_query_without_tokens(self):
+        self.assertIsNone(self.token_index.get_candidate_rows(', '))
+
+
+if __name__ == "__main__":
+    unittest.main()
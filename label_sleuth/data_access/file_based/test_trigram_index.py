@@ -0,0 +1,53 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import re
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from label_sleuth.data_access.file_based.trigram_index import TrigramIndex
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.texts = ['Hello world', 'the world is round', 'HELLO, Othello!', '', 'straße', 'say hello_world']
+        self.trigram_index = TrigramIndex.build(self.texts)
+
+    def test_candidate_rows_include_all_matches(self):
+        texts = pd.Series(self.texts)
+        for regex in [r'hello', r'^Hello world$', r'wor(ld|m)', r'(?:say|the) \w+', r'straße|round', r'l+o',
+                      r'(?i)hello', r'Oth(?i:ELLO)', r'x{0}orl']:
+            expected_rows = np.flatnonzero(texts.str.contains(regex, regex=True)).tolist()
+            candidate_rows = self.trigram_index.get_candidate_rows(regex)
+            if candidate_rows is not None:
+                self.assertTrue(set(expected_rows).issubset(candidate_rows.tolist()), regex)
+
+    def test_required_literals_narrow_the_candidates(self):
+        self.assertListEqual([1], self.trigram_index.get_candidate_rows(r'^the \w+ is').tolist())
+        self.assertListEqual([0, 1, 5], self.trigram_index.get_candidate_rows(r'world$').tolist())
+        regex = '|'.join(f'^{re.escape(text)}$' for text in ['Hello world', 'HELLO, Othello!'])
+        self.assertListEqual([0, 2], self.trigram_index.get_candidate_rows(regex).tolist())
+
+    def test_regex_without_literals(self):
+        self.assertIsNone(self.trigram_index.get_candidate_rows(r'[a-z]+'))
+        self.assertIsNone(self.trigram_index.get_candidate_rows(r'(?i)hello'))
+        self.assertIsNone(self.trigram_index.get_candidate_rows(r'hello|ab'))
+
+
+if __name__ == "__main__":
+    unittest.main()
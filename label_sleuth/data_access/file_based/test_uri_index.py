@@ -0,0 +1,40 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import unittest
+
+import numpy as np
+
+from label_sleuth.data_access.file_based.uri_index import NOT_FOUND, UriIndex, hash_strings
+
+
+class TestUriIndex(unittest.TestCase):
+
+    def test_get_rows(self):
+        uris = np.array([f'dataset-doc-{i}' for i in range(100)], dtype=object)
+        uri_index = UriIndex(hash_strings(uris[:60]))
+        uri_index.extend(hash_strings(uris[60:]))
+        self.assertEqual(100, uri_index.num_rows)
+        self.assertListEqual([99, 0, 42, NOT_FOUND], uri_index.get_rows(
+            ['dataset-doc-99', 'dataset-doc-0', 'dataset-doc-42', 'dataset-doc-100'], uris).tolist())
+
+    def test_hash_collisions_are_resolved_by_uri(self):
+        uris = np.array(['a', 'b', 'c'], dtype=object)
+        # all rows share the hash of 'b', so the row of 'b' is told apart by comparing the uris themselves
+        uri_index = UriIndex(np.repeat(hash_strings(['b']), 3))
+        self.assertListEqual([1], uri_index.get_rows(['b'], uris).tolist())
+
+if __name__ == "__main__":
+    unittest.main()
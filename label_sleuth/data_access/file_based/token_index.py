@@ -0,0 +1,102 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import re
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize_text(text: str) -> str:
+    # case-insensitive search in pandas (str.contains with case=False and regex=False) compares upper-cased strings,
+    # so texts and queries are normalized in the same way
+    return text.upper()
+
+
+class TokenIndex:
+    """
+    An inverted index from the word tokens of a set of texts to the rows in which they appear.
+
+    The vocabulary is kept sorted, and the rows of the i-th token are stored in postings[offsets[i]:offsets[i+1]], in
+    ascending order. Texts and queries are upper-cased before tokenization, so the index supports the case-insensitive
+    substring queries of the search: a row can only match a query if it contains every complete token of the query,
+    a token ending with the first token of the query and a token starting with its last token (or, for a single-token
+    query, a token containing it). The rows returned by get_candidate_rows() should therefore be verified against the
+    query, but no row outside of them can match it.
+    """
+
+    def __init__(self, vocabulary: Sequence[str], offsets: np.ndarray, postings: np.ndarray):
+        self.vocabulary = np.array(vocabulary, dtype=object)
+        self.offsets = offsets
+        self.postings = postings
+        self._vocabulary_series = None
+
+    @classmethod
+    def build(cls, texts: Sequence[str]):
+        """
+        :param texts: the text in each row
+        """
+        tokens = pd.Series(texts, dtype=object).map(normalize_text).str.findall(TOKEN_PATTERN).explode().dropna()
+        token_rows = pd.DataFrame({'token': tokens.values, 'row': tokens.index.to_numpy(dtype=np.int32)})
+        token_rows = token_rows.drop_duplicates().sort_values(['token', 'row'], kind='stable')
+        vocabulary, first_positions = np.unique(token_rows['token'].to_numpy(dtype=object), return_index=True)
+        offsets = np.append(first_positions, len(token_rows)).astype(np.int64)
+        return cls(vocabulary.tolist(), offsets, token_rows['row'].to_numpy(dtype=np.int32))
+
+    def get_candidate_rows(self, query: str) -> Optional[np.ndarray]:
+        """
+        :param query: a case-insensitive substring query
+        :return: a sorted array of the rows that may match *query*, or None if the query has no word tokens and thus
+        cannot be answered using the index
+        """
+        query = normalize_text(query)
+        query_tokens = list(TOKEN_PATTERN.finditer(query))
+        if len(query_tokens) == 0:
+            return None
+        candidate_rows = None
+        for token_match in query_tokens:
+            token = token_match.group()
+            # if the query starts (ends) with the token, it may match the end (start) of a longer token in the text
+            open_start = token_match.start() == 0
+            open_end = token_match.end() == len(query)
+            rows = self._get_token_rows(token, open_start, open_end)
+            candidate_rows = rows if candidate_rows is None \
+                else np.intersect1d(candidate_rows, rows, assume_unique=True)
+            if len(candidate_rows) == 0:
+                break
+        return candidate_rows
+
+    def _get_token_rows(self, token, open_start, open_end) -> np.ndarray:
+        if open_start:
+            vocabulary = self._get_vocabulary_series()
+            matches = vocabulary.str.contains(token, regex=False) if open_end else vocabulary.str.endswith(token)
+            token_ids = np.flatnonzero(matches.to_numpy(dtype=bool))
+            return np.unique(np.concatenate([self.postings[self.offsets[i]:self.offsets[i + 1]] for i in token_ids]
+                                            + [np.empty(0, dtype=self.postings.dtype)]))
+        start = np.searchsorted(self.vocabulary, token, side='left')
+        if open_end:
+            # tokens starting with *token* make up a contiguous range of the sorted vocabulary
+            end = np.searchsorted(self.vocabulary, token + chr(0x10FFFF), side='left')
+        else:
+            end = start + 1 if start < len(self.vocabulary) and self.vocabulary[start] == token else start
+        return np.unique(self.postings[self.offsets[start]:self.offsets[end]])
+
+    def _get_vocabulary_series(self) -> pd.Series:
+        if self._vocabulary_series is None:
+            self._vocabulary_series = pd.Series(self.vocabulary, dtype=object)
+        return self._vocabulary_series
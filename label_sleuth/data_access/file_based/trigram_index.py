@@ -0,0 +1,183 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import re
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # python < 3.11
+    import sre_parse
+
+BUILD_BATCH_SIZE = 50000
+# when intersecting the trigram posting lists of a literal, stop once the number of candidate rows is this small, as
+# the remaining rows are verified against the regex anyway
+MIN_CANDIDATES_TO_INTERSECT = 16
+
+
+def _encode_code_points(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [text.encode('utf-32-le', errors='surrogatepass') for text in texts]
+    lengths = np.array([len(text) // 4 for text in encoded], dtype=np.int64)
+    code_points = np.frombuffer(b''.join(encoded), dtype=np.uint32).astype(np.int64)
+    return code_points, lengths
+
+
+def _get_trigram_codes(code_points: np.ndarray) -> np.ndarray:
+    # each code point fits in 21 bits, so a trigram is encoded as a single 63-bit integer
+    return (code_points[:-2] << 42) | (code_points[1:-1] << 21) | code_points[2:]
+
+
+def _get_literal_requirement(literal):
+    return 'literal', ''.join(literal)
+
+
+def _get_requirement(items, literal_prefix=()):
+    """
+    Extract the literals required by a parsed regex. The requirement is a tree of ('and', [requirements]),
+    ('or', [requirements]) and ('literal', string) nodes: a text can only match the regex if it satisfies the
+    requirement. Constructs whose requirements are not extracted (character classes, case-insensitive groups,
+    lookarounds, etc.) impose no requirement.
+    :param items: a parsed regex, or a sequence of parsed regex items
+    :param literal_prefix: literal characters that precede *items* in every match
+    """
+    requirements = []
+    literal = list(literal_prefix)
+    for op, av in items:
+        op_name = op.name
+        if op_name == 'LITERAL':
+            literal.append(chr(av))
+            continue
+        if op_name == 'AT':  # anchors do not consume characters, so they do not break the literal
+            continue
+        if op_name == 'BRANCH':
+            # the literal before the alternation is a prefix of each of its branches
+            requirements.append(('or', [_get_requirement(branch, literal) for branch in av[1]]))
+            literal = []
+            continue
+        requirements.append(_get_literal_requirement(literal))
+        literal = []
+        if op_name == 'SUBPATTERN':
+            _, add_flags, _, subpattern = av
+            if not add_flags & re.IGNORECASE:
+                requirements.append(_get_requirement(subpattern))
+        elif op_name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            min_count, _, subpattern = av
+            if min_count > 0:
+                requirements.append(_get_requirement(subpattern))
+        elif op_name == 'ATOMIC_GROUP':
+            requirements.append(_get_requirement(av))
+    requirements.append(_get_literal_requirement(literal))
+    return 'and', requirements
+
+
+class TrigramIndex:
+    """
+    An inverted index from the character trigrams of a set of texts to the rows in which they appear, used for
+    narrowing down the rows that may match a regular expression.
+
+    Trigrams are encoded as integers and kept sorted in *codes*; the rows of the i-th trigram are stored in
+    postings[offsets[i]:offsets[i+1]], in ascending order. Given a regex, the literals that any match must contain are
+    extracted from the parsed regex, and only rows that contain all the trigrams of these literals are returned by
+    get_candidate_rows(). The candidate rows should then be matched against the regex itself.
+    """
+
+    def __init__(self, codes: np.ndarray, offsets: np.ndarray, postings: np.ndarray):
+        self.codes = codes
+        self.offsets = offsets
+        self.postings = postings
+
+    @classmethod
+    def build(cls, texts: Sequence[str]):
+        """
+        :param texts: the text in each row
+        """
+        batch_codes = []
+        batch_rows = []
+        for batch_start in range(0, len(texts), BUILD_BATCH_SIZE):
+            code_points, lengths = _encode_code_points(texts[batch_start:batch_start + BUILD_BATCH_SIZE])
+            if len(code_points) < 3:
+                continue
+            rows = np.repeat(np.arange(batch_start, batch_start + len(lengths), dtype=np.int32), lengths)
+            is_within_text = rows[:-2] == rows[2:]
+            codes = _get_trigram_codes(code_points)[is_within_text]
+            rows = rows[:-2][is_within_text]
+            order = np.lexsort((rows, codes))
+            codes, rows = codes[order], rows[order]
+            is_first = np.ones(len(codes), dtype=bool)
+            is_first[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+            batch_codes.append(codes[is_first])
+            batch_rows.append(rows[is_first])
+        codes = np.concatenate(batch_codes) if batch_codes else np.empty(0, dtype=np.int64)
+        rows = np.concatenate(batch_rows) if batch_rows else np.empty(0, dtype=np.int32)
+        # rows of different batches are disjoint, so sorting keeps the (code, row) pairs unique
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        unique_codes, first_positions = np.unique(codes, return_index=True)
+        offsets = np.append(first_positions, len(codes)).astype(np.int64)
+        return cls(unique_codes, offsets, rows)
+
+    def get_candidate_rows(self, regex: str) -> Optional[np.ndarray]:
+        """
+        :param regex: a case-sensitive regular expression
+        :return: a sorted array of the rows that may match *regex*, or None if no literals could be extracted from the
+        regex (or it is not a valid regex) and thus all rows may match it
+        """
+        try:
+            parsed = sre_parse.parse(regex)
+        except (re.error, RecursionError):
+            return None
+        if parsed.state.flags & re.IGNORECASE:
+            return None
+        return self._evaluate(_get_requirement(parsed))
+
+    def _evaluate(self, requirement) -> Optional[np.ndarray]:
+        requirement_type, value = requirement
+        if requirement_type == 'literal':
+            return self._get_literal_rows(value) if len(value) >= 3 else None
+        if requirement_type == 'and':
+            rows = None
+            for sub_requirement in value:
+                sub_rows = self._evaluate(sub_requirement)
+                if sub_rows is not None:
+                    rows = sub_rows if rows is None else np.intersect1d(rows, sub_rows, assume_unique=True)
+                    if len(rows) == 0:
+                        break
+            return rows
+        rows = []
+        for sub_requirement in value:
+            sub_rows = self._evaluate(sub_requirement)
+            if sub_rows is None:
+                return None
+            rows.append(sub_rows)
+        return np.unique(np.concatenate(rows)) if rows else None
+
+    def _get_literal_rows(self, literal: str) -> np.ndarray:
+        code_points, _ = _encode_code_points([literal])
+        codes = np.unique(_get_trigram_codes(code_points))
+        positions = np.searchsorted(self.codes, codes)
+        if np.any(positions == len(self.codes)) or np.any(self.codes[np.minimum(positions, len(self.codes) - 1)]
+                                                          != codes):
+            return np.empty(0, dtype=np.int32)
+        starts, ends = self.offsets[positions], self.offsets[positions + 1]
+        rows = None
+        # intersect the shortest posting lists first
+        for idx in np.argsort(ends - starts, kind='stable').tolist():
+            posting = self.postings[starts[idx]:ends[idx]]
+            rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+            if len(rows) <= MIN_CANDIDATES_TO_INTERSECT:
+                break
+        return np.asarray(rows)
@@ -0,0 +1,78 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+from typing import Sequence
+
+import numpy as np
+import xxhash
+
+from label_sleuth.data_access.file_based.sorted_runs import SortedRuns
+
+NOT_FOUND = -1
+
+
+def hash_strings(values: Sequence[str]) -> np.ndarray:
+    """
+    :return: a uint64 array with the 64-bit xxhash of each of the given strings
+    """
+    return np.fromiter((xxhash.xxh64_intdigest(value.encode('utf-8')) for value in values), dtype=np.uint64,
+                       count=len(values))
+
+
+class UriIndex:
+    """
+    A hash index from element uris to their row positions in the dataset.
+
+    The index is kept as SortedRuns of the 64-bit hashes of the uris along with the row of each hash, so a lookup is a
+    binary search rather than a scan over the uri column, and adding elements does not copy the existing index. As
+    different uris may share a hash, candidate rows are verified against the uri column. The uri hashes themselves
+    are computed when elements are added to the dataset and are persisted in the dataset store.
+    """
+
+    def __init__(self, uri_hashes: np.ndarray):
+        """
+        :param uri_hashes: the hash of the uri in each row of the dataset
+        """
+        self.num_rows = 0
+        self.sorted_runs = SortedRuns(np.uint64)
+        self.extend(uri_hashes)
+
+    def extend(self, new_uri_hashes: np.ndarray):
+        """
+        Add the hashes of uris that were appended to the end of the dataset
+        :param new_uri_hashes:
+        """
+        self.sorted_runs.add(np.asarray(new_uri_hashes, dtype=np.uint64),
+                             np.arange(self.num_rows, self.num_rows + len(new_uri_hashes), dtype=np.int64))
+        self.num_rows += len(new_uri_hashes)
+
+    def get_rows(self, uris: Sequence[str], uri_column) -> np.ndarray:
+        """
+        :param uris:
+        :param uri_column: the uri of each row in the dataset
+        :return: an array with the row position of each of the given uris, or NOT_FOUND for uris not in the dataset
+        """
+        hashes = hash_strings(uris)
+        rows = np.full(len(uris), NOT_FOUND, dtype=np.int64)
+        for sorted_hashes, sorted_rows in self.sorted_runs.runs:
+            starts = np.searchsorted(sorted_hashes, hashes, side='left')
+            ends = np.searchsorted(sorted_hashes, hashes, side='right')
+            for idx in np.flatnonzero((starts < ends) & (rows == NOT_FOUND)).tolist():
+                for position in range(starts[idx], ends[idx]):
+                    row = sorted_rows[position]
+                    if uri_column[row] == uris[idx]:
+                        rows[idx] = row
+                        break
+        return rows
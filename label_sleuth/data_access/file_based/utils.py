@@ -13,12 +13,15 @@
 #  limitations under the License.
 #
 import re
-from typing import Set, Union, Iterable, Optional, Dict
+from typing import Set, Union, Optional, Dict, Tuple, Sequence
 
+import numpy as np
 import pandas as pd
 from label_sleuth.data_access.core.data_structs import TextElement, URI_SEP, LabelType, LabeledTextElement, \
     MulticlassLabeledTextElement
 from label_sleuth.data_access.data_access_api import LabeledStatus
+from label_sleuth.data_access.file_based.dataset_store import StoredDataset
+from label_sleuth.data_access.file_based.label_index import LabelIndex
 
 
 def get_dataset_name_from_uri(uri):
@@ -44,10 +47,9 @@ def filename_to_uri(filename):
     return uri
 
 
-def build_text_elements_from_dataframe_and_labels(df, labels_dict: Optional[Dict],
-                                                  is_multiclass: Optional[bool] = None):
-    element_data_columns = list(TextElement.get_field_names())
-    element_dicts = map(lambda row: dict(zip(element_data_columns, row)), df[element_data_columns].values)
+def build_text_elements_from_dataset_and_labels(dataset: StoredDataset, rows: Sequence[int],
+                                                labels_dict: Optional[Dict], is_multiclass: Optional[bool] = None):
+    element_dicts = dataset.get_text_element_fields(rows)
     if labels_dict is None:
         return [TextElement(**d) for d in element_dicts]
     else:
@@ -60,16 +62,22 @@ def build_text_elements_from_dataframe_and_labels(df, labels_dict: Optional[Dict
                     for d in element_dicts]
 
 
-def filter_by_labeled_status(df: pd.DataFrame, labels_series: pd.Series, category_id: Union[int, None],
-                             labeled_status: LabeledStatus, label_types: Set[LabelType] = None):
+def filter_by_labeled_status(dataset: StoredDataset, label_index: LabelIndex, category_id: Union[int, None],
+                             labeled_status: LabeledStatus, label_types: Set[LabelType] = None) -> np.ndarray:
     """
-    :param df:
-    :param labels_series: series of the label dictionary corresponding to each element in the dataframe
+    :param dataset: the full dataset, whose rows are aligned with the label index
+    :param label_index: the label index of the workspace for this dataset
     :param category_id:
     :param labeled_status: unlabeled, labeled or all
     :param label_types: set of applicable label types if filtering for labeled elements (LabelStatus.LABELED)
-    :return:
+    :return: the sorted rows of the matching elements
     """
+    mask = _get_labeled_status_mask(label_index, category_id, labeled_status, label_types)
+    return np.arange(len(dataset), dtype=np.int64) if mask is None else np.flatnonzero(mask)
+
+
+def _get_labeled_status_mask(label_index: LabelIndex, category_id: Union[int, None], labeled_status: LabeledStatus,
+                             label_types: Set[LabelType] = None) -> Optional[np.ndarray]:
     if labeled_status in [LabeledStatus.UNLABELED, LabeledStatus.ALL] and label_types is not None:
         raise Exception(f"Label type is inapplicable when fetching {labeled_status} elements")
 
@@ -77,52 +85,67 @@ def filter_by_labeled_status(df: pd.DataFrame, labels_series: pd.Series, categor
         raise Exception(f"label_types must be provided when filtering labeled elements")
 
     if labeled_status == LabeledStatus.UNLABELED:
-        if category_id is None:
-            return df[labels_series.apply(lambda x: x is None)]
-        else:
-            return df[labels_series.apply(lambda x: category_id not in x)]
+        return ~label_index.get_labeled_mask(category_id)
     elif labeled_status == LabeledStatus.LABELED:
-        if category_id is None:
-            return df[labels_series.apply(lambda x: x is not None and x.label_type in label_types)]
-        else:
-            return df[labels_series.apply(lambda x: category_id in x and x[category_id].label_type in label_types)]
-
-    return df
+        return label_index.get_labeled_mask(category_id, label_types)
+    return None
 
 
-def filter_by_uris(df: pd.DataFrame, uris: Iterable[str]):
-    return df.loc[df['uri'].isin(uris)]
+def _filter_rows_by_query(dataset: StoredDataset, rows: np.ndarray, query, is_regex: bool) -> np.ndarray:
+    if not query:
+        return rows
+    texts = pd.Series(dataset.text.take(rows), dtype=object)
+    # case=is_regex: we want the query to be case sensitive if we are matching using a regex and case insensitive otherwise
+    return rows[texts.str.contains(query, case=is_regex, na=False, regex=is_regex).to_numpy(dtype=bool)]
 
 
-def filter_by_query_and_document_uri(df: pd.DataFrame, query, is_regex: bool = False, document_id=None):
-    if document_id is not None:
-        df = df[df.uri.str.startswith(f"{document_id}-")]
-    if query:
-        # case=is_regex: we want the query to be case sensitive if we are matching using a regex and case insensitive otherwise
-        df = df[df.text.str.contains(query, case=is_regex, na=False, regex=is_regex)]
-    return df
+def filter_by_query_and_document_uri(dataset: StoredDataset, query, is_regex: bool = False,
+                                     document_rows: Optional[Tuple[int, int]] = None,
+                                     query_rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    :param dataset:
+    :param query: query to use for filtering text elements
+    :param is_regex: whether to process the query as regular expression
+    :param document_rows: optional range of rows [start, end) in *dataset* that holds the elements of a single document
+    :param query_rows: optional sorted array of the rows in *dataset* that may match the query, as returned by the
+    token index of the dataset. If provided, only these rows are matched against the query
+    :return: the sorted rows of the matching elements
+    """
+    if query_rows is not None:
+        rows = query_rows
+        if document_rows is not None:
+            rows = rows[(rows >= document_rows[0]) & (rows < document_rows[1])]
+    elif document_rows is not None:
+        rows = np.arange(document_rows[0], document_rows[1], dtype=np.int64)
+    else:
+        rows = np.arange(len(dataset), dtype=np.int64)
+    return _filter_rows_by_query(dataset, rows, query, is_regex)
 
 
-def filter_by_query_and_label_status(df: pd.DataFrame, labels_series: pd.Series, category_id: Union[int, None],
+def filter_by_query_and_label_status(dataset: StoredDataset, label_index: LabelIndex, category_id: Union[int, None],
                                      labeled_status: LabeledStatus, query: str, is_regex: bool = False,
-                                     label_types: Set[LabelType] = None):
+                                     label_types: Set[LabelType] = None,
+                                     query_rows: Optional[np.ndarray] = None) -> np.ndarray:
     """
-    :param df:
-    :param labels_series: series of the label dictionary corresponding to each element in the dataframe
+    :param dataset: the full dataset, whose rows are aligned with the label index
+    :param label_index: the label index of the workspace for this dataset
     :param category_id:
     :param labeled_status: unlabeled, labeled or all
     :param query: query to use for filtering text elements
     :param is_regex: whether to process the query as regular expression
     :param label_types: set of applicable label types if filtering for labeled elements (LabelStatus.LABELED)
-    :return:
+    :param query_rows: optional sorted array of the rows in *dataset* that may match the query, as returned by the
+    token index of the dataset
+    :return: the sorted rows of the matching elements
     """
-    df = filter_by_labeled_status(df, labels_series, category_id, labeled_status, label_types=label_types)
-    return filter_by_query_and_document_uri(df, query, is_regex)
+    if query_rows is not None:
+        mask = _get_labeled_status_mask(label_index, category_id, labeled_status, label_types)
+        rows = query_rows if mask is None else query_rows[mask[query_rows]]
+    else:
+        rows = filter_by_labeled_status(dataset, label_index, category_id, labeled_status, label_types=label_types)
+    return _filter_rows_by_query(dataset, rows, query, is_regex)
 
 
-def filter_by_label_value(df: pd.DataFrame, labels_series: pd.Series, category_id: Union[int, None],
-                                     value: Union[bool, int]):
-    if category_id is None:
-        return df[labels_series.apply(lambda x: x is not None and x.label == value)]
-    else:
-        return df[labels_series.apply(lambda x: category_id in x and x[category_id].label == value)]
+def filter_by_label_value(dataset: StoredDataset, label_index: LabelIndex, category_id: Union[int, None],
+                          value: Union[bool, int]) -> np.ndarray:
+    return np.flatnonzero(label_index.get_label_value_mask(category_id, value))
@@ -27,7 +27,8 @@ def get_element_group_by_texts(texts: Sequence[str], workspace_id, dataset_name,
     """
     The user may import a large number of labeled instances, and these will not necessarily be given with a text
     element uri. Thus, the goal here is to efficiently query for a group of text elements using only the texts, and
-    optionally a *doc_uri* that the texts belong to.
+    optionally a *doc_uri* that the texts belong to. The texts are combined into a single regex of exact matches; the
+    data access uses its trigram index to narrow down the elements that are matched against this regex.
     The order of the returned elements DOES NOT match the order of the texts given as input.
     """
     regex = '|'.join(f'^{re.escape(t)}$' for t in texts)
@@ -13,16 +13,25 @@
 #  limitations under the License.
 #
 
+import os
 import random
+import shutil
 import unittest
 from collections import Counter, defaultdict
 from typing import List, Sequence
 import tempfile
+import time
+from unittest.mock import patch
+
+import pandas as pd
+
 from label_sleuth.data_access.core.data_structs import Document, TextElement, Label, LabeledTextElement, \
-    WorkspaceModelType, MulticlassLabel
+    WorkspaceModelType, MulticlassLabel, LabelType
 from label_sleuth.data_access.file_based.utils import URI_SEP
 
 from label_sleuth.data_access.file_based.file_based_data_access import FileBasedDataAccess
+from label_sleuth.data_access.file_based.dataset_store import DatasetStore
+from label_sleuth.utils import jsonpickle_encode
 from label_sleuth.data_access.core.data_structs import LABEL_POSITIVE, LABEL_NEGATIVE
 
 
@@ -602,6 +611,245 @@ class TestFileBasedDataAccess(unittest.TestCase):
         self.data_access.delete_all_labels(workspace_id, dataset_name)
         self.data_access.delete_dataset(dataset_name)
 
+    def test_metadata_is_kept_when_reloading_dataset(self):
+        dataset_name = self.test_metadata_is_kept_when_reloading_dataset.__name__ + '_dump'
+        doc = generate_simple_doc(dataset_name)
+        for idx, element in enumerate(doc.text_elements):
+            element.metadata = {'subject': f'subject {idx}', 'page': idx, 'score': 0.5, 'is_title': idx == 0,
+                                'authors': ['a', 'b']}
+        doc.text_elements[-1].metadata = {}
+        self.data_access.delete_dataset(dataset_name)
+        self.data_access.add_documents(dataset_name, [doc])
+
+        del self.data_access.ds_in_memory[dataset_name]
+        elements = sorted(self.data_access.get_all_text_elements(dataset_name), key=lambda te: te.uri)
+        self.assertListEqual(doc.text_elements, elements)
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_legacy_csv_dataset_is_migrated(self):
+        dataset_name = self.test_legacy_csv_dataset_is_migrated.__name__ + '_dump'
+        docs = generate_corpus(self.data_access, dataset_name, 2)
+        docs[1].metadata = {'source': 'web'}
+        # replace the dataset store with a csv file and a doc_dump directory, in the format written by previous
+        # versions
+        legacy_df = pd.DataFrame([vars(element) for element in self.data_access.get_all_text_elements(dataset_name)])
+        legacy_df.to_csv(self.data_access._get_dataset_dump_filename(dataset_name), index=False)
+        doc_dump_dir = self.data_access._get_documents_dump_dir(dataset_name)
+        os.makedirs(doc_dump_dir)
+        for doc in docs:
+            with open(os.path.join(doc_dump_dir, doc.uri + '.json'), 'w') as f:
+                f.write(jsonpickle_encode(doc))
+        shutil.rmtree(self.data_access._get_dataset_store(dataset_name).store_dir)
+        del self.data_access.ds_in_memory[dataset_name]
+        del self.data_access.documents_in_memory[dataset_name]
+
+        elements = self.data_access.get_all_text_elements(dataset_name)
+        self.assertListEqual([element for doc in docs for element in doc.text_elements], elements)
+        self.assertListEqual(docs, self.data_access.get_documents(None, dataset_name, [doc.uri for doc in docs]))
+        self.assertTrue(self.data_access._get_dataset_store(dataset_name).exists())
+        self.assertFalse(os.path.exists(self.data_access._get_dataset_dump_filename(dataset_name)))
+        self.assertFalse(os.path.exists(doc_dump_dir))
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_label_filters_after_labeling_and_adding_documents(self):
+        workspace_id = 'test_label_filters_after_labeling_and_adding_documents'
+        dataset_name = self.test_label_filters_after_labeling_and_adding_documents.__name__ + '_dump'
+        self.data_access.initialize_user_labels(workspace_id, dataset_name,
+                                                workspace_model_type=WorkspaceModelType.Binary)
+        doc = generate_corpus(self.data_access, dataset_name, 1)[0]
+        category_id = 0
+        uris = [element.uri for element in doc.text_elements]
+        self.data_access.set_labels(workspace_id, {uris[0]: {category_id: Label(label=LABEL_POSITIVE)},
+                                                   uris[1]: {category_id: Label(label=LABEL_NEGATIVE,
+                                                                                label_type=LabelType.Weak)}})
+        # adding documents after labeling should leave the new elements unlabeled
+        self.data_access.add_documents(dataset_name, [generate_simple_doc(dataset_name, doc_id=1)])
+        unlabeled = self.data_access.get_unlabeled_text_elements(workspace_id, dataset_name, category_id)
+        self.assertEqual(self.data_access.get_text_element_count(dataset_name) - 2, unlabeled['hit_count'])
+        labeled = self.data_access.get_labeled_text_elements(workspace_id, dataset_name, category_id)['results']
+        self.assertEqual([uris[0]], [element.uri for element in labeled])
+        labeled = self.data_access.get_labeled_text_elements(workspace_id, dataset_name, category_id,
+                                                             label_types={LabelType.Weak})['results']
+        self.assertEqual([uris[1]], [element.uri for element in labeled])
+        negative = self.data_access.get_labeled_elements_by_value(workspace_id, dataset_name, category_id,
+                                                                  LABEL_NEGATIVE)['results']
+        self.assertEqual([uris[1]], [element.uri for element in negative])
+
+        self.data_access.unset_labels(workspace_id, category_id, [uris[0]])
+        labeled = self.data_access.get_labeled_text_elements(workspace_id, dataset_name, category_id)['results']
+        self.assertEqual(0, len(labeled))
+        self.data_access.delete_all_labels(workspace_id, dataset_name)
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_duplicates_across_added_documents(self):
+        workspace_id = 'test_duplicates_across_added_documents'
+        dataset_name = self.test_duplicates_across_added_documents.__name__ + '_dump'
+        self.data_access.initialize_user_labels(workspace_id, dataset_name,
+                                                workspace_model_type=WorkspaceModelType.Binary)
+        doc = generate_corpus(self.data_access, dataset_name, 1)[0]
+        new_doc = generate_simple_doc(dataset_name, doc_id=1)
+        new_doc.text_elements[2].text = doc.text_elements[0].text
+        self.data_access.add_documents(dataset_name, [new_doc])
+        del self.data_access.ds_in_memory[dataset_name]
+
+        self.data_access.set_labels(workspace_id, {doc.text_elements[0].uri: {0: Label(label=LABEL_POSITIVE)}},
+                                    apply_to_duplicate_texts=True)
+        labeled = self.data_access.get_labeled_text_elements(workspace_id, dataset_name, 0)['results']
+        self.assertSetEqual({doc.text_elements[0].uri, new_doc.text_elements[2].uri},
+                            {element.uri for element in labeled})
+        self.data_access.delete_all_labels(workspace_id, dataset_name)
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_get_text_elements_by_document(self):
+        workspace_id = 'test_get_text_elements_by_document'
+        dataset_name = self.test_get_text_elements_by_document.__name__ + '_dump'
+        self.data_access.initialize_user_labels(workspace_id, dataset_name,
+                                                workspace_model_type=WorkspaceModelType.Binary)
+        docs = generate_corpus(self.data_access, dataset_name, 3)
+        self.data_access.add_documents(dataset_name, [generate_simple_doc(dataset_name, doc_id=3)])
+        for doc_id in [1, 3]:
+            document_uri = dataset_name + URI_SEP + str(doc_id)
+            results = self.data_access.get_text_elements(workspace_id, dataset_name, document_uri=document_uri,
+                                                         query='sentence')
+            self.assertEqual(2, results['hit_count'])
+            self.assertTrue(all(element.uri.startswith(document_uri + URI_SEP) for element in results['results']))
+        self.assertListEqual([doc.uri for doc in docs] + [dataset_name + URI_SEP + '3'],
+                             self.data_access.get_all_document_uris(dataset_name))
+        self.data_access.delete_all_labels(workspace_id, dataset_name)
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_texts_are_read_from_the_store_by_row_positions(self):
+        dataset_name = self.test_texts_are_read_from_the_store_by_row_positions.__name__ + '_dump'
+        generate_corpus(self.data_access, dataset_name, 2)
+        uris = self.data_access.get_all_text_elements_uris(dataset_name)
+        rows = self.data_access.get_row_positions_by_uris(dataset_name, [uris[3], uris[0], 'missing uri'])
+        self.assertListEqual([3, 0, -1], rows)
+        store_dir = self.data_access.get_dataset_store_dir(dataset_name)
+        self.assertListEqual(self.data_access.get_texts_by_row_positions(dataset_name, rows[:2]),
+                             DatasetStore(store_dir).read_dataset().text.take(rows[:2]))
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_query_across_added_documents(self):
+        workspace_id = 'test_query_across_added_documents'
+        dataset_name = self.test_query_across_added_documents.__name__ + '_dump'
+        self.data_access.initialize_user_labels(workspace_id, dataset_name,
+                                                workspace_model_type=WorkspaceModelType.Binary)
+        generate_corpus(self.data_access, dataset_name, 2)
+        new_doc = generate_simple_doc(dataset_name, doc_id=2)
+        self.data_access.add_documents(dataset_name, [new_doc])
+        self.data_access.set_labels(workspace_id, {new_doc.text_elements[1].uri: {0: Label(True)}})
+        results = self.data_access.get_text_elements(workspace_id, dataset_name, query='SENTENCE is')
+        self.assertEqual(3, results['hit_count'])
+        unlabeled = self.data_access.get_unlabeled_text_elements(workspace_id, dataset_name, 0, query='sentence is')
+        self.assertEqual(2, unlabeled['hit_count'])
+        labeled = self.data_access.get_labeled_text_elements(workspace_id, dataset_name, 0, query='ntence')
+        self.assertListEqual([new_doc.text_elements[1].uri], [element.uri for element in labeled['results']])
+        self.assertEqual(0, self.data_access.get_text_elements(workspace_id, dataset_name, query='sentences')[
+            'hit_count'])
+        regex_results = self.data_access.get_text_elements(workspace_id, dataset_name, query=r'^Last \w+ offers',
+                                                           is_regex=True)
+        self.assertEqual(3, regex_results['hit_count'])
+        self.data_access.delete_all_labels(workspace_id, dataset_name)
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_paging_with_cursor(self):
+        workspace_id = 'test_paging_with_cursor'
+        dataset_name = self.test_paging_with_cursor.__name__ + '_dump'
+        self.data_access.initialize_user_labels(workspace_id, dataset_name,
+                                                workspace_model_type=WorkspaceModelType.Binary)
+        generate_corpus(self.data_access, dataset_name, 5)
+        all_uris = [element.uri for element in self.data_access.get_text_elements(
+            workspace_id, dataset_name, query='is')['results']]
+        paged_uris = []
+        cursor = None
+        for page_idx in range(0, len(all_uris), 3):
+            page = self.data_access.get_text_elements(workspace_id, dataset_name, sample_size=3, query='is',
+                                                      cursor=cursor)
+            page_by_index = self.data_access.get_text_elements(workspace_id, dataset_name, sample_size=3,
+                                                               sample_start_idx=page_idx, query='is')
+            self.assertListEqual([element.uri for element in page_by_index['results']],
+                                 [element.uri for element in page['results']])
+            self.assertEqual(len(all_uris), page['hit_count'])
+            paged_uris.extend(element.uri for element in page['results'])
+            cursor = page['next_cursor']
+        self.assertIsNone(cursor)
+        self.assertListEqual(all_uris, paged_uris)
+        self.data_access.delete_all_labels(workspace_id, dataset_name)
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_cursor_is_rejected_for_other_request_arguments(self):
+        workspace_id = 'test_cursor_is_rejected_for_other_request_arguments'
+        dataset_name = self.test_cursor_is_rejected_for_other_request_arguments.__name__ + '_dump'
+        self.data_access.initialize_user_labels(workspace_id, dataset_name,
+                                                workspace_model_type=WorkspaceModelType.Binary)
+        generate_corpus(self.data_access, dataset_name, 5)
+        cursor = self.data_access.get_text_elements(workspace_id, dataset_name, sample_size=1,
+                                                    query='is')['next_cursor']
+        self.assertIsNotNone(cursor)
+        with self.assertRaises(Exception):
+            self.data_access.get_text_elements(workspace_id, dataset_name, sample_size=1, query='was', cursor=cursor)
+        with self.assertRaises(Exception):
+            self.data_access.get_unlabeled_text_elements(workspace_id, dataset_name, category_id=0, sample_size=1,
+                                                         query='is', cursor=cursor)
+        self.assertEqual(1, len(self.data_access.get_text_elements(workspace_id, dataset_name, sample_size=1,
+                                                                   query='is', cursor=cursor)['results']))
+        self.data_access.delete_all_labels(workspace_id, dataset_name)
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_labels_journal_replay_and_compaction(self):
+        workspace_id = 'test_labels_journal_replay_and_compaction'
+        dataset_name = self.test_labels_journal_replay_and_compaction.__name__ + '_dump'
+        self.data_access.initialize_user_labels(workspace_id, dataset_name,
+                                                workspace_model_type=WorkspaceModelType.Binary)
+        doc = generate_corpus(self.data_access, dataset_name, 1)[0]
+        uri_to_label = add_random_labels_to_document(doc, 3, [0, 1])
+        self.data_access.set_labels(workspace_id, uri_to_label)
+        unset_uri = next(iter(uri_to_label))
+        self.data_access.unset_labels(workspace_id, 0, [unset_uri])
+        expected_labels = {uri: {k: v for k, v in labels.items() if (uri, k) != (unset_uri, 0)}
+                           for uri, labels in uri_to_label.items()}
+        journal = self.data_access._get_labels_journal(workspace_id, dataset_name)
+        self.assertEqual(len(uri_to_label) + 1, journal.get_num_records())
+
+        # a partially written record at the end of the journal is ignored
+        with open(journal.path, 'a') as f:
+            f.write('["partial')
+        self.data_access.labels_in_memory = defaultdict(lambda: defaultdict(dict))
+        self.assertDictEqual(expected_labels, dict(self.data_access._get_labels(workspace_id, dataset_name)))
+        self.data_access.set_labels(workspace_id, {unset_uri: {0: Label(label=LABEL_POSITIVE)}})
+        expected_labels[unset_uri][0] = Label(label=LABEL_POSITIVE)
+        self.data_access.labels_in_memory = defaultdict(lambda: defaultdict(dict))
+        self.assertDictEqual(expected_labels, dict(self.data_access._get_labels(workspace_id, dataset_name)))
+
+        # the journal is not compacted while it holds fewer records than the threshold
+        self.data_access._compact_labels_journal(workspace_id, dataset_name)
+        self.assertEqual(len(uri_to_label) + 2, journal.get_num_records())
+        with patch.object(self.data_access, 'min_label_journal_records_to_compact', 0):
+            self.data_access._compact_labels_journal(workspace_id, dataset_name)
+        self.assertEqual(0, journal.get_num_records())
+        self.data_access.labels_in_memory = defaultdict(lambda: defaultdict(dict))
+        self.assertDictEqual(expected_labels, dict(self.data_access._get_labels(workspace_id, dataset_name)))
+        self.data_access.delete_all_labels(workspace_id, dataset_name)
+        self.data_access.delete_dataset(dataset_name)
+
+    def test_labels_journal_is_compacted_once_per_burst(self):
+        workspace_id = 'test_labels_journal_is_compacted_once_per_burst'
+        dataset_name = self.test_labels_journal_is_compacted_once_per_burst.__name__ + '_dump'
+        self.data_access.initialize_user_labels(workspace_id, dataset_name,
+                                                workspace_model_type=WorkspaceModelType.Binary)
+        doc = generate_corpus(self.data_access, dataset_name, 1)[0]
+        with patch.object(self.data_access, 'min_label_journal_records_to_compact', 0), \
+                patch.object(FileBasedDataAccess, '_compact_labels_journal') as compact_mock:
+            for uri, labels in add_random_labels_to_document(doc, 3, [0]).items():
+                self.data_access.set_labels(workspace_id, {uri: labels})
+                self.data_access.unset_labels(workspace_id, 0, [uri])
+            while compact_mock.call_count == 0:
+                time.sleep(0.01)
+        compact_mock.assert_called_once_with(workspace_id, dataset_name)
+        self.data_access.labels_journal_compactions_pending.clear()
+        self.data_access.delete_all_labels(workspace_id, dataset_name)
+        self.data_access.delete_dataset(dataset_name)
+
 # TODO add test for label types
 
 
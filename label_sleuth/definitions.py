@@ -16,6 +16,8 @@
 import torch
 
 INFER_CACHE_SIZE = 10000000
+INFER_CACHE_MAX_BYTES = 2 * 1024 ** 3  # approximate memory used by the in-memory prediction cache of each model api
+LOADED_MODELS_CACHE_SIZE = 4  # number of loaded models kept in memory by each model api
 ACTIVE_LEARNING_SUGGESTION_COUNT = 1000
 MPS_GPU_AVAILABLE = hasattr(torch.backends, "mps") and torch.backends.mps.is_available()  # relevant for mac machines
 # with GPU devices (e.g., Apple M1 chip). Check if mps exists in torch for backward compatibility
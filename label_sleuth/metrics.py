@@ -0,0 +1,264 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+"""
+An in-process registry of metrics (counters, gauges and histograms) that is exposed in the Prometheus text format, and
+spans that break down the time spent serving a request into its stages (e.g. data access, inference and
+serialization).
+"""
+
+import bisect
+import contextlib
+import functools
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str], extra: str = '') -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if len(labels) > 0 else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name = None
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.values = {}  # label values -> value
+        self.lock = threading.Lock()
+
+    def _get_label_values(self, labels: Dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise Exception(f"metric {self.name} expects the labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type_name}']
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.extend(self._render_value(label_values, value))
+        return lines
+
+    def _render_value(self, label_values, value) -> List[str]:
+        return [f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}']
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        label_values = self._get_label_values(labels)
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self._get_label_values(labels), 0)
+
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        label_values = self._get_label_values(labels)
+        with self.lock:
+            self.values[label_values] = value
+
+    def get(self, **labels):
+        return self.values.get(self._get_label_values(labels), 0)
+
+
+class Histogram(Metric):
+    """
+    Counts the observed values in cumulative buckets, and keeps their count and sum
+    """
+    type_name = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        label_values = self._get_label_values(labels)
+        with self.lock:
+            bucket_counts, total = self.values.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+            bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[label_values] = (bucket_counts, total + value)
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """
+        Observe the number of seconds it takes to run the block of code
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def get_count(self, **labels) -> int:
+        bucket_counts, _ = self.values.get(self._get_label_values(labels), ([0], 0.0))
+        return sum(bucket_counts)
+
+    def get_sum(self, **labels) -> float:
+        return self.values.get(self._get_label_values(labels), ([0], 0.0))[1]
+
+    def _render_value(self, label_values, value) -> List[str]:
+        bucket_counts, total = value
+        lines = []
+        cumulative_count = 0
+        for upper_bound, count in zip(self.buckets + (math.inf,), bucket_counts):
+            cumulative_count += count
+            le = _format_labels(self.label_names, label_values, f'le="{_format_value(float(upper_bound))}"')
+            lines.append(f'{self.name}_bucket{le} {cumulative_count}')
+        labels = _format_labels(self.label_names, label_values)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative_count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the application. Metrics are created on their first use, and collectors are called before
+    the metrics are rendered, to update gauges whose values are read from other objects (e.g. cache statistics).
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name: str, description: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, label_names)
+
+    def gauge(self, name: str, description: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, description, label_names)
+
+    def histogram(self, name: str, description: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, label_names, buckets=buckets)
+
+    def _get_or_create(self, metric_class, name, description, label_names, **kwargs):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = metric_class(name, description, label_names, **kwargs)
+            metric = self.metrics[name]
+        if type(metric) != metric_class:
+            raise Exception(f"metric {name} is a {metric.type_name}, not a {metric_class.type_name}")
+        return metric
+
+    def register_collector(self, name: str, collector: Callable[[], None]):
+        """
+        :param name: collectors are identified by name, so registering a collector again replaces it
+        :param collector: a function that updates metrics, called before the metrics are rendered
+        """
+        with self.lock:
+            self.collectors[name] = collector
+
+    def render(self) -> str:
+        """
+        :return: all the metrics, in the Prometheus text exposition format
+        """
+        with self.lock:
+            collectors = list(self.collectors.items())
+        for name, collector in collectors:
+            try:
+                collector()
+            except Exception:
+                logging.exception(f"metrics collector {name} failed")
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        return ''.join(line + '\n' for metric in metrics for line in metric.render())
+
+
+registry = MetricsRegistry()
+
+SPAN_SECONDS = registry.histogram('label_sleuth_span_seconds', 'Time spent in each kind of span', ('span',))
+ITERATION_STAGE_SECONDS = registry.histogram('label_sleuth_iteration_stage_seconds',
+                                             'Time spent in each stage of the iteration flow', ('stage',))
+
+_trace = threading.local()
+
+
+@contextlib.contextmanager
+def span(name: str):
+    """
+    Measure the time spent in a block of code of the kind *name* (e.g. 'data_access' or 'inference'). If the block runs
+    in a thread that serves a request, its time is also added to the request trace. A span that is nested in a span of
+    the same kind is not measured again.
+    """
+    active_spans = getattr(_trace, 'active_spans', None)
+    if active_spans is None:
+        active_spans = _trace.active_spans = set()
+    if name in active_spans:
+        yield
+        return
+    active_spans.add(name)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start_time
+        active_spans.discard(name)
+        SPAN_SECONDS.observe(duration, span=name)
+        request_durations = getattr(_trace, 'request_durations', None)
+        if request_durations is not None:
+            request_durations[name] = request_durations.get(name, 0.0) + duration
+
+
+def timed_span(name: str):
+    """
+    Decorator that runs the function within a span of the kind *name*
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request_trace():
+    _trace.request_durations = {}
+
+
+def end_request_trace() -> Optional[Dict[str, float]]:
+    """
+    :return: the total duration of each kind of span that ran in the current request, or None if no trace was started
+    """
+    request_durations = getattr(_trace, 'request_durations', None)
+    _trace.request_durations = None
+    return request_durations
@@ -22,21 +22,27 @@ import threading
 import uuid
 import tempfile
 
-from collections import defaultdict
 from concurrent.futures import Future
 from enum import Enum
 from typing import Mapping, Sequence, Tuple, Set, Union
 
 import label_sleuth.definitions as definitions
+from label_sleuth.metrics import ITERATION_STAGE_SECONDS, timed_span
 from label_sleuth.models.core.languages import Languages, Language
 from label_sleuth.models.core.prediction import Prediction, MulticlassPrediction
 from label_sleuth.models.util.LRUCache import LRUCache
-from label_sleuth.models.util.caches_infer_funnel import get_from_memory_or_disk_or_infer
-from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
-from label_sleuth.utils import jsonpickle_encode, jsonpickle_decode
+from label_sleuth.models.util.prediction_cache import PredictionCache
+from label_sleuth.models.util.caches_infer_funnel import get_from_memory_or_disk_or_infer, InFlightPredictions
+from label_sleuth.models.util.prediction_store import PredictionStore
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager, JobPriority
+from label_sleuth.serialization import deserialize, serialize
 
 PREDICTIONS_STORE_DIR_NAME = "predictions"
 LANGUAGE_STR_KEY = "Language"
+# Items to train on or infer may carry their location in a dataset store, as a (store directory, row position) tuple
+# under this field. This allows models that run in worker processes to read the texts from the store, rather than
+# sending the texts to the workers. The field is not part of the cache key of the item.
+DATASET_ROW_FIELD = "dataset_row"
 
 
 class ModelStatus(Enum):
@@ -46,6 +52,19 @@ class ModelStatus(Enum):
     DELETED = 3
 
 
+class _ModelLoading:
+    """
+    The threads that are loading a model (or waiting for another thread to load it), which share a lock so that only
+    one of them loads the model at a time
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.num_threads = 0
+        self.evicted = False  # the model was evicted (e.g. deleted) while it was being loaded
+        self.model_components = None  # the loaded model, which is returned to the threads that waited for it
+
+
 class ModelAPI(object, metaclass=abc.ABCMeta):
     """
     Base class for implementing a classification model.
@@ -63,10 +82,11 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
         os.makedirs(self.get_models_dir(), exist_ok=True)
         self.background_jobs_manager = background_jobs_manager
         self.gpu_support = gpu_support
-        self.primary_lock = threading.Lock()
-        self.model_locks = defaultdict(lambda: threading.Lock())
-        self.cache = LRUCache(definitions.INFER_CACHE_SIZE)
-        self.cache_lock = threading.Lock()
+        self.cache = PredictionCache(definitions.INFER_CACHE_MAX_BYTES)
+        self.in_flight_predictions = InFlightPredictions()
+        self.loaded_models = LRUCache(definitions.LOADED_MODELS_CACHE_SIZE)
+        self.loaded_models_lock = threading.Lock()
+        self.model_loadings = {}  # model_id -> _ModelLoading, guarded by loaded_models_lock
         self.is_multiclass = is_multiclass
         self.zero_shot_enabled = False
         self.uses_category_name = uses_category_name
@@ -143,7 +163,8 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
         future = self.background_jobs_manager.add_background_job(self.train_and_update_status,
                                                                  args=(model_id, train_data, model_params),
                                                                  use_gpu=self.gpu_support,
-                                                                 done_callback=done_callback)
+                                                                 done_callback=done_callback,
+                                                                 priority=JobPriority.ITERATION)
 
         return model_id, future
 
@@ -153,7 +174,8 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
         """
         try:
             logging.info(f"starting training for model {model_id} of type {self.__class__.__name__}")
-            self._train(model_id, *args)
+            with ITERATION_STAGE_SECONDS.time(stage='train'):
+                self._train(model_id, *args)
             self.mark_train_as_completed(model_id)
             logging.info(f"done training model {model_id} of type {self.__class__.__name__}")
         except Exception:
@@ -161,17 +183,20 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
             self.mark_train_as_error(model_id)
             raise
 
+        self.warm_up_loaded_model(model_id)
         return model_id
 
     @staticmethod
     def _infer_item_to_cache_key(item: Mapping):
         """
-        returns the unique identifier of an item sent to inference. Currently an item consists only of a text field.
+        returns the unique identifier of an item sent to inference. Currently an item consists only of a text field,
+        and possibly its location in a dataset store, which does not affect its predictions and is omitted.
         * The return value is somewhat complex for backward compatability. In the next breaking change, this could
         be changed to items's text only
         """
-        return str(tuple(sorted(item.items())))
+        return str(tuple(sorted((key, value) for key, value in item.items() if key != DATASET_ROW_FIELD)))
 
+    @timed_span('inference')
     def infer_by_id(self, model_id, items_to_infer: Sequence[Mapping], use_cache=True) \
             -> Union[Sequence[Prediction], Sequence[MulticlassPrediction]]:
         """
@@ -194,21 +219,19 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
 
         items_cache_keys = [self._infer_item_to_cache_key(item) for item in items_to_infer]
 
-        # If there are multiple calls to infer_by_id() using the same *model_id*, we do not want them to perform the
-        # below logic at the same time. Specifically, if two calls are asking for prediction results for the same
-        # element, the desired behavior is that just one of the calls will perform inference (if necessary) and save the
-        # prediction results to the cache; after that, the other call can retrieve the results directly from the cache.
-        # Thus, we use a lock per model_id.
-        model_lock_object = self._get_model_lock_object(model_id)
-        with model_lock_object:
-            return get_from_memory_or_disk_or_infer(items_to_infer,
-                                                    self.cache_lock,
-                                                    self.cache,
-                                                    items_cache_keys,
-                                                    model_id,
-                                                    functools.partial(self._infer_by_id, model_id),
-                                                    self.get_prediction_class(),
-                                                    self.get_model_prediction_store_file(model_id))
+        # Predictions that are already in the in-memory cache are returned without any locking, so that they are
+        # not held up by a long inference call of the same model. If multiple calls to infer_by_id() are asking for
+        # prediction results for the same element, only one of the calls will perform inference (if necessary) and
+        # save the prediction results to the cache; the other calls wait for these results, and only for them.
+        return get_from_memory_or_disk_or_infer(items_to_infer,
+                                                self.cache,
+                                                self.in_flight_predictions,
+                                                items_cache_keys,
+                                                model_id,
+                                                functools.partial(self._infer_by_id, model_id),
+                                                self.get_prediction_class(),
+                                                self.get_model_prediction_store_dir(model_id),
+                                                self.get_model_prediction_store_file(model_id))
 
     def infer_by_id_async(self, model_id, items_to_infer: Sequence[Mapping], done_callback=None):
         """
@@ -222,12 +245,71 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
         :param done_callback: an optional function to be executed once the inference job has completed
         """
         self.background_jobs_manager.add_background_job(self.infer_by_id, args=(model_id, items_to_infer),
-                                                        use_gpu=self.gpu_support, done_callback=done_callback)
+                                                        use_gpu=self.gpu_support, done_callback=done_callback,
+                                                        priority=JobPriority.BULK)
 
     def _infer_by_id(self, model_id, items_to_infer):
-        model_components = self.load_model(model_path=self.get_model_dir_by_id(model_id))
+        model_components = self.get_loaded_model(model_id)
         return self.infer(model_components, items_to_infer)
 
+    def get_loaded_model(self, model_id):
+        """
+        Return the model components of *model_id*, as returned by load_model(). The most recently used models are kept
+        in memory, so that consecutive inference calls for the same model do not load it from disk again.
+        """
+        with self.loaded_models_lock:
+            model_components = self.loaded_models.get(model_id)
+            if model_components is not None:
+                return model_components
+            loading = self.model_loadings.setdefault(model_id, _ModelLoading())
+            loading.num_threads += 1
+        try:
+            # only one thread loads a given model, while models with a different model_id can be loaded at the same
+            # time
+            with loading.lock:
+                with self.loaded_models_lock:
+                    model_components = self.loaded_models.get(model_id)
+                    if model_components is None:
+                        model_components = loading.model_components
+                if model_components is None:
+                    logging.info(f"loading {self.__class__.__name__} model id {model_id}")
+                    model_components = self._load_model_by_id(model_id)
+                    with self.loaded_models_lock:
+                        loading.model_components = model_components
+                        # a model that was deleted while it was being loaded is not kept in memory
+                        if not loading.evicted:
+                            self.loaded_models.set(model_id, model_components)
+            return model_components
+        finally:
+            with self.loaded_models_lock:
+                loading.num_threads -= 1
+                if loading.num_threads == 0:
+                    del self.model_loadings[model_id]
+
+    def _load_model_by_id(self, model_id):
+        return self.load_model(model_path=self.get_model_dir_by_id(model_id))
+
+    def warm_up_loaded_model(self, model_id):
+        """
+        Load a newly trained model into memory, so that the first inference calls for the model do not wait for loading
+        it. Failures are only logged, as the model is loaded again upon inference.
+        """
+        try:
+            self.get_loaded_model(model_id)
+        except Exception:
+            logging.exception(f"failed to load {self.__class__.__name__} model id {model_id} into memory")
+
+    def evict_loaded_model(self, model_id):
+        """
+        Remove *model_id* from the loaded models. If the model is being loaded, it is not kept in memory once loaded.
+        """
+        with self.loaded_models_lock:
+            self.loaded_models.pop(model_id)
+            # the lock of a model that is being loaded is kept, so that other threads do not load the model meanwhile
+            loading = self.model_loadings.get(model_id)
+            if loading is not None:
+                loading.evicted = True
+
     def get_model_status(self, model_id) -> ModelStatus:
         if os.path.isfile(self.get_completed_flag_path(model_id)):
             return ModelStatus.READY
@@ -237,13 +319,20 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
 
     def delete_model(self, model_id):
         logging.info(f"Deleting {self.__class__.__name__} model id {model_id}")
+        self.evict_loaded_model(model_id)
         model_dir = self.get_model_dir_by_id(model_id)
         if os.path.isdir(model_dir):
             shutil.rmtree(model_dir)
-        prediction_store_path = self.get_model_prediction_store_file(model_id)
-        if os.path.exists(prediction_store_path):
-            logging.info(f"Deleting prediction store {prediction_store_path}")
-            os.remove(prediction_store_path)
+        prediction_store_dir = self.get_model_prediction_store_dir(model_id)
+        if os.path.isdir(prediction_store_dir):
+            logging.info(f"Deleting prediction store {prediction_store_dir}")
+        PredictionStore.delete(prediction_store_dir)
+        legacy_prediction_store_path = self.get_model_prediction_store_file(model_id)
+        if os.path.exists(legacy_prediction_store_path):
+            logging.info(f"Deleting prediction store {legacy_prediction_store_path}")
+            os.remove(legacy_prediction_store_path)
+        # the model may have been loaded from its directory while the directory was removed
+        self.evict_loaded_model(model_id)
 
     def mark_train_as_started(self, model_id):
         os.makedirs(self.get_model_dir_by_id(model_id), exist_ok=True)
@@ -273,13 +362,13 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
         model_metadata = {LANGUAGE_STR_KEY: language.name, **model_params}
 
         with open(metadata_path, 'w') as f:
-            f.write(jsonpickle_encode(model_metadata))
+            f.write(serialize(model_metadata))
 
     @staticmethod
     def get_metadata(model_path: str):
         metadata_path = os.path.join(model_path, 'model_metadata.json')
         with open(metadata_path, 'r') as f:
-            metadata = jsonpickle_decode(f.read())
+            metadata = deserialize(f.read())
         return metadata
 
     @staticmethod
@@ -287,7 +376,14 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
         language_name = ModelAPI.get_metadata(model_path)[LANGUAGE_STR_KEY]
         return getattr(Languages, language_name.upper())
 
+    def get_model_prediction_store_dir(self, model_id):
+        return os.path.join(self.get_models_dir(), PREDICTIONS_STORE_DIR_NAME, model_id)
+
     def get_model_prediction_store_file(self, model_id):
+        """
+        Returns the path of the json prediction store used by previous versions, which is migrated to the prediction
+        store in get_model_prediction_store_dir() when the model is next used for inference.
+        """
         return os.path.join(self.get_models_dir(), PREDICTIONS_STORE_DIR_NAME, model_id + ".json")
 
     def get_model_dir_by_id(self, model_id):
@@ -312,10 +408,3 @@ class ModelAPI(object, metaclass=abc.ABCMeta):
         shutil.copytree(model_path, output_path)
 
         return output_path
-
-    def _get_model_lock_object(self, model_id):
-        """
-        Get a lock for a model. self.primary_lock is necessary because self.model_locks is not thread safe
-        """
-        with self.primary_lock:
-            return self.model_locks[model_id]
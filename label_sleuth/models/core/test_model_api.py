@@ -15,7 +15,10 @@
 
 import random
 import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock
 
 from label_sleuth.models.core.languages import Languages
@@ -61,5 +64,65 @@ class TestModelAPI(unittest.TestCase):
         self.model_api.infer_by_id(model_id=self.model_id, items_to_infer=self.sentences1, use_cache=True)
         self.model_api._infer.assert_not_called()
 
+    def test_concurrent_misses_infer_once(self):
+        inferred_texts = []
+        infer = self.model_api.infer
+        inference_started = threading.Event()
+
+        def slow_infer(model_components, items_to_infer):
+            inferred_texts.extend(item['text'] for item in items_to_infer)
+            inference_started.set()
+            time.sleep(0.2)
+            return infer(model_components, items_to_infer)
+
+        self.model_api.infer = slow_infer
+        with ThreadPoolExecutor(2) as executor:
+            first = executor.submit(self.model_api.infer_by_id, self.model_id, self.sentences1)
+            inference_started.wait()
+            second = executor.submit(self.model_api.infer_by_id, self.model_id, self.sentences2)
+            second_predictions = second.result()
+            self.assertEqual(first.result(), [second_predictions[self.sentences2.index(sentence)]
+                                              for sentence in self.sentences1])
+        self.assertEqual(sorted(sentence['text'] for sentence in self.sentences2), sorted(inferred_texts),
+                         "each sentence should be inferred exactly once")
+
+    def test_loaded_model_is_kept_in_memory(self):
+        self.assertIsNotNone(self.model_api.loaded_models.get(self.model_id),
+                             "the model should be loaded into memory once training completes")
+        self.model_api.load_model = MagicMock(name='load_model')
+        self.model_api.infer_by_id(model_id=self.model_id, items_to_infer=self.sentences2, use_cache=False)
+        self.model_api.load_model.assert_not_called()
+
+        self.model_api.delete_model(self.model_id)
+        self.assertIsNone(self.model_api.loaded_models.get(self.model_id),
+                          "the model should be evicted from memory once it is deleted")
+
+    def test_concurrent_loads_load_once_and_deleted_model_is_not_kept(self):
+        self.model_api.evict_loaded_model(self.model_id)
+        load_model = self.model_api.load_model
+        loading_started = threading.Event()
+        release_loading = threading.Event()
+
+        def slow_load_model(model_path):
+            model_components = load_model(model_path)
+            loading_started.set()
+            release_loading.wait()
+            return model_components
+
+        self.model_api.load_model = MagicMock(side_effect=slow_load_model)
+        with ThreadPoolExecutor(2) as executor:
+            futures = [executor.submit(self.model_api.get_loaded_model, self.model_id) for _ in range(2)]
+            loading_started.wait()
+            while self.model_api.model_loadings[self.model_id].num_threads < 2:
+                time.sleep(0.01)
+            self.model_api.delete_model(self.model_id)
+            release_loading.set()
+            for future in futures:
+                future.result()
+        self.model_api.load_model.assert_called_once()
+        self.assertIsNone(self.model_api.loaded_models.get(self.model_id),
+                          "a model that was deleted while it was being loaded should not be kept in memory")
+        self.assertDictEqual({}, self.model_api.model_loadings)
+
     def tearDown(self):
         self.temp_dir.cleanup()
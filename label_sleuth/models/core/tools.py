@@ -42,7 +42,8 @@ from tqdm.auto import tqdm
 from label_sleuth import definitions
 from label_sleuth.models.core.languages import Language, Languages
 from label_sleuth.models.util.LRUCache import LRUCache
-from label_sleuth.models.util.caches_infer_funnel import get_from_memory_or_disk_or_infer
+from label_sleuth.models.util.prediction_cache import PredictionCache
+from label_sleuth.models.util.caches_infer_funnel import get_from_memory_or_disk_or_infer, InFlightPredictions
 
 
 class RepresentationType(Enum):
@@ -63,8 +64,8 @@ class SentenceEmbeddingService:
         os.makedirs(self.fasttext_models_path, exist_ok=True)
         self.spacy_models = defaultdict(lambda: None)
         self.spacy_model_lock = threading.Lock()
-        self.sbert_cache_lock = threading.Lock()
-        self.sbert_cache = LRUCache(definitions.INFER_CACHE_SIZE)
+        self.sbert_cache = PredictionCache(definitions.INFER_CACHE_MAX_BYTES)
+        self.sbert_in_flight_predictions = InFlightPredictions()
         if preload_spacy_model_name is not None:
             self.load_or_download_spacy_model(preload_spacy_model_name)
         if preload_fasttext_language_id is not None:
@@ -138,16 +139,18 @@ class SentenceEmbeddingService:
             future = self.background_jobs_manager.add_background_job(infer_all, (inputs,), True, None)
             return future.result()
 
+        embeddings_store_path = os.path.join(self.embedding_model_dir, "models", "sentence-transformers",
+                                             'predictions', model_name,
+                                             'other_dataset' if dataset_name is None else dataset_name)
         text_embeddings = get_from_memory_or_disk_or_infer([{'text':text} for text in texts],
-                                         self.sbert_cache_lock,
                                          self.sbert_cache,
+                                         self.sbert_in_flight_predictions,
                                          texts,
                                          model_name,
                                          _sbert_infer,
                                          list,
-                                         os.path.join(self.embedding_model_dir, "models", "sentence-transformers",
-                                                      'predictions', model_name,
-                                                      'other_dataset' if dataset_name is None else dataset_name))
+                                         f'{embeddings_store_path}.store',
+                                         embeddings_store_path)
 
 
 
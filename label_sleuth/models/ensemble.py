@@ -28,7 +28,7 @@ import numpy as np
 from label_sleuth.models.core.model_api import ModelAPI
 from label_sleuth.models.core.model_type import ModelType
 from label_sleuth.models.core.prediction import Prediction, MulticlassPrediction
-from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager, JobPriority
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s')
 
@@ -85,7 +85,7 @@ class Ensemble(ModelAPI):
         future = self.background_jobs_manager.add_background_job(
             self.wait_and_update_status,
             args=(ensemble_model_id, [future for model_id, future in model_ids_and_futures]),
-            use_gpu=self.gpu_support, done_callback=done_callback)
+            use_gpu=self.gpu_support, done_callback=done_callback, priority=JobPriority.ITERATION)
 
         return ensemble_model_id, future
 
@@ -107,6 +107,7 @@ class Ensemble(ModelAPI):
             self.mark_train_as_error(model_id)
             raise
 
+        self.warm_up_loaded_model(model_id)
         return model_id
 
     def _train(self, model_id: str, train_data: Sequence[Mapping], model_params: dict):
@@ -139,14 +140,13 @@ class Ensemble(ModelAPI):
             model_paths = [api_name_to_path[model_api.__class__.__name__] for model_api in self.model_apis]
         return model_paths
 
-    def _infer_by_id(self, model_id, items_to_infer):
+    def _load_model_by_id(self, model_id):
         """
-        We override ModelAPI._infer as we need to extract the paths to all of the models constituting the ensemble
+        We override ModelAPI._load_model_by_id as the ensemble is composed of the models constituting it, which are
+        loaded (or taken from memory) by their respective model apis
         """
-        model_paths = [model_api.get_model_dir_by_id(m_id)
-                       for m_id, model_api in zip(model_id.split(","), self.model_apis)]
-        model = self.load_model(model_path=model_paths)
-        return self.infer(model, items_to_infer)
+        return EnsembleComponents(models=[model_api.get_loaded_model(m_id)
+                                          for m_id, model_api in zip(model_id.split(","), self.model_apis)])
 
     def infer(self, ensemble: EnsembleComponents, items_to_infer) -> Union[Sequence[EnsemblePrediction],
                                                                            Sequence[MulticlassEnsemblePrediction]]:
@@ -185,6 +185,7 @@ class Ensemble(ModelAPI):
                 for label, score, type_to_prediction in zip(labels, aggregated_scores, type_to_prediction_per_element)]
 
     def delete_model(self, model_id):
+        self.evict_loaded_model(model_id)
         for model_api, m_id in zip(self.model_apis, model_id.split(",")):
             model_api.delete_model(m_id)
 
@@ -14,30 +14,40 @@
 #
 
 import logging
-import os
-import pickle
 
 from dataclasses import dataclass
 
 import numpy as np
 
-from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.naive_bayes import GaussianNB, MultinomialNB, _BaseNB
 
 from label_sleuth.models.core.languages import Language, Languages
 from label_sleuth.models.core.model_api import ModelAPI
 from label_sleuth.models.core.prediction import Prediction
 from label_sleuth.models.core.tools import RepresentationType, SentenceEmbeddingService
+from label_sleuth.models.util.process_jobs import create_bow_vectorizer, fit_bow_in_processes, \
+    infer_bow_in_processes, load_model_and_vectorizer, save_model_and_vectorizer
 from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s')
 
+BOW_MAX_FEATURES = 1000
+
 
 @dataclass
 class NaiveBayesModelComponents:
     model: _BaseNB
     vectorizer: None
     language: Language
+    additional_fields: dict
+
+
+def predict_naive_bayes(model, features):
+    """
+    :return: the class probabilities of the given features. This function may run in a worker process (see
+    infer_bow_in_processes()).
+    """
+    return model.predict_proba(features)
 
 
 class NaiveBayes(ModelAPI):
@@ -53,39 +63,44 @@ class NaiveBayes(ModelAPI):
             self.sentence_embedding_service = sentence_embedding_service
 
     def _train(self, model_id, train_data, model_params):
-        model = MultinomialNB() if self.representation_type == RepresentationType.BOW else GaussianNB()
+        train_data = train_data[:self.max_datapoints]
+        if self.representation_type == RepresentationType.BOW:
+            # bag-of-words features only depend on the texts, so the model can be fitted in a worker process
+            fit_bow_in_processes(self.background_jobs_manager, MultinomialNB(),
+                                 create_bow_vectorizer(BOW_MAX_FEATURES), train_data, self.get_model_dir_by_id(model_id))
+            return
+
+        model = GaussianNB()
         language = self.get_language(self.get_model_dir_by_id(model_id))
         texts = [x['text'] for x in train_data]
-        texts = texts[:self.max_datapoints]
         train_data_features, vectorizer = self.input_to_features(texts, language=language)
         labels = [x['label'] for x in train_data]
-        labels = labels[:self.max_datapoints]
         model.fit(train_data_features, labels)
-
-        with open(os.path.join(self.get_model_dir_by_id(model_id), "vectorizer"), "wb") as fl:
-            pickle.dump(vectorizer, fl)
-        with open(os.path.join(self.get_model_dir_by_id(model_id), "model"), "wb") as fl:
-            pickle.dump(model, fl)
+        save_model_and_vectorizer(self.get_model_dir_by_id(model_id), model, vectorizer)
 
     def load_model(self, model_path) -> NaiveBayesModelComponents:
-        with open(os.path.join(model_path, "model"), "rb") as fl:
-            model = pickle.load(fl)
-        with open(os.path.join(model_path, "vectorizer"), "rb") as fl:
-            vectorizer = pickle.load(fl)
+        model, vectorizer = load_model_and_vectorizer(model_path)
         language = self.get_language(model_path)
-        return NaiveBayesModelComponents(model=model, vectorizer=vectorizer, language=language)
+        return NaiveBayesModelComponents(model=model, vectorizer=vectorizer, language=language,
+                                         additional_fields={'model_path': model_path})
 
     def infer(self, model_components: NaiveBayesModelComponents, items_to_infer):
-        items_to_infer = [x['text'] for x in items_to_infer]
-        last_batch = 0
-        predictions = []
-        while last_batch < len(items_to_infer):
-            batch = items_to_infer[last_batch:last_batch + self.infer_batch_size]
-            last_batch += self.infer_batch_size
-            batch, _ = self.input_to_features(batch, language=model_components.language,
-                                              vectorizer=model_components.vectorizer)
-            predictions.append(model_components.model.predict_proba(batch))
-        predictions = np.concatenate(predictions, axis=0)
+        if self.representation_type == RepresentationType.BOW and self.background_jobs_manager.uses_processes():
+            results = infer_bow_in_processes(self.background_jobs_manager, predict_naive_bayes,
+                                             model_components.additional_fields['model_path'], items_to_infer,
+                                             self.infer_batch_size)
+            predictions = np.concatenate(results, axis=0) if len(results) > 0 else np.zeros((0, 2))
+        else:
+            items_to_infer = [x['text'] for x in items_to_infer]
+            last_batch = 0
+            predictions = []
+            while last_batch < len(items_to_infer):
+                batch = items_to_infer[last_batch:last_batch + self.infer_batch_size]
+                last_batch += self.infer_batch_size
+                batch, _ = self.input_to_features(batch, language=model_components.language,
+                                                  vectorizer=model_components.vectorizer)
+                predictions.append(model_components.model.predict_proba(batch))
+            predictions = np.concatenate(predictions, axis=0)
 
         labels = [bool(np.argmax(prediction)) for prediction in predictions]
         # The True label is in the second position as sorted([True, False]) is [False, True]
@@ -95,8 +110,7 @@ class NaiveBayes(ModelAPI):
     def input_to_features(self, texts, language=Languages.ENGLISH, vectorizer=None):
         if self.representation_type == RepresentationType.BOW:
             if vectorizer is None:
-                vectorizer = CountVectorizer(analyzer="word", tokenizer=None, preprocessor=None, stop_words=None,
-                                             lowercase=True, max_features=1000)
+                vectorizer = create_bow_vectorizer(BOW_MAX_FEATURES)
                 train_data_features = vectorizer.fit_transform(texts)
                 return train_data_features, vectorizer
             else:
@@ -57,6 +57,7 @@ class RandomModel(ModelAPI):
         return ModelStatus.ERROR
 
     def delete_model(self, model_id):
+        self.evict_loaded_model(model_id)
         if model_id in self.model_id_to_random_seed:
             self.model_id_to_random_seed.pop(model_id)
 
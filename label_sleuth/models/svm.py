@@ -15,7 +15,6 @@
 
 import logging
 import os
-import pickle
 
 from dataclasses import dataclass
 from typing import Union
@@ -23,16 +22,19 @@ from typing import Union
 import numpy as np
 
 import sklearn.svm
-from sklearn.feature_extraction.text import CountVectorizer
 
 from label_sleuth.models.core.languages import Language, Languages
 from label_sleuth.models.core.model_api import ModelAPI, ModelStatus
 from label_sleuth.models.core.prediction import Prediction, MulticlassPrediction
 from label_sleuth.models.core.tools import RepresentationType, SentenceEmbeddingService
+from label_sleuth.models.util.process_jobs import create_bow_vectorizer, fit_bow_in_processes, \
+    infer_bow_in_processes, load_model_and_vectorizer, save_model_and_vectorizer
 from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s')
 
+BOW_MAX_FEATURES = 10000
+
 
 @dataclass
 class SVMModelComponents:
@@ -42,6 +44,24 @@ class SVMModelComponents:
     additional_fields: dict
 
 
+def create_svm(kernel) -> Union[sklearn.svm.LinearSVC, sklearn.svm.SVC]:
+    if kernel == "linear":
+        return sklearn.svm.LinearSVC(dual=True)
+    elif kernel == "rbf":
+        logging.warning("Using some arbitrary low gamma, gamma and C values might be better with tuning")
+        return sklearn.svm.SVC(gamma=1e-08)
+    else:
+        raise ValueError("Unknown kernel type")
+
+
+def predict_svm(model, features):
+    """
+    :return: the predicted labels and the class probabilities of the given features. This function may run in a worker
+    process (see infer_bow_in_processes()).
+    """
+    return model.predict(features).tolist(), SVM.get_probs(model, features)
+
+
 class SVM(ModelAPI):
     def __init__(self, output_dir, representation_type: RepresentationType,
                  background_jobs_manager: BackgroundJobsManager, sentence_embedding_service: SentenceEmbeddingService,
@@ -53,38 +73,31 @@ class SVM(ModelAPI):
             self.sentence_embedding_service = sentence_embedding_service
 
     def _train(self, model_id, train_data, model_params):
-        if self.kernel == "linear":
-            model = sklearn.svm.LinearSVC(dual=True)
-        elif self.kernel == "rbf":
-            logging.warning("Using some arbitrary low gamma, gamma and C values might be better with tuning")
-            model = sklearn.svm.SVC(gamma=1e-08)
-        else:
-            raise ValueError("Unknown kernel type")
+        model_dir = self.get_model_dir_by_id(model_id)
+        if self.representation_type == RepresentationType.BOW:
+            # bag-of-words features only depend on the texts, so the model can be fitted in a worker process
+            fit_bow_in_processes(self.background_jobs_manager, create_svm(self.kernel),
+                                 create_bow_vectorizer(BOW_MAX_FEATURES), train_data, model_dir)
+            return
 
-        language = self.get_language(self.get_model_dir_by_id(model_id))
         texts = [x['text'] for x in train_data]
+        labels = np.array([x['label'] for x in train_data])
+        model = create_svm(self.kernel)
+        language = self.get_language(model_dir)
         train_data_features, vectorizer = self.input_to_features(texts, language=language,
                                                                  dataset_name=model_params.get('dataset_name'))
-        labels = np.array([x['label'] for x in train_data])
-
         model.fit(train_data_features, labels)
-        with open(os.path.join(self.get_model_dir_by_id(model_id), "vectorizer"), "wb") as fl:
-            pickle.dump(vectorizer, fl)
-        with open(os.path.join(self.get_model_dir_by_id(model_id), "model"), "wb") as fl:
-            pickle.dump(model, fl)
+        save_model_and_vectorizer(model_dir, model, vectorizer)
 
         if self.representation_type == RepresentationType.WORD_EMBEDDING and language.spacy_model_name is not None:
             with open(os.path.join(self.get_model_dir_by_id(model_id), "spacy_version.txt"), "w") as fl:
                 fl.write(self.sentence_embedding_service.get_spacy_model_version(language))
 
     def load_model(self, model_path) -> SVMModelComponents:
-        with open(os.path.join(model_path, "model"), "rb") as fl:
-            model = pickle.load(fl)
-        with open(os.path.join(model_path, "vectorizer"), "rb") as fl:
-            vectorizer = pickle.load(fl)
+        model, vectorizer = load_model_and_vectorizer(model_path)
         language = self.get_language(model_path)
         dataset_name = self.get_metadata(model_path).get("dataset_name")
-        additional_fields = {'dataset_name': dataset_name}
+        additional_fields = {'dataset_name': dataset_name, 'model_path': model_path}
         if self.representation_type == RepresentationType.WORD_EMBEDDING and language.spacy_model_name is not None:
             spacy_version_file = os.path.join(model_path, "spacy_version.txt")
             if os.path.exists(spacy_version_file):
@@ -105,19 +118,28 @@ class SVM(ModelAPI):
                 raise Exception("This model is incompatible with the current version of Label Sleuth. To perform "
                                 "inference using this model, please downgrade to version 0.14.0 or earlier.")
 
-        features_all_texts, _ = self.input_to_features\
-            ([x['text'] for x in items_to_infer],
-           language=model_components.language,
-           vectorizer=model_components.vectorizer,
-           dataset_name=model_components.additional_fields.get('dataset_name'))
-        labels = model_components.model.predict(features_all_texts).tolist()
+        if self.representation_type == RepresentationType.BOW and self.background_jobs_manager.uses_processes():
+            results = infer_bow_in_processes(self.background_jobs_manager, predict_svm,
+                                             model_components.additional_fields['model_path'], items_to_infer)
+            labels = [label for batch_labels, _ in results for label in batch_labels]
+            probs = np.concatenate([batch_probs for _, batch_probs in results]) if len(results) > 0 \
+                else np.zeros((0, 2))
+        else:
+            texts = [x['text'] for x in items_to_infer]
+            features_all_texts, _ = self.input_to_features\
+                (texts,
+                 language=model_components.language,
+                 vectorizer=model_components.vectorizer,
+                 dataset_name=model_components.additional_fields.get('dataset_name'))
+            labels = model_components.model.predict(features_all_texts).tolist()
+            probs = self.get_probs(model_components.model, features_all_texts)
         if self.is_multiclass:
             all_classes = model_components.model.classes_
             return [MulticlassPrediction(label=label, scores=dict(zip(all_classes, scores.tolist())))
-                    for label, scores in zip(labels, self.get_probs(model_components.model, features_all_texts))]
+                    for label, scores in zip(labels, probs)]
         else:
             # The True label is in the second position as sorted([True, False]) is [False, True]
-            scores = [probs[1] for probs in self.get_probs(model_components.model, features_all_texts)]
+            scores = [text_probs[1] for text_probs in probs]
             return [Prediction(label=label, score=score) for label, score in zip(labels, scores)]
 
     @staticmethod
@@ -134,8 +156,7 @@ class SVM(ModelAPI):
     def input_to_features(self, texts, language=Languages.ENGLISH, vectorizer=None,dataset_name=None):
         if self.representation_type == RepresentationType.BOW:
             if vectorizer is None:
-                vectorizer = CountVectorizer(analyzer="word", tokenizer=None, preprocessor=None, stop_words=None,
-                                             lowercase=True, max_features=10000)
+                vectorizer = create_bow_vectorizer(BOW_MAX_FEATURES)
                 train_data_features = vectorizer.fit_transform(texts)
                 return train_data_features, vectorizer
             else:
@@ -0,0 +1,72 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import os
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+
+from label_sleuth.data_access.file_based.dataset_store import DatasetStore
+from label_sleuth.data_access.file_based.uri_index import hash_strings
+from label_sleuth.models.core.languages import Languages
+from label_sleuth.models.core.model_api import DATASET_ROW_FIELD, ModelStatus
+from label_sleuth.models.core.tools import SentenceEmbeddingService
+from label_sleuth.models.naive_bayes import NaiveBayes_BOW
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
+
+
+class TestNaiveBayesModel(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.texts = [f'{topic} text number {i}' for i in range(30) for topic in ['cookies', 'arbitration']]
+        self.labels = [i % 2 == 0 for i in range(len(self.texts))]
+        self.store_dir = os.path.join(self.temp_dir.name, 'dataset_store')
+        df = pd.DataFrame({'uri': [f'dataset-doc-{i}' for i in range(len(self.texts))], 'text': self.texts,
+                           'span': [[(0, len(text))] for text in self.texts], 'metadata': [{}] * len(self.texts),
+                           'text_unique_id': list(range(len(self.texts)))})
+        DatasetStore(self.store_dir).write(df, pd.DataFrame({'uri': ['dataset-doc'], 'num_elements': [len(df)],
+                                                             'metadata': [{}]}),
+                                           {'uri_hash': hash_strings(df['uri'].tolist())})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _train(self, model, train_data):
+        model_id = model.train(train_data, Languages.ENGLISH, {})[0]
+        while model.get_model_status(model_id) != ModelStatus.READY:
+            time.sleep(0.1)
+        return model_id
+
+    def test_nb_bow_train_and_infer(self):
+        model = NaiveBayes_BOW(self.temp_dir.name, BackgroundJobsManager(),
+                               SentenceEmbeddingService(self.temp_dir.name, background_jobs_manager=None))
+        model_id = self._train(model, [{'text': text, 'label': label} for text, label in zip(self.texts, self.labels)])
+        predictions = model.infer_by_id(model_id, [{'text': 'cookies text'}, {'text': 'arbitration text'}])
+        self.assertListEqual([True, False], [prediction.label for prediction in predictions])
+
+    def test_nb_bow_reads_texts_from_the_dataset_store_in_worker_processes(self):
+        background_jobs_manager = BackgroundJobsManager(process_workers=2)
+        model = NaiveBayes_BOW(self.temp_dir.name, background_jobs_manager,
+                               SentenceEmbeddingService(self.temp_dir.name, background_jobs_manager=None))
+        # the texts of the items are not sent to the workers, so wrong texts would result in wrong predictions
+        model_id = self._train(model, [{'text': '', 'label': label, DATASET_ROW_FIELD: (self.store_dir, row)}
+                                       for row, label in enumerate(self.labels)])
+        items = [{'text': '', DATASET_ROW_FIELD: (self.store_dir, row)} for row in [3, 0, 1, 2]]
+        predictions = model.infer_by_id(model_id, items, use_cache=False)
+        self.assertListEqual([False, True, False, True], [prediction.label for prediction in predictions])
+        background_jobs_manager.shutdown()
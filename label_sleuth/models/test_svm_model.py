@@ -13,12 +13,17 @@
 #  limitations under the License.
 #
 
+import os
 import tempfile
 import time
 import unittest
 
+import pandas as pd
+
+from label_sleuth.data_access.file_based.dataset_store import DatasetStore
+from label_sleuth.data_access.file_based.uri_index import hash_strings
 from label_sleuth.models.core.languages import Languages
-from label_sleuth.models.core.model_api import ModelStatus
+from label_sleuth.models.core.model_api import DATASET_ROW_FIELD, ModelStatus
 from label_sleuth.models.core.tools import SentenceEmbeddingService
 from label_sleuth.models.svm import MulticlassSVM_BOW
 from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
@@ -33,7 +38,42 @@ class TestEnsembleModel(unittest.TestCase):
                                      SentenceEmbeddingService(self.temp_dir.name,background_jobs_manager=None))
 
     def test_svm_bow_train_and_infer(self):
-        model_id = self.svm.train(
+        self._test_train_and_infer(self.svm)
+
+    def test_svm_bow_train_and_infer_in_worker_processes(self):
+        background_jobs_manager = BackgroundJobsManager(process_workers=2)
+        svm = MulticlassSVM_BOW(self.temp_dir.name, background_jobs_manager,
+                                SentenceEmbeddingService(self.temp_dir.name, background_jobs_manager=None))
+        self._test_train_and_infer(svm)
+        background_jobs_manager.shutdown()
+
+    def test_svm_bow_reads_texts_from_the_dataset_store_in_worker_processes(self):
+        texts = [f'{topic} text number {i}' for i in range(30) for topic in ['cookies', 'arbitration', 'license']]
+        labels = [i % 3 for i in range(len(texts))]
+        store_dir = os.path.join(self.temp_dir.name, 'dataset_store')
+        df = pd.DataFrame({'uri': [f'dataset-doc-{i}' for i in range(len(texts))], 'text': texts,
+                           'span': [[(0, len(text))] for text in texts], 'metadata': [{}] * len(texts),
+                           'text_unique_id': list(range(len(texts)))})
+        DatasetStore(store_dir).write(df, pd.DataFrame({'uri': ['dataset-doc'], 'num_elements': [len(texts)],
+                                                        'metadata': [{}]}),
+                                      {'uri_hash': hash_strings(df['uri'].tolist())})
+
+        background_jobs_manager = BackgroundJobsManager(process_workers=2)
+        svm = MulticlassSVM_BOW(self.temp_dir.name, background_jobs_manager,
+                                SentenceEmbeddingService(self.temp_dir.name, background_jobs_manager=None))
+        # the texts of the items are not sent to the workers, so wrong texts would result in wrong predictions
+        train_data = [{'text': '', 'label': label, DATASET_ROW_FIELD: (store_dir, row)}
+                      for row, label in enumerate(labels)]
+        model_id = svm.train(train_data, Languages.ENGLISH, {})[0]
+        while svm.get_model_status(model_id) != ModelStatus.READY:
+            time.sleep(0.1)
+        items = [{'text': '', DATASET_ROW_FIELD: (store_dir, row)} for row in [2, 0, 1, 4, 3]]
+        predictions = svm.infer_by_id(model_id, items, use_cache=False)
+        self.assertListEqual([2, 0, 1, 1, 0], [prediction.label for prediction in predictions])
+        background_jobs_manager.shutdown()
+
+    def _test_train_and_infer(self, svm):
+        model_id = svm.train(
             [
                 {
                     "text": "If you choose to decline cookies, some parts of the Airbnb Platform may not work as intended or may not work at all.",
@@ -85,7 +125,7 @@ class TestEnsembleModel(unittest.TestCase):
             ], Languages.ENGLISH,
             {"category_id_to_info": {0: {"category_name": "cookies"}}})[0]
 
-        while self.svm.get_model_status(model_id) != ModelStatus.READY:
+        while svm.get_model_status(model_id) != ModelStatus.READY:
             time.sleep(0.1)
 
         input_texts = [
@@ -96,7 +136,7 @@ class TestEnsembleModel(unittest.TestCase):
             "Get In Touch Chat with Sales Akamai will record this transcript.",
             "These Data Partners will provide us with additional information about you (such as your interests, preferences or demographic information)."
         ]
-        preds = self.svm.infer_by_id(model_id, [{"text": text} for text in input_texts], use_cache=False)
+        preds = svm.infer_by_id(model_id, [{"text": text} for text in input_texts], use_cache=False)
         for pred in preds:
             self.assertIn(pred.label, [0, 2, 3])
             self.assertEqual(1, round(sum(pred.scores.values()), 5))
@@ -1,3 +1,4 @@
+import threading
 from collections import OrderedDict
 
 
@@ -9,18 +10,58 @@ class LRUCache:
     def __init__(self, capacity):
         self.capacity = capacity
         self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stats_lock = threading.Lock()
 
     def get(self, key):
-        if key in self.cache:
+        # each OrderedDict operation is atomic, so a concurrent set() that evicts *key* results in a miss rather than an
+        # error, and get() can be called without holding the lock that guards set()
+        try:
+            value = self.cache[key]
             self.cache.move_to_end(key)
-            return self.cache[key]
-        return None
+        except KeyError:
+            with self.stats_lock:
+                self.misses += 1
+            return None
+        with self.stats_lock:
+            self.hits += 1
+        return value
+
+    def peek(self, key):
+        """
+        Get the value of *key* without marking it as recently used
+        """
+        return self.cache.get(key)
 
     def set(self, key, value):
         self.cache[key] = value
         self.cache.move_to_end(key)
         if len(self.cache) > self.capacity:
-            self.cache.popitem(last=False)
+            self.pop_least_recently_used()
+
+    def replace(self, key, value):
+        """
+        Replace the value of *key*, which is in the cache, without marking it as recently used
+        """
+        self.cache[key] = value
+
+    def pop(self, key):
+        return self.cache.pop(key, None)
+
+    def pop_least_recently_used(self):
+        """
+        Remove the least recently used item from the cache, and return its key and value
+        """
+        key, value = self.cache.popitem(last=False)
+        with self.stats_lock:
+            self.evictions += 1
+        return key, value
 
     def get_current_size(self):
         return len(self.cache)
+
+    def get_stats(self) -> dict:
+        with self.stats_lock:
+            return {'items': len(self.cache), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
@@ -1,58 +1,138 @@
 import logging
+import threading
+from concurrent.futures import Future
 
-from label_sleuth.models.util.disk_cache import save_model_prediction_store_to_disk, \
-    load_model_prediction_store_from_disk
+from label_sleuth.models.util.prediction_store import PredictionStore
 
 
-def get_from_memory_or_disk_or_infer(items_to_infer, cache_lock, memory_cache, item_cache_keys, model_id,
-                                     infer_function, prediction_class, model_prediction_store_file):
+class InFlightPredictions:
+    """
+    Keeps track of the predictions that are currently being read from the disk or inferred. Concurrent requests for
+    the predictions of the same items wait for the request that is already computing them, instead of computing them
+    again, so each missing prediction is computed only once (single-flight).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.futures = {}
+
+    def claim(self, cache_keys):
+        """
+        :param cache_keys: keys of predictions that are missing from the in memory cache
+        :return: the keys whose predictions should be computed by the caller, and a mapping from the rest of the keys
+        to futures for their predictions, which are computed by other callers
+        """
+        claimed_keys = []
+        key_to_future = {}
+        with self.lock:
+            for key in cache_keys:
+                if key in key_to_future:
+                    continue
+                if key in self.futures:
+                    key_to_future[key] = self.futures[key]
+                else:
+                    self.futures[key] = Future()
+                    claimed_keys.append(key)
+        return claimed_keys, key_to_future
+
+    def resolve(self, key_to_prediction):
+        with self.lock:
+            futures = [(self.futures.pop(key), prediction) for key, prediction in key_to_prediction.items()]
+        for future, prediction in futures:
+            future.set_result(prediction)
+
+    def fail(self, cache_keys, exception):
+        with self.lock:
+            futures = [self.futures.pop(key) for key in cache_keys if key in self.futures]
+        for future in futures:
+            future.set_exception(exception)
+
+
+def get_from_memory_or_disk_or_infer(items_to_infer, memory_cache, in_flight_predictions, item_cache_keys, model_id,
+                                     infer_function, prediction_class, model_prediction_store_dir,
+                                     legacy_prediction_store_file=None):
     """
     try to get the inference results from the in memory cache. If item is not in the in memory cache, read the disk
-    cache, if item is not in the disk cache, run inference
+    cache, if item is not in the disk cache, run inference. Only the predictions of items that are missing from the in
+    memory cache are read from the disk cache, and only newly inferred predictions are appended to it.
+    Items that are found in the in memory cache are returned without waiting for other calls; missing items that are
+    already being read or inferred by another call are awaited rather than inferred again.
     """
-    in_memory_cache_keys = [(model_id, key) for key in item_cache_keys]
-    with cache_lock:  # we avoid different threads reading and writing to the cache at the same time
-        infer_res = [memory_cache.get(cache_key) for cache_key in in_memory_cache_keys]
+    in_memory_cache_keys = [memory_cache.get_cache_key(model_id, key) for key in item_cache_keys]
+    # the in memory cache is read without taking a lock, as only writes to the cache are serialized
+    infer_res = [memory_cache.get(cache_key) for cache_key in in_memory_cache_keys]
 
     indices_not_in_cache = [i for i, v in enumerate(infer_res) if v is None]
+    if len(indices_not_in_cache) == 0:
+        return infer_res
+
+    # If duplicates exist, do not infer the same item more than once
+    cache_key_to_idx = {}
+    for idx in indices_not_in_cache:
+        cache_key_to_idx.setdefault(in_memory_cache_keys[idx], idx)
+    claimed_keys, key_to_future = in_flight_predictions.claim(list(cache_key_to_idx.keys()))
+    key_to_prediction = {}
+    try:
+        if len(claimed_keys) > 0:
+            _read_or_infer_claimed(claimed_keys, cache_key_to_idx, key_to_prediction, items_to_infer, memory_cache,
+                                   in_flight_predictions, item_cache_keys, model_id, infer_function,
+                                   prediction_class, model_prediction_store_dir, legacy_prediction_store_file)
+    except BaseException as e:
+        in_flight_predictions.fail(claimed_keys, e)
+        raise
 
-    if len(indices_not_in_cache) > 0:  # i.e., some items aren't in the in-memory cache
-        logging.info(f"{len(indices_not_in_cache)} not in cache, loading model prediction store from disk "
+    if len(key_to_future) > 0:
+        logging.info(f"model id {model_id}, waiting for {len(key_to_future)} values that are being inferred by "
+                     f"another call")
+        for key, future in key_to_future.items():
+            key_to_prediction[key] = future.result()
+
+    for idx in indices_not_in_cache:
+        infer_res[idx] = key_to_prediction[in_memory_cache_keys[idx]]
+    return infer_res
+
+
+def _read_or_infer_claimed(claimed_keys, cache_key_to_idx, key_to_prediction, items_to_infer, memory_cache,
+                           in_flight_predictions, item_cache_keys, model_id, infer_function,
+                           prediction_class, model_prediction_store_dir, legacy_prediction_store_file):
+    """
+    Get the predictions of the *claimed_keys* from the in memory cache (as they may have been added by another call
+    since the first lookup), the disk cache, or by running inference, and resolve them for any waiting calls.
+    """
+    for key in claimed_keys:
+        prediction = memory_cache.get(key)
+        if prediction is not None:
+            key_to_prediction[key] = prediction
+    missing_keys = [key for key in claimed_keys if key not in key_to_prediction]
+
+    if len(missing_keys) > 0:  # i.e., some items aren't in the in-memory cache
+        logging.info(f"{len(missing_keys)} not in cache, reading model prediction store from disk "
                      f"in for model {model_id}")
-        model_predictions_store = load_model_prediction_store_from_disk(model_prediction_store_file, prediction_class)
-        for key, value in model_predictions_store.items():
-            memory_cache.set((model_id, key), value)
-        logging.info(f"done loading model prediction store from disk for "
+        model_predictions_store = PredictionStore.get(model_prediction_store_dir, prediction_class,
+                                                      legacy_prediction_store_file)
+        stored_predictions = model_predictions_store.get_predictions([item_cache_keys[cache_key_to_idx[key]]
+                                                                      for key in missing_keys])
+        found_keys = [key for key, prediction in zip(missing_keys, stored_predictions) if prediction is not None]
+        found_predictions = [prediction for prediction in stored_predictions if prediction is not None]
+        key_to_prediction.update(zip(found_keys, found_predictions))
+        memory_cache.set_many(found_keys, found_predictions)
+        logging.info(f"done reading model prediction store from disk for "
                      f"id {model_id}")
-        for idx in indices_not_in_cache:
-            infer_res[idx] = memory_cache.get(in_memory_cache_keys[idx])
-        indices_not_in_cache = [i for i, v in enumerate(infer_res) if v is None]
+        missing_keys = [key for key in missing_keys if key not in key_to_prediction]
+    # calls waiting for predictions that were found do not need to wait for the inference below
+    in_flight_predictions.resolve({key: key_to_prediction[key] for key in claimed_keys if key in key_to_prediction})
 
-    if len(indices_not_in_cache) > 0:  # i.e., some items aren't in the in-memory cache or the prediction store
-        logging.info(f"model id {model_id}, {len(items_to_infer) - len(indices_not_in_cache)} already in cache,"
-                     f" running inference for {len(indices_not_in_cache)} values "
+    if len(missing_keys) > 0:  # i.e., some items aren't in the in-memory cache or the prediction store
+        logging.info(f"model id {model_id}, {len(items_to_infer) - len(missing_keys)} already in cache,"
+                     f" running inference for {len(missing_keys)} values "
                      f"(cache size {memory_cache.get_current_size()})")
-        missing_items_to_infer = [items_to_infer[idx] for idx in indices_not_in_cache]
-        # If duplicates exist, do not infer the same item more than once
-        uniques = set()
-        uniques_to_infer = [e for e in missing_items_to_infer if frozenset(e.items()) not in uniques
-                            and not uniques.add(frozenset(e.items()))]
-
         # Run inference using the model for the missing elements
-        new_predictions = infer_function(uniques_to_infer)
-        logging.info(f"model id {model_id} finished running infer for {len(indices_not_in_cache)} values")
-
-        item_to_prediction = {frozenset(unique_item.items()): item_predictions
-                              for unique_item, item_predictions in zip(uniques_to_infer, new_predictions)}
-
+        new_predictions = infer_function([items_to_infer[cache_key_to_idx[key]] for key in missing_keys])
+        logging.info(f"model id {model_id} finished running infer for {len(missing_keys)} values")
 
         # Update cache and prediction store with predictions for the newly inferred elements
-        with cache_lock:
-            for idx, entry in zip(indices_not_in_cache, missing_items_to_infer):
-                prediction = item_to_prediction[frozenset(entry.items())]
-                infer_res[idx] = prediction
-                memory_cache.set(in_memory_cache_keys[idx], prediction)
-                model_predictions_store[item_cache_keys[idx]] = prediction
-        save_model_prediction_store_to_disk(model_prediction_store_file,
-                                            model_predictions_store)
-    return infer_res
\ No newline at end of file
+        key_to_prediction.update(zip(missing_keys, new_predictions))
+        memory_cache.set_many(missing_keys, new_predictions)
+        model_predictions_store.add_predictions([item_cache_keys[cache_key_to_idx[key]] for key in missing_keys],
+                                                new_predictions)
+        in_flight_predictions.resolve({key: key_to_prediction[key] for key in missing_keys})
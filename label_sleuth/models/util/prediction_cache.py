@@ -0,0 +1,157 @@
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+import xxhash
+
+from label_sleuth.models.core.prediction import MulticlassPrediction, Prediction
+from label_sleuth.models.util.LRUCache import LRUCache
+
+# approximate memory used by each cache entry besides its prediction: the OrderedDict node, the key tuple and the
+# 128-bit key hash
+ENTRY_OVERHEAD_BYTES = 200
+# approximate memory used by a prediction that cannot be packed into a slab (e.g. an ensemble prediction)
+UNPACKED_PREDICTION_BYTES = 1000
+# once less than this fraction of the rows of a slab are in the cache, the remaining rows are copied to a smaller slab
+# and the original slab is released
+SLAB_COMPACTION_LIVE_FRACTION = 0.5
+
+
+class PredictionSlab:
+    """
+    The predictions of a batch of items, packed into numpy arrays: a label array and a score array for binary
+    predictions, a label array and a scores matrix for multiclass predictions, or a matrix of vectors (e.g. embeddings).
+    Cache entries refer to a row of a slab, and the prediction object is recreated when the entry is read.
+    """
+
+    def __init__(self, kind, labels: Optional[np.ndarray], values: np.ndarray, classes: Optional[tuple] = None,
+                 cache_keys: Sequence = ()):
+        self.kind = kind
+        self.labels = labels
+        self.values = values
+        self.classes = classes
+        self.cache_keys = cache_keys  # the cache key of each row
+        self.num_live_rows = len(values)  # the number of rows that are referred to by cache entries
+        self.nbytes = values.nbytes + (labels.nbytes if labels is not None else 0)
+
+    @classmethod
+    def pack(cls, predictions: Sequence, cache_keys: Sequence) -> Optional['PredictionSlab']:
+        """
+        :return: a slab with the given predictions, or None if they cannot be packed
+        """
+        if all(type(p) is Prediction for p in predictions):
+            return cls('binary', np.array([p.label for p in predictions], dtype=bool),
+                       np.array([p.score for p in predictions], dtype=np.float64), cache_keys=cache_keys)
+        if all(type(p) is MulticlassPrediction and type(p.scores) == dict for p in predictions):
+            classes = tuple(predictions[0].scores.keys())
+            if any(tuple(p.scores.keys()) != classes for p in predictions):
+                return None
+            return cls('multiclass', np.array([p.label for p in predictions], dtype=np.int64),
+                       np.array([list(p.scores.values()) for p in predictions], dtype=np.float64), classes,
+                       cache_keys)
+        if all(type(p) is list for p in predictions) and len({len(p) for p in predictions}) == 1:
+            return cls('vector', None, np.array(predictions, dtype=np.float64), cache_keys=cache_keys)
+        return None
+
+    def take(self, rows: Sequence[int]) -> 'PredictionSlab':
+        """
+        :return: a new slab with the given rows of this slab
+        """
+        return PredictionSlab(self.kind, self.labels[rows] if self.labels is not None else None, self.values[rows],
+                              self.classes, [self.cache_keys[row] for row in rows])
+
+    def get(self, row):
+        if self.kind == 'binary':
+            return Prediction(label=self.labels[row], score=self.values[row])
+        if self.kind == 'multiclass':
+            return MulticlassPrediction(label=self.labels[row], scores=dict(zip(self.classes, self.values[row].tolist())))
+        return self.values[row].tolist()
+
+
+class PredictionCache:
+    """
+    An in-memory LRU cache of model predictions, bounded by the approximate number of bytes it uses.
+
+    Items are keyed by the model id and a 128-bit hash of the item cache key (rather than the key itself, which
+    contains the full element text), and predictions that are added together are packed into a PredictionSlab. The
+    memory of a slab is counted in full for as long as any of its rows is in the cache; when most of the rows of a slab
+    were evicted, the remaining rows are copied to a smaller slab, so a few frequently used rows do not keep a large
+    slab in memory.
+    """
+
+    def __init__(self, max_bytes, max_items=None):
+        self.lru = LRUCache(capacity=float('inf'))
+        self.max_bytes = max_bytes
+        self.max_items = max_items if max_items is not None else float('inf')
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_cache_key(model_id, item_cache_key: str):
+        return model_id, xxhash.xxh3_128_intdigest(item_cache_key.encode('utf-8'))
+
+    def get(self, cache_key):
+        entry = self.lru.get(cache_key)
+        if entry is None:
+            return None
+        slab, row = entry
+        return slab.get(row) if slab is not None else row
+
+    def set_many(self, cache_keys: Sequence, predictions: Sequence):
+        if len(cache_keys) == 0:
+            return
+        slab = PredictionSlab.pack(predictions, cache_keys)
+        with self.lock:
+            if slab is not None:
+                self.current_bytes += slab.nbytes
+            for idx, (cache_key, prediction) in enumerate(zip(cache_keys, predictions)):
+                self._release(self.lru.pop(cache_key))
+                if slab is not None:
+                    self.lru.set(cache_key, (slab, idx))
+                    self.current_bytes += ENTRY_OVERHEAD_BYTES
+                else:
+                    self.lru.set(cache_key, (None, prediction))
+                    self.current_bytes += ENTRY_OVERHEAD_BYTES + UNPACKED_PREDICTION_BYTES
+            while self.lru.get_current_size() > 1 and \
+                    (self.current_bytes > self.max_bytes or self.lru.get_current_size() > self.max_items):
+                _, entry = self.lru.pop_least_recently_used()
+                self._release(entry)
+
+    def _release(self, entry):
+        """
+        Update the memory accounting for a cache entry that was removed, and release or compact its slab once it is
+        no longer needed
+        """
+        if entry is None:
+            return
+        slab, row = entry
+        if slab is None:
+            self.current_bytes -= ENTRY_OVERHEAD_BYTES + UNPACKED_PREDICTION_BYTES
+            return
+        self.current_bytes -= ENTRY_OVERHEAD_BYTES
+        slab.num_live_rows -= 1
+        if slab.num_live_rows == 0:
+            self.current_bytes -= slab.nbytes
+        elif slab.num_live_rows < len(slab.values) * SLAB_COMPACTION_LIVE_FRACTION:
+            self._compact(slab)
+
+    def _compact(self, slab: PredictionSlab):
+        live_rows = []
+        for row, cache_key in enumerate(slab.cache_keys):
+            entry = self.lru.peek(cache_key)
+            if entry is not None and entry[0] is slab and entry[1] == row:
+                live_rows.append(row)
+        compacted = slab.take(live_rows)
+        for new_row, cache_key in enumerate(compacted.cache_keys):
+            self.lru.replace(cache_key, (compacted, new_row))
+        self.current_bytes += compacted.nbytes - slab.nbytes
+        slab.num_live_rows = 0
+
+    def get_current_size(self):
+        return self.lru.get_current_size()
+
+    def get_stats(self) -> dict:
+        """
+        :return: the number of items and approximate bytes in the cache, and the number of hits, misses and evictions
+        """
+        return {**self.lru.get_stats(), 'bytes': self.current_bytes, 'max_bytes': self.max_bytes}
@@ -0,0 +1,335 @@
+import dataclasses
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Type, Union
+
+import numpy as np
+import ujson
+import xxhash
+
+from label_sleuth.data_access.file_based.sorted_runs import SortedRuns
+from label_sleuth.metrics import registry
+from label_sleuth.models.core.prediction import MulticlassPrediction, Prediction
+from label_sleuth.models.util.disk_cache import load_model_prediction_store_from_disk
+
+META_FILENAME = 'meta.json'
+KEYS_FILENAME = 'keys.bin'
+JSON_OFFSETS_FILENAME = 'values.offsets.bin'
+JSON_HEAP_FILENAME = 'values.heap'
+INDEX_FILENAME = 'index.bin'
+KEY_BYTES = 16
+# the sorted index file is rewritten once the keys that were added after it was written are as many as the keys in it
+# (and at least this many), so that adding keys costs amortized O(1) and the keys held in memory are at most half
+INDEX_MERGE_MIN_ROWS = 100000
+
+READ_BYTES = registry.counter('label_sleuth_prediction_store_read_bytes_total',
+                              'Bytes of predictions read from the prediction stores')
+WRITTEN_BYTES = registry.counter('label_sleuth_prediction_store_written_bytes_total',
+                                 'Bytes written to the prediction stores')
+
+
+def hash_keys(keys: Sequence[str]) -> np.ndarray:
+    """
+    :return: a uint64 array of shape (len(keys), 2) with the 128-bit xxhash of each of the given store keys: the high
+    64 bits, which are used for looking up the key, and the low 64 bits, which verify that the key matches
+    """
+    digests = b''.join(xxhash.xxh3_128_digest(key.encode('utf-8')) for key in keys)
+    return np.frombuffer(digests, dtype='>u8').astype(np.uint64).reshape(len(keys), 2)
+
+
+def _get_store_layout(prediction_class, predictions: Sequence) -> dict:
+    """
+    Choose how predictions of *prediction_class* are stored. Binary and multiclass predictions, as well as vectors
+    (e.g. embeddings) of a fixed size, are stored in fixed-width columns; other prediction classes are stored as json.
+    """
+    if prediction_class is Prediction:
+        return {'kind': 'binary', 'columns': {'label': ['bool', []], 'score': ['float64', []]}}
+    if prediction_class is MulticlassPrediction and all(type(p.scores) == dict for p in predictions):
+        classes = sorted({class_id for p in predictions for class_id in p.scores})
+        return {'kind': 'multiclass', 'classes': classes,
+                'columns': {'label': ['int64', []], 'scores': ['float64', [len(classes)]]}}
+    if prediction_class is list and len({len(p) for p in predictions}) == 1:
+        return {'kind': 'vector', 'columns': {'value': ['float64', [len(predictions[0])]]}}
+    return {'kind': 'json', 'columns': {}}
+
+
+class PredictionStore:
+    """
+    An append-only, binary store of the predictions of a single model, kept in its own directory.
+
+    Each prediction is stored under the 128-bit hash of its store key: the hashes are kept in a keys column, and the
+    predictions in fixed-width columns with a row for each key (e.g. a label column and a score column for binary
+    predictions, and a scores matrix for multiclass predictions). New predictions are appended to the end of the
+    columns, and looking up predictions reads only the rows of the requested keys, using an index sorted by the high
+    64 bits of the key hashes; the low 64 bits are read from the keys column and compared as well, so a key is never
+    matched with the prediction of a different key. The columns are written before the keys column, so rows whose key
+    was not written are ignored (and truncated) when the store is opened.
+
+    The index is kept in a memory-mapped file that is sorted by hash, and in sorted runs in memory (see SortedRuns) for
+    the keys that were added after the file was written. Once the keys in memory are as many as the keys in the file,
+    both are merged into a new index file.
+    """
+
+    open_stores = OrderedDict()
+    open_stores_lock = threading.Lock()
+    max_open_stores = 16
+
+    def __init__(self, store_dir: str, prediction_class: Type, legacy_store_file: Optional[str] = None):
+        """
+        :param store_dir:
+        :param prediction_class: the class of the stored predictions, e.g. Prediction, MulticlassPrediction or list
+        :param legacy_store_file: path to a prediction store json file written by previous versions. If it exists, its
+        predictions are added to this store, and the file is removed.
+        """
+        self.store_dir = store_dir
+        self.prediction_class = prediction_class
+        self.lock = threading.RLock()
+        self.layout = None
+        self.num_rows = 0
+        # the high 64 bits of the key hashes and their rows, sorted by hash, for the first rows of the store
+        self.index_hashes = np.empty(0, dtype=np.uint64)
+        self.index_rows = np.empty(0, dtype=np.int64)
+        self.added_keys = SortedRuns(np.uint64)  # the keys of the rows that were added after the index file was written
+        self._open()
+        if legacy_store_file is not None and os.path.isfile(legacy_store_file):
+            self._migrate_legacy_store_file(legacy_store_file)
+
+    @classmethod
+    def get(cls, store_dir: str, prediction_class: Type, legacy_store_file: Optional[str] = None):
+        """
+        Return the PredictionStore in *store_dir*. Recently used stores are kept open, along with their key index.
+        """
+        with cls.open_stores_lock:
+            store = cls.open_stores.get(store_dir)
+            # the store is reopened if its directory was removed, e.g. along with the output directory
+            if store is None or (store.num_rows > 0 and not os.path.isdir(store_dir)):
+                store = cls(store_dir, prediction_class, legacy_store_file)
+                cls.open_stores[store_dir] = store
+                while len(cls.open_stores) > cls.max_open_stores:
+                    cls.open_stores.popitem(last=False)
+            cls.open_stores.move_to_end(store_dir)
+            return store
+
+    @classmethod
+    def delete(cls, store_dir: str):
+        with cls.open_stores_lock:
+            cls.open_stores.pop(store_dir, None)
+            if os.path.isdir(store_dir):
+                shutil.rmtree(store_dir)
+
+    def get_predictions(self, keys: Sequence[str]) -> List[Optional[Union[Prediction, MulticlassPrediction, list]]]:
+        """
+        :return: the stored prediction of each of the given keys, or None for keys that are not in the store
+        """
+        with self.lock:
+            if self.num_rows == 0:
+                return [None] * len(keys)
+            rows, found, _ = self._find(hash_keys(keys))
+            predictions = self._read_rows(rows[found])
+        results = [None] * len(keys)
+        for idx, prediction in zip(np.flatnonzero(found).tolist(), predictions):
+            results[idx] = prediction
+        return results
+
+    def add_predictions(self, keys: Sequence[str], predictions: Sequence):
+        """
+        Append the predictions of the given keys to the store. Keys that are already in the store are skipped, as well
+        as keys whose lookup hash collides with that of a different key (their predictions are not stored).
+        """
+        with self.lock:
+            hashes = hash_keys(keys)
+            _, first_positions = np.unique(hashes[:, 0], return_index=True)
+            is_new = np.zeros(len(keys), dtype=bool)
+            is_new[first_positions] = True
+            if self.num_rows > 0:
+                _, _, hash_found = self._find(hashes)
+                is_new &= ~hash_found
+            new_indices = np.flatnonzero(is_new).tolist()
+            if len(new_indices) == 0:
+                return
+            new_predictions = [predictions[idx] for idx in new_indices]
+            if self.layout is None:
+                self._create(new_predictions)
+            self._append_rows(new_predictions)
+            self._append_to_file(KEYS_FILENAME, hashes[new_indices].tobytes())
+            self._extend_index(hashes[new_indices])
+
+    def _open(self):
+        meta_path = os.path.join(self.store_dir, META_FILENAME)
+        if not os.path.isfile(meta_path):
+            return
+        with open(meta_path) as f:
+            self.layout = ujson.loads(f.read())
+        keys_path = os.path.join(self.store_dir, KEYS_FILENAME)
+        num_rows = os.path.getsize(keys_path) // KEY_BYTES if os.path.isfile(keys_path) else 0
+        self._truncate(num_rows)
+        index_path = os.path.join(self.store_dir, INDEX_FILENAME)
+        index_rows = os.path.getsize(index_path) // 16 if os.path.isfile(index_path) else 0
+        if index_rows > num_rows:
+            # the index file refers to rows that were removed as partially written, so it is rebuilt
+            os.remove(index_path)
+            index_rows = 0
+        if index_rows > 0:
+            self.index_hashes = np.memmap(index_path, dtype=np.uint64, mode='r', shape=(index_rows,))
+            self.index_rows = np.memmap(index_path, dtype=np.int64, mode='r', shape=(index_rows,),
+                                        offset=index_rows * 8)
+            self.num_rows = index_rows
+        if num_rows > index_rows:
+            self._extend_index(np.fromfile(keys_path, dtype=np.uint64, count=(num_rows - index_rows) * 2,
+                                           offset=index_rows * KEY_BYTES).reshape(num_rows - index_rows, 2))
+
+    def _find(self, hashes: np.ndarray):
+        """
+        :param hashes: key hashes, as returned by hash_keys()
+        :return: the rows of the given hashes, a mask of the hashes that are in the store, and a mask of the hashes
+        whose high 64 bits are in the store (including keys that collide with a different stored key). The high 64 bits
+        of the stored keys are unique, so each hash is found in at most one of the sorted runs of the index.
+        """
+        rows = np.zeros(len(hashes), dtype=np.int64)
+        hash_found = np.zeros(len(hashes), dtype=bool)
+        for sorted_hashes, sorted_rows in [(self.index_hashes, self.index_rows)] + self.added_keys.runs:
+            if len(sorted_hashes) == 0:
+                continue
+            positions = np.minimum(np.searchsorted(sorted_hashes, hashes[:, 0]), len(sorted_hashes) - 1)
+            in_run = np.asarray(sorted_hashes[positions]) == hashes[:, 0]
+            rows[in_run] = sorted_rows[positions[in_run]]
+            hash_found |= in_run
+        found = hash_found.copy()
+        if hash_found.any():
+            keys = np.memmap(os.path.join(self.store_dir, KEYS_FILENAME), dtype=np.uint64, mode='r',
+                             shape=(self.num_rows, 2))
+            found[hash_found] = keys[rows[hash_found], 1] == hashes[hash_found, 1]
+        return rows, found, hash_found
+
+    def _create(self, predictions):
+        self.layout = _get_store_layout(self.prediction_class, predictions)
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, META_FILENAME), 'w') as f:
+            f.write(ujson.dumps(self.layout))
+
+    def _truncate(self, num_rows):
+        """
+        Remove rows beyond *num_rows* from the columns, as these were written without their keys
+        """
+        sizes = {KEYS_FILENAME: num_rows * KEY_BYTES}
+        for name, (dtype, shape) in self.layout['columns'].items():
+            sizes[f'{name}.bin'] = num_rows * np.dtype(dtype).itemsize * int(np.prod(shape))
+        if self.layout['kind'] == 'json':
+            sizes[JSON_OFFSETS_FILENAME] = num_rows * 8
+            sizes[JSON_HEAP_FILENAME] = int(self._get_json_offsets(num_rows)[-1]) if num_rows > 0 else 0
+        for filename, size in sizes.items():
+            path = os.path.join(self.store_dir, filename)
+            if os.path.isfile(path) and os.path.getsize(path) > size:
+                logging.warning(f"removing partially written predictions from {path}")
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _get_json_offsets(self, num_rows) -> np.ndarray:
+        # the end offset of each row in the json heap, memory-mapped so that only the offsets of the read rows are read
+        return np.memmap(os.path.join(self.store_dir, JSON_OFFSETS_FILENAME), dtype=np.int64, mode='r',
+                         shape=(num_rows,))
+
+    def _append_to_file(self, filename, data: bytes):
+        with open(os.path.join(self.store_dir, filename), 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        WRITTEN_BYTES.inc(len(data))
+
+    def _append_rows(self, predictions):
+        kind = self.layout['kind']
+        columns = {}
+        if kind == 'binary':
+            columns = {'label': [p.label for p in predictions], 'score': [p.score for p in predictions]}
+        elif kind == 'multiclass':
+            classes = self.layout['classes']
+            if any(type(p.scores) != dict or set(p.scores) != set(classes) for p in predictions):
+                raise Exception(f"predictions do not match the classes {classes} of prediction store {self.store_dir}")
+            columns = {'label': [p.label for p in predictions],
+                       'scores': [[p.scores[class_id] for class_id in classes] for p in predictions]}
+        elif kind == 'vector':
+            columns = {'value': predictions}
+        else:
+            encoded = [ujson.dumps(dataclasses.asdict(p) if dataclasses.is_dataclass(p) else p).encode('utf-8')
+                       for p in predictions]
+            heap_path = os.path.join(self.store_dir, JSON_HEAP_FILENAME)
+            heap_size = os.path.getsize(heap_path) if os.path.isfile(heap_path) else 0
+            offsets = heap_size + np.cumsum([len(value) for value in encoded], dtype=np.int64)
+            self._append_to_file(JSON_HEAP_FILENAME, b''.join(encoded))
+            self._append_to_file(JSON_OFFSETS_FILENAME, offsets.tobytes())
+        for name, values in columns.items():
+            dtype, shape = self.layout['columns'][name]
+            array = np.array(values, dtype=dtype).reshape([len(predictions)] + shape)
+            self._append_to_file(f'{name}.bin', array.tobytes())
+
+    def _read_rows(self, rows: np.ndarray) -> list:
+        if len(rows) == 0:
+            return []
+        kind = self.layout['kind']
+        if kind == 'json':
+            offsets = self._get_json_offsets(self.num_rows)
+            starts = np.where(rows > 0, offsets[np.maximum(rows - 1, 0)], 0)
+            ends = np.asarray(offsets[rows])
+            heap = np.memmap(os.path.join(self.store_dir, JSON_HEAP_FILENAME), dtype=np.uint8, mode='r')
+            READ_BYTES.inc(int((ends - starts).sum()))
+            values = [ujson.loads(heap[start:end].tobytes()) for start, end in zip(starts.tolist(), ends.tolist())]
+            if dataclasses.is_dataclass(self.prediction_class):
+                return [self.prediction_class(**value) for value in values]
+            return values
+
+        columns = {}
+        for name, (dtype, shape) in self.layout['columns'].items():
+            column = np.memmap(os.path.join(self.store_dir, f'{name}.bin'), dtype=dtype, mode='r',
+                               shape=tuple([self.num_rows] + shape))
+            columns[name] = column[rows].tolist()
+            READ_BYTES.inc(len(rows) * column.itemsize * int(np.prod(shape)))
+        if kind == 'binary':
+            return [Prediction(label=label, score=score) for label, score in zip(columns['label'], columns['score'])]
+        if kind == 'multiclass':
+            classes = self.layout['classes']
+            return [MulticlassPrediction(label=label, scores=dict(zip(classes, scores)))
+                    for label, scores in zip(columns['label'], columns['scores'])]
+        return columns['value']
+
+    def _extend_index(self, new_hashes: np.ndarray):
+        new_rows = np.arange(self.num_rows, self.num_rows + len(new_hashes), dtype=np.int64)
+        self.added_keys.add(new_hashes[:, 0], new_rows)
+        self.num_rows += len(new_hashes)
+        if len(self.added_keys) >= max(len(self.index_hashes), INDEX_MERGE_MIN_ROWS):
+            self._write_index_file()
+
+    def _write_index_file(self):
+        """
+        Merge the keys that were added since the index file was written into a new index file, which holds the sorted
+        hashes followed by their rows
+        """
+        hashes = np.concatenate([self.index_hashes] + [keys for keys, _ in self.added_keys.runs])
+        rows = np.concatenate([self.index_rows] + [rows for _, rows in self.added_keys.runs])
+        order = np.argsort(hashes, kind='stable')
+        index_path = os.path.join(self.store_dir, INDEX_FILENAME)
+        with open(f'{index_path}.tmp', 'wb') as f:
+            f.write(hashes[order].tobytes())
+            f.write(rows[order].tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f'{index_path}.tmp', index_path)
+        WRITTEN_BYTES.inc(len(hashes) * 16)
+        self.index_hashes = np.memmap(index_path, dtype=np.uint64, mode='r', shape=(len(hashes),))
+        self.index_rows = np.memmap(index_path, dtype=np.int64, mode='r', shape=(len(hashes),), offset=len(hashes) * 8)
+        self.added_keys = SortedRuns(np.uint64)
+
+    def _migrate_legacy_store_file(self, legacy_store_file):
+        logging.info(f"migrating prediction store {legacy_store_file} to {self.store_dir}")
+        legacy_predictions = load_model_prediction_store_from_disk(legacy_store_file, self.prediction_class)
+        if self.prediction_class is MulticlassPrediction:
+            # json object keys are strings, so the class ids of the scores are converted back to integers
+            for prediction in legacy_predictions.values():
+                if type(prediction.scores) == dict:
+                    prediction.scores = {int(class_id) if type(class_id) == str and class_id.isdigit() else class_id:
+                                         score for class_id, score in prediction.scores.items()}
+        if len(legacy_predictions) > 0:
+            self.add_predictions(list(legacy_predictions.keys()), list(legacy_predictions.values()))
+        os.remove(legacy_store_file)
@@ -0,0 +1,172 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import os
+import pickle
+
+from typing import Callable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sklearn.feature_extraction.text import CountVectorizer
+
+from label_sleuth.data_access.file_based.dataset_store import DatasetStore, MANIFEST_FILENAME
+from label_sleuth.models.core.model_api import DATASET_ROW_FIELD
+from label_sleuth.models.util.LRUCache import LRUCache
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
+
+# minimal number of items inferred by each worker process, so that small requests are not split across processes
+MIN_ITEMS_PER_PROCESS_JOB = 1000
+
+# the datasets read by a worker process, by the directory of their dataset store
+_worker_datasets = LRUCache(capacity=4)
+
+# the models loaded by a worker process for inference, by their model directory
+_worker_loaded_models = LRUCache(capacity=4)
+
+
+def create_bow_vectorizer(max_features) -> CountVectorizer:
+    return CountVectorizer(analyzer="word", tokenizer=None, preprocessor=None, stop_words=None, lowercase=True,
+                           max_features=max_features)
+
+
+def save_model_and_vectorizer(model_dir, model, vectorizer):
+    with open(os.path.join(model_dir, "vectorizer"), "wb") as fl:
+        pickle.dump(vectorizer, fl)
+    with open(os.path.join(model_dir, "model"), "wb") as fl:
+        pickle.dump(model, fl)
+
+
+def load_model_and_vectorizer(model_dir):
+    with open(os.path.join(model_dir, "model"), "rb") as fl:
+        model = pickle.load(fl)
+    with open(os.path.join(model_dir, "vectorizer"), "rb") as fl:
+        vectorizer = pickle.load(fl)
+    return model, vectorizer
+
+
+def get_process_job_texts(items: Sequence[Mapping]) -> Tuple[Optional[str], Sequence]:
+    """
+    Return what a process job needs in order to get the texts of *items*. If all the items carry their location in the
+    same dataset store (see DATASET_ROW_FIELD), only the store directory and the row positions of the items are sent to
+    the worker process, which reads the texts from the store (see read_process_job_texts()). Otherwise, the texts
+    themselves are sent.
+    :param items: a list of dictionaries with at least the "text" field
+    :return: the dataset store directory and the row positions of the items (as a range if they are consecutive), or
+    None and the texts of the items
+    """
+    locations = [item.get(DATASET_ROW_FIELD) for item in items]
+    store_dirs = {location[0] if location is not None else None for location in locations}
+    if len(items) == 0 or len(store_dirs) != 1 or None in store_dirs:
+        return None, [item['text'] for item in items]
+    rows = np.array([row for _, row in locations], dtype=np.int64)
+    if np.all(np.diff(rows) == 1):
+        return store_dirs.pop(), range(int(rows[0]), int(rows[-1]) + 1)
+    return store_dirs.pop(), rows
+
+
+def split_process_job_texts(texts_or_rows: Sequence, num_jobs: int) -> List[Sequence]:
+    """
+    Split the texts (or row positions) returned by get_process_job_texts() into *num_jobs* consecutive batches of
+    similar size
+    """
+    batch_size = max(1, -(-len(texts_or_rows) // num_jobs))
+    return [texts_or_rows[i:i + batch_size] for i in range(0, len(texts_or_rows), batch_size)]
+
+
+def _get_store_identity(store_dir):
+    # the manifest is replaced whenever the store changes, so its inode and modification time identify the contents of
+    # the store, including a store that was deleted and written again in the same directory
+    stat = os.stat(os.path.join(store_dir, MANIFEST_FILENAME))
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def read_process_job_texts(store_dir: Optional[str], texts_or_rows: Sequence) -> Sequence[str]:
+    """
+    Return the texts sent to a process job by get_process_job_texts(). This function runs in a worker process, which
+    keeps the columns of the most recently used dataset stores memory-mapped.
+    :param store_dir: the directory of the dataset store, or None if *texts_or_rows* are the texts themselves
+    :param texts_or_rows: the texts, or their row positions in the dataset store
+    """
+    if store_dir is None:
+        return texts_or_rows
+    identity = _get_store_identity(store_dir)
+    identity_and_dataset = _worker_datasets.get(store_dir)
+    if identity_and_dataset is None or identity_and_dataset[0] != identity:
+        identity_and_dataset = (identity, DatasetStore(store_dir).read_dataset())
+        _worker_datasets.set(store_dir, identity_and_dataset)
+    return identity_and_dataset[1].text.take(np.asarray(texts_or_rows, dtype=np.int64))
+
+
+def fit_bow_model(model, vectorizer, store_dir, texts_or_rows, labels, model_dir):
+    """
+    Fit *vectorizer* and a bag-of-words *model* on the given texts, and save them to *model_dir*. This function may run
+    in a worker process.
+    :param store_dir: the dataset store holding the train texts, or None if *texts_or_rows* are the texts themselves
+    :param texts_or_rows: the train texts, or their row positions in the dataset store (see get_process_job_texts())
+    """
+    model.fit(vectorizer.fit_transform(read_process_job_texts(store_dir, texts_or_rows)), labels)
+    save_model_and_vectorizer(model_dir, model, vectorizer)
+
+
+def infer_bow_model(predict_func: Callable, model_dir, store_dir, texts_or_rows, batch_size=None) -> list:
+    """
+    Infer the given texts in batches of *batch_size* (or in a single batch if it is None), using the bag-of-words model saved in *model_dir*. This function
+    runs in a worker process, which keeps the most recently used models in memory.
+    :param predict_func: a module-level function that returns the predictions of a model for the given features
+    :param store_dir: the dataset store holding the texts, or None if *texts_or_rows* are the texts themselves
+    :param texts_or_rows: the texts, or their row positions in the dataset store (see get_process_job_texts())
+    :return: the results of *predict_func* for each batch
+    """
+    model_and_vectorizer = _worker_loaded_models.get(model_dir)
+    if model_and_vectorizer is None:
+        model_and_vectorizer = load_model_and_vectorizer(model_dir)
+        _worker_loaded_models.set(model_dir, model_and_vectorizer)
+    model, vectorizer = model_and_vectorizer
+    texts = read_process_job_texts(store_dir, texts_or_rows)
+    if batch_size is None:
+        batch_size = max(1, len(texts))
+    return [predict_func(model, vectorizer.transform(texts[i:i + batch_size]))
+            for i in range(0, len(texts), batch_size)]
+
+
+def fit_bow_in_processes(background_jobs_manager: BackgroundJobsManager, model, vectorizer,
+                         train_data: Sequence[Mapping], model_dir):
+    """
+    Fit a bag-of-words *model* on *train_data* in a worker process, which reads the texts from the dataset store when
+    possible, and save it to *model_dir*
+    """
+    if background_jobs_manager.uses_processes():
+        store_dir, texts_or_rows = get_process_job_texts(train_data)
+    else:
+        store_dir, texts_or_rows = None, [x['text'] for x in train_data]
+    labels = [x['label'] for x in train_data]
+    background_jobs_manager.map_process_jobs(fit_bow_model,
+                                             [(model, vectorizer, store_dir, texts_or_rows, labels, model_dir)])
+
+
+def infer_bow_in_processes(background_jobs_manager: BackgroundJobsManager, predict_func: Callable, model_dir,
+                           items_to_infer: Sequence[Mapping], batch_size=None) -> list:
+    """
+    Split *items_to_infer* between the worker processes, each of which loads the model from *model_dir* and reads the
+    texts of its items from the dataset store when possible
+    :return: the results of *predict_func* for each batch of items, in order
+    """
+    num_jobs = max(1, min(background_jobs_manager.process_workers, len(items_to_infer) // MIN_ITEMS_PER_PROCESS_JOB))
+    store_dir, texts_or_rows = get_process_job_texts(items_to_infer)
+    results = background_jobs_manager.map_process_jobs(
+        infer_bow_model, [(predict_func, model_dir, store_dir, batch, batch_size)
+                          for batch in split_process_job_texts(texts_or_rows, num_jobs)])
+    return [batch_result for job_results in results for batch_result in job_results]
@@ -0,0 +1,45 @@
+import unittest
+
+from label_sleuth.models.core.prediction import MulticlassPrediction, Prediction
+from label_sleuth.models.util.prediction_cache import PredictionCache, ENTRY_OVERHEAD_BYTES
+
+
+class TestPredictionCache(unittest.TestCase):
+    def test_predictions_are_unpacked_from_slabs(self):
+        cache = PredictionCache(max_bytes=10 ** 6)
+        keys = [cache.get_cache_key('model', text) for text in ['a', 'b', 'c']]
+        predictions = [Prediction(True, 0.75), MulticlassPrediction(2, {0: 0.1, 2: 0.9}), [0.5, 1.5]]
+        for key, prediction in zip(keys, predictions):
+            cache.set_many([key], [prediction])
+        self.assertEqual(predictions, [cache.get(key) for key in keys])
+        self.assertIsNone(cache.get(cache.get_cache_key('other_model', 'a')))
+        self.assertEqual({'items': 3, 'hits': 3, 'misses': 1, 'evictions': 0},
+                         {k: v for k, v in cache.get_stats().items() if k in ('items', 'hits', 'misses', 'evictions')})
+
+    def test_cache_is_bounded_by_bytes(self):
+        slab_bytes = 15 * 9  # a bool label and a float64 score for each row
+        cache = PredictionCache(max_bytes=slab_bytes + ENTRY_OVERHEAD_BYTES * 10)
+        keys = [cache.get_cache_key('model', str(i)) for i in range(15)]
+        cache.set_many(keys, [Prediction(i % 2 == 0, i / 15) for i in range(15)])
+        self.assertEqual(10, cache.get_current_size())
+        self.assertEqual(5, cache.get_stats()['evictions'])
+        self.assertEqual(slab_bytes + ENTRY_OVERHEAD_BYTES * 10, cache.get_stats()['bytes'])
+        self.assertIsNone(cache.get(keys[4]))
+        self.assertEqual(Prediction(True, 14 / 15), cache.get(keys[14]))
+
+    def test_slab_with_few_cached_rows_is_compacted(self):
+        cache = PredictionCache(max_bytes=10 ** 6)
+        keys = [cache.get_cache_key('model', str(i)) for i in range(100)]
+        cache.set_many(keys, [Prediction(i % 2 == 0, i / 100) for i in range(100)])
+        cache.get(keys[0])
+        # the new predictions evict all the rows of the first slab, except for the recently used keys[0]
+        new_keys = [cache.get_cache_key('model', f'new_{i}') for i in range(100)]
+        cache.max_items = 101
+        cache.set_many(new_keys, [Prediction(False, 0.5)] * 100)
+
+        self.assertEqual(101, cache.get_current_size())
+        first_slab, row = cache.lru.peek(keys[0])
+        # the slab is compacted whenever less than half of its rows are cached
+        self.assertLessEqual(len(first_slab.values), 2)
+        self.assertEqual(Prediction(True, 0.0), first_slab.get(row))
+        self.assertEqual(first_slab.nbytes + 100 * 9 + 101 * ENTRY_OVERHEAD_BYTES, cache.get_stats()['bytes'])
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from label_sleuth.models.core.prediction import MulticlassPrediction, Prediction
+from label_sleuth.models.util.disk_cache import save_model_prediction_store_to_disk
+from label_sleuth.models.util import prediction_store
+from label_sleuth.models.util.prediction_store import PredictionStore, KEYS_FILENAME, KEY_BYTES
+
+
+class TestPredictionStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.temp_dir.name, 'model_id')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_add_and_get_binary_predictions(self):
+        store = PredictionStore(self.store_dir, Prediction)
+        self.assertEqual([None, None], store.get_predictions(['a', 'b']))
+        store.add_predictions(['a', 'b'], [Prediction(True, 0.9), Prediction(False, 0.25)])
+        store.add_predictions(['c', 'a'], [Prediction(True, 0.5), Prediction(False, 0.1)])
+        self.assertEqual([Prediction(True, 0.5), None, Prediction(True, 0.9), Prediction(False, 0.25)],
+                         store.get_predictions(['c', 'd', 'a', 'b']))
+
+        reopened = PredictionStore(self.store_dir, Prediction)
+        self.assertEqual(3, reopened.num_rows)
+        self.assertEqual([Prediction(False, 0.25), Prediction(True, 0.5)], reopened.get_predictions(['b', 'c']))
+
+    def test_multiclass_and_vector_predictions(self):
+        store = PredictionStore(self.store_dir, MulticlassPrediction)
+        predictions = [MulticlassPrediction(1, {0: 0.2, 1: 0.8}), MulticlassPrediction(0, {0: 0.6, 1: 0.4})]
+        store.add_predictions(['a', 'b'], predictions)
+        self.assertEqual(predictions[::-1], PredictionStore(self.store_dir, MulticlassPrediction)
+                         .get_predictions(['b', 'a']))
+
+        vector_store = PredictionStore(os.path.join(self.temp_dir.name, 'embeddings'), list)
+        vector_store.add_predictions(['a', 'b'], [[0.5, 1.0, 1.5], [2.0, 2.5, 3.0]])
+        self.assertEqual([[2.0, 2.5, 3.0]], vector_store.get_predictions(['b']))
+
+    def test_partially_written_rows_are_ignored(self):
+        store = PredictionStore(self.store_dir, Prediction)
+        store.add_predictions(['a', 'b'], [Prediction(True, 0.9), Prediction(False, 0.25)])
+        keys_path = os.path.join(self.store_dir, KEYS_FILENAME)
+        with open(keys_path, 'r+b') as f:
+            f.truncate(KEY_BYTES + 5)
+
+        reopened = PredictionStore(self.store_dir, Prediction)
+        self.assertEqual([Prediction(True, 0.9), None], reopened.get_predictions(['a', 'b']))
+        reopened.add_predictions(['c'], [Prediction(True, 0.75)])
+        self.assertEqual([Prediction(True, 0.75)], PredictionStore(self.store_dir, Prediction).get_predictions(['c']))
+
+    def test_keys_with_colliding_lookup_hashes_are_not_matched(self):
+        store = PredictionStore(self.store_dir, Prediction)
+        store.add_predictions(['a'], [Prediction(True, 0.9)])
+        colliding_hash = prediction_store.hash_keys(['a'])
+        colliding_hash[0, 1] += np.uint64(1)
+        with patch.object(prediction_store, 'hash_keys', return_value=colliding_hash):
+            self.assertEqual([None], store.get_predictions(['b']))
+            store.add_predictions(['b'], [Prediction(False, 0.1)])
+        self.assertEqual(1, store.num_rows)
+        self.assertEqual([Prediction(True, 0.9)], store.get_predictions(['a']))
+
+    def test_index_file_is_merged_and_memory_mapped(self):
+        with patch.object(prediction_store, 'INDEX_MERGE_MIN_ROWS', 2):
+            store = PredictionStore(self.store_dir, Prediction)
+            for i in range(10):
+                store.add_predictions([f'key {i}'], [Prediction(i % 2 == 0, i / 10)])
+            self.assertEqual(8, len(store.index_hashes))
+            self.assertEqual(2, len(store.added_keys))
+            expected = [Prediction(i % 2 == 0, i / 10) for i in range(10)]
+            self.assertEqual(expected, store.get_predictions([f'key {i}' for i in range(10)]))
+
+            reopened = PredictionStore(self.store_dir, Prediction)
+            self.assertIsInstance(reopened.index_hashes, np.memmap)
+            self.assertEqual(expected, reopened.get_predictions([f'key {i}' for i in range(10)]))
+
+            # rows of the index file that were removed as partially written are not matched
+            with open(os.path.join(self.store_dir, KEYS_FILENAME), 'r+b') as f:
+                f.truncate(KEY_BYTES * 5)
+            reopened = PredictionStore(self.store_dir, Prediction)
+            self.assertEqual(expected[:5] + [None] * 5, reopened.get_predictions([f'key {i}' for i in range(10)]))
+
+    def test_json_predictions(self):
+        store = PredictionStore(self.store_dir, dict)
+        store.add_predictions(['a', 'b'], [{'x': 1}, {'y': [2, 3]}])
+        store.add_predictions(['c'], [{'z': 'text'}])
+        self.assertEqual([{'z': 'text'}, None, {'x': 1}, {'y': [2, 3]}],
+                         PredictionStore(self.store_dir, dict).get_predictions(['c', 'd', 'a', 'b']))
+
+    def test_legacy_store_file_is_migrated(self):
+        legacy_store_file = os.path.join(self.temp_dir.name, 'model_id.json')
+        save_model_prediction_store_to_disk(legacy_store_file, {'a': MulticlassPrediction(1, {0: 0.3, 1: 0.7})})
+
+        store = PredictionStore(self.store_dir, MulticlassPrediction, legacy_store_file)
+        self.assertFalse(os.path.exists(legacy_store_file))
+        store.add_predictions(['b'], [MulticlassPrediction(0, {0: 0.9, 1: 0.1})])
+        self.assertEqual([MulticlassPrediction(1, {0: 0.3, 1: 0.7}), MulticlassPrediction(0, {0: 0.9, 1: 0.1})],
+                         store.get_predictions(['a', 'b']))
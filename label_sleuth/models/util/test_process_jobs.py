@@ -0,0 +1,87 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from label_sleuth.data_access.file_based.dataset_store import DatasetStore
+from label_sleuth.data_access.file_based.uri_index import hash_strings
+from label_sleuth.models.core.model_api import DATASET_ROW_FIELD
+from label_sleuth.models.util.process_jobs import get_process_job_texts, read_process_job_texts, \
+    split_process_job_texts
+
+
+def write_texts(store, first_idx, num_elements, prefix='text'):
+    df = pd.DataFrame({'uri': [f'dataset-doc-{i}' for i in range(first_idx, first_idx + num_elements)],
+                       'text': [f'{prefix} {i} ✓' for i in range(first_idx, first_idx + num_elements)],
+                       'span': [[(0, 8)]] * num_elements,
+                       'metadata': [{}] * num_elements,
+                       'text_unique_id': list(range(first_idx, first_idx + num_elements))})
+    documents_df = pd.DataFrame({'uri': [f'dataset-doc_{first_idx}'], 'num_elements': [num_elements],
+                                 'metadata': [{}]})
+    if store.exists():
+        store.append(df, documents_df, {'uri_hash': hash_strings(df['uri'].tolist())})
+    else:
+        store.write(df, documents_df, {'uri_hash': hash_strings(df['uri'].tolist())})
+
+
+class TestProcessJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.temp_dir.name, 'dataset_store')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_items_without_locations_send_their_texts(self):
+        items = [{'text': 'a', DATASET_ROW_FIELD: (self.store_dir, 0)}, {'text': 'b'}]
+        self.assertEqual((None, ['a', 'b']), get_process_job_texts(items))
+        self.assertEqual((None, []), get_process_job_texts([]))
+
+    def test_items_with_locations_send_their_rows(self):
+        items = [{'text': f'text {row} ✓', DATASET_ROW_FIELD: (self.store_dir, row)} for row in [3, 4, 5]]
+        self.assertEqual((self.store_dir, range(3, 6)), get_process_job_texts(items))
+        store_dir, rows = get_process_job_texts(items[::-1])
+        self.assertEqual(self.store_dir, store_dir)
+        self.assertListEqual([5, 4, 3], rows.tolist())
+
+    def test_split(self):
+        self.assertListEqual([range(0, 4), range(4, 8), range(8, 10)], split_process_job_texts(range(10), 3))
+        self.assertListEqual([['a']], split_process_job_texts(['a'], 2))
+        self.assertListEqual([], split_process_job_texts([], 2))
+
+    def test_read_texts_from_store(self):
+        store = DatasetStore(self.store_dir)
+        write_texts(store, 0, 10)
+        self.assertListEqual(['text 2 ✓', 'text 7 ✓'], read_process_job_texts(self.store_dir, np.array([2, 7])))
+        self.assertListEqual(['a', 'b'], read_process_job_texts(None, ['a', 'b']))
+        # rows appended to the store after it was read
+        write_texts(store, 10, 5)
+        self.assertListEqual(['text 9 ✓', 'text 10 ✓', 'text 11 ✓'],
+                             read_process_job_texts(self.store_dir, range(9, 12)))
+
+    def test_store_that_was_written_again_is_read_again(self):
+        write_texts(DatasetStore(self.store_dir), 0, 10)
+        self.assertListEqual(['text 2 ✓'], read_process_job_texts(self.store_dir, [2]))
+        # the dataset is deleted and added again with the same number of rows
+        shutil.rmtree(self.store_dir)
+        write_texts(DatasetStore(self.store_dir), 0, 10, prefix='new text')
+        self.assertListEqual(['new text 2 ✓'], read_process_job_texts(self.store_dir, [2]))
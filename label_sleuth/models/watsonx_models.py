@@ -304,9 +304,6 @@ class WatsonXBaseModel(ModelAPI, ABC):
             return f"Classify this text as {self.get_pos_label(model_components.category_name)} or {self.get_neg_label(model_components.category_name)}."
         raise Exception(f"{self.prompt_type} not supported")
 
-    def _get_model_lock_object(self, model_id):
-        return super()._get_model_lock_object(model_id)
-
     def _get_tokenizer(self):
 
         """ GENAI Current model types
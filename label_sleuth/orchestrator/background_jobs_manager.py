@@ -13,37 +13,282 @@
 #  limitations under the License.
 #
 
+import atexit
+import itertools
 import logging
+import multiprocessing
+import os
+import queue
+import threading
 
-from concurrent.futures import Future
-from concurrent.futures.thread import ThreadPoolExecutor
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from enum import IntEnum
+from typing import Hashable, List, Optional, Sequence
 
 from label_sleuth.definitions import GPU_WORKERS, GPU_AVAILABLE
 
+WORKER_PROCESS_NICENESS = 5
+
+
+class JobPriority(IntEnum):
+    """
+    Pending jobs are started by their priority (lowest value first), and then by the order in which they were added
+    """
+    INTERACTIVE = 0  # a user is waiting for the result of the job
+    ITERATION = 1  # part of the flow of a model iteration, e.g. training and inference over the dataset
+    BULK = 2  # e.g. inference that only populates the prediction caches
+
+
+class JobCancelledException(Exception):
+    def __init__(self, message):
+        self.message = message
+
+
+class CancellationToken:
+    """
+    Allows cancelling a job. Jobs that were not started yet are not run, and long-running jobs are expected to call
+    raise_if_cancelled() periodically.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled.is_set()
+
+    def raise_if_cancelled(self):
+        if self.is_cancelled():
+            raise JobCancelledException("The job was cancelled")
+
+
+class _Job:
+    def __init__(self, method, args, priority: JobPriority, key: Optional[Hashable],
+                 cancellation_token: Optional[CancellationToken]):
+        self.method = method
+        self.args = args
+        self.priority = priority
+        self.key = key
+        self.cancellation_token = cancellation_token
+        self.future = Future()
+
+
+# the priority of the job that is run by the current worker thread, if any
+_current_job = threading.local()
+
+
+class PriorityThreadPoolExecutor:
+    """
+    A thread pool that runs the pending jobs by their priority. Unlike ThreadPoolExecutor, a pending job with a key is
+    not added again while it is pending, and pending jobs that were cancelled are skipped.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self.pending_jobs = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.idle_threads = 0
+        self.pending_jobs_by_key = {}
+        self.pending_counts = Counter()
+
+    def submit(self, method, args, priority: JobPriority, key: Optional[Hashable] = None,
+               cancellation_token: Optional[CancellationToken] = None) -> Future:
+        with self.lock:
+            if key is not None and key in self.pending_jobs_by_key:
+                pending_job = self.pending_jobs_by_key[key]
+                if priority < pending_job.priority:
+                    # the pending job is queued again with the higher priority, and its previous entry is skipped
+                    self.pending_counts[pending_job.priority] -= 1
+                    pending_job.priority = priority
+                    self._queue_job(pending_job)
+                return pending_job.future
+            job = _Job(method, args, priority, key, cancellation_token)
+            if key is not None:
+                self.pending_jobs_by_key[key] = job
+            self._queue_job(job)
+            if self.idle_threads > 0:
+                self.idle_threads -= 1
+            elif len(self.threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f"{self.thread_name_prefix}_{len(self.threads)}")
+                self.threads.append(thread)
+                thread.start()
+            return job.future
+
+    def _queue_job(self, job: _Job):
+        self.pending_counts[job.priority] += 1
+        self.pending_jobs.put((job.priority, next(self.sequence), job))
+
+    def get_queue_depths(self) -> Counter:
+        """
+        :return: the number of pending jobs of each priority
+        """
+        with self.lock:
+            return Counter(self.pending_counts)
+
+    def _work(self):
+        while True:
+            priority, _, job = self.pending_jobs.get()
+            with self.lock:
+                if priority != job.priority:
+                    continue  # the job was queued again with a higher priority, and this is its previous entry
+                self.pending_counts[priority] -= 1
+                if job.key is not None and self.pending_jobs_by_key.get(job.key) is job:
+                    del self.pending_jobs_by_key[job.key]
+            try:
+                self._run(job)
+            finally:
+                with self.lock:
+                    self.idle_threads += 1
+
+    @staticmethod
+    def _run(job: _Job):
+        if job.cancellation_token is not None and job.cancellation_token.is_cancelled():
+            job.future.cancel()
+        if not job.future.set_running_or_notify_cancel():
+            return
+        _current_job.priority = job.priority
+        try:
+            result = job.method(*job.args)
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            _current_job.priority = None
+
 
 class BackgroundJobsManager:
     """
     This class manages various jobs that are submitted in the background (for example, training and inference).
-    The number of jobs running on CPU/GPU at the same time is limited by the cpu_workers/GPU_WORKERS parameters.
+    The number of jobs running on CPU/GPU at the same time is limited by the cpu_workers/GPU_WORKERS parameters, and
+    pending jobs are started by their JobPriority.
+
+    CPU-bound work that holds the GIL (e.g. feature extraction and fitting of scikit-learn models) can opt into running
+    in a pool of *process_workers* worker processes, so that it can use all cores without starving the threads serving
+    requests.
     """
-    def __init__(self, cpu_workers: int = 10):
+    def __init__(self, cpu_workers: int = 10, process_workers: int = 0):
         """
         :param cpu_workers: number of jobs running on CPU
+        :param process_workers: number of worker processes for process jobs. If 0, process jobs run on the CPU threads
         """
-        self.cpu_executor = ThreadPoolExecutor(cpu_workers, thread_name_prefix=f"CPU_{cpu_workers}_threadpool")
-        self.gpu_executor = ThreadPoolExecutor(GPU_WORKERS, thread_name_prefix=f"GPU_{GPU_WORKERS}_threadpool")
+        self.cpu_executor = PriorityThreadPoolExecutor(cpu_workers, thread_name_prefix=f"CPU_{cpu_workers}_threadpool")
+        self.gpu_executor = PriorityThreadPoolExecutor(GPU_WORKERS,
+                                                       thread_name_prefix=f"GPU_{GPU_WORKERS}_threadpool")
+        self.process_workers = process_workers
+        self.process_executor = None  # created on first use, so that worker processes are only spawned when needed
+        self.process_executor_lock = threading.Lock()
+        if self.uses_processes():
+            atexit.register(self.shutdown)
 
-    def add_background_job(self, method, args, use_gpu, done_callback) -> Future:
+    def add_background_job(self, method, args, use_gpu, done_callback, priority: Optional[JobPriority] = None,
+                           key: Optional[Hashable] = None,
+                           cancellation_token: Optional[CancellationToken] = None) -> Future:
+        """
+        :param method: the function to run
+        :param args: the arguments of *method*
+        :param use_gpu: whether to run the job on the GPU workers, if a GPU is available
+        :param done_callback: an optional function that is called with the future of the job once it is done
+        :param priority: the priority of the job. By default, jobs added by another background job inherit its
+        priority, and jobs added elsewhere (i.e. while serving a request) are interactive
+        :param key: an optional key of the job. While a job with the same key is pending, its future is returned
+        instead of adding another job
+        :param cancellation_token: an optional token for cancelling the job. The job is not run if it was cancelled
+        before it started, in which case its future is cancelled
+        """
+        if priority is None:
+            priority = getattr(_current_job, 'priority', None)
+            if priority is None:
+                priority = JobPriority.INTERACTIVE
         executor = self.get_executor(use_gpu)
-        future = executor.submit(method, *args)
+        future = executor.submit(method, args, priority, key, cancellation_token)
 
-        logging.info(f"Adding background job {method} into the {executor._thread_name_prefix}")
+        logging.info(f"Adding background job {method} with priority {priority.name} into the "
+                     f"{executor.thread_name_prefix}")
 
         if done_callback is not None:
             future.add_done_callback(done_callback)
         return future
 
-    def get_executor(self, model_requested_gpu) -> ThreadPoolExecutor:
+    def get_queue_depths(self) -> dict:
+        """
+        :return: the number of pending jobs of each priority
+        """
+        depths = self.cpu_executor.get_queue_depths() + self.gpu_executor.get_queue_depths()
+        return {priority.name.lower(): depths[priority] for priority in JobPriority}
+
+    def get_executor(self, model_requested_gpu) -> PriorityThreadPoolExecutor:
         if model_requested_gpu and GPU_WORKERS > 0 and GPU_AVAILABLE:
             return self.gpu_executor
         return self.cpu_executor
+
+    def uses_processes(self) -> bool:
+        return self.process_workers > 0
+
+    def add_process_job(self, method, args, done_callback) -> Future:
+        """
+        Submit a job to a worker process. As *method* and *args* are pickled and sent to the worker, *method* must be a
+        module-level function, and large inputs (e.g. model artifacts or dataset files) should be passed by path and
+        loaded by the worker rather than passed as objects. If no worker processes are configured, the job is
+        submitted to the CPU threads.
+        """
+        if not self.uses_processes():
+            return self.add_background_job(method, args, False, done_callback)
+        try:
+            future = self._get_process_executor().submit(method, *args)
+        except BrokenProcessPool:
+            # a worker process died abruptly (e.g. it was killed for using too much memory), so the pool is replaced
+            logging.warning("Process pool is broken, starting new worker processes")
+            with self.process_executor_lock:
+                self.process_executor = None
+            future = self._get_process_executor().submit(method, *args)
+
+        logging.info(f"Adding process job {method} into the process pool")
+
+        if done_callback is not None:
+            future.add_done_callback(done_callback)
+        return future
+
+    def map_process_jobs(self, method, args_list: Sequence[Sequence]) -> List:
+        """
+        Run *method* on each of the given args in the worker processes, and wait for all of the results. This is meant
+        to be called from within a background job; if no worker processes are configured, *method* runs in the
+        calling thread rather than waiting on another CPU thread.
+        :return: the results of *method* for each of the args, in the same order
+        """
+        if not self.uses_processes():
+            return [method(*args) for args in args_list]
+        futures = [self.add_process_job(method, args, None) for args in args_list]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """
+        Stop the worker processes, if they were started. Process jobs that are added later on start new workers.
+        """
+        with self.process_executor_lock:
+            process_executor, self.process_executor = self.process_executor, None
+        if process_executor is not None:
+            process_executor.shutdown()
+
+    def _get_process_executor(self) -> ProcessPoolExecutor:
+        with self.process_executor_lock:
+            if self.process_executor is None:
+                # workers are spawned rather than forked, as forking a process that runs threads is unsafe
+                self.process_executor = ProcessPoolExecutor(self.process_workers,
+                                                            mp_context=multiprocessing.get_context('spawn'),
+                                                            initializer=_lower_worker_priority)
+            return self.process_executor
+
+
+def _lower_worker_priority():
+    # the worker processes yield the CPU to the process serving requests when the machine is fully loaded
+    if hasattr(os, 'nice'):
+        os.nice(WORKER_PROCESS_NICENESS)
@@ -12,10 +12,12 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 #
+import atexit
 import dataclasses
 import os
 import threading
 import logging
+import time
 from collections import defaultdict
 
 from dataclasses import dataclass, field
@@ -26,7 +28,8 @@ from typing import Dict, List, Sequence, Tuple, Mapping, Union, Optional
 from label_sleuth.data_access.core.data_structs import WorkspaceModelType
 from label_sleuth.models.core.model_api import ModelStatus
 from label_sleuth.models.core.model_type import ModelType
-from label_sleuth.utils import jsonpickle_decode, jsonpickle_encode
+from label_sleuth.orchestrator.core.state_api.workspace_journal import WorkspaceJournal
+from label_sleuth.serialization import decode_value, deserialize, encode_value, serialize
 
 
 class IterationStatus(Enum):
@@ -39,6 +42,7 @@ class IterationStatus(Enum):
     ERROR = 5
     MODEL_DELETED = 6
     INSUFFICIENT_TRAIN_DATA = 7
+    CANCELLED = 8  # a newer iteration was started before this iteration was completed
 
 
 @dataclass
@@ -111,13 +115,37 @@ class CategoryNameAlreadyExistsException(Exception):
         self.existing_category_name = existing_category_name
 
 
+LABEL_CHANGE_COUNT_RECORD = 'label_change_count'
+ITERATION_RECORD = 'iteration'
+
+
 class OrchestratorStateApi:
+    """
+    Manages the state of the workspaces, which is kept in memory and persisted to a json file per workspace.
+
+    By default, every change rewrites the workspace file. If *flush_interval_ms* is positive, frequent changes (e.g.
+    label change counts, models and statistics of iterations) are instead appended to an fsync'd workspace journal and
+    the workspace is marked as dirty; a background thread writes dirty workspaces to their files at most once every
+    *flush_interval_ms*, and the journal is replayed when a workspace is loaded. Changes to the status of an iteration
+    and to the categories, as well as process shutdown, always write the workspace file.
+    """
 
-    def __init__(self, workspaces_dir):
+    def __init__(self, workspaces_dir, flush_interval_ms: int = 0):
+        """
+        :param workspaces_dir: the directory in which the workspace files are stored
+        :param flush_interval_ms: the minimal interval between writes of a workspace file, or 0 to write the workspace
+        file on every change
+        """
         self.workspace_dir = workspaces_dir
         os.makedirs(self.workspace_dir, exist_ok=True)
         self.workspaces = dict()  # in-memory cache for Workspace objects
         self.workspaces_lock = defaultdict(threading.RLock)  # lock for methods that access or manipulate the workspaces
+        self.flush_interval_ms = flush_interval_ms
+        self.dirty_workspace_ids = set()  # workspaces with changes that are only persisted in their journal
+        self.dirty_workspace_ids_lock = threading.Lock()
+        self.flusher_thread = None
+        if self.flush_interval_ms > 0:
+            atexit.register(self.flush)
 
     # Workspace-related methods
 
@@ -177,6 +205,9 @@ class OrchestratorStateApi:
     def delete_workspace_state(self, workspace_id: str):
         with self.workspaces_lock[workspace_id]:
             os.remove(os.path.join(self.workspace_dir, self._filename_from_workspace_id(workspace_id)))
+            self._get_journal(workspace_id).clear()
+            with self.dirty_workspace_ids_lock:
+                self.dirty_workspace_ids.discard(workspace_id)
             if workspace_id in self.workspaces:
                 del self.workspaces[workspace_id]
 
@@ -200,17 +231,123 @@ class OrchestratorStateApi:
             return cached_workspace
         with open(os.path.join(self.workspace_dir, self._filename_from_workspace_id(workspace_id))) as json_file:
             workspace = json_file.read()
-        workspace = jsonpickle_decode(workspace, keys=True)
+        workspace = deserialize(workspace, keys=True)
         # for backward compatibility with jsonpickle formatting of old workspaces
         workspace.categories = {int(category_id_str): category
                                 for category_id_str, category in workspace.categories.items()}
+        journal_records = self._get_journal(workspace_id).read()
+        for record in journal_records:
+            self._apply_journal_record(workspace, record)
         self.workspaces[workspace_id] = workspace
+        if len(journal_records) > 0:
+            if self.flush_interval_ms > 0:
+                self._mark_dirty(workspace_id)
+            else:
+                self._write_workspace_file(workspace)
         return workspace
 
-    def _save_workspace(self, workspace: Workspace):
-        workspace_encoded = jsonpickle_encode(workspace, keys=True)
-        with open(os.path.join(self.workspace_dir, self._filename_from_workspace_id(workspace.workspace_id)), 'w') as f:
+    def _save_workspace(self, workspace: Union[Workspace, MulticlassWorkspace], journal_record: list = None):
+        """
+        Persist a change to the workspace. If write-behind is enabled and the change is described by *journal_record*,
+        the record is appended to the workspace journal and the workspace file is written later on by the flusher
+        thread. Otherwise, the workspace file is written immediately.
+
+        :param workspace: the changed workspace
+        :param journal_record: a record describing the change, see _apply_journal_record()
+        """
+        if journal_record is None or self.flush_interval_ms <= 0:
+            self._write_workspace_file(workspace)
+            return
+        self._get_journal(workspace.workspace_id).append(journal_record)
+        self._mark_dirty(workspace.workspace_id)
+
+    def _mark_dirty(self, workspace_id: str):
+        with self.dirty_workspace_ids_lock:
+            self.dirty_workspace_ids.add(workspace_id)
+            if self.flusher_thread is None:
+                self.flusher_thread = threading.Thread(target=self._run_flusher, daemon=True,
+                                                       name='workspace-state-flusher')
+                self.flusher_thread.start()
+
+    def _write_workspace_file(self, workspace: Union[Workspace, MulticlassWorkspace]):
+        """
+        Write the workspace file and clear the workspace journal, whose changes are now included in the file. The file
+        is written to a temporary file which then replaces the previous file, so a failure during the write does not
+        leave a partially written workspace file.
+        """
+        workspace_encoded = serialize(workspace)
+        file_path = os.path.join(self.workspace_dir, self._filename_from_workspace_id(workspace.workspace_id))
+        with open(file_path + '.tmp', 'w') as f:
             f.write(workspace_encoded)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(file_path + '.tmp', file_path)
+        self._get_journal(workspace.workspace_id).clear()
+        with self.dirty_workspace_ids_lock:
+            self.dirty_workspace_ids.discard(workspace.workspace_id)
+
+    def flush(self):
+        """
+        Write the files of all the workspaces that have changes which are only persisted in their journal
+        """
+        with self.dirty_workspace_ids_lock:
+            workspace_ids = list(self.dirty_workspace_ids)
+        for workspace_id in workspace_ids:
+            with self.workspaces_lock[workspace_id]:
+                if workspace_id not in self.dirty_workspace_ids or workspace_id not in self.workspaces:
+                    continue
+                try:
+                    self._write_workspace_file(self.workspaces[workspace_id])
+                except Exception:
+                    logging.exception(f"failed to write the state of workspace '{workspace_id}'")
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval_ms / 1000)
+            self.flush()
+
+    def _get_journal(self, workspace_id: str) -> WorkspaceJournal:
+        return WorkspaceJournal(os.path.join(self.workspace_dir, workspace_id + ".journal.jsonl"))
+
+    @staticmethod
+    def _apply_journal_record(workspace: Union[Workspace, MulticlassWorkspace], record: list):
+        """
+        Apply a workspace journal record to the workspace. The supported records are:
+        - [LABEL_CHANGE_COUNT_RECORD, category_id, label change count since last train]
+        - [ITERATION_RECORD, category_id, iteration index, encoded iteration], which replaces the iteration at the given
+        index, or adds it if the index equals the number of iterations
+        where category_id is None for multiclass workspaces.
+        """
+        record_type, category_id = record[0], record[1]
+        owner = workspace if category_id is None else workspace.categories[category_id]
+        if record_type == LABEL_CHANGE_COUNT_RECORD:
+            owner.label_change_count_since_last_train = record[2]
+        elif record_type == ITERATION_RECORD:
+            iteration_index, iteration = record[2], decode_value(record[3])
+            if iteration_index < len(owner.iterations):
+                owner.iterations[iteration_index] = iteration
+            elif iteration_index == len(owner.iterations):
+                owner.iterations.append(iteration)
+            else:
+                raise Exception(f"Journal of workspace '{workspace.workspace_id}' refers to iteration "
+                                f"{iteration_index}, but there are only {len(owner.iterations)} iterations")
+        else:
+            raise Exception(f"Unknown journal record type '{record_type}' in workspace '{workspace.workspace_id}'")
+
+    @staticmethod
+    def _get_label_change_count_record(workspace: Union[Workspace, MulticlassWorkspace],
+                                       category_id: Union[int, None]) -> list:
+        owner = workspace if category_id is None else workspace.categories[category_id]
+        return [LABEL_CHANGE_COUNT_RECORD, category_id, owner.label_change_count_since_last_train]
+
+    @staticmethod
+    def _get_iteration_record(workspace: Union[Workspace, MulticlassWorkspace], category_id: Union[int, None],
+                              iteration_index: int) -> list:
+        owner = workspace if category_id is None else workspace.categories[category_id]
+        if iteration_index < 0:
+            iteration_index += len(owner.iterations)
+        return [ITERATION_RECORD, category_id, iteration_index,
+                encode_value(owner.iterations[iteration_index])]
 
     @staticmethod
     def _filename_from_workspace_id(workspace_id: str):
@@ -294,7 +431,7 @@ class OrchestratorStateApi:
                     = recommended_items
             else:
                 workspace.iterations[iteration_index].active_learning_recommendations = recommended_items
-            self._save_workspace(workspace)
+            self._save_workspace(workspace, self._get_iteration_record(workspace, category_id, iteration_index))
 
     def get_label_change_count_since_last_train(self, workspace_id: str, category_id: Union[int, None]) -> int:
         with self.workspaces_lock[workspace_id]:
@@ -315,7 +452,8 @@ class OrchestratorStateApi:
             else:
                 raise Exception(f"workspace id '{workspace_id}' type ({type(workspace)}) is not supported")
 
-            self._save_workspace(workspace)
+            self._save_workspace(workspace, self._get_label_change_count_record(
+                workspace, category_id if type(workspace) == Workspace else None))
 
     def increase_label_change_count_since_last_train(self, workspace_id: str, category_id: Union[int, None],
                                                      number_of_new_changes: int):
@@ -335,7 +473,7 @@ class OrchestratorStateApi:
                     workspace.label_change_count_since_last_train + number_of_new_changes
             else:
                 raise Exception(f"Workspace type {type} is not supported")
-            self._save_workspace(workspace)
+            self._save_workspace(workspace, self._get_label_change_count_record(workspace, category_id))
 
     # Iteration-related methods
 
@@ -347,7 +485,7 @@ class OrchestratorStateApi:
                 workspace.iterations.append(iteration)
             else:
                 workspace.categories[category_id].iterations.append(iteration)
-            self._save_workspace(workspace)
+            self._save_workspace(workspace, self._get_iteration_record(workspace, category_id, -1))
 
     def add_model(self, workspace_id: str, category_id: int, iteration_index: int, model_info: ModelInfo):
         with self.workspaces_lock[workspace_id]:
@@ -363,7 +501,7 @@ class OrchestratorStateApi:
                     raise Exception(f"Workspace '{workspace_id}' (multiclass) iteration {iteration_index} "
                                     f"already has a model, cannot add a model")
                 workspace.iterations[iteration_index].model = model_info
-            self._save_workspace(workspace)
+            self._save_workspace(workspace, self._get_iteration_record(workspace, category_id, iteration_index))
 
     def get_iteration_status(self, workspace_id: str, category_id: int, iteration_index: int) -> IterationStatus:
         with self.workspaces_lock[workspace_id]:
@@ -426,7 +564,7 @@ class OrchestratorStateApi:
                 iteration = workspace.iterations[iteration_index]
 
             iteration.iteration_statistics.update(statistics_dict)
-            self._save_workspace(workspace)
+            self._save_workspace(workspace, self._get_iteration_record(workspace, category_id, iteration_index))
 
     def update_model_status(self, workspace_id: str, category_id: int, iteration_index: int, new_status: ModelStatus):
         with self.workspaces_lock[workspace_id]:
@@ -438,7 +576,7 @@ class OrchestratorStateApi:
             assert len(iterations) > iteration_index,\
                 f"Iteration '{iteration_index}' doesn't exist in workspace '{workspace_id}'"
             iterations[iteration_index].model.model_status = new_status
-            self._save_workspace(workspace)
+            self._save_workspace(workspace, self._get_iteration_record(workspace, category_id, iteration_index))
 
     def mark_iteration_model_as_deleted(self, workspace_id, category_id: int, iteration_index: int):
         with self.workspaces_lock[workspace_id]:
@@ -17,6 +17,7 @@ import os
 import unittest
 import shutil
 import tempfile
+import time
 from datetime import datetime
 
 from label_sleuth.data_access.core.data_structs import WorkspaceModelType
@@ -199,3 +200,58 @@ class TestOrchestratorStateAPI(unittest.TestCase):
         self.assertIn("cat2", loaded_categories)
         self.assertIn("desc1", loaded_descriptions)
         self.assertIn("desc2", loaded_descriptions)
+
+    def _create_workspace_with_iteration(self, orchestrator_state_api, workspace_id):
+        orchestrator_state_api.create_workspace(workspace_id=workspace_id, dataset_name='non_existing_dump')
+        category_id = orchestrator_state_api.add_category_to_workspace(workspace_id, "category_1", "description")
+        orchestrator_state_api.increase_label_change_count_since_last_train(workspace_id, category_id, 3)
+        orchestrator_state_api.add_iteration(workspace_id, category_id)
+        orchestrator_state_api.add_model(workspace_id, category_id, 0,
+                                         ModelInfo("123", ModelStatus.TRAINING, datetime.now(),
+                                                   ModelsCatalog.SVM_OVER_WORD_EMBEDDINGS, {}))
+        orchestrator_state_api.add_iteration_statistics(workspace_id, category_id, 0, {'score': 0.5})
+        return category_id
+
+    def test_write_behind_workspace_is_restored_from_journal(self):
+        workspace_id = "workspace_1"
+        write_behind_state_api = OrchestratorStateApi(self.temp_dir.name, flush_interval_ms=60 * 1000)
+        category_id = self._create_workspace_with_iteration(write_behind_state_api, workspace_id)
+        workspace = write_behind_state_api.get_workspace(workspace_id)
+        self.assertEqual({workspace_id}, write_behind_state_api.dirty_workspace_ids)
+
+        # the workspace file was not written since the category was added, but the journal holds the later changes
+        workspace_from_disk = OrchestratorStateApi(self.temp_dir.name).get_workspace(workspace_id)
+        self.assertEqual(workspace, workspace_from_disk)
+        self.assertEqual(3, workspace_from_disk.categories[category_id].label_change_count_since_last_train)
+        self.assertEqual({'score': 0.5}, workspace_from_disk.categories[category_id].iterations[0].iteration_statistics)
+        write_behind_state_api.flush()
+
+    def test_write_behind_flush_and_status_transitions_write_the_workspace_file(self):
+        workspace_id = "workspace_1"
+        write_behind_state_api = OrchestratorStateApi(self.temp_dir.name, flush_interval_ms=60 * 1000)
+        category_id = self._create_workspace_with_iteration(write_behind_state_api, workspace_id)
+        journal_path = os.path.join(self.temp_dir.name, f"{workspace_id}.journal.jsonl")
+        self.assertTrue(os.path.isfile(journal_path))
+
+        write_behind_state_api.flush()
+        self.assertFalse(os.path.isfile(journal_path))
+        self.assertEqual(set(), write_behind_state_api.dirty_workspace_ids)
+
+        write_behind_state_api.update_model_status(workspace_id, category_id, 0, ModelStatus.READY)
+        self.assertTrue(os.path.isfile(journal_path))
+        write_behind_state_api.update_iteration_status(workspace_id, category_id, 0, IterationStatus.READY)
+        self.assertFalse(os.path.isfile(journal_path))
+        self.assertEqual(write_behind_state_api.get_workspace(workspace_id),
+                         OrchestratorStateApi(self.temp_dir.name).get_workspace(workspace_id))
+        self.assertEqual({workspace_id}, {ws.workspace_id for ws in write_behind_state_api.get_all_workspaces()})
+
+    def test_write_behind_flusher_thread(self):
+        workspace_id = "workspace_1"
+        write_behind_state_api = OrchestratorStateApi(self.temp_dir.name, flush_interval_ms=10)
+        self._create_workspace_with_iteration(write_behind_state_api, workspace_id)
+        for _ in range(100):
+            if len(write_behind_state_api.dirty_workspace_ids) == 0:
+                break
+            time.sleep(0.05)
+        self.assertEqual(set(), write_behind_state_api.dirty_workspace_ids)
+        self.assertFalse(os.path.isfile(os.path.join(self.temp_dir.name, f"{workspace_id}.journal.jsonl")))
@@ -0,0 +1,70 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import logging
+import os
+from typing import List
+
+import ujson as json
+
+
+class WorkspaceJournal:
+    """
+    An append-only log of changes to the state of a workspace, kept alongside the workspace snapshot file. Each record
+    sets a value to its current state (rather than describing a delta), so replaying the records on top of the
+    snapshot restores the current workspace state, and replaying a record more than once has no effect.
+
+    Records are written as json lines, and each append is flushed and synced to disk before returning. The journal is
+    not thread-safe, and callers are expected to hold the lock of the workspace.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, record: list):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self) -> List[list]:
+        """
+        Return the records in the journal, in the order in which they were appended
+        """
+        if not os.path.isfile(self.path):
+            return []
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        records = []
+        for line_idx, line in enumerate(lines):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                if line_idx != len(lines) - 1:
+                    raise
+                # the last record may be partially written if the process stopped while appending it. It is removed,
+                # so that records appended later on are not written on the same line.
+                logging.warning(f"removing a partially written record at the end of workspace journal {self.path}")
+                with open(self.path + '.tmp', 'w') as f:
+                    f.write(''.join(line + '\n' for line in lines[:line_idx]))
+                os.replace(self.path + '.tmp', self.path)
+        return records
+
+    def clear(self):
+        """
+        Remove all records from the journal, once they are included in the workspace snapshot
+        """
+        if os.path.isfile(self.path):
+            os.remove(self.path)
@@ -0,0 +1,157 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import os
+import shutil
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from label_sleuth.models.core.prediction import MulticlassPrediction, Prediction
+
+LABELS_FILENAME = 'labels.npy'
+SCORES_FILENAME = 'scores.npy'
+CLASS_IDS_FILENAME = 'class_ids.npy'
+
+
+class IterationPredictions:
+    """
+    The predictions of an iteration model over an entire dataset, as arrays aligned with the dataset row positions:
+    the i-th entry of *labels* and *scores* holds the prediction for the i-th row of the dataset.
+
+    For binary models, *labels* is a boolean array and *scores* holds the score of each row. For multiclass models,
+    *labels* holds the predicted class id of each row, and *scores* is a matrix with a column for each of the
+    *class_ids*.
+    """
+
+    def __init__(self, labels: np.ndarray, scores: np.ndarray, class_ids: Optional[np.ndarray] = None):
+        self.labels = labels
+        self.scores = scores
+        self.class_ids = class_ids
+
+    @classmethod
+    def from_predictions(cls, predictions: Sequence[Union[Prediction, MulticlassPrediction]]):
+        """
+        :param predictions: the prediction for each row of the dataset, in row order
+        """
+        labels, scores, class_ids = cls._to_arrays(predictions)
+        return cls(labels, scores, class_ids)
+
+    @staticmethod
+    def _to_arrays(predictions, class_ids=None):
+        if len(predictions) > 0 and isinstance(predictions[0], MulticlassPrediction):
+            if class_ids is None:
+                class_ids = np.array(sorted(predictions[0].scores.keys()), dtype=np.int64)
+            labels = np.array([p.label for p in predictions], dtype=np.int64)
+            scores = np.array([[p.scores[class_id] for class_id in class_ids.tolist()] for p in predictions],
+                              dtype=np.float64).reshape(len(predictions), len(class_ids))
+            return labels, scores, class_ids
+        labels = np.array([p.label for p in predictions], dtype=bool)
+        scores = np.array([p.score for p in predictions], dtype=np.float64)
+        return labels, scores, class_ids
+
+    @classmethod
+    def concatenate(cls, chunks: Sequence['IterationPredictions']):
+        """
+        :param chunks: the predictions of consecutive ranges of rows
+        """
+        if len(chunks) == 0:
+            return cls.from_predictions([])
+        return cls(np.concatenate([chunk.labels for chunk in chunks]),
+                   np.concatenate([chunk.scores for chunk in chunks]), chunks[0].class_ids)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def extended(self, predictions: Sequence[Union[Prediction, MulticlassPrediction]]) -> 'IterationPredictions':
+        """
+        :param predictions: the predictions of rows that were added to the dataset after these predictions were
+        calculated
+        :return: new predictions, with the given predictions appended to these predictions
+        """
+        labels, scores, _ = self._to_arrays(predictions, self.class_ids)
+        return IterationPredictions(np.concatenate([self.labels, labels]), np.concatenate([self.scores, scores]),
+                                    self.class_ids)
+
+    @classmethod
+    def load(cls, predictions_dir):
+        class_ids_path = os.path.join(predictions_dir, CLASS_IDS_FILENAME)
+        return cls(np.load(os.path.join(predictions_dir, LABELS_FILENAME)),
+                   np.load(os.path.join(predictions_dir, SCORES_FILENAME)),
+                   np.load(class_ids_path) if os.path.isfile(class_ids_path) else None)
+
+    def save(self, predictions_dir):
+        """
+        Save the predictions to *predictions_dir*, replacing predictions that were previously saved there. The
+        predictions are first written to a temporary directory, so that a failure during the write does not leave
+        partially written predictions.
+        """
+        temp_dir = predictions_dir + '.tmp'
+        previous_dir = predictions_dir + '.old'
+        for directory in [temp_dir, previous_dir]:
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+        os.makedirs(temp_dir)
+        np.save(os.path.join(temp_dir, SCORES_FILENAME), self.scores)
+        if self.class_ids is not None:
+            np.save(os.path.join(temp_dir, CLASS_IDS_FILENAME), self.class_ids)
+        np.save(os.path.join(temp_dir, LABELS_FILENAME), self.labels)
+        if os.path.isdir(predictions_dir):
+            os.replace(predictions_dir, previous_dir)
+        os.replace(temp_dir, predictions_dir)
+        if os.path.isdir(previous_dir):
+            shutil.rmtree(previous_dir)
+
+    @staticmethod
+    def exist(predictions_dir):
+        return os.path.isfile(os.path.join(predictions_dir, LABELS_FILENAME))
+
+    def get_label_counts(self, label_values: Sequence) -> dict:
+        """
+        :return: a mapping from each of the *label_values* to the number of rows predicted with this label
+        """
+        values, counts = np.unique(self.labels, return_counts=True)
+        value_to_count = dict(zip(values.tolist(), counts.tolist()))
+        return {label_value: value_to_count.get(label_value, 0) for label_value in label_values}
+
+    def get_rows_with_label(self, label_value, rows: np.ndarray) -> np.ndarray:
+        """
+        :param label_value: the required predicted label
+        :param rows: candidate row positions, in the desired order
+        :return: the row positions from *rows* that were predicted with *label_value*, in the same order
+        """
+        return rows[self.labels[rows] == label_value]
+
+    def get_label_scores(self, label_value) -> np.ndarray:
+        """
+        :return: the score of *label_value* for each row
+        """
+        if self.class_ids is None:
+            return self.scores if label_value else 1 - self.scores
+        return self.scores[:, int(np.flatnonzero(self.class_ids == label_value)[0])]
+
+    def get_top_rows_by_score(self, label_value, rows: np.ndarray, count: int) -> np.ndarray:
+        """
+        :return: the *count* row positions from *rows* that have the highest score for *label_value*, in descending
+        order of their score
+        """
+        if count <= 0 or len(rows) == 0:
+            return rows[:0]
+        scores = self.get_label_scores(label_value)[rows]
+        if count < len(rows):
+            top = np.argpartition(-scores, count - 1)[:count]
+        else:
+            top = np.arange(len(rows))
+        return rows[top[np.argsort(-scores[top], kind='stable')]]
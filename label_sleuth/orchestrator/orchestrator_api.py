@@ -14,20 +14,22 @@
 #
 
 import functools
-import itertools
 import logging
 import os
+import shutil
 import sys
+import threading
 import time
 import copy 
 
-from collections import Counter, defaultdict
+from collections import Counter, OrderedDict, defaultdict
 from concurrent.futures.thread import ThreadPoolExecutor
 from datetime import datetime
 from statistics import mean
 from typing import Mapping, List, Sequence, Union, Tuple
 
 import jsonpickle
+import numpy as np
 import pandas as pd
 
 from label_sleuth.active_learning.core.active_learning_factory import ActiveLearningFactory
@@ -40,22 +42,27 @@ from label_sleuth.data_access.data_access_api import DataAccessApi, DatasetRowCo
 from label_sleuth.data_access.label_import_utils import process_labels_dataframe
 from label_sleuth.data_access.processors.csv_processor import CsvFileProcessor
 from label_sleuth.definitions import ACTIVE_LEARNING_SUGGESTION_COUNT
+from label_sleuth.metrics import ITERATION_STAGE_SECONDS
 from label_sleuth.models.core.model_api import ModelStatus
 from label_sleuth.models.core.catalog import ModelsCatalog
 from label_sleuth.models.core.model_type import ModelType
 from label_sleuth.models.core.models_factory import ModelFactory
 from label_sleuth.models.core.prediction import Prediction, MulticlassPrediction
 from label_sleuth.models.core.tools import SentenceEmbeddingService
-from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager, CancellationToken, \
+    JobCancelledException, JobPriority
 from label_sleuth.orchestrator.core.state_api.orchestrator_state_api import Category, Iteration, IterationStatus, \
     ModelInfo, MulticlassWorkspace, OrchestratorStateApi, MulticlassCategory, Workspace
-from label_sleuth.orchestrator.utils import convert_text_elements_to_train_data, \
+from label_sleuth.orchestrator.iteration_predictions import IterationPredictions
+from label_sleuth.orchestrator.utils import add_dataset_rows_to_items, convert_text_elements_to_train_data, \
     convert_text_elements_to_multiclass_train_data
 from label_sleuth.training_set_selector.training_set_selector_factory import TrainingSetSelectionFactory
-from label_sleuth.utils import jsonpickle_encode
+from label_sleuth.serialization import serialize
 
 # constants
 NUMBER_OF_MODELS_TO_KEEP = 2
+MAX_ITERATION_PREDICTIONS_IN_MEMORY = 8
+ITERATION_PREDICTIONS_DIR_NAME = "iteration_predictions"
 TRAIN_COUNTS_STR_KEY = "train_counts"
 MODEL_CATEGORIES_STR_KEY = "categories"
 
@@ -77,6 +84,16 @@ class OrchestratorApi:
         self.sentence_embedding_service = sentence_embedding_service
         self.training_set_selection_factory = training_set_selection_factory
         self.config = config
+        # full-dataset prediction arrays of recently used iterations, keyed by (workspace_id, category_id, iteration)
+        self.iteration_predictions_in_memory = OrderedDict()
+        self.iteration_predictions_lock = threading.RLock()
+        # a lock for each iteration, held while its predictions are loaded or calculated
+        self.iteration_predictions_key_locks = defaultdict(threading.Lock)
+        # the latest iteration of each (workspace_id, category_id) and its cancellation token, as (iteration, token)
+        self.iteration_cancellation_tokens = {}
+        # pending train_if_recommended() calls, keyed by (workspace_id, category_id)
+        self.pending_training_triggers = {}
+        self.iteration_flow_lock = threading.Lock()
         self._verify_model_and_language_compatibility()
 
     def get_all_dataset_names(self):
@@ -105,6 +122,7 @@ class OrchestratorApi:
         :param workspace_id:
         """
         logging.info(f"deleting workspace '{workspace_id}'")
+        self._cancel_iterations(workspace_id)
         if self.workspace_exists(workspace_id):
             workspace = self.orchestrator_state.get_workspace(workspace_id)
             try:
@@ -115,6 +133,10 @@ class OrchestratorApi:
                         if category is not None:
                             self._delete_category_models(workspace_id, category_id)
                 self.orchestrator_state.delete_workspace_state(workspace_id)
+                workspace_predictions_dir = os.path.join(self.orchestrator_state.workspace_dir,
+                                                         ITERATION_PREDICTIONS_DIR_NAME, workspace_id)
+                if os.path.isdir(workspace_predictions_dir):
+                    shutil.rmtree(workspace_predictions_dir)
             except Exception as e:
                 logging.exception(f"error deleting workspace '{workspace_id}'")
                 raise e
@@ -207,6 +229,7 @@ class OrchestratorApi:
         :param category_id:
         """
         logging.info(f"deleting category id {category_id} from workspace '{workspace_id}'")
+        self._cancel_iterations(workspace_id, category_id)
         dataset_name = self.get_dataset_name(workspace_id)
         self.data_access.delete_labels_for_category(workspace_id, dataset_name, category_id)
         if self.is_binary_workspace(workspace_id):
@@ -308,7 +331,7 @@ class OrchestratorApi:
     def query(self, workspace_id: str, dataset_name: str, category_id: Union[int, None],
               query: str, is_regex: bool = False,
               sample_size: int = sys.maxsize, sample_start_idx: int = 0, unlabeled_only: bool = False,
-              remove_duplicates=False) -> Mapping[str, Union[List[TextElement], int]]:
+              remove_duplicates=False, cursor: str = None) -> Mapping[str, Union[List[TextElement], int]]:
         """
         Query a dataset using the given regex, returning up to *sample_size* elements that meet the query
 
@@ -321,9 +344,12 @@ class OrchestratorApi:
         :param sample_size: maximum items to return
         :param sample_start_idx: get elements starting from this index (for pagination)
         :param remove_duplicates: if True, remove duplicate elements
-        :return: a dictionary with two keys: 'results' whose value is a list of TextElements, and 'hit_count' whose
-        value is the total number of TextElements in the dataset matched by the query.
-        {'results': [TextElement], 'hit_count': int}
+        :param cursor: the 'next_cursor' returned by a previous query with the same arguments, for fetching the next
+        page of its results
+        :return: a dictionary with the keys 'results' whose value is a list of TextElements, 'hit_count' whose value
+        is the total number of TextElements in the dataset matched by the query, and 'next_cursor' whose value is a
+        cursor for fetching the next page of results (or None if there are no more results).
+        {'results': [TextElement], 'hit_count': int, 'next_cursor': str}
         """
         if unlabeled_only and category_id is None:
             raise Exception("unlabeled_only was set to True and category_id was not provided")
@@ -332,12 +358,12 @@ class OrchestratorApi:
             return self.data_access.get_unlabeled_text_elements(workspace_id=workspace_id, dataset_name=dataset_name,
                                                                 category_id=category_id, sample_size=sample_size,
                                                                 sample_start_idx=sample_start_idx,
-                                                                remove_duplicates=remove_duplicates)
+                                                                remove_duplicates=remove_duplicates, cursor=cursor)
         else:
             return self.data_access.get_text_elements(workspace_id=workspace_id, dataset_name=dataset_name,
                                                       sample_size=sample_size, sample_start_idx=sample_start_idx,
                                                       query=query, is_regex=is_regex,
-                                                      remove_duplicates=remove_duplicates)
+                                                      remove_duplicates=remove_duplicates, cursor=cursor)
 
     def set_labels(self, workspace_id: str, uri_to_label: Union[Mapping[str, Mapping[int, Label]],
                                                                 Mapping[str, MulticlassLabel]],
@@ -459,6 +485,7 @@ class OrchestratorApi:
                      f"workspace '{workspace_id}' in category id '{category_id}' as deleted, and deleting the model")
         self.orchestrator_state.mark_iteration_model_as_deleted(workspace_id, category_id, iteration_index)
         model_api.delete_model(model_info.model_id)
+        self._delete_iteration_predictions(workspace_id, category_id, iteration_index)
 
     def _delete_category_models(self, workspace_id, category_id: Union[int, None]):
         iterations = self.orchestrator_state.get_all_iterations(workspace_id, category_id)
@@ -497,6 +524,8 @@ class OrchestratorApi:
         Since the training and inference stages of the iteration are submitted asynchronously in the background, the
         full flow is composed of this method, along with the _train_done_callback and _infer_done_callback, which are
         launched when the training and inference stages, respectively, are completed.
+        Starting an iteration cancels the remaining stages of the previous iteration for the same category, if it is
+        still running, as its results would be superseded by the new iteration.
 
         :param workspace_id:
         :param dataset_name:
@@ -505,6 +534,7 @@ class OrchestratorApi:
         """
         new_iteration_index = len(self.orchestrator_state.get_all_iterations(workspace_id, category_id))
         self.orchestrator_state.add_iteration(workspace_id=workspace_id, category_id=category_id)
+        cancellation_token = self._start_iteration_cancellation_token(workspace_id, category_id, new_iteration_index)
         is_multiclass = self.data_access.is_multiclass(workspace_id)
 
         if is_multiclass:
@@ -527,12 +557,62 @@ class OrchestratorApi:
 
         future = train_set_selector.collect_train_set(workspace_id=workspace_id,
                                                       train_dataset_name=dataset_name,
-                                                      cat_id_to_name_and_desc=cat_id_to_name_and_desc)
+                                                      cat_id_to_name_and_desc=cat_id_to_name_and_desc,
+                                                      cancellation_token=cancellation_token)
 
         future.add_done_callback(functools.partial(self._train, workspace_id, category_id, model_type,
-                                                   new_iteration_index))
+                                                   new_iteration_index, cancellation_token))
+
+    def _start_iteration_cancellation_token(self, workspace_id, category_id, iteration_index) -> CancellationToken:
+        """
+        Create the cancellation token of a new iteration, and cancel the token of the previous iteration
+        """
+        cancellation_token = CancellationToken()
+        with self.iteration_flow_lock:
+            previous = self.iteration_cancellation_tokens.get((workspace_id, category_id))
+            self.iteration_cancellation_tokens[(workspace_id, category_id)] = (iteration_index, cancellation_token)
+        if previous is not None:
+            previous_iteration_index, previous_cancellation_token = previous
+            iterations = self.get_all_iterations_for_category(workspace_id, category_id)
+            if iterations[previous_iteration_index].status in \
+                    [IterationStatus.PREPARING_DATA, IterationStatus.TRAINING, IterationStatus.RUNNING_INFERENCE,
+                     IterationStatus.CALCULATING_STATISTICS, IterationStatus.RUNNING_ACTIVE_LEARNING]:
+                logging.info(f"workspace '{workspace_id}' category id '{category_id}': cancelling iteration "
+                             f"{previous_iteration_index} as iteration {iteration_index} was started")
+            previous_cancellation_token.cancel()
+        return cancellation_token
+
+    def _cancel_iterations(self, workspace_id, category_id=None):
+        """
+        Cancel the running iterations of the given category, or of all the categories of the workspace if
+        *category_id* is None
+        """
+        with self.iteration_flow_lock:
+            keys = [key for key in self.iteration_cancellation_tokens
+                    if key[0] == workspace_id and (category_id is None or key[1] == category_id)]
+            cancellation_tokens = [self.iteration_cancellation_tokens.pop(key)[1] for key in keys]
+        for cancellation_token in cancellation_tokens:
+            cancellation_token.cancel()
+
+    def _mark_iteration_as_cancelled(self, workspace_id, category_id, iteration_index):
+        """
+        Stop the flow of a cancelled iteration: delete its model, if it was already trained, and mark it as cancelled
+        """
+        if not self.workspace_exists(workspace_id) or \
+                (category_id is not None and category_id not in self.get_all_categories(workspace_id)):
+            return  # the iteration was cancelled as its workspace or category were deleted
+        logging.info(f"iteration {iteration_index} in workspace '{workspace_id}' category id '{category_id}' was "
+                     f"cancelled")
+        iteration = self.get_all_iterations_for_category(workspace_id, category_id)[iteration_index]
+        if iteration.model is not None and iteration.model.model_status != ModelStatus.DELETED:
+            self.delete_iteration_model(workspace_id, category_id, iteration_index)
+        self.orchestrator_state.update_iteration_status(workspace_id, category_id, iteration_index,
+                                                        IterationStatus.CANCELLED)
 
-    def _train(self, workspace_id, category_id, model_type, iteration_index, future):
+    def _train(self, workspace_id, category_id, model_type, iteration_index, cancellation_token, future):
+        if cancellation_token.is_cancelled():
+            self._mark_iteration_as_cancelled(workspace_id, category_id, iteration_index)
+            return
 
         try:
             train_data = future.result()
@@ -565,6 +645,9 @@ class OrchestratorApi:
             return dict(Counter(label_names))
 
         is_multiclass = self.data_access.is_multiclass(workspace_id)
+        dataset_name = self.get_dataset_name(workspace_id)
+        train_rows = self.data_access.get_row_positions_by_uris(dataset_name,
+                                                                [element.uri for element in train_data])
 
         train_counts = _get_counts_per_label(train_data, category_id)
         train_statistics = {TRAIN_COUNTS_STR_KEY: train_counts}
@@ -576,7 +659,7 @@ class OrchestratorApi:
             logging.info(f"workspace '{workspace_id}' (multiclass) training a model."
                          f"train_statistics: {train_statistics}")
             model_params = {
-                "dataset_name": self.get_dataset_name(workspace_id),
+                "dataset_name": dataset_name,
                 "category_id_to_info": {
                     cat_id: {
                         "category_name": category.name,
@@ -590,7 +673,7 @@ class OrchestratorApi:
             logging.info(f"workspace '{workspace_id}' training a model for category id '{category_id}', "
                          f"train_statistics: {train_statistics}")
             model_params = {
-                "dataset_name": self.get_dataset_name(workspace_id),
+                "dataset_name": dataset_name,
                 "category_id_to_info": {
                     category_id: {
                         "category_name": category.name,
@@ -599,6 +682,8 @@ class OrchestratorApi:
                 }
             }
 
+        add_dataset_rows_to_items(train_data, self.data_access.get_dataset_store_dir(dataset_name), train_rows)
+
         self.orchestrator_state.update_iteration_status(workspace_id=workspace_id, category_id=category_id,
                                                         iteration_index=iteration_index,
                                                         new_status=IterationStatus.TRAINING)
@@ -613,20 +698,25 @@ class OrchestratorApi:
                                           iteration_index=iteration_index, model_info=model_info)
         # The train callback is added here to ensure it only runs after the iteration has been added
         future.add_done_callback(functools.partial(self._train_done_callback, workspace_id, category_id,
-                                                   iteration_index))
+                                                   iteration_index, cancellation_token))
         # The model id is returned almost immediately, but the training is performed in the background. Once training is
         # complete the iteration flow continues in the *_train_done_callback* method
         return model_id
 
-    def _train_done_callback(self, workspace_id, category_id, iteration_index, future):
+    def _train_done_callback(self, workspace_id, category_id, iteration_index, cancellation_token, future):
         """
         Once model training for Iteration *iteration_index* is complete, the flow of the iteration continues here. As
         part of this stage an inference job over the entire dataset is launched in the background.
         :param workspace_id:
         :param category_id:
         :param iteration_index:
+        :param cancellation_token: the cancellation token of the iteration
         :param future: future object for the train job, which was submitted through the BackgroundJobsManager
         """
+        if cancellation_token.is_cancelled():
+            self._mark_iteration_as_cancelled(workspace_id, category_id, iteration_index)
+            return
+
         try:
             model_id = future.result()
         except Exception:
@@ -646,27 +736,67 @@ class OrchestratorApi:
         model_info = iteration.model
         model_api = self.model_factory.get_model_api(model_info.model_type)
         dataset_name = self.get_dataset_name(workspace_id)
-        elements = self.get_all_text_elements(dataset_name)
+        num_rows = self.data_access.get_dataset_elements_count(dataset_name)
         logging.info(f"Successfully trained model id {model_id} for workspace '{workspace_id}' category id "
                      f"'{category_id}' iteration {iteration_index}. Running background inference for the full "
-                     f"dataset ({len(elements)} items)")
-        model_api.infer_by_id_async(model_id, items_to_infer=[{"text": element.text} for element in elements],
-                                    done_callback=functools.partial(self._infer_done_callback, workspace_id,
-                                                                    category_id, iteration_index))
+                     f"dataset ({num_rows} items)")
+        self.background_jobs_manager.add_background_job(
+            self._infer_dataset_in_chunks,
+            args=(workspace_id, category_id, iteration_index, model_api, model_id, dataset_name, num_rows,
+                  cancellation_token),
+            use_gpu=model_api.gpu_support,
+            done_callback=functools.partial(self._infer_done_callback, workspace_id, category_id, iteration_index,
+                                            cancellation_token),
+            priority=JobPriority.ITERATION, key=('infer_dataset', model_id), cancellation_token=cancellation_token)
         # Inference is performed in the background. Once the infer job is complete the iteration flow continues in the
         # *_infer_done_callback* method
 
-    def _infer_done_callback(self, workspace_id, category_id, iteration_index, future):
+    def _infer_dataset_in_chunks(self, workspace_id, category_id, iteration_index, model_api, model_id, dataset_name,
+                                 num_rows, cancellation_token: CancellationToken = None) -> IterationPredictions:
+        """
+        Infer the first *num_rows* elements of the dataset using *model_id*, in chunks of
+        *config.inference_chunk_size* elements. Only the texts of a single chunk are fetched from the dataset at a time,
+        and the predictions of each chunk are saved to the model prediction store before inferring the next chunk.
+        The progress of the inference is stored in the iteration statistics.
+        :param cancellation_token: an optional token, which is checked before inferring each chunk
+        :return: the predictions for all the inferred elements, as arrays aligned with the dataset row positions
+        """
+        chunk_size = self.config.inference_chunk_size
+        store_dir = self.data_access.get_dataset_store_dir(dataset_name)
+        chunks = []
+        with ITERATION_STAGE_SECONDS.time(stage='inference'):
+            for chunk_start in range(0, num_rows, chunk_size):
+                if cancellation_token is not None:
+                    cancellation_token.raise_if_cancelled()
+                chunk_end = min(chunk_start + chunk_size, num_rows)
+                rows = np.arange(chunk_start, chunk_end)
+                items = [{"text": text} for text in self.data_access.get_texts_by_row_positions(dataset_name, rows)]
+                add_dataset_rows_to_items(items, store_dir, rows)
+                predictions = model_api.infer_by_id(model_id, items)
+                chunks.append(IterationPredictions.from_predictions(predictions))
+                self.orchestrator_state.add_iteration_statistics(
+                    workspace_id, category_id, iteration_index,
+                    {"inference_progress": {"inferred_count": chunk_end, "total_count": num_rows}})
+                logging.info(f"workspace '{workspace_id}' category id '{category_id}' iteration {iteration_index}: "
+                             f"inferred {chunk_end} out of {num_rows} elements")
+            return IterationPredictions.concatenate(chunks)
+
+    def _infer_done_callback(self, workspace_id, category_id, iteration_index, cancellation_token, future):
         """
         Once model inference for Iteration *iteration_index* over the full dataset is complete, the flow of the
         iteration continues here. As part of this stage the active learning module recommendations are calculated.
         :param workspace_id:
         :param category_id:
         :param iteration_index:
+        :param cancellation_token: the cancellation token of the iteration
         :param future: future object for the inference job, which was submitted through the BackgroundJobsManager
         """
+        if cancellation_token.is_cancelled():
+            self._mark_iteration_as_cancelled(workspace_id, category_id, iteration_index)
+            return
+
         try:
-            predictions = future.result()
+            iteration_predictions = future.result()
         except Exception:
             logging.exception(f"Background inference on workspace '{workspace_id}' category id '{category_id}' "
                               f"iteration {iteration_index} Failed. Marking iteration with Error")
@@ -679,41 +809,45 @@ class OrchestratorApi:
                          f" category id '{category_id}' iteration {iteration_index}, "
                          f"calculating statistics and updating active learning recommendations")
 
-            self._calculate_iteration_statistics(workspace_id, category_id, iteration_index, predictions)
+            self._save_iteration_predictions(workspace_id, category_id, iteration_index, iteration_predictions)
+            with ITERATION_STAGE_SECONDS.time(stage='statistics'):
+                self._calculate_iteration_statistics(workspace_id, category_id, iteration_index)
+            cancellation_token.raise_if_cancelled()
 
             self.orchestrator_state.update_iteration_status(workspace_id, category_id,
                                                             iteration_index, IterationStatus.RUNNING_ACTIVE_LEARNING)
             dataset_name = self.get_dataset_name(workspace_id)
-            self._calculate_active_learning_recommendations(workspace_id, dataset_name, category_id,
-                                                            ACTIVE_LEARNING_SUGGESTION_COUNT, iteration_index)
+            with ITERATION_STAGE_SECONDS.time(stage='active_learning'):
+                self._calculate_active_learning_recommendations(workspace_id, dataset_name, category_id,
+                                                                ACTIVE_LEARNING_SUGGESTION_COUNT, iteration_index)
             self.orchestrator_state.update_iteration_status(workspace_id, category_id, iteration_index,
                                                             IterationStatus.READY)
             logging.info(f"Successfully finished iteration {iteration_index} "
                          f"in workspace '{workspace_id}' category id '{category_id}'.")
 
+        except JobCancelledException:
+            self._mark_iteration_as_cancelled(workspace_id, category_id, iteration_index)
         except Exception:
             logging.exception(f"Iteration {iteration_index} on workspace '{workspace_id}' category id '{category_id}' "
                               f"Failed. Marking iteration with Error")
             self.orchestrator_state.update_iteration_status(workspace_id, category_id, iteration_index,
                                                             IterationStatus.ERROR)
         try:
-            self._delete_old_models(workspace_id, category_id, iteration_index)
+            with ITERATION_STAGE_SECONDS.time(stage='delete_old_models'):
+                self._delete_old_models(workspace_id, category_id, iteration_index)
         except Exception:
             logging.exception(f"Failed to delete old models for workspace '{workspace_id}' category id '{category_id}' "
                               f"after iteration {iteration_index} finished successfully ")
 
-    def _calculate_iteration_statistics(self, workspace_id, category_id, iteration_index,
-                                        predictions: Sequence[Prediction]):
+    def _calculate_iteration_statistics(self, workspace_id, category_id, iteration_index):
         """
         Calculate some statistics about the *iteration_index* model and store them in the workspace
         :param workspace_id:
         :param category_id:
         :param iteration_index:
-        :param predictions: model predictions of the *iteration_index* model over the entire dataset
         """
-        dataset_name = self.get_dataset_name(workspace_id)
-        elements = self.get_all_text_elements(dataset_name)
-        dataset_size = len(predictions)
+        iteration_predictions = self.get_iteration_predictions(workspace_id, category_id, iteration_index)
+        dataset_size = len(iteration_predictions)
 
         # calculate the fraction of examples per prediction from the current model
         if category_id is None: # multiclass
@@ -722,9 +856,10 @@ class OrchestratorApi:
             labels = [LABEL_POSITIVE, LABEL_NEGATIVE]
 
         post_train_statistics = {"prediction_stats": {}}
+        label_counts = iteration_predictions.get_label_counts(labels)
         for label_value in labels:
             post_train_statistics["prediction_stats"][label_value] = {}
-            count = sum([pred.label == label_value for pred in predictions])
+            count = label_counts[label_value]
             fraction = count / dataset_size
             post_train_statistics["prediction_stats"][label_value]["count"] = count
             post_train_statistics["prediction_stats"][label_value]["fraction"] = fraction
@@ -735,9 +870,10 @@ class OrchestratorApi:
             [candidate_iteration_index for candidate_iteration_index, iteration in enumerate(previous_iterations)
              if iteration.status == IterationStatus.READY]
         if len(previous_ready_iteration_indices) > 0:
-            previous_model_predictions = self.infer(workspace_id, category_id, elements,
-                                                    iteration_index=previous_ready_iteration_indices[-1])
-            num_identical = sum(x.label == y.label for x, y in zip(predictions, previous_model_predictions))
+            previous_iteration_predictions = \
+                self.get_iteration_predictions(workspace_id, category_id, previous_ready_iteration_indices[-1])
+            num_identical = int(np.sum(iteration_predictions.labels
+                                       == previous_iteration_predictions.labels[:dataset_size]))
             post_train_statistics["changed_fraction"] = (dataset_size - num_identical) / dataset_size
 
         logging.info(f"workspace {workspace_id} category {category_id} post train measurements for "
@@ -745,6 +881,114 @@ class OrchestratorApi:
         self.orchestrator_state.add_iteration_statistics(workspace_id, category_id, iteration_index,
                                                          post_train_statistics)
 
+    def get_iteration_predictions(self, workspace_id, category_id, iteration_index: int = None) \
+            -> IterationPredictions:
+        """
+        Get the predictions of the *iteration_index* model for all the elements in the dataset, as arrays aligned with
+        the dataset row positions. These are saved once the iteration infers the entire dataset; rows that were added
+        to the dataset afterwards are inferred and added to the saved predictions.
+        :param workspace_id:
+        :param category_id:
+        :param iteration_index: iteration to use. If set to None, the latest model for the category will be used
+        """
+        if iteration_index is None:  # use the latest ready model
+            _, iteration_index = self.get_all_iterations_by_status(workspace_id, category_id,
+                                                                   IterationStatus.READY)[-1]
+        dataset_name = self.get_dataset_name(workspace_id)
+        key = (workspace_id, category_id, iteration_index)
+        predictions_dir = self._get_iteration_predictions_dir(workspace_id, category_id, iteration_index)
+        with self.iteration_predictions_lock:
+            key_lock = self.iteration_predictions_key_locks[key]
+        # the predictions of an iteration are calculated once, while holding the lock of this iteration, so inference
+        # for one iteration does not block access to the predictions of other iterations
+        with key_lock:
+            with self.iteration_predictions_lock:
+                iteration_predictions = self.iteration_predictions_in_memory.get(key)
+            if iteration_predictions is None:
+                if IterationPredictions.exist(predictions_dir):
+                    iteration_predictions = IterationPredictions.load(predictions_dir)
+                else:
+                    # e.g. iterations that were completed before the predictions were saved as arrays
+                    iteration_predictions = IterationPredictions.from_predictions(
+                        self.infer(workspace_id, category_id, self.get_all_text_elements(dataset_name),
+                                   iteration_index))
+                    self._store_iteration_predictions(workspace_id, category_id, iteration_index,
+                                                      iteration_predictions)
+
+            num_rows = self.data_access.get_dataset_elements_count(dataset_name)
+            if len(iteration_predictions) < num_rows:
+                new_rows = np.arange(len(iteration_predictions), num_rows)
+                new_elements = self.data_access.get_text_elements_by_row_positions(workspace_id, dataset_name,
+                                                                                   new_rows)
+                iteration_predictions = iteration_predictions.extended(
+                    self.infer(workspace_id, category_id, new_elements, iteration_index))
+                self._store_iteration_predictions(workspace_id, category_id, iteration_index, iteration_predictions)
+            else:
+                self._store_iteration_predictions(workspace_id, category_id, iteration_index, iteration_predictions,
+                                                  save=False)
+            return iteration_predictions
+
+    def _save_iteration_predictions(self, workspace_id, category_id, iteration_index,
+                                    iteration_predictions: IterationPredictions):
+        """
+        Save the predictions of the *iteration_index* model over the entire dataset
+        :param iteration_predictions: model predictions for all the elements in the dataset
+        """
+        key = (workspace_id, category_id, iteration_index)
+        with self.iteration_predictions_lock:
+            key_lock = self.iteration_predictions_key_locks[key]
+        with key_lock:
+            self._store_iteration_predictions(workspace_id, category_id, iteration_index, iteration_predictions)
+
+    def _store_iteration_predictions(self, workspace_id, category_id, iteration_index,
+                                     iteration_predictions: IterationPredictions, save=True):
+        """
+        Save the predictions of an iteration to disk and keep them in memory, unless the model of the iteration was
+        deleted in the meantime. Must be called while holding the lock of this iteration.
+        :param iteration_predictions: model predictions for all the elements in the dataset
+        :param save: if False, only keep the predictions in memory
+        """
+        if self._is_iteration_model_deleted(workspace_id, category_id, iteration_index):
+            logging.info(f"Not keeping the predictions of iteration {iteration_index} in workspace '{workspace_id}' "
+                         f"category id '{category_id}' as its model was deleted")
+            return
+        if save:
+            iteration_predictions.save(self._get_iteration_predictions_dir(workspace_id, category_id,
+                                                                           iteration_index))
+        key = (workspace_id, category_id, iteration_index)
+        with self.iteration_predictions_lock:
+            self.iteration_predictions_in_memory[key] = iteration_predictions
+            self.iteration_predictions_in_memory.move_to_end(key)
+            while len(self.iteration_predictions_in_memory) > MAX_ITERATION_PREDICTIONS_IN_MEMORY:
+                self.iteration_predictions_in_memory.popitem(last=False)
+
+    def _is_iteration_model_deleted(self, workspace_id, category_id, iteration_index) -> bool:
+        model_info = self.get_all_iterations_for_category(workspace_id, category_id)[iteration_index].model
+        return model_info is not None and model_info.model_status == ModelStatus.DELETED
+
+    def _delete_iteration_predictions(self, workspace_id, category_id, iteration_index):
+        """
+        Delete the predictions of an iteration whose model was marked as deleted. The lock of this iteration is held
+        during the deletion, so predictions that are being calculated for this iteration are not saved afterwards.
+        """
+        key = (workspace_id, category_id, iteration_index)
+        with self.iteration_predictions_lock:
+            key_lock = self.iteration_predictions_key_locks[key]
+        with key_lock:
+            with self.iteration_predictions_lock:
+                self.iteration_predictions_in_memory.pop(key, None)
+            predictions_dir = self._get_iteration_predictions_dir(workspace_id, category_id, iteration_index)
+            if os.path.isdir(predictions_dir):
+                shutil.rmtree(predictions_dir)
+            # threads that already got this lock see that the model was deleted once they acquire it
+            with self.iteration_predictions_lock:
+                self.iteration_predictions_key_locks.pop(key, None)
+
+    def _get_iteration_predictions_dir(self, workspace_id, category_id, iteration_index):
+        category_dir_name = 'multiclass' if category_id is None else f'category_{category_id}'
+        return os.path.join(self.orchestrator_state.workspace_dir, ITERATION_PREDICTIONS_DIR_NAME, workspace_id,
+                            category_dir_name, f'iteration_{iteration_index}')
+
     def _calculate_active_learning_recommendations(self, workspace_id, dataset_name, category_id, count,
                                                    iteration_index: int):
         """
@@ -816,7 +1060,8 @@ class OrchestratorApi:
         try:
             iterations_without_errors = [iteration for iteration in iterations
                                          if iteration.status not in [IterationStatus.ERROR,
-                                                                     IterationStatus.INSUFFICIENT_TRAIN_DATA]]
+                                                                     IterationStatus.INSUFFICIENT_TRAIN_DATA,
+                                                                     IterationStatus.CANCELLED]]
 
             changes_since_last_model = \
                 self.orchestrator_state.get_label_change_count_since_last_train(workspace_id, category_id)
@@ -891,6 +1136,28 @@ class OrchestratorApi:
 
             logging.exception(f"train_if_recommended failed in iteration {iteration_index}. Model will not be trained")
 
+    def train_if_recommended_later(self, workspace_id: str, category_id: Union[int, None]):
+        """
+        Call train_if_recommended() in the background, after *config.training_trigger_window_seconds*. Calls for the
+        same workspace and category that arrive while a call is pending are coalesced into the pending call, so that
+        bursts of labeling do not result in redundant checks and training jobs.
+        :param workspace_id:
+        :param category_id:
+        """
+        key = (workspace_id, category_id)
+        with self.iteration_flow_lock:
+            if key in self.pending_training_triggers:
+                return
+            timer = threading.Timer(self.config.training_trigger_window_seconds, self._run_training_trigger, key)
+            timer.daemon = True
+            self.pending_training_triggers[key] = timer
+        timer.start()
+
+    def _run_training_trigger(self, workspace_id, category_id):
+        with self.iteration_flow_lock:
+            self.pending_training_triggers.pop((workspace_id, category_id), None)
+        self.train_if_recommended(workspace_id, category_id)
+
     def _should_train_binary_condition(self, changes_since_last_model, label_counts, workspace_id, config, category_id):
         return (LABEL_POSITIVE in label_counts and
                 label_counts[LABEL_POSITIVE] >= self.config.binary_flow.first_model_positive_threshold and
@@ -908,7 +1175,7 @@ class OrchestratorApi:
         # check the model info and compare the class list to the current class list.
 
         previous_not_failed_iterations = [iteration for iteration in iterations
-                                         if iteration.status not in [IterationStatus.ERROR]]
+                                         if iteration.status not in [IterationStatus.ERROR, IterationStatus.CANCELLED]]
 
         # first iteration is zero shot + no labeled data + no model was trained yet
         zero_shot_training_condition = len(previous_not_failed_iterations) == 0 and \
@@ -971,7 +1238,7 @@ class OrchestratorApi:
             iteration = iterations[iteration_index]
             if iteration.status in [IterationStatus.PREPARING_DATA, IterationStatus.TRAINING,
                                     IterationStatus.MODEL_DELETED, IterationStatus.ERROR,
-                                    IterationStatus.INSUFFICIENT_TRAIN_DATA]:
+                                    IterationStatus.INSUFFICIENT_TRAIN_DATA, IterationStatus.CANCELLED]:
                 raise Exception(
                     f"iteration {iteration_index} in workspace '{workspace_id}' category id '{category_id}' "
                     f"is not ready for inference. "
@@ -1085,20 +1352,35 @@ class OrchestratorApi:
                                       value: Union[bool, int],
                                       sample_size: int = sys.maxsize,
                                       sample_start_idx: int = 0,
-                                      remove_duplicates=False, random_state: int = 0):
+                                      remove_duplicates=False, random_state: int = 0,
+                                      cursor: str = None) -> Mapping[str, Union[List[TextElement], int, str]]:
+        """
+        Return the elements that were assigned the label *value* for the given category by the user
 
+        :param workspace_id:
+        :param category_id: the id of the category in binary workspaces, or None in multiclass workspaces
+        :param value: True/False for binary workspaces, or the class id for multiclass workspaces
+        :param sample_size: number of elements to return
+        :param sample_start_idx: get elements starting from this index (for pagination)
+        :param remove_duplicates: if True, do not include elements that are duplicates of each other.
+        :param random_state: provide an int seed to define a random state. Default is zero.
+        :param cursor: the 'next_cursor' returned by a previous call with the same arguments, for fetching the next
+        page of its results
+        :return: a dictionary with the keys 'results', 'hit_count' and 'next_cursor' (see query())
+        """
         dataset_name = self.get_dataset_name(workspace_id)
-        results_dict = self.data_access.get_labeled_elements_by_value(workspace_id, dataset_name, category_id, value,
-                                                      sample_size, sample_start_idx, remove_duplicates, random_state)
-        return results_dict["results"], results_dict["hit_count"]
+        return self.data_access.get_labeled_elements_by_value(workspace_id, dataset_name, category_id, value,
+                                                              sample_size, sample_start_idx, remove_duplicates,
+                                                              random_state, cursor=cursor)
 
     def get_elements_by_prediction(self, workspace_id, category_id, required_prediction, sample_size, start_idx=0,
-                                   shuffle=False, random_state=0, remove_duplicates=True) -> List[TextElement]:
+                                   shuffle=False, random_state=0, remove_duplicates=True,
+                                   sort_by_score=False) -> List[TextElement]:
         """
         Get elements in the given workspace that received a positive prediction from the latest classification model
         for the category.
-        As finding and returning _all_ the positively predicted elements is expensive, this method only collects as many
-        elements as is required by the request, namely up to *sample_size + start_idx* positively predicted elements.
+        The elements are selected using the predictions of the model for the entire dataset (see
+        get_iteration_predictions()), so only the returned elements are fetched from the dataset.
 
         :param workspace_id:
         :param category_id:
@@ -1108,32 +1390,29 @@ class OrchestratorApi:
         :param shuffle: if True, text elements are retrieved in a random order.
         :param random_state: provide an int seed to define a random state. Default is zero.
         :param remove_duplicates: if True, do not include elements that are duplicates of each other.
+        :param sort_by_score: if True, text elements are retrieved in descending order of their score for
+        *required_prediction*.
         """
         logging.info(f"workspace '{workspace_id}' category id {category_id} fetching {sample_size} "
                      f"{required_prediction} predictions (start index: {start_idx})")
 
-        def batched(iterable, batch_size=100):
-            it = iter(iterable)
-            while batch := list(itertools.islice(it, batch_size)):
-                yield batch
-
         dataset_name = self.get_dataset_name(workspace_id)
-        elements_with_required_prediction = []
-        # we fetch and infer text elements in batches, and collect those elements that match the required prediction
-        element_batch_iterator = batched(
-            self.data_access.get_text_element_iterator(workspace_id, dataset_name, shuffle=shuffle,
-                                                       random_state=random_state, remove_duplicates=remove_duplicates))
-        for element_batch in element_batch_iterator:
-            batch_predictions = self.infer(workspace_id, category_id, element_batch)
-            for element, prediction in zip(element_batch, batch_predictions):
-                if prediction.label == required_prediction:
-                    elements_with_required_prediction.append(element)
-            if len(elements_with_required_prediction) >= start_idx + sample_size:
-                break  # we have collected enough elements
+        iteration_predictions = self.get_iteration_predictions(workspace_id, category_id)
+        rows = self.data_access.get_text_element_row_positions(dataset_name, shuffle=shuffle,
+                                                               random_state=random_state,
+                                                               remove_duplicates=remove_duplicates)
+        # rows that were added after the predictions were fetched are skipped
+        rows = rows[rows < len(iteration_predictions)]
+        rows = iteration_predictions.get_rows_with_label(required_prediction, rows)
+        if sort_by_score:
+            rows = iteration_predictions.get_top_rows_by_score(required_prediction, rows, start_idx + sample_size)
+        rows = rows[start_idx:start_idx + sample_size]
+        elements_with_required_prediction = \
+            self.data_access.get_text_elements_by_row_positions(workspace_id, dataset_name, rows)
         logging.info(
             f"workspace '{workspace_id}' category id {category_id} done fetching {sample_size} {required_prediction}"
             f" predictions (start index: {start_idx})")
-        return elements_with_required_prediction[start_idx:start_idx + sample_size]
+        return elements_with_required_prediction
 
     def get_progress(self, workspace_id: str, dataset_name: str, category_id: Union[int, None]):
         label_counts = self.get_label_counts(workspace_id, dataset_name, category_id, remove_duplicates=True,
@@ -1358,7 +1637,7 @@ class OrchestratorApi:
         exported_model_dir = model_api.copy_model_dir_for_export(iteration.model.model_id)
 
         exported_model_info = {'model_type': iteration.model.model_type}
-        model_info_encoded = jsonpickle_encode(exported_model_info)
+        model_info_encoded = serialize(exported_model_info)
         with open(os.path.join(exported_model_dir, 'model_info.json'), 'w') as f:
             f.write(model_info_encoded)
         return os.path.abspath(os.path.join(exported_model_dir, os.pardir))
@@ -1433,7 +1712,8 @@ class OrchestratorApi:
                      f"using model {iteration_index}")
         # Currently, there is no indication to the user that inference is running on the new documents, and there is no
         # indication for when this inference ends. Can be added and reflected in the UI in the future
-        self.infer(workspace_id, category_id, self.get_all_text_elements(dataset_name), iteration_index)
+        # only the newly added rows are inferred, and their predictions are added to the saved iteration predictions
+        self.get_iteration_predictions(workspace_id, category_id, iteration_index)
         logging.info(f"completed inference with the latest model for category id {category_id} in workspace "
                      f"'{workspace_id}' after new documents were loaded to dataset '{dataset_name}',"
                      f"using model {iteration_index}")
@@ -1489,7 +1769,8 @@ class OrchestratorApi:
                 for category_id, category in self.get_all_categories(workspace_id).items():
                     if len(category.iterations) > 0 \
                             and category.iterations[-1].status not in [IterationStatus.ERROR, IterationStatus.READY
-                                                                       , IterationStatus.INSUFFICIENT_TRAIN_DATA]:
+                                                                       , IterationStatus.INSUFFICIENT_TRAIN_DATA
+                                                                       , IterationStatus.CANCELLED]:
                         logging.info(f"workspace '{workspace_id}', category id {category_id} ('{category.name}') has "
                                      f"iteration in status {category.iterations[-1]}. Restarting iteration")
                         self.restart_last_iteration(workspace_id, category_id)
@@ -1498,7 +1779,7 @@ class OrchestratorApi:
                 iterations = self.orchestrator_state.get_all_iterations(workspace_id, None)
                 if len(iterations) > 0 \
                         and iterations[-1].status not in [IterationStatus.ERROR, IterationStatus.READY
-                    , IterationStatus.INSUFFICIENT_TRAIN_DATA]:
+                    , IterationStatus.INSUFFICIENT_TRAIN_DATA, IterationStatus.CANCELLED]:
                     logging.info(f"workspace '{workspace_id}' (multiclass) has "
                                  f"iteration in status {iterations[-1]}. Restarting iteration")
                     self.restart_last_iteration(workspace_id, None)
@@ -15,12 +15,13 @@
 
 import functools
 import os
+import threading
 import unittest
 from unittest.mock import MagicMock
 from label_sleuth.config import load_config
 
 from label_sleuth.models.core.prediction import Prediction
-from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager, CancellationToken, JobPriority
 
 DUMMY_PREDICTIONS = [Prediction(True, 0.54), Prediction(False, 0.22)]
 
@@ -47,6 +48,10 @@ def infer_failed_with_error(mid, dummy_data):
     raise Exception("Inference failed")
 
 
+def get_process_id(mid):
+    return mid, os.getpid()
+
+
 class TestBackgroundJobsManager(unittest.TestCase):
     def test_simple_training_job(self):
         callback_mock = MagicMock(name='callback')
@@ -93,3 +98,73 @@ class TestBackgroundJobsManager(unittest.TestCase):
                                             done_callback=functools.partial(callback_mock, dummy_callback_data))
         self.assertRaises(Exception, future.result)
         callback_mock.assert_called_once_with(dummy_callback_data, future)
+
+    def test_process_jobs(self):
+        manager = BackgroundJobsManager(config.cpu_workers, process_workers=2)
+        mid, pid = manager.add_process_job(get_process_id, (123,), done_callback=None).result()
+        self.assertEqual(123, mid)
+        self.assertNotEqual(os.getpid(), pid)
+        results = manager.map_process_jobs(get_process_id, [(1,), (2,)])
+        self.assertEqual([1, 2], [mid for mid, _ in results])
+        self.assertNotIn(os.getpid(), [pid for _, pid in results])
+        manager.shutdown()
+
+    def test_process_jobs_without_worker_processes(self):
+        manager = BackgroundJobsManager(config.cpu_workers)
+        self.assertEqual([(1, os.getpid()), (2, os.getpid())],
+                         manager.map_process_jobs(get_process_id, [(1,), (2,)]))
+        self.assertIsNone(manager.process_executor)
+
+    def _add_blocking_job(self, manager):
+        release_event = threading.Event()
+        started_event = threading.Event()
+
+        def blocking_job():
+            started_event.set()
+            release_event.wait()
+
+        future = manager.add_background_job(blocking_job, (), False, None)
+        started_event.wait()
+        return release_event, future
+
+    def test_pending_jobs_run_by_priority(self):
+        manager = BackgroundJobsManager(cpu_workers=1)
+        release_event, blocking_future = self._add_blocking_job(manager)
+        run_order = []
+        futures = [manager.add_background_job(run_order.append, (priority.name,), False, None, priority=priority)
+                   for priority in [JobPriority.BULK, JobPriority.ITERATION, JobPriority.INTERACTIVE,
+                                    JobPriority.ITERATION]]
+        self.assertEqual({'interactive': 1, 'iteration': 2, 'bulk': 1}, manager.get_queue_depths())
+        release_event.set()
+        for future in futures:
+            future.result()
+        self.assertEqual(['INTERACTIVE', 'ITERATION', 'ITERATION', 'BULK'], run_order)
+        self.assertEqual({'interactive': 0, 'iteration': 0, 'bulk': 0}, manager.get_queue_depths())
+
+    def test_pending_jobs_with_the_same_key_are_added_once(self):
+        manager = BackgroundJobsManager(cpu_workers=1)
+        release_event, _ = self._add_blocking_job(manager)
+        run_order = []
+        bulk_future = manager.add_background_job(run_order.append, ('first',), False, None,
+                                                 priority=JobPriority.BULK, key='job')
+        manager.add_background_job(run_order.append, ('other',), False, None, priority=JobPriority.ITERATION)
+        interactive_future = manager.add_background_job(run_order.append, ('second',), False, None,
+                                                        priority=JobPriority.INTERACTIVE, key='job')
+        self.assertIs(bulk_future, interactive_future)
+        release_event.set()
+        manager.add_background_job(run_order.append, ('last',), False, None, priority=JobPriority.BULK).result()
+        self.assertEqual(['first', 'other', 'last'], run_order)
+
+    def test_cancelled_job_is_not_run(self):
+        manager = BackgroundJobsManager(cpu_workers=1)
+        release_event, _ = self._add_blocking_job(manager)
+        method_mock = MagicMock(name='method')
+        callback_mock = MagicMock(name='callback')
+        token = CancellationToken()
+        future = manager.add_background_job(method_mock, (), False, callback_mock, cancellation_token=token)
+        token.cancel()
+        release_event.set()
+        manager.add_background_job(method_mock, (), False, None).result()
+        self.assertTrue(future.cancelled())
+        method_mock.assert_called_once_with()
+        callback_mock.assert_called_once_with(future)
@@ -0,0 +1,65 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from label_sleuth.models.core.prediction import MulticlassPrediction, Prediction
+from label_sleuth.orchestrator.iteration_predictions import IterationPredictions
+
+
+class TestIterationPredictions(unittest.TestCase):
+    def test_binary_predictions(self):
+        predictions = IterationPredictions.from_predictions(
+            [Prediction(True, 0.7), Prediction(False, 0.2), Prediction(True, 0.9), Prediction(False, 0.4)])
+        extended = predictions.extended([Prediction(True, 0.8)])
+        self.assertEqual(4, len(predictions))
+        predictions = extended
+        self.assertEqual({True: 3, False: 2}, predictions.get_label_counts([True, False]))
+
+        rows = np.array([4, 3, 2, 1, 0])
+        self.assertEqual([4, 2, 0], predictions.get_rows_with_label(True, rows).tolist())
+        self.assertEqual([2, 4], predictions.get_top_rows_by_score(True, rows, 2).tolist())
+        self.assertEqual([1, 3], predictions.get_top_rows_by_score(False, np.array([1, 3]), 5).tolist())
+
+    def test_concatenate_chunks(self):
+        chunks = [IterationPredictions.from_predictions([Prediction(True, 0.7), Prediction(False, 0.2)]),
+                  IterationPredictions.from_predictions([Prediction(False, 0.1)])]
+        predictions = IterationPredictions.concatenate(chunks)
+        self.assertEqual([True, False, False], predictions.labels.tolist())
+        self.assertEqual([0.7, 0.2, 0.1], predictions.scores.tolist())
+        self.assertEqual(0, len(IterationPredictions.concatenate([])))
+
+    def test_multiclass_predictions_save_and_load(self):
+        predictions = IterationPredictions.from_predictions(
+            [MulticlassPrediction(0, {0: 0.6, 1: 0.3, 2: 0.1}), MulticlassPrediction(2, {0: 0.1, 1: 0.2, 2: 0.7}),
+             MulticlassPrediction(2, {0: 0.2, 1: 0.2, 2: 0.6})])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            predictions_dir = os.path.join(temp_dir, 'iteration_0')
+            self.assertFalse(IterationPredictions.exist(predictions_dir))
+            predictions.save(predictions_dir)
+            self.assertTrue(IterationPredictions.exist(predictions_dir))
+            loaded = IterationPredictions.load(predictions_dir)
+            # saving again replaces the saved predictions
+            IterationPredictions.from_predictions([MulticlassPrediction(1, {0: 0.1, 1: 0.8, 2: 0.1})]) \
+                .save(predictions_dir)
+            self.assertEqual([1], IterationPredictions.load(predictions_dir).labels.tolist())
+            self.assertEqual(['iteration_0'], os.listdir(temp_dir))
+
+        self.assertEqual({0: 1, 1: 0, 2: 2}, loaded.get_label_counts([0, 1, 2]))
+        self.assertEqual([1, 2], loaded.get_top_rows_by_score(2, np.arange(3), 2).tolist())
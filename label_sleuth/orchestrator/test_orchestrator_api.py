@@ -16,10 +16,13 @@
 import os
 import random
 import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import Future
 from datetime import datetime
 from typing import List
-from unittest.mock import patch
+from unittest.mock import call, patch
 
 import pandas as pd
 
@@ -32,9 +35,11 @@ from label_sleuth.data_access.test_file_based_data_access import generate_corpus
 from label_sleuth.models.core.model_api import ModelStatus
 from label_sleuth.models.core.catalog import ModelsCatalog
 from label_sleuth.models.core.models_factory import ModelFactory
+from label_sleuth.models.core.prediction import Prediction
 from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
 from label_sleuth.orchestrator.core.state_api.orchestrator_state_api import OrchestratorStateApi, Iteration, \
     IterationStatus, ModelInfo, MulticlassCategory
+from label_sleuth.orchestrator.iteration_predictions import IterationPredictions
 from label_sleuth.orchestrator.orchestrator_api import OrchestratorApi, NUMBER_OF_MODELS_TO_KEEP
 from label_sleuth.training_set_selector.training_set_selector_factory import TrainingSetSelectionFactory
 
@@ -455,6 +460,118 @@ class TestOrchestratorAPI(unittest.TestCase):
         self.assertEqual(0, num_changed, msg="we set a label with update_label_counter=False "
                                              "so number of changed element should be zero")
 
+    @patch.object(OrchestratorApi, 'train_if_recommended')
+    def test_training_triggers_are_coalesced(self, mock_train_if_recommended):
+        workspace_id = self.test_training_triggers_are_coalesced.__name__
+        with patch.object(self.orchestrator_api.config, 'training_trigger_window_seconds', 0.2):
+            for _ in range(5):
+                self.orchestrator_api.train_if_recommended_later(workspace_id, 0)
+            self.orchestrator_api.train_if_recommended_later(workspace_id, 1)
+            time.sleep(0.5)
+            self.assertCountEqual([call(workspace_id, 0), call(workspace_id, 1)],
+                                  mock_train_if_recommended.call_args_list)
+            self.orchestrator_api.train_if_recommended_later(workspace_id, 0)
+            time.sleep(0.5)
+        self.assertEqual(3, mock_train_if_recommended.call_count)
+
+    def test_superseded_iteration_is_cancelled(self):
+        workspace_id = self.test_superseded_iteration_is_cancelled.__name__
+        dataset_name = f'{workspace_id}_dump'
+        generate_corpus(self.data_access, dataset_name)
+        self.orchestrator_api.create_workspace(workspace_id, dataset_name)
+        category_id = self.orchestrator_api.create_new_category(workspace_id, f'{workspace_id}_cat', 'description')
+        self.orchestrator_state.add_iteration(workspace_id, category_id)
+        first_token = self.orchestrator_api._start_iteration_cancellation_token(workspace_id, category_id, 0)
+        self.orchestrator_state.add_iteration(workspace_id, category_id)
+        second_token = self.orchestrator_api._start_iteration_cancellation_token(workspace_id, category_id, 1)
+        self.assertTrue(first_token.is_cancelled())
+        self.assertFalse(second_token.is_cancelled())
+
+        train_future = Future()
+        train_future.set_result("model_id")
+        self.orchestrator_api._train_done_callback(workspace_id, category_id, 0, first_token, train_future)
+        self.assertEqual(IterationStatus.CANCELLED,
+                         self.orchestrator_api.get_iteration_status(workspace_id, category_id, 0))
+
+        self.orchestrator_api.delete_category(workspace_id, category_id)
+        self.assertTrue(second_token.is_cancelled())
+
+    def test_iteration_predictions_inference_does_not_block_other_iterations(self):
+        workspace_ids = [f'{self.test_iteration_predictions_inference_does_not_block_other_iterations.__name__}_{i}'
+                         for i in range(2)]
+        dataset_name = f'{workspace_ids[0]}_dump'
+        generate_corpus(self.data_access, dataset_name)
+        num_rows = self.data_access.get_dataset_elements_count(dataset_name)
+        for workspace_id in workspace_ids:
+            self._create_workspace_with_iteration(workspace_id, dataset_name)
+        saved_predictions = IterationPredictions.from_predictions([Prediction(True, 0.5)] * num_rows)
+        self.orchestrator_api._save_iteration_predictions(workspace_ids[1], 0, 0, saved_predictions)
+
+        inference_started = threading.Event()
+        finish_inference = threading.Event()
+
+        def infer(workspace_id, category_id, elements, iteration_index):
+            inference_started.set()
+            finish_inference.wait(10)
+            return [Prediction(False, 0.1)] * len(elements)
+
+        with patch.object(self.orchestrator_api, 'infer', side_effect=infer):
+            inferring_thread = threading.Thread(target=self.orchestrator_api.get_iteration_predictions,
+                                                args=(workspace_ids[0], 0, 0))
+            inferring_thread.start()
+            self.assertTrue(inference_started.wait(10))
+            results = []
+            reading_thread = threading.Thread(target=lambda: results.append(
+                self.orchestrator_api.get_iteration_predictions(workspace_ids[1], 0, 0)))
+            reading_thread.start()
+            reading_thread.join(5)
+            self.assertEqual([saved_predictions], results)
+            finish_inference.set()
+            reading_thread.join()
+            inferring_thread.join()
+        self.assertEqual({True: 0, False: num_rows},
+                         self.orchestrator_api.get_iteration_predictions(workspace_ids[0], 0, 0)
+                         .get_label_counts([True, False]))
+
+    def test_iteration_predictions_of_deleted_model_are_not_kept(self):
+        workspace_id = self.test_iteration_predictions_of_deleted_model_are_not_kept.__name__
+        dataset_name = f'{workspace_id}_dump'
+        generate_corpus(self.data_access, dataset_name)
+        self._create_workspace_with_iteration(workspace_id, dataset_name)
+        inference_started = threading.Event()
+        finish_inference = threading.Event()
+
+        def infer(workspace_id, category_id, elements, iteration_index):
+            inference_started.set()
+            finish_inference.wait(10)
+            return [Prediction(False, 0.1)] * len(elements)
+
+        def delete_predictions():
+            self.orchestrator_state.mark_iteration_model_as_deleted(workspace_id, 0, 0)
+            self.orchestrator_api._delete_iteration_predictions(workspace_id, 0, 0)
+
+        with patch.object(self.orchestrator_api, 'infer', side_effect=infer):
+            inferring_thread = threading.Thread(target=self.orchestrator_api.get_iteration_predictions,
+                                                args=(workspace_id, 0, 0))
+            inferring_thread.start()
+            self.assertTrue(inference_started.wait(10))
+            deleting_thread = threading.Thread(target=delete_predictions)
+            deleting_thread.start()
+            while not self.orchestrator_api._is_iteration_model_deleted(workspace_id, 0, 0):
+                time.sleep(0.01)
+            finish_inference.set()
+            inferring_thread.join()
+            deleting_thread.join()
+        self.assertFalse(os.path.exists(self.orchestrator_api._get_iteration_predictions_dir(workspace_id, 0, 0)))
+        self.assertNotIn((workspace_id, 0, 0), self.orchestrator_api.iteration_predictions_in_memory)
+
+    def _create_workspace_with_iteration(self, workspace_id, dataset_name):
+        self.orchestrator_api.create_workspace(workspace_id, dataset_name)
+        category_id = self.orchestrator_api.create_new_category(workspace_id, f'{workspace_id}_cat', 'description')
+        self.orchestrator_state.add_iteration(workspace_id, category_id)
+        self.orchestrator_state.add_model(workspace_id, category_id, 0,
+                                          ModelInfo("x", ModelStatus.READY, datetime.now(), ModelsCatalog.RAND, {}))
+
     @patch.object(OrchestratorApi, 'delete_iteration_model')
     @patch.object(OrchestratorStateApi, 'get_all_iterations')
     def test_old_models_deletion(self, get_all_iterations, delete_iteration_model):
@@ -13,9 +13,10 @@
 #  limitations under the License.
 #
 
-from typing import Mapping, Sequence
+from typing import Mapping, Optional, Sequence
 
 from label_sleuth.data_access.core.data_structs import LabeledTextElement, MulticlassLabeledTextElement
+from label_sleuth.models.core.model_api import DATASET_ROW_FIELD
 
 
 def convert_text_elements_to_train_data(elements: Sequence[LabeledTextElement], category_id) -> Sequence[Mapping]:
@@ -50,3 +51,16 @@ def convert_text_elements_to_multiclass_train_data(elements: Sequence[Multiclass
     return converted_data
 
 
+def add_dataset_rows_to_items(items: Sequence[dict], store_dir: Optional[str], rows: Sequence[int]):
+    """
+    Add the location of each item in the dataset store to the item (see DATASET_ROW_FIELD), so that models which run
+    in worker processes can read the texts of the items from the store. The items are left unchanged if the dataset is
+    not held in a store, or if some of the items are not in the dataset.
+    :param items: the items to train on or infer, in the expected format of the models
+    :param store_dir: the directory of the dataset store, as returned by get_dataset_store_dir()
+    :param rows: the row positions of the items in the dataset
+    """
+    if store_dir is None or any(row < 0 for row in rows):
+        return
+    for item, row in zip(items, rows):
+        item[DATASET_ROW_FIELD] = (store_dir, int(row))
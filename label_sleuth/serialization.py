@@ -0,0 +1,215 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+"""
+A schema-driven json codec for the objects that Label Sleuth persists to disk (e.g. workspaces, iterations and model
+metadata).
+
+Converters between an object and json-compatible values are built once per type, from the type annotations of
+dataclass fields, and cached. Values whose type is not known in advance (e.g. an untyped *dict* field) are encoded
+with their type when it cannot be inferred from json: dicts with non-string keys, tuples, dataclasses, enums,
+datetimes and model types. Anything else falls back to jsonpickle.
+
+Files written by previous versions with jsonpickle are still read by deserialize().
+"""
+
+import collections.abc
+import dataclasses
+import functools
+import importlib
+import typing
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, NamedTuple
+
+import numpy as np
+import ujson as json
+
+from label_sleuth.models.core.model_type import ModelType
+from label_sleuth.utils import jsonpickle_decode, jsonpickle_encode
+
+CODEC_KEY = 'label_sleuth_codec'
+CODEC_VERSION = 1
+TYPE_KEY = '__type__'
+VALUE_KEY = '__value__'
+DICT_TYPE = 'dict'
+TUPLE_TYPE = 'tuple'
+JSONPICKLE_TYPE = 'jsonpickle'
+
+JSON_SCALAR_TYPES = (str, int, float, bool)
+
+
+class Converter(NamedTuple):
+    encode: Callable[[Any], Any]
+    decode: Callable[[Any], Any]
+
+
+converters = {}  # type annotation -> Converter
+
+
+def serialize(obj) -> str:
+    return json.dumps({CODEC_KEY: CODEC_VERSION, VALUE_KEY: encode_value(obj)})
+
+
+def deserialize(json_str: str, **jsonpickle_decode_kwargs):
+    """
+    :param json_str: a string created by serialize(), or by jsonpickle_encode() in previous versions
+    :param jsonpickle_decode_kwargs: arguments for jsonpickle_decode(), used if *json_str* was created by jsonpickle
+    """
+    data = json.loads(json_str)
+    if type(data) is dict and CODEC_KEY in data:
+        return decode_value(data[VALUE_KEY])
+    return jsonpickle_decode(json_str, **jsonpickle_decode_kwargs)
+
+
+def encode_value(value):
+    """
+    Convert a value of any type to a json-compatible value, from which decode_value() recreates it
+    """
+    value_type = type(value)
+    if value is None or value_type in JSON_SCALAR_TYPES:
+        return value
+    if value_type is list:
+        return [encode_value(item) for item in value]
+    if value_type is dict:
+        if TYPE_KEY not in value and all(type(key) is str for key in value):
+            return {key: encode_value(item) for key, item in value.items()}
+        return {TYPE_KEY: DICT_TYPE,
+                VALUE_KEY: [[encode_value(key), encode_value(item)] for key, item in value.items()]}
+    if value_type is tuple:
+        return {TYPE_KEY: TUPLE_TYPE, VALUE_KEY: [encode_value(item) for item in value]}
+    if isinstance(value, np.generic):
+        return encode_value(value.item())
+    if _is_typed(value_type):
+        return {TYPE_KEY: _get_type_path(value_type), VALUE_KEY: get_converter(value_type).encode(value)}
+    return {TYPE_KEY: JSONPICKLE_TYPE, VALUE_KEY: jsonpickle_encode(value)}
+
+
+def decode_value(value):
+    value_type = type(value)
+    if value_type is list:
+        return [decode_value(item) for item in value]
+    if value_type is not dict:
+        return value
+    type_path = value.get(TYPE_KEY)
+    if type_path is None:
+        return {key: decode_value(item) for key, item in value.items()}
+    if type_path == DICT_TYPE:
+        return {decode_value(key): decode_value(item) for key, item in value[VALUE_KEY]}
+    if type_path == TUPLE_TYPE:
+        return tuple(decode_value(item) for item in value[VALUE_KEY])
+    if type_path == JSONPICKLE_TYPE:
+        return jsonpickle_decode(value[VALUE_KEY])
+    return get_converter(_import_type(type_path)).decode(value[VALUE_KEY])
+
+
+def get_converter(annotation) -> Converter:
+    """
+    :param annotation: a type, or a type annotation such as Dict[int, Category]
+    :return: a converter between values of this type (or None) and json-compatible values
+    """
+    converter = converters.get(annotation)
+    if converter is None:
+        converter = _build_converter(annotation)
+        if converter.encode not in (_identity, encode_value):
+            encode, decode = converter
+            converter = Converter(lambda value: None if value is None else encode(value),
+                                  lambda value: None if value is None else decode(value))
+        converters[annotation] = converter
+    return converter
+
+
+def _build_converter(annotation) -> Converter:
+    if annotation in JSON_SCALAR_TYPES:
+        return Converter(_identity, _identity)
+    if annotation is datetime:
+        return Converter(datetime.isoformat, datetime.fromisoformat)
+    if annotation is ModelType:
+        return Converter(lambda model_type: _get_type_path(model_type.cls),
+                         lambda type_path: ModelType(_import_type(type_path)))
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return Converter(lambda member: member.value, annotation)
+    if dataclasses.is_dataclass(annotation):
+        return _build_dataclass_converter(annotation)
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        non_none_args = [arg for arg in args if arg is not type(None)]
+        if len(non_none_args) == 1:
+            return get_converter(non_none_args[0])
+    elif origin in (list, collections.abc.Sequence) and len(args) == 1:
+        item_converter = get_converter(args[0])
+        if item_converter.encode is _identity:
+            return Converter(list, list)
+        return Converter(lambda items: [item_converter.encode(item) for item in items],
+                         lambda items: [item_converter.decode(item) for item in items])
+    elif origin in (dict, collections.abc.Mapping) and len(args) == 2 and args[0] in (str, int):
+        # json object keys are strings, so int keys are converted to strings and back
+        key_encode, key_decode = (_identity, _identity) if args[0] is str else (str, int)
+        value_converter = get_converter(args[1])
+        return Converter(lambda items: {key_encode(key): value_converter.encode(item) for key, item in items.items()},
+                         lambda items: {key_decode(key): value_converter.decode(item) for key, item in items.items()})
+    # the type is not specific enough (e.g. dict, Any or a Union of several types), so each value is encoded with its
+    # own type
+    return Converter(encode_value, decode_value)
+
+
+def _build_dataclass_converter(cls) -> Converter:
+    type_hints = typing.get_type_hints(cls)
+    field_converters = [(dataclass_field.name, get_converter(type_hints[dataclass_field.name]))
+                        for dataclass_field in dataclasses.fields(cls)]
+    # fields with json-compatible values are copied as is
+    identity_fields = [name for name, converter in field_converters if converter.encode is _identity]
+    converted_fields = [(name, converter) for name, converter in field_converters
+                        if converter.encode is not _identity]
+
+    def encode(obj):
+        obj_dict = obj.__dict__
+        encoded = {name: obj_dict[name] for name in identity_fields}
+        for name, converter in converted_fields:
+            encoded[name] = converter.encode(obj_dict[name])
+        return encoded
+
+    def decode(encoded: dict):
+        # fields that are missing from *encoded* (e.g. fields that were added in later versions) get their default
+        kwargs = {name: encoded[name] for name in identity_fields if name in encoded}
+        for name, converter in converted_fields:
+            if name in encoded:
+                kwargs[name] = converter.decode(encoded[name])
+        return cls(**kwargs)
+
+    return Converter(encode, decode)
+
+
+def _identity(value):
+    return value
+
+
+def _is_typed(value_type) -> bool:
+    return dataclasses.is_dataclass(value_type) or issubclass(value_type, Enum) or value_type in (datetime, ModelType)
+
+
+def _get_type_path(cls) -> str:
+    return f'{cls.__module__}:{cls.__qualname__}'
+
+
+@functools.lru_cache(maxsize=None)
+def _import_type(type_path: str):
+    module_name, qualname = type_path.split(':')
+    obj = importlib.import_module(module_name)
+    for attr_name in qualname.split('.'):
+        obj = getattr(obj, attr_name)
+    return obj
@@ -53,6 +53,17 @@ class TestAppIntegration(unittest.TestCase):
     def tearDownClass(cls):
         cls.temp_dir.cleanup()
 
+    def test_metrics(self):
+        res = self.client.get("/workspaces", headers=HEADERS)
+        self.assertEqual(200, res.status_code)
+        self.assertIn("serialization;dur=", res.headers['Server-Timing'])
+
+        res = self.client.get("/metrics")
+        self.assertEqual(200, res.status_code)
+        text = res.get_data(as_text=True)
+        self.assertIn('label_sleuth_http_request_seconds_count{endpoint="/workspaces",method="GET",status="200"}', text)
+        self.assertIn('label_sleuth_background_jobs_pending{priority="interactive"}', text)
+
     def test_full_flow(self):
         ui_defaults = app_utils.get_default_customizable_UI_text()
 
@@ -176,6 +187,25 @@ class TestAppIntegration(unittest.TestCase):
             "model_predictions": None, "text": text_with_parenthesis,
             "user_labels": None}],
             document3_elements, msg=f"diff in {documents[-1]['document_id']} content")
+
+        # page through the document elements using cursors
+        res = self.client.get(f"/workspace/{workspace_name}/document/{documents[-1]['document_id']}?size=3",
+                              headers=HEADERS)
+        next_cursor = res.get_json()['next_cursor']
+        self.assertIsNotNone(next_cursor)
+        res = self.client.get(f"/workspace/{workspace_name}/document/{documents[-1]['document_id']}?size=3"
+                              f"&cursor={next_cursor}", headers=HEADERS)
+        self.assertEqual(document3_elements[3:], res.get_json()['elements'])
+        self.assertIsNone(res.get_json()['next_cursor'])
+        # a cursor cannot be used for another document
+        res = self.client.get(f"/workspace/{workspace_name}/document/{documents[0]['document_id']}?size=3"
+                              f"&cursor={next_cursor}", headers=HEADERS)
+        self.assertEqual(400, res.status_code)
+        self.assertEqual('invalid_cursor', res.get_json()['type'])
+        res = self.client.get(f"/workspace/{workspace_name}/document/{documents[-1]['document_id']}?size=3"
+                              f"&cursor=not-a-cursor", headers=HEADERS)
+        self.assertEqual(400, res.status_code)
+
         res = self.client.put(f'/workspace/{workspace_name}/element/{document3_elements[0]["id"]}',
                               data='{{"category_id":"{}","binary_label":{}}}'.format(category_id, 'true'), headers=HEADERS)
         self.assertEqual(200, res.status_code, msg="Failed to set the first label for a category")
@@ -212,7 +242,7 @@ class TestAppIntegration(unittest.TestCase):
                     "text": text_with_parenthesis,
                     "user_labels": None
                 }
-            ], "hit_count": 1,  "hit_count_unique": 1}, 
+            ], "hit_count": 1,  "hit_count_unique": 1, "next_cursor": None}, 
             res.get_json(), 
             msg="The searched text differs from the response"
         )
@@ -283,7 +313,8 @@ class TestAppIntegration(unittest.TestCase):
               'model_predictions': {'0': 'true'},
           'snippet': 'this text contains a parenthesis a a a a a ... x and some more text to force creating a snippet',
               'text': 'this text contains a parenthesis a a a a a a(b b b b b b c c c c ( x x x x and some more '
-                      'text to force creating a snippet', 'user_labels': None}], 'fraction': 0.8571428571428571},
+                      'text to force creating a snippet', 'user_labels': None}], 'fraction': 0.8571428571428571,
+                          'next_cursor': None},
                          res.get_json(), msg="Failed to get elements by positive prediction")
 
         # elements by negative prediction
@@ -297,7 +328,7 @@ class TestAppIntegration(unittest.TestCase):
                     'end': 141, 'id': 'my_test_dataset-document3-1',
                     'model_predictions': {'0': 'false'},
                     'text': 'document 3 has three text elements, this is the second that will be labeled as negative',
-                                'user_labels': {'0': 'false'}}], 'fraction': 0.14285714285714285},
+                                'user_labels': {'0': 'false'}}], 'fraction': 0.14285714285714285, 'next_cursor': None},
                          res.get_json(), msg="Failed to get elements by positive prediction")
 
         # get active learning recommendations
@@ -317,7 +348,7 @@ class TestAppIntegration(unittest.TestCase):
              'user_labels': None},
             {'begin': 0, 'docid': 'my_test_dataset-document1', 'end': 46, 'id': 'my_test_dataset-document1-0',
              'model_predictions': {str(category_id): 'true'}, 'text': 'this is the first text element of document one',
-             'user_labels': None}], 'hit_count': 4},
+             'user_labels': None}], 'hit_count': 4, 'next_cursor': None},
             active_learning_response)
 
         # set the first label according to the active learning recommendations
@@ -389,7 +420,7 @@ class TestAppIntegration(unittest.TestCase):
                            'model_predictions': {'0': 'true'},
                            'text': 'this is the second text element of document one',
                            'user_labels': {'0': 'true'}}],
-                             'hit_count': 3},
+                             'hit_count': 3, 'next_cursor': None},
                         res.get_json(), msg="diffs in positively labeled elements")
 
 
@@ -413,7 +444,7 @@ class TestAppIntegration(unittest.TestCase):
                            'model_predictions': {'0': 'true'},
                            'text': 'this is the only text element in document two',
                            'user_labels': {'0': 'false'}}],
-                            'hit_count': 2},
+                            'hit_count': 2, 'next_cursor': None},
                         res.get_json(), msg="diffs in negatively labeled elements")
 
 
@@ -668,7 +699,8 @@ class TestAppIntegration(unittest.TestCase):
                     }
                 ],
                 "hit_count": 1,
-                "hit_count_unique": 1
+                "hit_count_unique": 1,
+                "next_cursor": None
             },
             res.get_json(),
             msg="The searched text differs from the response"
@@ -714,7 +746,7 @@ class TestAppIntegration(unittest.TestCase):
              'user_labels': None},
             {'begin': 0, 'docid': 'multiclass_dataset-document1', 'end': 46, 'id': 'multiclass_dataset-document1-0',
              'model_predictions': 2, 'text': 'this is the first text element of document one',
-             'user_labels': None}], 'hit_count': 4},
+             'user_labels': None}], 'hit_count': 4, 'next_cursor': None},
             active_learning_response)
 
         # set the first label according to the active learning recommendations
@@ -746,7 +778,7 @@ class TestAppIntegration(unittest.TestCase):
                               headers=HEADERS)
         self.assertEqual(200, res.status_code,
                          msg="Failed to get labeled elements from category 0")
-        self.assertEqual({'elements': [{'begin': 0, 'docid': 'multiclass_dataset-document3', 'end': 53, 'id': 'multiclass_dataset-document3-0', 'model_predictions': 0, 'text': 'document 3 has three text elements, this is the first', 'user_labels': 0}], 'hit_count': 1},
+        self.assertEqual({'elements': [{'begin': 0, 'docid': 'multiclass_dataset-document3', 'end': 53, 'id': 'multiclass_dataset-document3-0', 'model_predictions': 0, 'text': 'document 3 has three text elements, this is the first', 'user_labels': 0}], 'hit_count': 1, 'next_cursor': None},
             res.get_json(), msg="diffs in labeled elements for class 0")
 
         # get predictions stats
@@ -783,7 +815,7 @@ class TestAppIntegration(unittest.TestCase):
                               headers=HEADERS)
         self.assertEqual(200, res.status_code,
                          msg="Failed to get labeled elements from category 0")
-        self.assertEqual({'elements': [], 'hit_count': 0},
+        self.assertEqual({'elements': [], 'hit_count': 0, 'next_cursor': None},
                          res.get_json(), msg="labeled elements for category 0 were deleted should not exist in this workspace")
 
         res = self.client.get(f"/workspace/{workspace_name}/categories", headers=HEADERS)
@@ -0,0 +1,59 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+
+import unittest
+
+from label_sleuth import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render_prometheus_text(self):
+        registry = metrics.MetricsRegistry()
+        counter = registry.counter('test_requests_total', 'Number of requests', ('path',))
+        counter.inc(path='/a')
+        counter.inc(2, path='/b "quoted"')
+        histogram = registry.histogram('test_seconds', 'Durations', buckets=(0.1, 1))
+        for value in [0.05, 0.1, 0.5, 3]:
+            histogram.observe(value)
+        registry.register_collector('test', lambda: registry.gauge('test_queue_depth', 'Queue depth').set(7))
+
+        self.assertEqual('# HELP test_queue_depth Queue depth\n'
+                         '# TYPE test_queue_depth gauge\n'
+                         'test_queue_depth 7\n'
+                         '# HELP test_requests_total Number of requests\n'
+                         '# TYPE test_requests_total counter\n'
+                         'test_requests_total{path="/a"} 1\n'
+                         'test_requests_total{path="/b \\"quoted\\""} 2\n'
+                         '# HELP test_seconds Durations\n'
+                         '# TYPE test_seconds histogram\n'
+                         'test_seconds_bucket{le="0.1"} 2\n'
+                         'test_seconds_bucket{le="1.0"} 3\n'
+                         'test_seconds_bucket{le="+Inf"} 4\n'
+                         'test_seconds_sum 3.65\n'
+                         'test_seconds_count 4\n', registry.render())
+        self.assertRaises(Exception, registry.gauge, 'test_seconds', 'Durations')
+
+    def test_request_trace(self):
+        metrics.start_request_trace()
+        with metrics.span('data_access'):
+            with metrics.span('data_access'):
+                pass
+            with metrics.span('inference'):
+                pass
+        request_durations = metrics.end_request_trace()
+        self.assertEqual({'data_access', 'inference'}, set(request_durations))
+        self.assertGreaterEqual(request_durations['data_access'], request_durations['inference'])
+        self.assertIsNone(metrics.end_request_trace())
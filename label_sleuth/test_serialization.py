@@ -0,0 +1,71 @@
+#
+#  Copyright (c) 2022 IBM Corp.
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+import os
+import unittest
+from datetime import datetime
+
+from label_sleuth.models.core.catalog import ModelsCatalog
+from label_sleuth.models.core.model_api import ModelStatus
+from label_sleuth.orchestrator.core.state_api.orchestrator_state_api import Category, Iteration, IterationStatus, \
+    ModelInfo, MulticlassCategory, MulticlassWorkspace, Workspace
+from label_sleuth.serialization import deserialize, serialize
+from label_sleuth.utils import jsonpickle_encode
+
+
+def get_workspace():
+    model = ModelInfo("123", ModelStatus.READY, datetime(2022, 7, 12, 14, 24, 59, 123),
+                      ModelsCatalog.SVM_OVER_BOW, {'train_counts': {True: 2, False: 1}})
+    iteration = Iteration(IterationStatus.READY, model, {'prediction_stats': {True: {'count': 3, 'fraction': 0.25}},
+                                                         'estimated_precision': float('nan')}, ['uri1', 'uri2'])
+    return Workspace('workspace', 'dataset', {0: Category('category', 0, 'description', 5, [iteration]), 1: None})
+
+
+class TestSerialization(unittest.TestCase):
+    def test_serialize_and_deserialize_workspace(self):
+        workspace = get_workspace()
+        decoded = deserialize(serialize(workspace))
+        self.assertEqual(Workspace, type(decoded))
+        iteration = decoded.categories[0].iterations[0]
+        self.assertEqual(workspace.categories[0].iterations[0].model, iteration.model)
+        self.assertEqual({True: {'count': 3, 'fraction': 0.25}}, iteration.iteration_statistics['prediction_stats'])
+        self.assertEqual(ModelsCatalog.SVM_OVER_BOW.cls, iteration.model.model_type.cls)
+        self.assertIsNone(decoded.categories[1])
+        iteration.iteration_statistics.pop('estimated_precision')
+        workspace.categories[0].iterations[0].iteration_statistics.pop('estimated_precision')
+        self.assertEqual(workspace, decoded)
+
+    def test_untyped_values_keep_their_type(self):
+        categories = {0: MulticlassCategory('cat', 0, 'description', '#ffffff'), 1: None}
+        workspace = MulticlassWorkspace('workspace', 'dataset', 2, categories, [
+            Iteration(IterationStatus.TRAINING, ModelInfo("123", ModelStatus.TRAINING, datetime.now(),
+                                                          ModelsCatalog.SVM_OVER_BOW, {'categories': categories}),
+                      {'pair': (1, 'a'), '__type__': 'not a type', 'status': ModelStatus.ERROR})])
+        self.assertEqual(workspace, deserialize(serialize(workspace)))
+
+    def test_deserialize_jsonpickle_files(self):
+        workspace = get_workspace()
+        workspace.categories[0].iterations[0].iteration_statistics.pop('estimated_precision')
+        self.assertEqual(workspace, deserialize(jsonpickle_encode(workspace, keys=True), keys=True))
+        self.assertEqual({'language': 'ENGLISH'}, deserialize(jsonpickle_encode({'language': 'ENGLISH'})))
+
+        sample_workspace = os.path.abspath(os.path.join(__file__, os.pardir, 'orchestrator', 'core', 'state_api',
+                                                        'test_workspace.json'))
+        with open(sample_workspace) as f:
+            legacy_workspace = deserialize(f.read(), keys=True)
+        # category ids are strings in old jsonpickle workspaces, and are converted by the OrchestratorStateApi
+        legacy_workspace.categories = {int(category_id): category
+                                       for category_id, category in legacy_workspace.categories.items()}
+        self.assertEqual(legacy_workspace, deserialize(serialize(legacy_workspace)))
@@ -19,7 +19,8 @@ from concurrent.futures import Future
 from typing import Sequence, Set, Union, Tuple, Mapping
 
 from label_sleuth.data_access.core.data_structs import LabelType, LabeledTextElement, MulticlassLabeledTextElement
-from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager
+from label_sleuth.metrics import ITERATION_STAGE_SECONDS
+from label_sleuth.orchestrator.background_jobs_manager import BackgroundJobsManager, CancellationToken, JobPriority
 
 
 class TrainSetSelectorAPI(object, metaclass=abc.ABCMeta):
@@ -32,12 +33,18 @@ class TrainSetSelectorAPI(object, metaclass=abc.ABCMeta):
         self.gpu_support = gpu_support
 
     def collect_train_set(self, workspace_id: str, train_dataset_name: str,
-                          cat_id_to_name_and_desc: Mapping[int, Tuple], done_callback=None) -> Future:
+                          cat_id_to_name_and_desc: Mapping[int, Tuple], done_callback=None,
+                          cancellation_token: CancellationToken = None) -> Future:
         future = self.background_jobs_manager.add_background_job(
-            self.get_train_set, args=(workspace_id, train_dataset_name, cat_id_to_name_and_desc),
-            use_gpu=self.gpu_support, done_callback=done_callback)
+            self._timed_get_train_set, args=(workspace_id, train_dataset_name, cat_id_to_name_and_desc),
+            use_gpu=self.gpu_support, done_callback=done_callback, priority=JobPriority.ITERATION,
+            cancellation_token=cancellation_token)
         return future
 
+    def _timed_get_train_set(self, *args):
+        with ITERATION_STAGE_SECONDS.time(stage='train_set_selection'):
+            return self.get_train_set(*args)
+
     @abc.abstractmethod
     def get_train_set(self, workspace_id: str, train_dataset_name: str,
                       cat_id_to_name_and_desc: Mapping[int, Tuple]) -> Union[Sequence[LabeledTextElement],